@@ -0,0 +1 @@
+"""Benchmarks measuring the computational performance of Flow."""
@@ -0,0 +1,158 @@
+"""Benchmark of the headless simulator against sumo on the ring road.
+
+Runs the same ring road simulation with the "traci" and "headless" simulators
+and reports the mean time per environment step, with the acceleration
+controllers evaluated separately and in batches. Also reports the throughput of
+the headless engine when simulating many rings at once, in ring-steps per
+second.
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from flow.controllers import IDMController, ContinuousRouter
+from flow.core.kernel.simulation.ring_engine import RingEngine
+from flow.core.params import EnvParams
+from flow.core.params import InitialConfig
+from flow.core.params import NetParams
+from flow.core.params import SumoParams
+from flow.core.params import VehicleParams
+from flow.envs import TestEnv
+from flow.networks.ring import RingNetwork, ADDITIONAL_NET_PARAMS
+
+EXAMPLE_USAGE = """
+example usage:
+    python headless.py --num_vehicles 22 --num_rings 1000
+"""
+
+
+def create_parser():
+    """Create the parser to capture CLI arguments."""
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="[Flow] Benchmarks the headless simulator.",
+        epilog=EXAMPLE_USAGE,
+    )
+    parser.add_argument(
+        "--num_vehicles",
+        type=int,
+        default=22,
+        help="Number of vehicles in the ring road.",
+    )
+    parser.add_argument(
+        "--num_rings",
+        type=int,
+        default=1000,
+        help="Number of rings simulated at once by the headless engine.",
+    )
+    parser.add_argument(
+        "--num_steps", type=int, default=500, help="Number of simulation steps."
+    )
+    return parser
+
+
+def create_env(num_vehicles, simulator, batch_controllers=False):
+    """Create a ring road environment with human-driven vehicles."""
+    vehicles = VehicleParams()
+    vehicles.add(
+        "human",
+        acceleration_controller=(IDMController, {}),
+        routing_controller=(ContinuousRouter, {}),
+        num_vehicles=num_vehicles,
+    )
+
+    network = RingNetwork(
+        name="headless",
+        vehicles=vehicles,
+        net_params=NetParams(additional_params=ADDITIONAL_NET_PARAMS.copy()),
+        initial_config=InitialConfig(spacing="uniform"),
+    )
+
+    return TestEnv(
+        env_params=EnvParams(horizon=float("inf"), batch_controllers=batch_controllers),
+        sim_params=SumoParams(sim_step=0.1, render=False),
+        network=network,
+        simulator=simulator,
+    )
+
+
+def run_env(flags, simulator, batch_controllers=False):
+    """Return the mean time per environment step, in seconds."""
+    env = create_env(flags.num_vehicles, simulator, batch_controllers)
+    env.reset()
+
+    t0 = time.time()
+    for _ in range(flags.num_steps):
+        env.step(rl_actions=None)
+    t = (time.time() - t0) / flags.num_steps
+
+    env.terminate()
+
+    return t
+
+
+def run_engine(flags):
+    """Return the mean time per step of the batched headless engine."""
+    length = ADDITIONAL_NET_PARAMS["length"]
+    engine = RingEngine(
+        length,
+        sim_step=0.1,
+        speed_limit=ADDITIONAL_NET_PARAMS["speed_limit"],
+        num_rings=flags.num_rings,
+    )
+    pos = np.linspace(0, length, flags.num_vehicles, endpoint=False)
+    pos = pos + np.random.uniform(-1, 1, (flags.num_rings, flags.num_vehicles))
+    engine.add_vehicles(pos, 0)
+
+    t0 = time.time()
+    for _ in range(flags.num_steps):
+        engine.step()
+
+    return (time.time() - t0) / flags.num_steps
+
+
+def main(args):
+    """Run the benchmark and print the timing results."""
+    flags = create_parser().parse_args(args)
+
+    t_traci = run_env(flags, "traci")
+    t_headless = run_env(flags, "headless")
+    t_batched = run_env(flags, "headless", batch_controllers=True)
+    t_engine = run_engine(flags)
+
+    print("simulator                    ms/step   ring-steps/s")
+    print("{:<26}   {:>7.3f}   {:>12.0f}".format("traci", 1e3 * t_traci, 1 / t_traci))
+    print(
+        "{:<26}   {:>7.3f}   {:>12.0f}".format(
+            "headless", 1e3 * t_headless, 1 / t_headless
+        )
+    )
+    print(
+        "{:<26}   {:>7.3f}   {:>12.0f}".format(
+            "headless (batched)", 1e3 * t_batched, 1 / t_batched
+        )
+    )
+    print(
+        "{:<26}   {:>7.3f}   {:>12.0f}".format(
+            "engine ({} rings)".format(flags.num_rings),
+            1e3 * t_engine,
+            flags.num_rings / t_engine,
+        )
+    )
+    print("speedup (headless vs traci): {:.2f}x".format(t_traci / t_headless))
+    print("speedup (headless batched vs traci): {:.2f}x".format(t_traci / t_batched))
+    print(
+        "speedup (engine vs traci, per ring): {:.0f}x".format(
+            t_traci * flags.num_rings / t_engine
+        )
+    )
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("TEST_FLAG", "True")
+    import sys
+
+    main(sys.argv[1:])
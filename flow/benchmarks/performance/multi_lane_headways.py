@@ -0,0 +1,164 @@
+"""Benchmark of the multi-lane leader/follower computation.
+
+Compares the vectorized implementation of ``TraCIVehicle._multi_lane_headways``
+to the per-vehicle reference implementation on a multi-lane highway, and
+checks at every step that both produce identical lane headways, tailways,
+leaders and followers.
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from flow.controllers import IDMController
+from flow.core.params import EnvParams
+from flow.core.params import InFlows
+from flow.core.params import InitialConfig
+from flow.core.params import NetParams
+from flow.core.params import SumoLaneChangeParams
+from flow.core.params import SumoParams
+from flow.core.params import VehicleParams
+from flow.envs import TestEnv
+from flow.networks.highway import HighwayNetwork, ADDITIONAL_NET_PARAMS
+
+EXAMPLE_USAGE = """
+example usage:
+    python multi_lane_headways.py --num_vehicles 1500 --lanes 4
+"""
+
+
+def create_parser():
+    """Create the parser to capture CLI arguments."""
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="[Flow] Benchmarks the multi-lane headway computation.",
+        epilog=EXAMPLE_USAGE,
+    )
+    parser.add_argument(
+        "--num_vehicles",
+        type=int,
+        default=500,
+        help="Number of vehicles in the network at the start of a rollout.",
+    )
+    parser.add_argument(
+        "--query_fraction",
+        type=float,
+        default=0.1,
+        help="Fraction of vehicles whose lane data is computed (the share of "
+        "RL vehicles in a typical experiment).",
+    )
+    parser.add_argument(
+        "--lanes", type=int, default=4, help="Number of lanes of the highway."
+    )
+    parser.add_argument(
+        "--num_edges", type=int, default=4, help="Number of highway edges."
+    )
+    parser.add_argument(
+        "--num_steps", type=int, default=200, help="Number of simulation steps."
+    )
+    return parser
+
+
+def create_env(num_vehicles, lanes, num_edges):
+    """Create a highway environment with human-driven vehicles and inflows."""
+    vehicles = VehicleParams()
+    vehicles.add(
+        "human",
+        acceleration_controller=(IDMController, {}),
+        lane_change_params=SumoLaneChangeParams(lane_change_mode="strategic"),
+        num_vehicles=num_vehicles,
+    )
+
+    inflows = InFlows()
+    inflows.add(
+        veh_type="human",
+        edge="highway_0",
+        vehs_per_hour=1000 * lanes,
+        depart_lane="free",
+        depart_speed=10,
+    )
+
+    additional_net_params = ADDITIONAL_NET_PARAMS.copy()
+    additional_net_params["lanes"] = lanes
+    additional_net_params["num_edges"] = num_edges
+    additional_net_params["length"] = max(1000, 10 * num_vehicles // lanes)
+
+    network = HighwayNetwork(
+        name="multi_lane_headways",
+        vehicles=vehicles,
+        net_params=NetParams(inflows=inflows, additional_params=additional_net_params),
+        initial_config=InitialConfig(
+            spacing="uniform", lanes_distribution=float("inf")
+        ),
+    )
+
+    return TestEnv(
+        env_params=EnvParams(horizon=float("inf")),
+        sim_params=SumoParams(sim_step=0.1, render=False, print_warnings=False),
+        network=network,
+    )
+
+
+def lane_data(kv, veh_ids):
+    """Return the lane data of the specified vehicles."""
+    return [
+        (
+            kv.get_lane_headways(veh_id),
+            kv.get_lane_tailways(veh_id),
+            kv.get_lane_leaders(veh_id),
+            kv.get_lane_followers(veh_id),
+        )
+        for veh_id in veh_ids
+    ]
+
+
+def main(args):
+    """Run the benchmark and print the timing results."""
+    flags = create_parser().parse_args(args)
+    env = create_env(flags.num_vehicles, flags.lanes, flags.num_edges)
+    env.reset()
+    kv = env.k.vehicle
+
+    times_python, times_vectorized = [], []
+    num_mismatches = 0
+    for _ in range(flags.num_steps):
+        env.step(None)
+
+        veh_ids = kv.get_ids()
+        num_queries = max(1, int(flags.query_fraction * len(veh_ids)))
+        query_ids = list(np.random.choice(veh_ids, num_queries, replace=False))
+
+        t0 = time.time()
+        kv._multi_lane_headways_python(query_ids)
+        times_python.append(time.time() - t0)
+        expected = (lane_data(kv, query_ids), dict(kv._ids_by_edge))
+
+        t0 = time.time()
+        kv._multi_lane_headways(query_ids)
+        times_vectorized.append(time.time() - t0)
+        actual = (lane_data(kv, query_ids), dict(kv._ids_by_edge))
+
+        num_mismatches += int(expected != actual)
+
+    env.terminate()
+
+    print("vehicles in the network: {}".format(len(kv.get_ids())))
+    print("mean time, reference:    {:.3f} ms".format(1e3 * np.mean(times_python)))
+    print("mean time, vectorized:   {:.3f} ms".format(1e3 * np.mean(times_vectorized)))
+    print(
+        "speedup:                 {:.1f}x".format(
+            np.mean(times_python) / np.mean(times_vectorized)
+        )
+    )
+    print("mismatching steps:       {}".format(num_mismatches))
+
+    return num_mismatches
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("TEST_FLAG", "True")
+    import sys
+
+    sys.exit(int(main(sys.argv[1:]) > 0))
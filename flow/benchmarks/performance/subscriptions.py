@@ -0,0 +1,154 @@
+"""Benchmark of the methods used to collect vehicle states from sumo.
+
+Runs the same highway simulation with every ``subscription_mode`` supported by
+``SumoParams`` and reports the mean time per step spent advancing the
+simulation and collecting the states of all vehicles through TraCI.
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from flow.controllers import IDMController
+from flow.core.kernel.vehicle.traci import SUBSCRIPTION_MODES
+from flow.core.params import EnvParams
+from flow.core.params import InFlows
+from flow.core.params import InitialConfig
+from flow.core.params import NetParams
+from flow.core.params import SumoLaneChangeParams
+from flow.core.params import SumoParams
+from flow.core.params import VehicleParams
+from flow.envs import TestEnv
+from flow.networks.highway import HighwayNetwork, ADDITIONAL_NET_PARAMS
+
+EXAMPLE_USAGE = """
+example usage:
+    python subscriptions.py --num_vehicles 1000 --lanes 4
+"""
+
+
+def create_parser():
+    """Create the parser to capture CLI arguments."""
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="[Flow] Benchmarks the TraCI subscription modes.",
+        epilog=EXAMPLE_USAGE,
+    )
+    parser.add_argument(
+        "--num_vehicles",
+        type=int,
+        default=500,
+        help="Number of vehicles in the network at the start of a rollout.",
+    )
+    parser.add_argument(
+        "--lanes", type=int, default=4, help="Number of lanes of the highway."
+    )
+    parser.add_argument(
+        "--num_edges", type=int, default=4, help="Number of highway edges."
+    )
+    parser.add_argument(
+        "--num_steps", type=int, default=200, help="Number of simulation steps."
+    )
+    return parser
+
+
+def create_env(num_vehicles, lanes, num_edges, subscription_mode):
+    """Create a highway environment with human-driven vehicles and inflows."""
+    vehicles = VehicleParams()
+    vehicles.add(
+        "human",
+        acceleration_controller=(IDMController, {}),
+        lane_change_params=SumoLaneChangeParams(lane_change_mode="strategic"),
+        num_vehicles=num_vehicles,
+    )
+
+    inflows = InFlows()
+    inflows.add(
+        veh_type="human",
+        edge="highway_0",
+        vehs_per_hour=1000 * lanes,
+        depart_lane="free",
+        depart_speed=10,
+    )
+
+    additional_net_params = ADDITIONAL_NET_PARAMS.copy()
+    additional_net_params["lanes"] = lanes
+    additional_net_params["num_edges"] = num_edges
+    additional_net_params["length"] = max(1000, 10 * num_vehicles // lanes)
+
+    network = HighwayNetwork(
+        name="subscriptions",
+        vehicles=vehicles,
+        net_params=NetParams(inflows=inflows, additional_params=additional_net_params),
+        initial_config=InitialConfig(
+            spacing="uniform", lanes_distribution=float("inf")
+        ),
+    )
+
+    return TestEnv(
+        env_params=EnvParams(horizon=float("inf")),
+        sim_params=SumoParams(
+            sim_step=0.1,
+            render=False,
+            print_warnings=False,
+            subscription_mode=subscription_mode,
+        ),
+        network=network,
+    )
+
+
+def run(flags, subscription_mode):
+    """Return the mean simulation and update times per step, in seconds."""
+    env = create_env(
+        flags.num_vehicles, flags.lanes, flags.num_edges, subscription_mode
+    )
+    env.reset()
+
+    times_step, times_update = [], []
+    for _ in range(flags.num_steps):
+        t0 = time.time()
+        env.k.simulation.simulation_step()
+        t1 = time.time()
+        env.k.update(reset=False)
+        t2 = time.time()
+        times_step.append(t1 - t0)
+        times_update.append(t2 - t1)
+
+    num_vehicles = env.k.vehicle.num_vehicles
+    env.terminate()
+
+    return np.mean(times_step), np.mean(times_update), num_vehicles
+
+
+def main(args):
+    """Run the benchmark and print the timing results."""
+    flags = create_parser().parse_args(args)
+
+    results = {}
+    for subscription_mode in SUBSCRIPTION_MODES:
+        results[subscription_mode] = run(flags, subscription_mode)
+
+    print("mode        vehicles   simulation_step   k.update   total (ms/step)")
+    for subscription_mode, (t_step, t_update, num_vehicles) in results.items():
+        print(
+            "{:<10}  {:>8}   {:>15.3f}   {:>8.3f}   {:>13.3f}".format(
+                subscription_mode,
+                num_vehicles,
+                1e3 * t_step,
+                1e3 * t_update,
+                1e3 * (t_step + t_update),
+            )
+        )
+
+    t_vehicle = sum(results["vehicle"][:2])
+    t_context = sum(results["context"][:2])
+    print("speedup (context vs vehicle): {:.2f}x".format(t_vehicle / t_context))
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("TEST_FLAG", "True")
+    import sys
+
+    main(sys.argv[1:])
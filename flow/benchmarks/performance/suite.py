@@ -0,0 +1,610 @@
+"""Performance benchmark suite of the Flow experiment configurations.
+
+For every experiment in flow/flow_cfg/get_experiment.py and every non-RL
+experiment in flow/flow_cfg/exp_configs/non_rl, and for several vehicle counts
+(obtained by scaling the number of initial vehicles and the inflow rates of the
+configuration), the suite measures:
+
+* construct_s: the time needed to create the environment
+* reset_s: the mean reset latency, including any warm-up steps
+* steps_per_s: the number of environment steps per second
+* peak_rss_mb: the peak resident memory of the process running Flow
+* peak_rss_sim_mb: the peak resident memory of the simulator process (if any)
+* phases_ms: the mean time spent in every phase of a step (see
+  flow/core/profiler.py)
+
+Every measurement runs in a new process, so that peak memory usage is measured
+separately for every configuration and a failing configuration does not affect
+the others, even if it kills its process or hangs. The random seeds of Flow and
+of the simulator are fixed.
+
+The results are stored in a JSON file, which can serve as a baseline for later
+runs. The compare command flags all metrics that regressed by more than a
+threshold, and exits with a non-zero status if any did.
+
+On machines without sumo, the headless simulator is used as a stub backend
+(see flow/core/kernel/simulation/headless.py). Configurations that it does not
+support are reported as skipped.
+"""
+
+import argparse
+import copy
+import fnmatch
+import importlib
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import shutil
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+from flow.core.params import InitialConfig
+from flow.core.params import TrafficLightParams
+from flow.core.params import VehicleParams
+from flow.flow_cfg.get_experiment import EXPERIMENTS
+from flow.utils.exceptions import FatalFlowError
+from flow.version import __version__
+
+EXAMPLE_USAGE = """
+example usage:
+    python suite.py run --output baseline.json
+    python suite.py run --output new.json --configs "non_rl/*" --scales 1
+    python suite.py compare baseline.json new.json --threshold 0.1
+"""
+
+# directory of the non-RL experiment configurations
+NON_RL_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
+    "flow_cfg",
+    "exp_configs",
+    "non_rl",
+)
+
+# metrics compared by the compare command, and whether larger values are
+# better (True) or worse (False)
+METRICS = {
+    "construct_s": False,
+    "reset_s": False,
+    "steps_per_s": True,
+    "peak_rss_mb": False,
+    "peak_rss_sim_mb": False,
+}
+
+
+def create_parser():
+    """Create the parser to capture CLI arguments."""
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="[Flow] Performance benchmark suite.",
+        epilog=EXAMPLE_USAGE,
+    )
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.required = True
+
+    run = subparsers.add_parser("run", help="Run the benchmarks.")
+    run.add_argument(
+        "--output",
+        type=str,
+        default="perf_results.json",
+        help="Path to the JSON file the results are written to.",
+    )
+    run.add_argument(
+        "--configs",
+        type=str,
+        nargs="+",
+        default=["*"],
+        help="Patterns of the names of the configurations to run, e.g. "
+        '"non_rl/*" or "rl/singleagent_ring".',
+    )
+    run.add_argument(
+        "--scales",
+        type=float,
+        nargs="+",
+        default=[0.5, 1, 2],
+        help="Factors by which the number of vehicles and the inflow rates of "
+        "every configuration are multiplied.",
+    )
+    run.add_argument(
+        "--num_steps",
+        type=int,
+        default=200,
+        help="Number of environment steps used to measure the step rate.",
+    )
+    run.add_argument(
+        "--num_resets",
+        type=int,
+        default=2,
+        help="Number of resets used to measure the reset latency.",
+    )
+    run.add_argument(
+        "--simulator",
+        type=str,
+        default="auto",
+        choices=["auto", "traci", "headless"],
+        help="Simulator used by all configurations. auto uses traci if sumo is "
+        "installed, and the headless simulator otherwise.",
+    )
+    run.add_argument("--seed", type=int, default=0, help="Random seed.")
+    run.add_argument(
+        "--timeout",
+        type=float,
+        default=3600,
+        help="Time (in seconds) after which a configuration is stopped and "
+        "reported as an error.",
+    )
+    run.add_argument(
+        "--list",
+        action="store_true",
+        help="List the configurations matching --configs, without running.",
+    )
+
+    compare = subparsers.add_parser(
+        "compare", help="Compare results against a baseline."
+    )
+    compare.add_argument("baseline", type=str, help="Path to the baseline results.")
+    compare.add_argument("results", type=str, help="Path to the new results.")
+    compare.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="Relative change beyond which a metric is flagged as a regression.",
+    )
+    compare.add_argument(
+        "--phases",
+        action="store_true",
+        help="Also compare the mean time spent in every phase of a step.",
+    )
+    compare.add_argument(
+        "--min_phase_ms",
+        type=float,
+        default=0.1,
+        help="Phases shorter than this in the baseline are not compared, since "
+        "their timings are dominated by noise.",
+    )
+
+    return parser
+
+
+def list_configs(patterns=("*",)):
+    """Return the benchmarked configurations.
+
+    Parameters
+    ----------
+    patterns : list of str, optional
+        shell-style patterns of the names of the returned configurations
+
+    Returns
+    -------
+    dict <str, str>
+        module of every configuration, keyed by the name of the configuration,
+        e.g. "rl/singleagent_ring" or "non_rl/ring"
+    """
+    configs = {}
+    for exp_tag, package in EXPERIMENTS.items():
+        configs["rl/" + exp_tag] = "flow.flow_cfg.exp_configs.rl.{}.{}".format(
+            package, exp_tag
+        )
+    for filename in sorted(os.listdir(NON_RL_DIR)):
+        if filename.endswith(".py") and not filename.startswith("__"):
+            name = filename[:-3]
+            configs["non_rl/" + name] = "flow.flow_cfg.exp_configs.non_rl." + name
+
+    return {
+        name: module
+        for name, module in configs.items()
+        if any(fnmatch.fnmatch(name, pattern) for pattern in patterns)
+    }
+
+
+def scale_flow_params(flow_params, scale):
+    """Return a copy of flow_params with a scaled number of vehicles.
+
+    The number of initial vehicles of every type and the rate of every inflow
+    are multiplied by scale.
+    """
+    flow_params = copy.deepcopy(flow_params)
+    if scale == 1:
+        return flow_params
+
+    vehicles = VehicleParams()
+    for veh_type in flow_params["veh"].initial:
+        kwargs = dict(veh_type)
+        kwargs["num_vehicles"] = int(round(kwargs["num_vehicles"] * scale))
+        color = flow_params["veh"].type_parameters[veh_type["veh_id"]].get("color")
+        vehicles.add(color=color, **kwargs)
+    flow_params["veh"] = vehicles
+
+    for inflow in flow_params["net"].inflows.get():
+        if "vehsPerHour" in inflow:
+            inflow["vehsPerHour"] *= scale
+        if "probability" in inflow:
+            inflow["probability"] = min(1, inflow["probability"] * scale)
+        if "period" in inflow:
+            inflow["period"] /= scale
+
+    return flow_params
+
+
+def create_env(flow_params, simulator):
+    """Create the environment of an experiment configuration.
+
+    The environment is created without rendering, and with profiling enabled.
+    """
+    sim_params = copy.deepcopy(flow_params["sim"])
+    sim_params.render = False
+    sim_params.profile = True
+
+    network = flow_params["network"](
+        name=flow_params["exp_tag"],
+        vehicles=flow_params["veh"],
+        net_params=flow_params["net"],
+        initial_config=flow_params.get("initial", InitialConfig()),
+        traffic_lights=flow_params.get("tls", TrafficLightParams()),
+    )
+
+    return flow_params["env_name"](
+        env_params=flow_params["env"],
+        sim_params=sim_params,
+        network=network,
+        simulator=simulator,
+    )
+
+
+def sample_actions(env, obs):
+    """Return random actions for all agents of an environment."""
+    if isinstance(obs, dict):
+        return {agent_id: env.action_space.sample() for agent_id in obs}
+    return env.action_space.sample()
+
+
+def run_case(name, module, scale, simulator, num_steps, num_resets, seed):
+    """Benchmark a configuration at a given scale.
+
+    This is meant to be run in a new process, see run_case_process.
+
+    Returns
+    -------
+    dict
+        the status of the benchmark ("ok", "skipped" or "error"), and the
+        measured metrics if it succeeded (see the module docstring)
+    """
+    result = {"config": name, "scale": scale, "simulator": simulator}
+    try:
+        flow_params = importlib.import_module(module).flow_params
+        if flow_params["simulator"] != "traci":
+            result.update(
+                status="skipped",
+                error="{} simulator is not benchmarked".format(
+                    flow_params["simulator"]
+                ),
+            )
+            return result
+
+        flow_params = scale_flow_params(flow_params, scale)
+        flow_params["env"].horizon = max(flow_params["env"].horizon, num_steps)
+        if hasattr(flow_params["sim"], "seed"):
+            flow_params["sim"].seed = seed
+        np.random.seed(seed)
+        random.seed(seed)
+
+        t0 = time.time()
+        env = create_env(flow_params, simulator)
+        result["construct_s"] = time.time() - t0
+        env.action_space.seed(seed)
+
+        try:
+            reset_times = []
+            for _ in range(num_resets):
+                t0 = time.time()
+                obs = env.reset()
+                reset_times.append(time.time() - t0)
+            if isinstance(obs, tuple):
+                obs = obs[0]
+
+            # the profiler only keeps the timings of the steps
+            env.profiler.reset()
+            num_vehicles = 0
+            t0 = time.time()
+            for _ in range(num_steps):
+                obs = env.step(sample_actions(env, obs))[0]
+                num_vehicles += len(env.k.vehicle.get_ids())
+            step_time = time.time() - t0
+        finally:
+            env.terminate()
+
+        result.update(
+            status="ok",
+            num_vehicles=num_vehicles / num_steps,
+            reset_s=float(np.mean(reset_times)),
+            steps_per_s=num_steps / step_time,
+            peak_rss_mb=_peak_rss_mb(resource.RUSAGE_SELF),
+            peak_rss_sim_mb=_peak_rss_mb(resource.RUSAGE_CHILDREN),
+            phases_ms={
+                phase: 1e3 * stats["mean"]
+                for phase, stats in env.profiler.summary().items()
+            },
+        )
+    except FatalFlowError as e:
+        # configuration not supported by the simulator
+        result.update(status="skipped", error=_format_error(e))
+    except Exception as e:
+        result.update(status="error", error=_format_error(e))
+
+    return result
+
+
+def _format_error(e):
+    """Return a one-line description of an exception."""
+    return "{}: {}".format(type(e).__name__, " ".join(str(e).split()))
+
+
+def _peak_rss_mb(who):
+    """Return the peak resident memory of this process or its children, in MB."""
+    # ru_maxrss is in kilobytes on Linux, and in bytes on macOS
+    unit = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(who).ru_maxrss * unit / 2**20
+
+
+def _run_case(conn, kwargs):
+    """Send the result of run_case through a pipe (used by run_case_process)."""
+    conn.send(run_case(**kwargs))
+    conn.close()
+
+
+def run_case_process(timeout=None, **kwargs):
+    """Run run_case in a new process, and return its result.
+
+    If the process exits without a result (e.g. if the simulator crashed), or
+    does not finish within the timeout, the benchmark is reported as an error.
+
+    Parameters
+    ----------
+    timeout : float, optional
+        time (in seconds) after which the process is terminated. If set to
+        None, there is no time limit.
+    kwargs : dict
+        arguments of run_case
+    """
+    ctx = multiprocessing.get_context("spawn")
+    recv_conn, send_conn = ctx.Pipe(duplex=False)
+    proc = ctx.Process(target=_run_case, args=(send_conn, kwargs))
+    proc.start()
+    # only the process keeps the sending end open, so that the pipe is closed
+    # as soon as the process exits
+    send_conn.close()
+
+    result = None
+    timed_out = False
+    try:
+        if recv_conn.poll(timeout):
+            result = recv_conn.recv()
+        else:
+            timed_out = True
+            proc.terminate()
+    except EOFError:
+        pass
+    finally:
+        recv_conn.close()
+    proc.join()
+
+    if result is None:
+        if timed_out:
+            error = "timed out after {:g} s".format(timeout)
+        else:
+            error = "process exited with code {} without a result".format(proc.exitcode)
+        result = {
+            "config": kwargs["name"],
+            "scale": kwargs["scale"],
+            "simulator": kwargs["simulator"],
+            "status": "error",
+            "error": error,
+        }
+    return result
+
+
+def run_suite(
+    configs,
+    scales,
+    simulator="traci",
+    num_steps=200,
+    num_resets=2,
+    seed=0,
+    timeout=None,
+):
+    """Benchmark several configurations, each in a new process.
+
+    Parameters
+    ----------
+    configs : dict <str, str>
+        module of every configuration, keyed by name (see list_configs)
+    scales : list of float
+        factors by which the number of vehicles of every configuration are
+        multiplied
+    simulator : str, optional
+        simulator used by all configurations
+    num_steps : int, optional
+        number of environment steps used to measure the step rate
+    num_resets : int, optional
+        number of resets used to measure the reset latency
+    seed : int, optional
+        random seed
+    timeout : float, optional
+        time (in seconds) after which a configuration is stopped and reported
+        as an error. If set to None, there is no time limit.
+
+    Returns
+    -------
+    dict
+        the results, with the following keys:
+
+        * meta: description of the machine and of the benchmark parameters
+        * results: the result of every configuration and scale (see
+          run_case), keyed by "<name>@<scale>"
+    """
+    meta = {
+        "date": datetime.now().isoformat(),
+        "flow_version": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "simulator": simulator,
+        "num_steps": num_steps,
+        "num_resets": num_resets,
+        "seed": seed,
+        "timeout": timeout,
+    }
+
+    results = {}
+    for name, module in configs.items():
+        for scale in scales:
+            key = "{}@{:g}".format(name, scale)
+            result = run_case_process(
+                timeout=timeout,
+                name=name,
+                module=module,
+                scale=scale,
+                simulator=simulator,
+                num_steps=num_steps,
+                num_resets=num_resets,
+                seed=seed,
+            )
+            results[key] = result
+            print(_format_result(key, result))
+
+    return {"meta": meta, "results": results}
+
+
+def _format_result(key, result):
+    """Return a one-line description of the result of a benchmark."""
+    if result["status"] != "ok":
+        return "{:<48} {}: {}".format(key, result["status"], result.get("error"))
+    return (
+        "{:<48} {:>6.0f} veh  construct {:>6.2f} s  reset {:>6.2f} s  "
+        "{:>8.1f} steps/s  {:>6.0f} MB".format(
+            key,
+            result["num_vehicles"],
+            result["construct_s"],
+            result["reset_s"],
+            result["steps_per_s"],
+            result["peak_rss_mb"],
+        )
+    )
+
+
+def compare(baseline, results, threshold=0.1, phases=False, min_phase_ms=0.1):
+    """Compare benchmark results against a baseline.
+
+    Only the configurations that succeeded in both results are compared.
+
+    Parameters
+    ----------
+    baseline : dict
+        baseline results, as returned by run_suite
+    results : dict
+        new results, as returned by run_suite
+    threshold : float, optional
+        relative change beyond which a metric is flagged as a regression
+    phases : bool, optional
+        whether to also compare the mean time spent in every phase of a step
+    min_phase_ms : float, optional
+        phases whose mean time in the baseline is shorter than this (in
+        milliseconds) are not compared
+
+    Returns
+    -------
+    list of tuple
+        (key, metric, baseline value, new value, relative change, regressed)
+        for every compared metric. The relative change is positive when the
+        metric improved.
+    """
+    rows = []
+    for key, new in results["results"].items():
+        old = baseline["results"].get(key)
+        if old is None or old["status"] != "ok" or new["status"] != "ok":
+            continue
+
+        metrics = [(m, old.get(m), new.get(m), better) for m, better in METRICS.items()]
+        if phases:
+            metrics += [
+                ("phases_ms." + phase, old["phases_ms"][phase], value, False)
+                for phase, value in new["phases_ms"].items()
+                if old["phases_ms"].get(phase, 0) >= min_phase_ms
+            ]
+
+        for metric, old_value, new_value, larger_is_better in metrics:
+            if old_value is None or new_value is None or old_value <= 0:
+                continue
+            change = (new_value - old_value) / old_value
+            if not larger_is_better:
+                change = -change
+            rows.append(
+                (key, metric, old_value, new_value, change, change < -threshold)
+            )
+
+    return rows
+
+
+def main(args):
+    """Run the requested command, and return the exit status."""
+    flags = create_parser().parse_args(args)
+
+    if flags.command == "run":
+        configs = list_configs(flags.configs)
+        if flags.list:
+            for name in configs:
+                print(name)
+            return 0
+
+        simulator = flags.simulator
+        if simulator == "auto":
+            simulator = "traci" if shutil.which("sumo") else "headless"
+
+        results = run_suite(
+            configs,
+            flags.scales,
+            simulator=simulator,
+            num_steps=flags.num_steps,
+            num_resets=flags.num_resets,
+            seed=flags.seed,
+            timeout=flags.timeout,
+        )
+        with open(flags.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print("Results written to {}".format(flags.output))
+        return 0
+
+    with open(flags.baseline) as f:
+        baseline = json.load(f)
+    with open(flags.results) as f:
+        results = json.load(f)
+
+    rows = compare(baseline, results, flags.threshold, flags.phases, flags.min_phase_ms)
+    regressions = [row for row in rows if row[5]]
+    for key, metric, old_value, new_value, change, regressed in rows:
+        print(
+            "{:<48} {:<40} {:>10.3f} {:>10.3f} {:>+8.1%}{}".format(
+                key,
+                metric,
+                old_value,
+                new_value,
+                change,
+                "  REGRESSION" if regressed else "",
+            )
+        )
+    print(
+        "{} metrics compared, {} regressions (threshold {:.0%})".format(
+            len(rows), len(regressions), flags.threshold
+        )
+    )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
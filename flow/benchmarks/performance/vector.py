@@ -0,0 +1,88 @@
+"""Benchmark of the vectorized environment on the ring road.
+
+Steps several ring road environments, each with its own sumo process, through
+a VectorFlowEnv, first with a single worker thread (sequential stepping) and
+then with one worker thread per environment, and reports the mean time per
+vectorized step.
+"""
+
+import argparse
+import os
+import time
+
+from flow.benchmarks.performance.headless import create_env
+from flow.envs.vector import VectorFlowEnv
+
+EXAMPLE_USAGE = """
+example usage:
+    python vector.py --num_envs 8 --simulator traci
+"""
+
+
+def create_parser():
+    """Create the parser to capture CLI arguments."""
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="[Flow] Benchmarks the vectorized environment.",
+        epilog=EXAMPLE_USAGE,
+    )
+    parser.add_argument(
+        "--num_envs", type=int, default=4, help="Number of environments."
+    )
+    parser.add_argument(
+        "--num_vehicles",
+        type=int,
+        default=22,
+        help="Number of vehicles in each ring road.",
+    )
+    parser.add_argument(
+        "--num_steps", type=int, default=500, help="Number of simulation steps."
+    )
+    parser.add_argument(
+        "--simulator",
+        type=str,
+        default="traci",
+        help="Simulator used by the environments.",
+    )
+    return parser
+
+
+def run_vector_env(flags, max_workers):
+    """Return the mean time per vectorized step, in seconds."""
+    env = VectorFlowEnv(
+        [lambda: create_env(flags.num_vehicles, flags.simulator)] * flags.num_envs,
+        max_workers=max_workers,
+    )
+    env.reset()
+    actions = env.action_space.sample()
+
+    t0 = time.time()
+    for _ in range(flags.num_steps):
+        env.step(actions)
+    t = (time.time() - t0) / flags.num_steps
+
+    env.close()
+
+    return t
+
+
+def main(args):
+    """Run the benchmark and print the timing results."""
+    flags = create_parser().parse_args(args)
+
+    t_sequential = run_vector_env(flags, max_workers=1)
+    t_threaded = run_vector_env(flags, max_workers=flags.num_envs)
+
+    print("workers   ms/step   env-steps/s")
+    for workers, t in [(1, t_sequential), (flags.num_envs, t_threaded)]:
+        print("{:>7}   {:>7.3f}   {:>11.0f}".format(
+            workers, 1e3 * t, flags.num_envs / t))
+    print("speedup (threaded vs sequential): {:.2f}x".format(
+        t_sequential / t_threaded))
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("TEST_FLAG", "True")
+    import sys
+
+    main(sys.argv[1:])
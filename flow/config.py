@@ -6,6 +6,19 @@ PYTHON_COMMAND = "python"
 
 SUMO_SLEEP = 1.0  # Delay between initializing SUMO and connecting with TraCI
 
+# directory in which the .net.xml files generated by netconvert are cached,
+# keyed by a hash of the inputs to netconvert. This allows processes that
+# build the same network (e.g. parallel rollout workers, or restarted sumo
+# instances) to skip netconvert. The directory is private to the current user
+# (it is created with mode 0o700, and is not used if other users may write to
+# it). Set to None to disable the cache.
+NET_CACHE_DIR = os.environ.get(
+    "FLOW_NET_CACHE_DIR",
+    osp.join(
+        os.environ.get("XDG_CACHE_HOME", osp.expanduser("~/.cache")), "flow/net"
+    ),
+)
+
 PROJECT_PATH = osp.abspath(osp.join(osp.dirname(__file__), ".."))
 
 LOG_DIR = PROJECT_PATH + "/data"
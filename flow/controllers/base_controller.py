@@ -44,6 +44,11 @@ class BaseController(metaclass=ABCMeta):
         variance of the gaussian from which to sample a noisy acceleration
     """
 
+    # names of the attributes that parametrize the get_accel_batch method of a
+    # controller class. Vehicles whose controllers share the same class and
+    # the same values for these attributes are evaluated together.
+    batch_params = ()
+
     def __init__(
         self,
         veh_id,
@@ -80,10 +85,12 @@ class BaseController(metaclass=ABCMeta):
             "obey_speed_limit": self.get_obey_speed_limit_action,
         }
         self.failsafes = []
+        self.failsafe_names = []
         if failsafe_list:
             for check in failsafe_list:
                 if check in failsafe_map:
                     self.failsafes.append(failsafe_map.get(check))
+                    self.failsafe_names.append(check)
                 else:
                     raise ValueError(
                         "Skipping {}, as it is not a valid failsafe.".format(check)
@@ -102,6 +109,78 @@ class BaseController(metaclass=ABCMeta):
         """Return the acceleration of the controller."""
         pass
 
+    def get_accel_batch(self, env, veh_ids):
+        """Return the accelerations of a group of vehicles.
+
+        All vehicles in veh_ids are controlled by controllers with the same
+        class and parameters as this controller (see batch_key), so that
+        subclasses can compute their accelerations with array operations using
+        the parameters of this controller. This default implementation calls
+        the get_accel method of the controller of every vehicle.
+
+        Parameters
+        ----------
+        env : flow.envs.Env
+            state of the environment at the current time step
+        veh_ids : list of str
+            vehicles whose accelerations are computed
+
+        Returns
+        -------
+        np.ndarray
+            the acceleration of every vehicle, or NaN for vehicles whose
+            acceleration is not specified (i.e. left to the simulator)
+        """
+        accel = [
+            env.k.vehicle.get_acc_controller(veh_id).get_accel(env)
+            for veh_id in veh_ids
+        ]
+        return np.array([np.nan if a is None else a for a in accel], dtype=float)
+
+    def batch_key(self):
+        """Return the key used to group controllers in batched evaluations.
+
+        Controllers with the same key share a class, failsafes, and the values
+        of all attributes in batch_params.
+        """
+        return (
+            type(self),
+            tuple(self.failsafe_names),
+            self.delay,
+            self.max_accel,
+            self.max_deaccel,
+            self.display_warnings,
+        ) + tuple(getattr(self, param) for param in self.batch_params)
+
+    def get_failsafe_action_batch(self, env, veh_ids, action):
+        """Apply the failsafes of this controller to a group of vehicles.
+
+        This is the batched version of the failsafes applied in get_action.
+
+        Parameters
+        ----------
+        env : flow.envs.Env
+            state of the environment at the current time step
+        veh_ids : list of str
+            vehicles whose actions are modified
+        action : np.ndarray
+            requested acceleration actions
+
+        Returns
+        -------
+        np.ndarray
+            the modified actions
+        """
+        failsafe_map = {
+            "instantaneous": self.get_safe_action_instantaneous_batch,
+            "safe_velocity": self.get_safe_velocity_action_batch,
+            "feasible_accel": self.get_feasible_action_batch,
+            "obey_speed_limit": self.get_obey_speed_limit_action_batch,
+        }
+        for name in self.failsafe_names:
+            action = failsafe_map[name](env, veh_ids, action)
+        return action
+
     def get_action(self, env):
         """Convert the get_accel() acceleration into an action.
 
@@ -391,3 +470,266 @@ class BaseController(metaclass=ABCMeta):
                 )
 
         return action
+
+    def get_safe_action_instantaneous_batch(self, env, veh_ids, action):
+        """Perform the "instantaneous" failsafe action on a group of vehicles.
+
+        See get_safe_action_instantaneous.
+        """
+        # if there is only one vehicle in the network, all actions are safe
+        if env.k.vehicle.num_vehicles == 1:
+            return action
+
+        lead_ids = env.k.vehicle.get_leader(veh_ids)
+        this_vel = np.asarray(env.k.vehicle.get_speed(veh_ids), dtype=float)
+        sim_step = env.sim_step
+        next_vel = this_vel + action * sim_step
+        h = np.asarray(env.k.vehicle.get_headway(veh_ids), dtype=float)
+
+        # if there is no other vehicle in the lane, all actions are safe
+        has_lead = np.array([lead_id is not None for lead_id in lead_ids], dtype=bool)
+        unsafe = (
+            has_lead
+            & (next_vel > 0)
+            & (h < sim_step * next_vel + this_vel * 1e-3 + 0.5 * this_vel * sim_step)
+        )
+
+        if self.display_warnings:
+            for i in np.flatnonzero(unsafe):
+                print(
+                    "=====================================\n"
+                    "Vehicle {} is about to crash. Instantaneous acceleration "
+                    "clipping applied.\n"
+                    "=====================================".format(veh_ids[i])
+                )
+
+        return np.where(unsafe, -this_vel / sim_step, action)
+
+    def get_safe_velocity_action_batch(self, env, veh_ids, action):
+        """Perform the "safe_velocity" failsafe action on a group of vehicles.
+
+        See get_safe_velocity_action.
+        """
+        if env.k.vehicle.num_vehicles == 1:
+            # if there is only one vehicle in the network, all actions are safe
+            return action
+
+        safe_velocity = self.safe_velocity_batch(env, veh_ids)
+        this_vel = np.asarray(env.k.vehicle.get_speed(veh_ids), dtype=float)
+        sim_step = env.sim_step
+
+        return np.where(
+            this_vel + action * sim_step > safe_velocity,
+            np.where(
+                safe_velocity > 0,
+                (safe_velocity - this_vel) / sim_step,
+                -this_vel / sim_step,
+            ),
+            action,
+        )
+
+    def safe_velocity_batch(self, env, veh_ids):
+        """Compute a safe velocity for a group of vehicles.
+
+        See safe_velocity.
+        """
+        lead_ids = env.k.vehicle.get_leader(veh_ids)
+        lead_vel = np.asarray(env.k.vehicle.get_speed(lead_ids), dtype=float)
+        this_vel = np.asarray(env.k.vehicle.get_speed(veh_ids), dtype=float)
+
+        h = np.asarray(env.k.vehicle.get_headway(veh_ids), dtype=float)
+        dv = lead_vel - this_vel
+
+        v_safe = 2 * h / env.sim_step + dv - this_vel * (2 * self.delay)
+
+        if self.display_warnings:
+            for i in np.flatnonzero(this_vel > v_safe):
+                print(
+                    "=====================================\n"
+                    "Speed of vehicle {} is greater than safe speed. Safe velocity "
+                    "clipping applied.\n"
+                    "=====================================".format(veh_ids[i])
+                )
+
+        return v_safe
+
+    def get_obey_speed_limit_action_batch(self, env, veh_ids, action):
+        """Perform the "obey_speed_limit" failsafe action on a group of vehicles.
+
+        See get_obey_speed_limit_action.
+        """
+        # check for speed limit
+        edges = env.k.vehicle.get_edge(veh_ids)
+        speed_limits = {edge: env.k.network.speed_limit(edge) for edge in set(edges)}
+        edge_speed_limit = np.array([speed_limits[edge] for edge in edges], dtype=float)
+
+        this_vel = np.asarray(env.k.vehicle.get_speed(veh_ids), dtype=float)
+        sim_step = env.sim_step
+
+        exceeds = this_vel + action * sim_step > edge_speed_limit
+        if self.display_warnings:
+            for i in np.flatnonzero(exceeds & (edge_speed_limit > 0)):
+                print(
+                    "=====================================\n"
+                    "Speed of vehicle {} is greater than speed limit. Obey "
+                    "speed limit clipping applied.\n"
+                    "=====================================".format(veh_ids[i])
+                )
+
+        return np.where(
+            exceeds,
+            np.where(
+                edge_speed_limit > 0,
+                (edge_speed_limit - this_vel) / sim_step,
+                -this_vel / sim_step,
+            ),
+            action,
+        )
+
+    def get_feasible_action_batch(self, env, veh_ids, action):
+        """Perform the "feasible_accel" failsafe action on a group of vehicles.
+
+        See get_feasible_action.
+        """
+        too_high = action > self.max_accel
+        too_low = action < -self.max_deaccel
+
+        if self.display_warnings:
+            for i in np.flatnonzero(too_high):
+                print(
+                    "=====================================\n"
+                    "Acceleration of vehicle {} is greater than the max "
+                    "acceleration. Feasible acceleration clipping applied.\n"
+                    "=====================================".format(veh_ids[i])
+                )
+            for i in np.flatnonzero(too_low):
+                print(
+                    "=====================================\n"
+                    "Deceleration of vehicle {} is greater than the max "
+                    "deceleration. Feasible acceleration clipping applied.\n"
+                    "=====================================".format(veh_ids[i])
+                )
+
+        action = np.where(too_high, self.max_accel, action)
+        return np.where(too_low, -self.max_deaccel, action)
+
+
+def _has_vectorized_accel(cls):
+    """Return True if the get_accel_batch method of a class is vectorized.
+
+    This is the case if the class (or one of its parents) overrides
+    get_accel_batch, and get_accel is not overridden by a more specific class.
+    """
+    for klass in cls.__mro__:
+        if "get_accel_batch" in vars(klass):
+            return klass is not BaseController
+        if "get_accel" in vars(klass):
+            return False
+    return False
+
+
+def get_batch_actions(env, veh_ids):
+    """Compute the actions of the acceleration controllers of many vehicles.
+
+    This is equivalent to calling the get_action method of the controller of
+    every vehicle, in order. Vehicles are grouped by the batch_key of their
+    controllers, and the accelerations, failsafes and noise of every group are
+    computed with array operations. Noise is sampled in the order of veh_ids,
+    and controllers that override get_action are evaluated between the noise
+    samples of the vehicles before and after them, so the random number stream
+    matches the one consumed by the per-vehicle evaluation.
+
+    Parameters
+    ----------
+    env : flow.envs.Env
+        state of the environment at the current time step
+    veh_ids : list of str
+        vehicles whose actions are computed
+
+    Returns
+    -------
+    list of float or None
+        the action of every vehicle, or None if the acceleration should be
+        determined by the simulator for the current time step
+    """
+    num_vehicles = len(veh_ids)
+    controllers = [env.k.vehicle.get_acc_controller(veh_id) for veh_id in veh_ids]
+    edges = env.k.vehicle.get_edge(veh_ids)
+
+    actions = [None] * num_vehicles
+    batched = np.ones(num_vehicles, dtype=bool)
+    groups = {}
+    for i, (controller, edge) in enumerate(zip(controllers, edges)):
+        if type(controller).get_action is not BaseController.get_action:
+            # controllers that modify get_action are evaluated separately
+            batched[i] = False
+        elif len(edge) > 0 and edge[0] != ":":
+            # vehicles that just entered the network or are in a junction are
+            # left to the simulator, as in get_action
+            groups.setdefault(controller.batch_key(), []).append(i)
+
+    # compute the accelerations of every group, with and without failsafes
+    accel = np.full(num_vehicles, np.nan)
+    accel_failsafe = np.full(num_vehicles, np.nan)
+    for index in groups.values():
+        controller = controllers[index[0]]
+        group_ids = [veh_ids[i] for i in index]
+        if _has_vectorized_accel(type(controller)):
+            group_accel = controller.get_accel_batch(env, group_ids)
+        else:
+            group_accel = BaseController.get_accel_batch(controller, env, group_ids)
+        accel[index] = group_accel
+        accel_failsafe[index] = controller.get_failsafe_action_batch(
+            env, group_ids, group_accel
+        )
+
+    # add noise to the accelerations, if requested. The noise of the vehicles
+    # between two separately evaluated vehicles is sampled at once, and the
+    # separately evaluated vehicles sample their own noise in get_action.
+    noise = np.array([controller.accel_noise for controller in controllers])
+    accel_noise = accel.copy()
+    sampled = ~np.isnan(accel) & (noise > 0)
+    start = 0
+    for end in list(np.flatnonzero(~batched)) + [num_vehicles]:
+        index = start + np.flatnonzero(sampled[start:end])
+        if len(index) > 0:
+            accel_noise[index] += np.sqrt(env.sim_step) * np.random.normal(
+                0, noise[index]
+            )
+        if end < num_vehicles:
+            actions[end] = controllers[end].get_action(env)
+        start = end + 1
+
+    # run the fail-safes on the noisy accelerations, if requested
+    accel_noise_failsafe = accel_noise.copy()
+    for index in groups.values():
+        controller = controllers[index[0]]
+        group_ids = [veh_ids[i] for i in index]
+        accel_noise_failsafe[index] = controller.get_failsafe_action_batch(
+            env, group_ids, accel_noise[index]
+        )
+
+    # store the accelerations of the batched vehicles (None for vehicles left
+    # to the simulator)
+    batched_ids = [veh_ids[i] for i in np.flatnonzero(batched)]
+    for values, noise, failsafe in (
+        (accel, False, False),
+        (accel_failsafe, False, True),
+        (accel_noise, True, False),
+        (accel_noise_failsafe, True, True),
+    ):
+        env.k.vehicle.update_accel(
+            batched_ids, _to_actions(values[batched]), noise=noise, failsafe=failsafe
+        )
+
+    for i, action in zip(
+        np.flatnonzero(batched), _to_actions(accel_noise_failsafe[batched])
+    ):
+        actions[i] = action
+
+    return actions
+
+
+def _to_actions(accel):
+    """Convert batched accelerations into a list of actions (None if NaN)."""
+    return np.where(np.isnan(accel), None, accel).tolist()
@@ -25,8 +25,18 @@ class BaseRouter(metaclass=ABCMeta):
         ID of the vehicle this controller is used for
     router_params : dict
         Dictionary of router params
+
+    Attributes
+    ----------
+    final_edge_only : bool
+        whether the controller only changes the route of its vehicle once the
+        vehicle is on the last edge of its route. If so, the controller is only
+        called when the vehicle enters this edge (or when its route changes),
+        instead of at every step.
     """
 
+    final_edge_only = False
+
     def __init__(self, veh_id, router_params):
         """Instantiate the base class for routing controllers."""
         self.veh_id = veh_id
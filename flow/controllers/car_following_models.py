@@ -46,6 +46,8 @@ class CFMController(BaseController):
         to no failsafe (None)
     """
 
+    batch_params = ("k_d", "k_v", "k_c", "d_des", "v_des")
+
     def __init__(
         self,
         veh_id,
@@ -95,6 +97,24 @@ class CFMController(BaseController):
             + self.k_c * (self.v_des - this_vel)
         )
 
+    def get_accel_batch(self, env, veh_ids):
+        """See parent class."""
+        lead_ids = env.k.vehicle.get_leader(veh_ids)
+        lead_vel = np.asarray(env.k.vehicle.get_speed(lead_ids), dtype=float)
+        this_vel = np.asarray(env.k.vehicle.get_speed(veh_ids), dtype=float)
+
+        d_l = np.asarray(env.k.vehicle.get_headway(veh_ids), dtype=float)
+
+        accel = (
+            self.k_d * (d_l - self.d_des)
+            + self.k_v * (lead_vel - this_vel)
+            + self.k_c * (self.v_des - this_vel)
+        )
+
+        # no car ahead
+        no_lead = np.array([not lead_id for lead_id in lead_ids], dtype=bool)
+        return np.where(no_lead, self.max_accel, accel)
+
 
 class BCMController(BaseController):
     """Bilateral car-following model controller.
@@ -130,6 +150,8 @@ class BCMController(BaseController):
         to no failsafe (None)
     """
 
+    batch_params = ("k_d", "k_v", "k_c", "d_des", "v_des")
+
     def __init__(
         self,
         veh_id,
@@ -190,6 +212,28 @@ class BCMController(BaseController):
             + self.k_c * (self.v_des - this_vel)
         )
 
+    def get_accel_batch(self, env, veh_ids):
+        """See parent class."""
+        lead_ids = env.k.vehicle.get_leader(veh_ids)
+        lead_vel = np.asarray(env.k.vehicle.get_speed(lead_ids), dtype=float)
+        this_vel = np.asarray(env.k.vehicle.get_speed(veh_ids), dtype=float)
+
+        trail_ids = env.k.vehicle.get_follower(veh_ids)
+        trail_vel = np.asarray(env.k.vehicle.get_speed(trail_ids), dtype=float)
+
+        headway = np.asarray(env.k.vehicle.get_headway(veh_ids), dtype=float)
+        footway = np.asarray(env.k.vehicle.get_headway(trail_ids), dtype=float)
+
+        accel = (
+            self.k_d * (headway - footway)
+            + self.k_v * ((lead_vel - this_vel) - (this_vel - trail_vel))
+            + self.k_c * (self.v_des - this_vel)
+        )
+
+        # no car ahead
+        no_lead = np.array([not lead_id for lead_id in lead_ids], dtype=bool)
+        return np.where(no_lead, self.max_accel, accel)
+
 
 class LACController(BaseController):
     """Linear Adaptive Cruise Control.
@@ -217,6 +261,8 @@ class LACController(BaseController):
         to no failsafe (None)
     """
 
+    batch_params = ("k_1", "k_2", "h", "tau")
+
     def __init__(
         self,
         veh_id,
@@ -264,6 +310,31 @@ class LACController(BaseController):
 
         return self.a
 
+    def get_accel_batch(self, env, veh_ids):
+        """See parent class.
+
+        The acceleration state of every vehicle is read from, and stored back
+        into, the controller of the vehicle.
+        """
+        controllers = [env.k.vehicle.get_acc_controller(veh_id) for veh_id in veh_ids]
+        a = np.array([controller.a for controller in controllers], dtype=float)
+
+        lead_ids = env.k.vehicle.get_leader(veh_ids)
+        lead_vel = np.asarray(env.k.vehicle.get_speed(lead_ids), dtype=float)
+        this_vel = np.asarray(env.k.vehicle.get_speed(veh_ids), dtype=float)
+        headway = np.asarray(env.k.vehicle.get_headway(veh_ids), dtype=float)
+        L = np.asarray(env.k.vehicle.get_length(veh_ids), dtype=float)
+        ex = headway - L - self.h * this_vel
+        ev = lead_vel - this_vel
+        u = self.k_1 * ex + self.k_2 * ev
+        a_dot = -(a / self.tau) + (u / self.tau)
+        a = a_dot * env.sim_step + a
+
+        for controller, a_i in zip(controllers, a):
+            controller.a = a_i
+
+        return a
+
 
 class OVMController(BaseController):
     """Optimal Vehicle Model controller.
@@ -299,6 +370,8 @@ class OVMController(BaseController):
         to no failsafe (None)
     """
 
+    batch_params = ("v_max", "alpha", "beta", "h_st", "h_go")
+
     def __init__(
         self,
         veh_id,
@@ -355,6 +428,32 @@ class OVMController(BaseController):
 
         return self.alpha * (v_h - this_vel) + self.beta * h_dot
 
+    def get_accel_batch(self, env, veh_ids):
+        """See parent class."""
+        lead_ids = env.k.vehicle.get_leader(veh_ids)
+        lead_vel = np.asarray(env.k.vehicle.get_speed(lead_ids), dtype=float)
+        this_vel = np.asarray(env.k.vehicle.get_speed(veh_ids), dtype=float)
+        h = np.asarray(env.k.vehicle.get_headway(veh_ids), dtype=float)
+        h_dot = lead_vel - this_vel
+
+        # V function here - input: h, output : Vh
+        v_h = np.select(
+            [h <= self.h_st, (self.h_st < h) & (h < self.h_go)],
+            [
+                0,
+                self.v_max
+                / 2
+                * (1 - np.cos(np.pi * (h - self.h_st) / (self.h_go - self.h_st))),
+            ],
+            self.v_max,
+        )
+
+        accel = self.alpha * (v_h - this_vel) + self.beta * h_dot
+
+        # no car ahead
+        no_lead = np.array([not lead_id for lead_id in lead_ids], dtype=bool)
+        return np.where(no_lead, self.max_accel, accel)
+
 
 class LinearOVM(BaseController):
     """Linear OVM controller.
@@ -384,6 +483,8 @@ class LinearOVM(BaseController):
         to no failsafe (None)
     """
 
+    batch_params = ("v_max", "adaptation", "h_st")
+
     def __init__(
         self,
         veh_id,
@@ -429,6 +530,21 @@ class LinearOVM(BaseController):
 
         return (v_h - this_vel) / self.adaptation
 
+    def get_accel_batch(self, env, veh_ids):
+        """See parent class."""
+        this_vel = np.asarray(env.k.vehicle.get_speed(veh_ids), dtype=float)
+        h = np.asarray(env.k.vehicle.get_headway(veh_ids), dtype=float)
+
+        # V function here - input: h, output : Vh
+        alpha = 1.689  # the average value from Nakayama paper
+        v_h = np.select(
+            [h < self.h_st, (self.h_st <= h) & (h <= self.h_st + self.v_max / alpha)],
+            [0, alpha * (h - self.h_st)],
+            self.v_max,
+        )
+
+        return (v_h - this_vel) / self.adaptation
+
 
 class IDMController(BaseController):
     """Intelligent Driver Model (IDM) controller.
@@ -467,6 +583,8 @@ class IDMController(BaseController):
         to no failsafe (None)
     """
 
+    batch_params = ("v0", "T", "a", "b", "delta", "s0")
+
     def __init__(
         self,
         veh_id,
@@ -519,6 +637,25 @@ class IDMController(BaseController):
 
         return self.a * (1 - (v / self.v0) ** self.delta - (s_star / h) ** 2)
 
+    def get_accel_batch(self, env, veh_ids):
+        """See parent class."""
+        v = np.asarray(env.k.vehicle.get_speed(veh_ids), dtype=float)
+        lead_ids = env.k.vehicle.get_leader(veh_ids)
+        h = np.asarray(env.k.vehicle.get_headway(veh_ids), dtype=float)
+
+        # in order to deal with ZeroDivisionError
+        h = np.where(np.abs(h) < 1e-3, 1e-3, h)
+
+        has_lead = np.array(
+            [lead_id is not None and lead_id != "" for lead_id in lead_ids],
+            dtype=bool,
+        )
+        lead_vel = np.asarray(env.k.vehicle.get_speed(lead_ids), dtype=float)
+        s_star = v * self.T + v * (v - lead_vel) / (2 * np.sqrt(self.a * self.b))
+        s_star = np.where(has_lead, self.s0 + np.where(s_star > 0, s_star, 0), 0)
+
+        return self.a * (1 - (v / self.v0) ** self.delta - (s_star / h) ** 2)
+
 
 class SimCarFollowingController(BaseController):
     """Controller whose actions are purely defined by the simulator.
@@ -573,6 +710,8 @@ class GippsController(BaseController):
         to no failsafe (None)
     """
 
+    batch_params = ("v_desired", "acc", "b", "b_l", "s0", "tau")
+
     def __init__(
         self,
         veh_id,
@@ -632,6 +771,35 @@ class GippsController(BaseController):
 
         return (v_next - v) / env.sim_step
 
+    def get_accel_batch(self, env, veh_ids):
+        """See parent class."""
+        v = np.asarray(env.k.vehicle.get_speed(veh_ids), dtype=float)
+        h = np.asarray(env.k.vehicle.get_headway(veh_ids), dtype=float)
+        lead_ids = env.k.vehicle.get_leader(veh_ids)
+        v_l = np.asarray(env.k.vehicle.get_speed(lead_ids), dtype=float)
+
+        # get velocity dynamics
+        v_acc = v + (
+            2.5
+            * self.acc
+            * self.tau
+            * (1 - (v / self.v_desired))
+            * np.sqrt(0.025 + (v / self.v_desired))
+        )
+        v_safe = (self.tau * self.b) + np.sqrt(
+            ((self.tau**2) * (self.b**2))
+            - (
+                self.b
+                * ((2 * (h - self.s0)) - (self.tau * v) - ((v_l**2) / self.b_l))
+            )
+        )
+
+        # same as min(v_acc, v_safe, v_desired), including for NaN values
+        v_next = np.where(v_safe < v_acc, v_safe, v_acc)
+        v_next = np.where(self.v_desired < v_next, self.v_desired, v_next)
+
+        return (v_next - v) / env.sim_step
+
 
 class BandoFTLController(BaseController):
     """Bando follow-the-leader controller.
@@ -667,6 +835,8 @@ class BandoFTLController(BaseController):
         to no failsafe (None)
     """
 
+    batch_params = ("v_max", "alpha", "beta", "h_st", "h_go", "want_max_accel")
+
     def __init__(
         self,
         veh_id,
@@ -712,6 +882,21 @@ class BandoFTLController(BaseController):
         s = env.k.vehicle.get_headway(self.veh_id)
         return self.accel_func(v, v_l, s)
 
+    def get_accel_batch(self, env, veh_ids):
+        """See parent class."""
+        lead_ids = env.k.vehicle.get_leader(veh_ids)
+        v_l = np.asarray(env.k.vehicle.get_speed(lead_ids), dtype=float)
+        v = np.asarray(env.k.vehicle.get_speed(veh_ids), dtype=float)
+        s = np.asarray(env.k.vehicle.get_headway(veh_ids), dtype=float)
+        accel = self.accel_func(v, v_l, s)
+
+        if self.want_max_accel:
+            # no car ahead
+            no_lead = np.array([not lead_id for lead_id in lead_ids], dtype=bool)
+            accel = np.where(no_lead, self.max_accel, accel)
+
+        return accel
+
     def accel_func(self, v, v_l, s):
         """Compute the acceleration function."""
         v_h = self.v_max * (
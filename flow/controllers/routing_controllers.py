@@ -16,6 +16,8 @@ class ContinuousRouter(BaseRouter):
     See base class for usage example.
     """
 
+    final_edge_only = True
+
     def choose_route(self, env):
         """See parent class.
 
@@ -30,15 +32,13 @@ class ContinuousRouter(BaseRouter):
             return None
         elif edge == current_route[-1]:
             # choose one of the available routes based on the fraction of times
-            # the given route can be chosen
-            num_routes = len(env.available_routes[edge])
-            frac = [val[1] for val in env.available_routes[edge]]
-            route_id = np.random.choice([i for i in range(num_routes)], size=1, p=frac)[
-                0
-            ]
+            # the given route can be chosen (this draws the same random number
+            # as np.random.choice)
+            routes, cum_frac = env.route_tables[edge]
+            route_id = cum_frac.searchsorted(np.random.random_sample(), side="right")
 
             # pass the chosen route
-            return env.available_routes[edge][route_id][0]
+            return routes[route_id]
         else:
             return None
 
@@ -89,6 +89,8 @@ class GridRouter(BaseRouter):
     See base class for usage example.
     """
 
+    final_edge_only = True
+
     def choose_route(self, env):
         """See parent class."""
         if len(env.k.vehicle.get_route(self.veh_id)) == 0:
@@ -114,6 +116,9 @@ class BayBridgeRouter(ContinuousRouter):
     See base class for usage example.
     """
 
+    # vehicles are also re-routed on some edges that do not end their routes
+    final_edge_only = False
+
     def choose_route(self, env):
         """See parent class."""
         edge = env.k.vehicle.get_edge(self.veh_id)
@@ -142,6 +147,9 @@ class I210Router(ContinuousRouter):
     See base class for usage example.
     """
 
+    # vehicles are also re-routed on some edges that do not end their routes
+    final_edge_only = False
+
     def choose_route(self, env):
         """See parent class."""
         edge = env.k.vehicle.get_edge(self.veh_id)
@@ -22,6 +22,8 @@ class FollowerStopper(BaseController):
         desired speed of the vehicles (m/s)
     """
 
+    batch_params = ("v_des",)
+
     def __init__(self, veh_id, car_following_params, v_des=15, danger_edges=None):
         """Instantiate FollowerStopper."""
         BaseController.__init__(
@@ -112,6 +114,55 @@ class FollowerStopper(BaseController):
             # compute the acceleration from the desired velocity
             return (v_cmd - this_vel) / env.sim_step
 
+    def get_accel_batch(self, env, veh_ids):
+        """See parent class."""
+        if self.v_des is None:
+            return np.full(len(veh_ids), np.nan)
+
+        lead_ids = env.k.vehicle.get_leader(veh_ids)
+        this_vel = np.asarray(env.k.vehicle.get_speed(veh_ids), dtype=float)
+        lead_vel = np.asarray(env.k.vehicle.get_speed(lead_ids), dtype=float)
+        dx = np.asarray(env.k.vehicle.get_headway(veh_ids), dtype=float)
+
+        dv_minus = np.minimum(lead_vel - this_vel, 0)
+        dx_1 = self.dx_1_0 + 1 / (2 * self.d_1) * dv_minus**2
+        dx_2 = self.dx_2_0 + 1 / (2 * self.d_2) * dv_minus**2
+        dx_3 = self.dx_3_0 + 1 / (2 * self.d_3) * dv_minus**2
+        # same as min(max(lead_vel, 0), self.v_des), including for NaN values
+        v = np.where(0 > lead_vel, 0, lead_vel)
+        v = np.where(self.v_des < v, self.v_des, v)
+
+        # compute the desired velocity
+        v_cmd = np.select(
+            [dx <= dx_1, dx <= dx_2, dx <= dx_3],
+            [
+                0,
+                v * (dx - dx_1) / (dx_2 - dx_1),
+                v + (self.v_des - this_vel) * (dx - dx_2) / (dx_3 - dx_2),
+            ],
+            self.v_des,
+        )
+        has_lead = np.array([lead_id is not None for lead_id in lead_ids], dtype=bool)
+        v_cmd = np.where(has_lead, v_cmd, self.v_des)
+
+        # compute the acceleration from the desired velocity
+        accel = (v_cmd - this_vel) / env.sim_step
+
+        # vehicles near dangerous intersections are left to the simulator
+        for i, (veh_id, edge) in enumerate(
+            zip(veh_ids, env.k.vehicle.get_edge(veh_ids))
+        ):
+            controller = env.k.vehicle.get_acc_controller(veh_id)
+            if edge == "" or edge[0] == ":":
+                accel[i] = np.nan
+            elif (
+                edge in controller.danger_edges
+                and controller.find_intersection_dist(env) <= 10
+            ):
+                accel[i] = np.nan
+
+        return accel
+
 
 class NonLocalFollowerStopper(FollowerStopper):
     """Follower stopper that uses the average system speed to compute its acceleration."""
@@ -161,6 +212,14 @@ class NonLocalFollowerStopper(FollowerStopper):
             # compute the acceleration from the desired velocity
             return (v_cmd - this_vel) / env.sim_step
 
+    def get_accel_batch(self, env, veh_ids):
+        """See parent class."""
+        v_des = np.mean(env.k.vehicle.get_speed(env.k.vehicle.get_ids()))
+        for veh_id in veh_ids:
+            env.k.vehicle.get_acc_controller(veh_id).v_des = v_des
+        self.v_des = v_des
+        return FollowerStopper.get_accel_batch(self, env, veh_ids)
+
 
 class PISaturation(BaseController):
     """Inspired by Dan Work's... work.
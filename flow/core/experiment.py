@@ -1,10 +1,20 @@
 """Contains an experiment class for running simulations."""
 from flow.utils.registry import make_create_env
+from concurrent.futures import ProcessPoolExecutor
+from copy import deepcopy
 from datetime import datetime
 import logging
+import multiprocessing
+from multiprocessing.util import Finalize
+import os
+import random
 import time
 import numpy as np
 
+# experiment and rl_actions of the current worker process (see Experiment.run)
+_worker_experiment = None
+_worker_rl_actions = None
+
 
 class Experiment:
     """
@@ -41,6 +51,11 @@ class Experiment:
 
         >>> exp.run(num_runs=1, convert_to_csv=True)
 
+    Independent runs can also be spread over several local processes, each
+    with its own environment and simulator instance:
+
+        >>> exp.run(num_runs=8, num_workers=4)
+
     After the experiment is complete, look at the "./data" directory. There
     will be two files, one with the suffix .xml and another with the suffix
     .csv. The latter should be easily interpretable from any csv reader (e.g.
@@ -54,7 +69,12 @@ class Experiment:
         to extract information from the env and it will be stored in a dict
         keyed by the str.
     env : flow.envs.Env
-        the environment object the simulator will run
+        the environment object the simulator will run. It is created once it
+        is first needed, so that runs spread over worker processes do not
+        start a simulation in this process
+    flow_params : dict
+        flow-specific parameters, used to create the environments of worker
+        processes
     """
 
     def __init__(self, flow_params, custom_callables=None):
@@ -71,24 +91,43 @@ class Experiment:
             in a dict keyed by the str.
         """
         self.custom_callables = custom_callables or {}
+        self.flow_params = flow_params
 
         # Get the env name and a creator for the environment.
-        create_env, _ = make_create_env(flow_params)
+        self._create_env, _ = make_create_env(flow_params)
+        self._env = None
 
-        # Create the environment.
-        self.env = create_env()
+    @property
+    def env(self):
+        """Return the environment, which is created on first use."""
+        if self._env is None:
+            logging.info("Initializing environment.")
 
-        logging.info(
-            " Starting experiment {} at {}".format(
-                self.env.network.name, str(datetime.utcnow())
+            # Create the environment.
+            self._env = self._create_env()
+
+            logging.info(
+                " Starting experiment {} at {}".format(
+                    self._env.network.name, str(datetime.utcnow())
+                )
             )
-        )
+        return self._env
 
-        logging.info("Initializing environment.")
+    @env.setter
+    def env(self, env):
+        self._env = env
 
-    def run(self, num_runs, rl_actions=None, convert_to_csv=False):
+    def run(self, num_runs, rl_actions=None, convert_to_csv=False, num_workers=None):
         """Run the given network for a set number of runs.
 
+        By default, the runs are performed one after the other, each starting
+        from the state of the simulator at the end of the previous one. If
+        num_workers is specified, every run is instead independent of the
+        others: the simulation is restarted at the start of the run, with
+        seeds that only depend on the seed of the simulation parameters and the
+        index of the run. The results of a run are then the same regardless of
+        the number of workers.
+
         Parameters
         ----------
         num_runs : int
@@ -99,18 +138,28 @@ class Experiment:
         convert_to_csv : bool
             Specifies whether to convert the emission file created by sumo
             into a csv file
+        num_workers : int, optional
+            number of local processes the independent runs are spread over.
+            Each process creates its own environment, with a seed derived
+            from the seed of the simulation parameters. The processes are
+            forked where available, unless the environment of this experiment
+            was already created, in which case they are spawned (and
+            rl_actions and the custom callables must then be picklable). If
+            set to 1, the runs are performed in this process.
 
         Returns
         -------
         info_dict : dict < str, Any >
             contains returns, average speed per step
         """
-        num_steps = self.env.env_params.horizon
-
         # raise an error if convert_to_csv is set to True but no emission
         # file will be generated, to avoid getting an error at the end of the
         # simulation
-        if convert_to_csv and self.env.sim_params.emission_path is None:
+        if self._env is not None:
+            sim_params = self._env.sim_params
+        else:
+            sim_params = self.flow_params["sim"]
+        if convert_to_csv and sim_params.emission_path is None:
             raise ValueError(
                 "The experiment was run with convert_to_csv set "
                 "to True, but no emission file will be generated. If you wish "
@@ -120,6 +169,10 @@ class Experiment:
                 "output should be generated. If you do not wish to generate "
                 "emissions, set the convert_to_csv parameter to False."
             )
+        if num_workers is not None and num_workers < 1:
+            raise ValueError(
+                "Invalid num_workers: {}. Must be at least 1.".format(num_workers)
+            )
 
         # used to store
         info_dict = {
@@ -130,51 +183,62 @@ class Experiment:
         info_dict.update({key: [] for key in self.custom_callables.keys()})
 
         if rl_actions is None:
-
-            def rl_actions(*_):
-                return None
+            rl_actions = _no_rl_actions
 
         # time profiling information
         t = time.time()
         times = []
 
-        for i in range(num_runs):
-            ret = 0
-            vel = []
-            custom_vals = {key: [] for key in self.custom_callables.keys()}
-            state = self.env.reset()
-            for j in range(num_steps):
-                t0 = time.time()
-                state, reward, done, _ = self.env.step(rl_actions(state))
-                t1 = time.time()
-                times.append(1 / (t1 - t0))
-
-                # Compute the velocity speeds and cumulative returns.
-                veh_ids = self.env.k.vehicle.get_ids()
-                vel.append(np.mean(self.env.k.vehicle.get_speed(veh_ids)))
-                ret += reward
-
-                # Compute the results for the custom callables.
-                for key, lambda_func in self.custom_callables.items():
-                    custom_vals[key].append(lambda_func(self.env))
-
-                if done:
-                    break
-
-            # Store the information from the run in info_dict.
-            outflow = self.env.k.vehicle.get_outflow_rate(int(500))
-            info_dict["returns"].append(ret)
-            info_dict["velocities"].append(np.mean(vel))
-            info_dict["outflows"].append(outflow)
-            for key in custom_vals.keys():
-                info_dict[key].append(np.mean(custom_vals[key]))
-
-            print("Round {0}, return: {1}".format(i, ret))
-
-            # Save emission data at the end of every rollout. This is skipped
-            # by the internal method if no emission path was specified.
-            if self.env.simulator == "traci":
-                self.env.k.simulation.save_emission(run_id=i)
+        pool = None
+        independent_runs = None
+        if num_workers is None:
+            runs = (self._run_rollout(i, rl_actions) for i in range(num_runs))
+        elif num_workers == 1:
+            independent_runs = self._use_independent_runs()
+            runs = (
+                self._run_rollout(i, rl_actions, seed=self._run_seed(i))
+                for i in range(num_runs)
+            )
+        else:
+            # The workers are forked where available, so that they inherit
+            # rl_actions and the custom callables instead of pickling them.
+            # This is only safe if no simulation was started in this process
+            # (forking copies its connections, but not its threads).
+            if self._env is None and "fork" in multiprocessing.get_all_start_methods():
+                ctx = multiprocessing.get_context("fork")
+            else:
+                ctx = multiprocessing.get_context("spawn")
+            pool = ProcessPoolExecutor(
+                max_workers=min(num_workers, num_runs),
+                mp_context=ctx,
+                initializer=_init_worker,
+                initargs=(
+                    self.flow_params,
+                    self.custom_callables,
+                    rl_actions,
+                    ctx.Value("i", 0),
+                ),
+            )
+            runs = pool.map(
+                _run_worker_rollout,
+                range(num_runs),
+                [self._run_seed(i) for i in range(num_runs)],
+            )
+
+        try:
+            # Store the information from the runs in info_dict, in the order
+            # of the runs.
+            for i, (results, run_times) in enumerate(runs):
+                for key in info_dict.keys():
+                    info_dict[key].append(results[key])
+                times.extend(run_times)
+
+                print("Round {0}, return: {1}".format(i, results["returns"]))
+        finally:
+            if pool is not None:
+                pool.shutdown()
+            if independent_runs is not None:
+                self._restore_runs(*independent_runs)
 
         # Print the averages/std for all variables in the info_dict.
         for key in info_dict.keys():
@@ -186,6 +250,170 @@ class Experiment:
 
         print("Total time:", time.time() - t)
         print("steps/second:", np.mean(times))
-        self.env.terminate()
+
+        # Print the time spent in every phase of the steps, if profiled. The
+        # steps of worker processes are not profiled by this environment.
+        if pool is None and self.env.profiler.enabled:
+            for phase, stats in self.env.profiler.summary().items():
+                print(
+                    "{} (ms): mean {:.3f}, p50 {:.3f}, p95 {:.3f}, max {:.3f}".format(
+                        phase,
+                        1e3 * stats["mean"],
+                        1e3 * stats["p50"],
+                        1e3 * stats["p95"],
+                        1e3 * stats["max"],
+                    )
+                )
+
+        if self._env is not None:
+            self._env.terminate()
 
         return info_dict
+
+    def _run_rollout(self, run_id, rl_actions, seed=None):
+        """Perform a single run.
+
+        Parameters
+        ----------
+        run_id : int
+            index of the run, used to name its emission file
+        rl_actions : method
+            maps states to actions to be performed by the RL agents
+        seed : int, optional
+            seed of the random number generators used by the run. If not
+            specified, the generators are not seeded.
+
+        Returns
+        -------
+        dict < str, float >
+            results of the run, keyed by the terms of the info_dict
+        list of float
+            steps per second of every step
+        """
+        if seed is not None:
+            # the seed of the simulator is drawn from random when it restarts
+            random.seed(seed)
+            np.random.seed(seed)
+
+        num_steps = self.env.env_params.horizon
+        times = []
+        ret = 0
+        vel = []
+        custom_vals = {key: [] for key in self.custom_callables.keys()}
+        state, _ = self.env.reset()
+        for j in range(num_steps):
+            t0 = time.time()
+            state, reward, terminated, truncated, _ = self.env.step(rl_actions(state))
+            t1 = time.time()
+            times.append(1 / (t1 - t0))
+
+            # Compute the velocity speeds and cumulative returns.
+            veh_ids = self.env.k.vehicle.get_ids()
+            vel.append(np.mean(self.env.k.vehicle.get_speed(veh_ids)))
+            ret += reward
+
+            # Compute the results for the custom callables.
+            for key, lambda_func in self.custom_callables.items():
+                custom_vals[key].append(lambda_func(self.env))
+
+            if terminated or truncated:
+                break
+
+        results = {
+            "returns": ret,
+            "velocities": np.mean(vel),
+            "outflows": self.env.k.vehicle.get_outflow_rate(int(500)),
+        }
+        for key in custom_vals.keys():
+            results[key] = np.mean(custom_vals[key])
+
+        # Save emission data at the end of every rollout. This is skipped
+        # by the internal method if no emission path was specified.
+        if self.env.simulator == "traci":
+            self.env.k.simulation.save_emission(run_id=run_id)
+
+        return results, times
+
+    def _run_seed(self, run_id):
+        """Return the seed of an independent run."""
+        return (self.flow_params["sim"].seed or 0) + run_id
+
+    def _use_independent_runs(self):
+        """Restart the simulation at the start of every run of the environment.
+
+        Warm instances and saved states are not used, since they carry the
+        state of the simulator from one run to the next. The environment is
+        given a modified copy of its simulation parameters.
+
+        Returns
+        -------
+        flow.core.params.SimParams
+            the previous simulation parameters of the environment
+        str
+            the previous reset mode of the environment
+        """
+        env = self.env.unwrapped
+        sim_params, reset_mode = env.sim_params, env.reset_mode
+        env.sim_params = deepcopy(sim_params)
+        env.sim_params.restart_instance = True
+        if env.simulator == "traci":
+            env.k.simulation.close_warm_instances()
+            env.sim_params.num_warm_instances = 0
+            # the seeds of the restarts are drawn from the seeds of the runs
+            env._restart_seeds.clear()
+            if env._snapshot_path is not None:
+                os.remove(env._snapshot_path)
+                env._snapshot_path = None
+            env.reset_mode = "add"
+
+        return sim_params, reset_mode
+
+    def _restore_runs(self, sim_params, reset_mode):
+        """Undo _use_independent_runs, given the values it returned."""
+        env = self.env.unwrapped
+        env.sim_params = sim_params
+        env.reset_mode = reset_mode
+
+
+def _no_rl_actions(*_):
+    """Return no actions for the RL agents (the default of Experiment.run)."""
+    return None
+
+
+def _worker_flow_params(flow_params, worker_id):
+    """Return the flow parameters of a worker process of Experiment.run.
+
+    Every worker creates its environment with a different seed, derived from
+    the seed of the simulation parameters.
+    """
+    flow_params = dict(flow_params)
+    flow_params["sim"] = deepcopy(flow_params["sim"])
+    flow_params["sim"].seed = (flow_params["sim"].seed or 0) + worker_id
+    return flow_params
+
+
+def _init_worker(flow_params, custom_callables, rl_actions, worker_count):
+    """Create the experiment of a worker process of Experiment.run.
+
+    worker_count is a shared counter of the workers started so far, used to
+    number them.
+    """
+    global _worker_experiment, _worker_rl_actions
+    with worker_count.get_lock():
+        worker_id = worker_count.value
+        worker_count.value += 1
+
+    flow_params = _worker_flow_params(flow_params, worker_id)
+    random.seed(flow_params["sim"].seed)
+    np.random.seed(flow_params["sim"].seed)
+    _worker_experiment = Experiment(flow_params, custom_callables)
+    _worker_experiment._use_independent_runs()
+    _worker_rl_actions = rl_actions
+
+    # terminate the environment when the worker exits
+    Finalize(_worker_experiment, _worker_experiment.env.terminate, exitpriority=0)
+
+
+def _run_worker_rollout(run_id, seed):
+    """Perform a single run in a worker process of Experiment.run."""
+    return _worker_experiment._run_rollout(run_id, _worker_rl_actions, seed=seed)
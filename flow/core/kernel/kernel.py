@@ -1,10 +1,23 @@
 """Script containing the Flow kernel object for interacting with simulators."""
 
 import warnings
-from flow.core.kernel.simulation import TraCISimulation, AimsunKernelSimulation
-from flow.core.kernel.network import TraCIKernelNetwork, AimsunKernelNetwork
-from flow.core.kernel.vehicle import TraCIVehicle, AimsunKernelVehicle
-from flow.core.kernel.traffic_light import TraCITrafficLight, AimsunKernelTrafficLight
+from flow.core.kernel.simulation import (
+    TraCISimulation,
+    AimsunKernelSimulation,
+    HeadlessSimulation,
+)
+from flow.core.kernel.network import (
+    TraCIKernelNetwork,
+    AimsunKernelNetwork,
+    HeadlessKernelNetwork,
+)
+from flow.core.kernel.vehicle import TraCIVehicle, AimsunKernelVehicle, HeadlessVehicle
+from flow.core.kernel.traffic_light import (
+    TraCITrafficLight,
+    AimsunKernelTrafficLight,
+    HeadlessTrafficLight,
+)
+from flow.core.profiler import get_profiler
 from flow.utils.exceptions import FatalFlowError
 
 
@@ -50,7 +63,7 @@ class Kernel(object):
         Parameters
         ----------
         simulator : str
-            simulator type, must be one of {"traci"}
+            simulator type, must be one of {"traci", "aimsun", "headless"}
         sim_params : flow.core.params.SimParams
             simulation-specific parameters
 
@@ -58,9 +71,14 @@ class Kernel(object):
         ------
         flow.utils.exceptions.FatalFlowError
             if the specified input simulator is not a valid type
+        ValueError
+            if the profile term of sim_params is not valid
         """
         self.kernel_api = None
 
+        # profiler of the steps of the environment, see flow/core/profiler.py
+        self.profiler = get_profiler(sim_params)
+
         if simulator == "traci":
             self.simulation = TraCISimulation(self)
             self.network = TraCIKernelNetwork(self, sim_params)
@@ -71,6 +89,11 @@ class Kernel(object):
             self.network = AimsunKernelNetwork(self, sim_params)
             self.vehicle = AimsunKernelVehicle(self, sim_params)
             self.traffic_light = AimsunKernelTrafficLight(self)
+        elif simulator == "headless":
+            self.simulation = HeadlessSimulation(self)
+            self.network = HeadlessKernelNetwork(self, sim_params)
+            self.vehicle = HeadlessVehicle(self, sim_params)
+            self.traffic_light = HeadlessTrafficLight(self)
         else:
             raise FatalFlowError('Simulator type "{}" is not valid.'.format(simulator))
 
@@ -96,10 +119,15 @@ class Kernel(object):
             specifies whether the simulator was reset in the last simulation
             step
         """
+        t = self.profiler.tic()
         self.vehicle.update(reset)
+        t = self.profiler.toc("update_vehicle", t)
         self.traffic_light.update(reset)
+        t = self.profiler.toc("update_traffic_light", t)
         self.network.update(reset)
+        t = self.profiler.toc("update_network", t)
         self.simulation.update(reset)
+        self.profiler.toc("update_simulation", t)
 
     def close(self):
         """Terminate all components within the simulation and network."""
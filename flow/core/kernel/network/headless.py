@@ -0,0 +1,274 @@
+"""Script containing the headless network kernel class."""
+
+import numpy as np
+
+from flow.core.kernel.network.base import BaseKernelNetwork
+from flow.utils.exceptions import FatalFlowError
+
+
+class HeadlessKernelNetwork(BaseKernelNetwork):
+    """Network kernel for the headless simulator.
+
+    The headless simulator supports single-lane closed networks, such as the
+    ring road and the figure eight. The edges of the network are laid end to
+    end along the route of the vehicles, so that the network can be simulated
+    as a single loop (see flow/core/kernel/simulation/ring_engine.py). Unlike
+    in sumo, the loop does not include any internal links (junctions).
+
+    Attributes
+    ----------
+    network : flow.networks.Network
+        an object containing relevant network-specific features such as the
+        locations and properties of nodes and edges in the network
+    rts : dict
+        specifies routes vehicles can take
+    loop : list of str
+        names of the edges in the network, in the order they are traversed
+    """
+
+    def __init__(self, master_kernel, sim_params):
+        """See parent class."""
+        BaseKernelNetwork.__init__(self, master_kernel, sim_params)
+
+        self.network = None
+        self._edges = None
+        self._edge_list = None
+        self.__max_speed = None
+        self.__length = None
+        self.rts = None
+        self.loop = None
+        self._starts = None
+        self._shape = None
+
+    def generate_network(self, network):
+        """See parent class.
+
+        Raises
+        ------
+        flow.utils.exceptions.FatalFlowError
+            if the network is not a single-lane closed network without traffic
+            lights
+        """
+        self.network = network
+        self.orig_name = network.orig_name
+        self.name = network.name
+
+        if network.edges is None:
+            raise FatalFlowError(
+                "The headless simulator does not support networks imported from "
+                "templates or osm files."
+            )
+        if len(network.traffic_lights.get_properties()) > 0:
+            raise FatalFlowError(
+                "The headless simulator does not support traffic lights."
+            )
+
+        nodes = {node["id"]: node for node in network.nodes}
+        types = {typ["id"]: typ for typ in network.types or []}
+
+        # collect the length, speed limit, number of lanes, and shape of every
+        # edge, either directly or from the type of the edge
+        self._edges = {}
+        for edge in network.edges:
+            attrs = dict(types.get(edge.get("type"), {}))
+            attrs.update(edge)
+            shape = edge.get("shape") or [
+                (nodes[edge[key]]["x"], nodes[edge[key]]["y"]) for key in ["from", "to"]
+            ]
+            shape = np.asarray(shape, dtype=float)
+            if "length" in attrs:
+                length = float(attrs["length"])
+            else:
+                length = np.sum(np.linalg.norm(np.diff(shape, axis=0), axis=1))
+            self._edges[edge["id"]] = {
+                "length": length,
+                "speed": float(attrs.get("speed", 30)),
+                "lanes": int(attrs.get("numLanes", 1)),
+                "shape": shape,
+            }
+
+        self._edge_list = list(self._edges.keys())
+        if any(self._edges[edge]["lanes"] != 1 for edge in self._edge_list):
+            raise FatalFlowError(
+                "The headless simulator only supports single-lane networks."
+            )
+
+        if network.routes is None:
+            raise FatalFlowError("The headless simulator requires closed routes.")
+
+        # list of routes with one element
+        for route_id in network.routes.keys():
+            if isinstance(network.routes[route_id][0], str):
+                network.routes[route_id] = [(network.routes[route_id], 1)]
+        self.rts = network.routes
+
+        # order of the edges in the loop, starting from the edge with the
+        # smallest edge start (if specified)
+        loop = list(self.rts[self._edge_list[0]][0][0])
+        if sorted(loop) != sorted(self._edge_list):
+            raise FatalFlowError(
+                "The headless simulator only supports closed networks whose "
+                "routes cover every edge exactly once."
+            )
+        if network.edge_starts is not None:
+            first = min(network.edge_starts, key=lambda tup: tup[1])[0]
+            i = loop.index(first)
+            loop = loop[i:] + loop[:i]
+        self.loop = loop
+
+        self.edgestarts = []
+        length = 0
+        for edge_id in loop:
+            self.edgestarts.append((edge_id, length))
+            length += self._edges[edge_id]["length"]
+        self.__length = length
+        self.__max_speed = max(self.speed_limit(edge) for edge in self._edge_list)
+
+        self.internal_edgestarts = []
+        self.internal_edgestarts_dict = {}
+        self.total_edgestarts = list(self.edgestarts)
+        self.total_edgestarts_dict = dict(self.total_edgestarts)
+        self._starts = np.array([start for _, start in self.edgestarts])
+        self._loop = np.array(self.loop, dtype=object)
+
+        # points along the shape of the loop, and their absolute positions,
+        # used to compute the 2D positions of vehicles
+        points, positions = [], []
+        for edge_id, start in self.edgestarts:
+            shape = self._edges[edge_id]["shape"]
+            dist = np.concatenate(
+                [[0], np.cumsum(np.linalg.norm(np.diff(shape, axis=0), axis=1))]
+            )
+            # scale the shape so that it matches the length of the edge
+            if dist[-1] > 0:
+                dist *= self._edges[edge_id]["length"] / dist[-1]
+            points.append(shape)
+            positions.append(start + dist)
+        positions = np.concatenate(positions)
+        points = np.concatenate(points)
+        # skip the points shared by consecutive edges
+        keep = np.concatenate([[True], np.diff(positions) > 0])
+        self._shape = (positions[keep], points[keep])
+
+    def update(self, reset):
+        """Perform no action of value (networks are static)."""
+        pass
+
+    def close(self):
+        """Perform no action of value (no files are generated)."""
+        pass
+
+    ###########################################################################
+    #                        State acquisition methods                        #
+    ###########################################################################
+
+    def edge_length(self, edge_id):
+        """See parent class."""
+        try:
+            return self._edges[edge_id]["length"]
+        except KeyError:
+            return -1001
+
+    def length(self):
+        """See parent class."""
+        return self.__length
+
+    def non_internal_length(self):
+        """Return the total length of all edges (there are no junctions)."""
+        return self.__length
+
+    def speed_limit(self, edge_id):
+        """See parent class."""
+        try:
+            return self._edges[edge_id]["speed"]
+        except KeyError:
+            return -1001
+
+    def max_speed(self):
+        """See parent class."""
+        return self.__max_speed
+
+    def num_lanes(self, edge_id):
+        """See parent class."""
+        try:
+            return self._edges[edge_id]["lanes"]
+        except KeyError:
+            return -1001
+
+    def get_edge_list(self):
+        """See parent class."""
+        return self._edge_list
+
+    def get_junction_list(self):
+        """See parent class."""
+        return []
+
+    def get_edge(self, x):
+        """See parent class."""
+        i = np.searchsorted(self._starts, x % self.__length, side="right") - 1
+        return self.edgestarts[i][0], x % self.__length - self._starts[i]
+
+    def get_edges(self, x):
+        """Return the edges and relative positions of absolute positions.
+
+        Parameters
+        ----------
+        x : np.ndarray
+            absolute positions in the network
+
+        Returns
+        -------
+        np.ndarray of str
+            edge names
+        np.ndarray
+            relative positions on the edges
+        """
+        index = np.searchsorted(self._starts, x, side="right") - 1
+        return self._loop[index], x - self._starts[index]
+
+    def get_x(self, edge, position):
+        """See parent class."""
+        if edge not in self.total_edgestarts_dict:
+            return -1001
+        return self.total_edgestarts_dict[edge] + position
+
+    def get_2d_position(self, x):
+        """Return the 2D coordinates and angle (in degrees) of positions.
+
+        The angle is measured clockwise from north, as in sumo.
+
+        Parameters
+        ----------
+        x : np.ndarray
+            absolute positions in the network
+
+        Returns
+        -------
+        np.ndarray
+            2D coordinates of the positions, of shape (len(x), 2)
+        np.ndarray
+            angles of the network at the positions
+        """
+        positions, points = self._shape
+        coords = np.stack(
+            [np.interp(x, positions, points[:, 0]), np.interp(x, positions, points[:, 1])],
+            axis=1,
+        )
+        index = np.clip(np.searchsorted(positions, x, side="right"), 1, len(positions) - 1)
+        delta = points[index] - points[index - 1]
+        angle = np.degrees(np.arctan2(delta[:, 0], delta[:, 1])) % 360
+        return coords, angle
+
+    def next_edge(self, edge, lane):
+        """See parent class."""
+        if edge not in self.loop:
+            return []
+        i = self.loop.index(edge)
+        return [(self.loop[(i + 1) % len(self.loop)], lane)]
+
+    def prev_edge(self, edge, lane):
+        """See parent class."""
+        if edge not in self.loop:
+            return []
+        i = self.loop.index(edge)
+        return [(self.loop[i - 1], lane)]
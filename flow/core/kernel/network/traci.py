@@ -3,9 +3,15 @@ import tempfile
 
 from flow.core.kernel.network import BaseKernelNetwork
 from flow.core.util import makexml, printxml, ensure_dir
+import flow.config as config
 import time
 import os
 import subprocess
+import hashlib
+import functools
+import json
+import logging
+import shutil
 import xml.etree.ElementTree as ElementTree
 from lxml import etree
 from copy import deepcopy
@@ -16,12 +22,83 @@ E = etree.Element
 RETRIES_ON_ERROR = 10
 # number of seconds to wait before trying to access the .net.xml file again
 WAIT_ON_ERROR = 1
+# version of the cached .net.xml files (see flow.config.NET_CACHE_DIR)
+NET_CACHE_VERSION = 2
 
 
 def _flow(name, vtype, route, **kwargs):
     return E("flow", id=name, route=route, type=vtype, **kwargs)
 
 
+@functools.lru_cache(maxsize=None)
+def _netconvert_version():
+    """Return the version information printed by netconvert."""
+    try:
+        return subprocess.run(
+            ["netconvert", "--version"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            universal_newlines=True,
+        ).stdout
+    except OSError:
+        return None
+
+
+def _net_cache_key(nodes, edges, types, connections):
+    """Return a hash of the inputs to netconvert.
+
+    This is used to identify cached .net.xml files. The version of the cache
+    format and of netconvert are included in the hash, in order to invalidate
+    old files if the format, the netconvert options or sumo change.
+    """
+    inputs = json.dumps(
+        [NET_CACHE_VERSION, _netconvert_version(), nodes, edges, types, connections],
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(inputs.encode()).hexdigest()
+
+
+def _is_private_dir(path):
+    """Return whether a directory is owned by, and only writable by, the user.
+
+    Files in other directories may have been planted by other users, and are
+    not read from the cache.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return False
+    if not hasattr(os, "getuid"):
+        return True
+    return stat.st_uid == os.getuid() and stat.st_mode & 0o022 == 0
+
+
+def _encode_connections(conn_dict):
+    """Convert connection data to json (whose keys can only be strings)."""
+    return {
+        direction: {
+            edge: [[lane, links] for lane, links in lanes.items()]
+            for edge, lanes in data.items()
+        }
+        for direction, data in conn_dict.items()
+    }
+
+
+def _decode_connections(data):
+    """Convert connection data back from json, see _encode_connections."""
+    return {
+        direction: {
+            edge: {
+                lane: [(to_edge, to_lane) for to_edge, to_lane in links]
+                for lane, links in lanes
+            }
+            for edge, lanes in edges.items()
+        }
+        for direction, edges in data.items()
+    }
+
+
 def _inputs(net=None, rou=None, add=None, gui=None):
     inp = E("input")
     inp.append(E("net-file", value=net))
@@ -421,13 +498,6 @@ class TraCIKernelNetwork(BaseKernelNetwork):
             if "radius" in node:
                 node["radius"] = str(node["radius"])
 
-        # xml file for nodes; contains nodes for the boundary points with
-        # respect to the x and y axes
-        x = makexml("nodes", "http://sumo.dlr.de/xsd/nodes_file.xsd")
-        for node_attributes in nodes:
-            x.append(E("node", **node_attributes))
-        printxml(x, self.net_path + self.nodfn)
-
         # modify the length, shape, numLanes, and speed values
         for edge in edges:
             edge["length"] = str(edge["length"])
@@ -443,6 +513,38 @@ class TraCIKernelNetwork(BaseKernelNetwork):
             if "speed" in edge:
                 edge["speed"] = str(edge["speed"])
 
+        # modify the numLanes and speed values
+        if types is not None:
+            for typ in types:
+                if "numLanes" in typ:
+                    typ["numLanes"] = str(typ["numLanes"])
+                if "speed" in typ:
+                    typ["speed"] = str(typ["speed"])
+
+        # modify the fromLane and toLane values
+        if connections is not None:
+            for connection in connections:
+                if "fromLane" in connection:
+                    connection["fromLane"] = str(connection["fromLane"])
+                if "toLane" in connection:
+                    connection["toLane"] = str(connection["toLane"])
+                if "signal_group" in connection:
+                    del connection["signal_group"]
+
+        # the .net.xml file only depends on the inputs to netconvert, so a
+        # file generated from the same inputs can be reused (if available)
+        cache_key = _net_cache_key(nodes, edges, types, connections)
+        cached_net = self._load_cached_net(cache_key)
+        if cached_net is not None:
+            return cached_net
+
+        # xml file for nodes; contains nodes for the boundary points with
+        # respect to the x and y axes
+        x = makexml("nodes", "http://sumo.dlr.de/xsd/nodes_file.xsd")
+        for node_attributes in nodes:
+            x.append(E("node", **node_attributes))
+        printxml(x, self.net_path + self.nodfn)
+
         # xml file for edges
         x = makexml("edges", "http://sumo.dlr.de/xsd/edges_file.xsd")
         for edge_attributes in edges:
@@ -452,13 +554,6 @@ class TraCIKernelNetwork(BaseKernelNetwork):
         # xml file for types: contains the the number of lanes and the speed
         # limit for the lanes
         if types is not None:
-            # modify the numLanes and speed values
-            for typ in types:
-                if "numLanes" in typ:
-                    typ["numLanes"] = str(typ["numLanes"])
-                if "speed" in typ:
-                    typ["speed"] = str(typ["speed"])
-
             x = makexml("types", "http://sumo.dlr.de/xsd/types_file.xsd")
             for type_attributes in types:
                 x.append(E("type", **type_attributes))
@@ -467,17 +562,8 @@ class TraCIKernelNetwork(BaseKernelNetwork):
         # xml for connections: specifies which lanes connect to which in the
         # edges
         if connections is not None:
-            # modify the fromLane and toLane values
-            for connection in connections:
-                if "fromLane" in connection:
-                    connection["fromLane"] = str(connection["fromLane"])
-                if "toLane" in connection:
-                    connection["toLane"] = str(connection["toLane"])
-
             x = makexml("connections", "http://sumo.dlr.de/xsd/connections_file.xsd")
             for connection_attributes in connections:
-                if "signal_group" in connection_attributes:
-                    del connection_attributes["signal_group"]
                 x.append(E("connection", **connection_attributes))
             printxml(x, self.net_path + self.confn)
 
@@ -524,12 +610,91 @@ class TraCIKernelNetwork(BaseKernelNetwork):
         for _ in range(RETRIES_ON_ERROR):
             try:
                 edges_dict, conn_dict = self._import_edges_from_net(net_params)
-                return edges_dict, conn_dict
+                break
             except Exception as e:
                 print("Error during start: {}".format(e))
                 print("Retrying in {} seconds...".format(WAIT_ON_ERROR))
                 time.sleep(WAIT_ON_ERROR)
-        raise error
+                error = e
+        else:
+            raise error
+
+        self._save_cached_net(cache_key, edges_dict, conn_dict)
+        return edges_dict, conn_dict
+
+    def _load_cached_net(self, cache_key):
+        """Reuse a cached .net.xml file and its edge and connection data.
+
+        The cached .net.xml file is copied to the location expected by the
+        sumo configuration file.
+
+        Parameters
+        ----------
+        cache_key : str
+            hash of the inputs to netconvert, see ``_net_cache_key``
+
+        Returns
+        -------
+        tuple of dict or None
+            the edges and connection data of the network (see
+            ``_import_edges_from_net``), or None if the network is not cached
+        """
+        if config.NET_CACHE_DIR is None or not _is_private_dir(config.NET_CACHE_DIR):
+            return None
+
+        cache_path = os.path.join(config.NET_CACHE_DIR, cache_key)
+        try:
+            with open(cache_path + ".json") as f:
+                data = json.load(f)
+            edges_dict = data["edges"]
+            conn_dict = _decode_connections(data["connections"])
+            shutil.copyfile(cache_path + ".net.xml", self.cfg_path + self.netfn)
+        except (OSError, ValueError, KeyError, TypeError):
+            # the network is not cached (or the cache is corrupted)
+            return None
+
+        return edges_dict, conn_dict
+
+    def _save_cached_net(self, cache_key, edges_dict, conn_dict):
+        """Store the generated .net.xml file and its edge and connection data.
+
+        The files are first written to temporary files and then renamed, so
+        that other processes never read partially written files. The cache is
+        optional: if it cannot be written, a warning is logged instead.
+
+        Parameters
+        ----------
+        cache_key : str
+            hash of the inputs to netconvert, see ``_net_cache_key``
+        edges_dict : dict
+            edge data of the network
+        conn_dict : dict
+            connection data of the network
+        """
+        if config.NET_CACHE_DIR is None:
+            return
+
+        cache_path = os.path.join(config.NET_CACHE_DIR, cache_key)
+        suffix = ".{}.tmp".format(os.getpid())
+        data = {"edges": edges_dict, "connections": _encode_connections(conn_dict)}
+        try:
+            os.makedirs(config.NET_CACHE_DIR, mode=0o700, exist_ok=True)
+            if not _is_private_dir(config.NET_CACHE_DIR):
+                return
+
+            shutil.copyfile(
+                self.cfg_path + self.netfn, cache_path + ".net.xml" + suffix
+            )
+            os.replace(cache_path + ".net.xml" + suffix, cache_path + ".net.xml")
+
+            # the json file is written last, as it marks the entry as complete
+            with open(cache_path + ".json" + suffix, "w") as f:
+                json.dump(data, f)
+            os.replace(cache_path + ".json" + suffix, cache_path + ".json")
+        except OSError as e:
+            logging.warning(
+                "Could not cache the network in %s: %s", config.NET_CACHE_DIR, e
+            )
 
     def generate_net_from_osm(self, net_params):
         """Generate .net.xml files from OpenStreetMap files.
@@ -3,6 +3,12 @@
 from flow.core.kernel.simulation.base import KernelSimulation
 from flow.core.kernel.simulation.traci import TraCISimulation
 from flow.core.kernel.simulation.aimsun import AimsunKernelSimulation
+from flow.core.kernel.simulation.headless import HeadlessSimulation
 
 
-__all__ = ["KernelSimulation", "TraCISimulation", "AimsunKernelSimulation"]
+__all__ = [
+    "KernelSimulation",
+    "TraCISimulation",
+    "AimsunKernelSimulation",
+    "HeadlessSimulation",
+]
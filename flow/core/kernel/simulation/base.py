@@ -80,6 +80,26 @@ class KernelSimulation(object):
         """
         raise NotImplementedError
 
+    def save_state(self, path):
+        """Save the current state of the simulation to a file.
+
+        Parameters
+        ----------
+        path : str
+            path to the file the state is saved in
+        """
+        raise NotImplementedError
+
+    def load_state(self, path):
+        """Replace the current state of the simulation with a saved state.
+
+        Parameters
+        ----------
+        path : str
+            path to a file created by ``save_state``
+        """
+        raise NotImplementedError
+
     def close(self):
         """Close the current simulation instance."""
         raise NotImplementedError
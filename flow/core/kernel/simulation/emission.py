@@ -0,0 +1,277 @@
+"""Streaming writer for the emission data collected during simulations.
+
+The emission data consists of one row per vehicle and per time step. Rows are
+appended to fixed-size columnar chunks, which are written to disk by a
+background thread once they are full. The memory used by the writer is thus
+bounded by the size of a few chunks, regardless of the length of the
+simulation.
+"""
+
+import csv
+import gzip
+import queue
+import threading
+
+import numpy as np
+
+# name and dtype of all the columns of an emission file, in order
+EMISSION_COLUMNS = [
+    ("time", np.float64),
+    ("id", object),
+    ("x", np.float64),
+    ("y", np.float64),
+    ("speed", np.float64),
+    ("headway", np.float64),
+    ("leader_id", object),
+    ("target_accel_with_noise_with_failsafe", np.float64),
+    ("target_accel_no_noise_no_failsafe", np.float64),
+    ("target_accel_with_noise_no_failsafe", np.float64),
+    ("target_accel_no_noise_with_failsafe", np.float64),
+    ("realized_accel", np.float64),
+    ("road_grade", np.float64),
+    ("edge_id", object),
+    ("lane_number", np.int64),
+    ("distance", np.float64),
+    ("relative_position", np.float64),
+    ("follower_id", object),
+    ("leader_rel_speed", np.float64),
+]
+
+# valid options for the emission_format term in SumoParams. These are also
+# the extensions of the generated files.
+EMISSION_FORMATS = ["csv", "csv.gz", "parquet", "arrow"]
+
+# default number of rows in a chunk
+CHUNK_SIZE = 20000
+
+# maximum number of full chunks waiting to be written to disk
+MAX_PENDING_CHUNKS = 2
+
+
+class EmissionWriter(object):
+    """Streaming writer of emission files.
+
+    The following formats are supported:
+
+    * "csv": plain csv file, readable with ``pandas.read_csv``
+    * "csv.gz": gzip-compressed csv file, readable with ``pandas.read_csv``
+    * "parquet": Parquet file, readable with ``pandas.read_parquet``. Requires
+      pyarrow.
+    * "arrow": Arrow IPC (Feather v2) file, readable with
+      ``pandas.read_feather``. Requires pyarrow.
+
+    Missing values (e.g. the accelerations of vehicles that were not assigned
+    one, or the leader of a vehicle without a leader) are written as empty
+    fields in csv files, and as nulls in the other formats.
+
+    Usage
+    -----
+    >>> writer = EmissionWriter("emission.csv", fmt="csv")
+    >>> writer.append(time=[0.1, 0.1], id=["idm_0", "idm_1"], ...)
+    >>> writer.close()
+
+    Attributes
+    ----------
+    path : str
+        path to the file the data is written to
+    fmt : str
+        format of the file
+    num_rows : int
+        number of rows appended so far
+    """
+
+    def __init__(self, path, fmt="csv", chunk_size=CHUNK_SIZE):
+        """Instantiate the writer, and start its background thread.
+
+        Parameters
+        ----------
+        path : str
+            path to the file the data is written to
+        fmt : str, optional
+            format of the file, one of EMISSION_FORMATS
+        chunk_size : int, optional
+            number of rows kept in memory before they are written to disk
+
+        Raises
+        ------
+        ValueError
+            if the format is not valid
+        ImportError
+            if the format requires pyarrow, and it is not installed
+        """
+        if fmt not in EMISSION_FORMATS:
+            raise ValueError(
+                "Invalid emission format: {}. Must be one of: {}".format(
+                    fmt, EMISSION_FORMATS
+                )
+            )
+
+        self.path = path
+        self.fmt = fmt
+        self.num_rows = 0
+        self._chunk_size = chunk_size
+        self._chunk = None
+        self._chunk_rows = 0
+        self._new_chunk()
+
+        # open the output file (this raises errors, e.g. on missing optional
+        # dependencies, in the calling thread)
+        self._sink = _open_sink(path, fmt)
+
+        self._queue = queue.Queue(maxsize=MAX_PENDING_CHUNKS)
+        self._error = None
+        self._thread = threading.Thread(target=self._write_chunks, daemon=True)
+        self._thread.start()
+
+    def append(self, **columns):
+        """Append several rows to the file.
+
+        Parameters
+        ----------
+        columns : dict < str, array_like >
+            the values of the rows for each column in EMISSION_COLUMNS. All
+            columns must have the same length. None values are considered
+            missing.
+        """
+        self._check_error()
+
+        num_rows = len(columns["id"])
+        start = 0
+        while start < num_rows:
+            # number of rows that fit in the current chunk
+            n = min(num_rows - start, self._chunk_size - self._chunk_rows)
+            end = self._chunk_rows + n
+            for name, dtype in EMISSION_COLUMNS:
+                values = columns[name][start:start + n]
+                if dtype is np.float64:
+                    # missing float values are stored as nan
+                    values = np.array(values, dtype=object)
+                    values[np.equal(values, None)] = np.nan
+                self._chunk[name][self._chunk_rows:end] = values
+            self._chunk_rows = end
+            start += n
+
+            if self._chunk_rows == self._chunk_size:
+                self._flush()
+
+        self.num_rows += num_rows
+
+    def close(self):
+        """Write all remaining rows and close the file."""
+        self._flush()
+        self._queue.put(None)
+        self._thread.join()
+        self._check_error()
+
+    def _new_chunk(self):
+        """Allocate a new empty chunk."""
+        self._chunk = {
+            name: np.empty(self._chunk_size, dtype=dtype)
+            for name, dtype in EMISSION_COLUMNS
+        }
+        self._chunk_rows = 0
+
+    def _flush(self):
+        """Pass the current chunk to the background thread."""
+        if self._chunk_rows == 0:
+            return
+
+        chunk = {name: self._chunk[name][:self._chunk_rows] for name in self._chunk}
+        # this blocks if too many chunks are waiting, which bounds the memory
+        self._queue.put(chunk)
+        self._new_chunk()
+
+    def _write_chunks(self):
+        """Write the chunks in the queue until the writer is closed."""
+        try:
+            while True:
+                chunk = self._queue.get()
+                if chunk is None:
+                    break
+                self._sink.write(chunk)
+        except Exception as e:
+            self._error = e
+            # keep consuming chunks, so that the main thread never blocks
+            while self._queue.get() is not None:
+                pass
+        finally:
+            self._sink.close()
+
+    def _check_error(self):
+        """Raise any error that occurred in the background thread."""
+        if self._error is not None:
+            raise self._error
+
+
+def _open_sink(path, fmt):
+    """Open the file the chunks are written to, based on the format."""
+    if fmt in ["csv", "csv.gz"]:
+        return _CSVSink(path, compress=fmt == "csv.gz")
+    else:
+        return _ArrowSink(path, fmt)
+
+
+class _CSVSink(object):
+    """Writes chunks to a (possibly compressed) csv file."""
+
+    def __init__(self, path, compress):
+        if compress:
+            self._file = gzip.open(path, "wt", newline="")
+        else:
+            self._file = open(path, "w", newline="")
+        self._writer = csv.writer(self._file, delimiter=",")
+        self._writer.writerow([name for name, _ in EMISSION_COLUMNS])
+
+    def write(self, chunk):
+        columns = []
+        for name, dtype in EMISSION_COLUMNS:
+            values = chunk[name].tolist()
+            if dtype is np.float64:
+                # missing values are written as empty fields
+                values = [None if v != v else v for v in values]
+            columns.append(values)
+        self._writer.writerows(zip(*columns))
+
+    def close(self):
+        self._file.close()
+
+
+class _ArrowSink(object):
+    """Writes chunks to a Parquet or Arrow IPC file."""
+
+    def __init__(self, path, fmt):
+        try:
+            import pyarrow as pa
+            import pyarrow.ipc
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError(
+                "The {} emission format requires pyarrow. Install it with "
+                "`pip install pyarrow`, or use the csv format.".format(fmt)
+            )
+
+        self._pa = pa
+        self._schema = pa.schema(
+            [
+                (name, pa.string() if dtype is object else pa.from_numpy_dtype(dtype))
+                for name, dtype in EMISSION_COLUMNS
+            ]
+        )
+        if fmt == "parquet":
+            self._writer = pyarrow.parquet.ParquetWriter(path, self._schema)
+        else:
+            self._writer = pyarrow.ipc.new_file(path, self._schema)
+
+    def write(self, chunk):
+        pa = self._pa
+        arrays = []
+        for name, dtype in EMISSION_COLUMNS:
+            if dtype is np.float64:
+                values = chunk[name]
+                arrays.append(pa.array(values, mask=np.isnan(values)))
+            else:
+                arrays.append(pa.array(chunk[name], type=self._schema.field(name).type))
+        self._writer.write_table(pa.Table.from_arrays(arrays, schema=self._schema))
+
+    def close(self):
+        self._writer.close()
@@ -0,0 +1,62 @@
+"""Script containing the headless simulation kernel class."""
+
+from flow.core.kernel.simulation.traci import TraCISimulation
+from flow.core.kernel.simulation.ring_engine import RingSimulator
+from flow.core.util import ensure_dir
+from flow.utils.exceptions import FatalFlowError
+
+
+class HeadlessSimulation(TraCISimulation):
+    """Headless simulation kernel.
+
+    Simulates single-lane closed networks in-process with NumPy (see
+    flow/core/kernel/simulation/ring_engine.py), without starting a separate
+    simulator. The kernel API generated by this class is a
+    flow.core.kernel.simulation.ring_engine.RingSimulator object.
+
+    Emission data is collected and stored in the same format as with sumo.
+    """
+
+    def pass_api(self, kernel_api):
+        """See parent class."""
+        self.kernel_api = kernel_api
+
+    def simulation_step(self):
+        """See parent class."""
+        self.kernel_api.step()
+
+    def close(self):
+        """See parent class."""
+        # Save the emission data to a csv.
+        if self.emission_path is not None:
+            self.save_emission()
+
+    def check_collision(self):
+        """See parent class."""
+        return bool(self.kernel_api.engine.collided.any())
+
+    def start_simulation(self, network, sim_params):
+        """Start a headless simulation instance.
+
+        Raises
+        ------
+        flow.utils.exceptions.FatalFlowError
+            if rendering is requested, since the simulation has no gui
+        """
+        if sim_params.render:
+            raise FatalFlowError("The headless simulator does not support rendering.")
+
+        # Save the simulation step size (for later use).
+        self.sim_step = sim_params.sim_step
+
+        # Update the emission path term.
+        self.emission_path = sim_params.emission_path
+        self.emission_format = getattr(sim_params, "emission_format", "csv")
+        if self.emission_path is not None:
+            ensure_dir(self.emission_path)
+
+        return RingSimulator(
+            length=network.length(),
+            sim_step=self.sim_step,
+            speed_limit=network.max_speed(),
+        )
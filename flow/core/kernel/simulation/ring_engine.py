@@ -0,0 +1,380 @@
+"""Script containing the NumPy engine used by the headless simulator.
+
+The engine integrates the positions and speeds of vehicles on single-lane
+closed networks (e.g. the ring road and the figure eight), and can step any
+number of independent copies of the same network at once, with the state of
+all copies stored in arrays of shape (num_rings, num_vehicles).
+"""
+
+import numpy as np
+
+# default length of vehicles, in meters (the same as in sumo)
+VEHICLE_LENGTH = 5
+
+# bits of the sumo speed modes that are reproduced by the engine
+SAFE_SPEED = 1
+MAX_ACCEL = 2
+MAX_DECEL = 4
+
+# parameters of the vehicles, with their default values. These match the
+# default values of flow.core.params.SumoCarFollowingParams
+VEHICLE_PARAMS = {
+    "length": VEHICLE_LENGTH,
+    "accel": 2.6,
+    "decel": 4.5,
+    "tau": 1.0,
+    "min_gap": 2.5,
+    "max_speed": 30,
+    "speed_mode": SAFE_SPEED,
+}
+
+
+class RingEngine(object):
+    """Batched simulator of vehicles on single-lane closed networks.
+
+    Every step, the speeds of all vehicles are updated, and then their
+    positions are updated using the new speeds (forward Euler, as in sumo).
+    Vehicles that are not commanded a speed follow the intelligent driver
+    model (IDM), which is the default car following model of vehicles in Flow.
+    The new speeds are then bounded by the speed limit of the network, the
+    maximum speed of the vehicle, and optionally by a safe speed and the
+    maximum acceleration and deceleration of the vehicle, as specified by the
+    vehicle's speed mode (see flow.core.params.SumoCarFollowingParams).
+
+    Lane changes and conflicts at intersections (e.g. at the center of the
+    figure eight) are not modeled.
+
+    Attributes
+    ----------
+    length : float
+        length of the closed network, in meters
+    sim_step : float
+        seconds per simulation step
+    speed_limit : float
+        speed limit of the network, in m/s
+    num_rings : int
+        number of independent copies of the network that are simulated
+    time : float
+        simulation time, in seconds
+    pos : np.ndarray
+        absolute position of every vehicle, of shape (num_rings, num_vehicles)
+    speed : np.ndarray
+        speed of every vehicle, of the same shape as ``pos``
+    default_speed : np.ndarray
+        the speed every vehicle would have been assigned by the car following
+        model in the last step, of the same shape as ``pos``
+    distance : np.ndarray
+        distance traveled by every vehicle, of the same shape as ``pos``
+    leader : np.ndarray
+        index of the leader of every vehicle, of the same shape as ``pos``
+    headway : np.ndarray
+        bumper-to-bumper gap with the leader, of the same shape as ``pos``
+    collided : np.ndarray
+        whether a collision occurred in every copy of the network in the last
+        step, of shape (num_rings,)
+    """
+
+    def __init__(self, length, sim_step=0.1, speed_limit=np.inf, num_rings=1):
+        """Instantiate the engine.
+
+        Parameters
+        ----------
+        length : float
+            length of the closed network, in meters
+        sim_step : float, optional
+            seconds per simulation step
+        speed_limit : float, optional
+            speed limit of the network, in m/s
+        num_rings : int, optional
+            number of independent copies of the network that are simulated
+        """
+        self.length = float(length)
+        self.sim_step = sim_step
+        self.speed_limit = speed_limit
+        self.num_rings = num_rings
+        self.time = 0
+
+        shape = (num_rings, 0)
+        self.pos = np.zeros(shape)
+        self.speed = np.zeros(shape)
+        self.default_speed = np.zeros(shape)
+        self.distance = np.zeros(shape)
+        self.leader = np.zeros(shape, dtype=int)
+        self.headway = np.zeros(shape)
+        self.collided = np.zeros(num_rings, dtype=bool)
+
+        # parameters of every vehicle, shared by all copies of the network
+        self.params = {
+            key: np.zeros(0, dtype=int if key == "speed_mode" else float)
+            for key in VEHICLE_PARAMS
+        }
+
+    @property
+    def num_vehicles(self):
+        """Return the number of vehicles in each copy of the network."""
+        return self.pos.shape[1]
+
+    def add_vehicles(self, pos, speed, **params):
+        """Add vehicles to all copies of the network.
+
+        Parameters
+        ----------
+        pos : array_like
+            absolute positions of the new vehicles, either of shape
+            (num_vehicles,) to use the same positions in all copies of the
+            network, or of shape (num_rings, num_vehicles)
+        speed : array_like
+            initial speeds of the new vehicles, broadcastable to the shape of
+            ``pos``
+        params : array_like
+            parameters of the new vehicles (see ``VEHICLE_PARAMS``). Scalars
+            are applied to all new vehicles, and missing parameters are set to
+            their default values.
+
+        Returns
+        -------
+        np.ndarray
+            indices of the new vehicles
+        """
+        pos = np.asarray(pos, dtype=float)
+        num_new = pos.shape[-1]
+        shape = (self.num_rings, num_new)
+        pos = np.broadcast_to(pos, shape) % self.length
+        speed = np.broadcast_to(np.asarray(speed, dtype=float), shape)
+
+        for key, default in VEHICLE_PARAMS.items():
+            value = np.broadcast_to(params.get(key, default), (num_new,))
+            self.params[key] = np.concatenate(
+                [self.params[key], value.astype(self.params[key].dtype)]
+            )
+
+        start = self.num_vehicles
+        self.pos = np.concatenate([self.pos, pos], axis=1)
+        self.speed = np.concatenate([self.speed, speed], axis=1)
+        self.default_speed = np.concatenate([self.default_speed, speed], axis=1)
+        self.distance = np.concatenate([self.distance, np.zeros(shape)], axis=1)
+        self.update_leaders()
+
+        return np.arange(start, start + num_new)
+
+    def remove_vehicles(self, index):
+        """Remove the vehicles with the given indices from all copies.
+
+        The indices of the remaining vehicles are shifted to stay contiguous.
+        """
+        self.pos = np.delete(self.pos, index, axis=1)
+        self.speed = np.delete(self.speed, index, axis=1)
+        self.default_speed = np.delete(self.default_speed, index, axis=1)
+        self.distance = np.delete(self.distance, index, axis=1)
+        for key in self.params:
+            self.params[key] = np.delete(self.params[key], index)
+        self.update_leaders()
+
+    def update_leaders(self):
+        """Compute the leader and headway of every vehicle.
+
+        The leader of a vehicle is the next vehicle downstream of it, with the
+        vehicle at the front of the network following the vehicle at the back.
+        A vehicle that is alone on the network follows itself.
+        """
+        num_vehicles = self.num_vehicles
+        rows = np.arange(self.num_rings)[:, None]
+
+        order = np.argsort(self.pos, axis=1, kind="stable")
+        leader = np.empty_like(order)
+        leader[rows, order] = np.roll(order, -1, axis=1)
+
+        if num_vehicles == 1:
+            gap = np.full(self.pos.shape, self.length)
+        else:
+            gap = (self.pos[rows, leader] - self.pos) % self.length
+
+        self.leader = leader
+        self.headway = gap - self.params["length"][leader]
+        self.collided = (self.headway < 0).any(axis=1)
+
+    def model_accel(self):
+        """Return the accelerations assigned by the car following model."""
+        params = self.params
+        rows = np.arange(self.num_rings)[:, None]
+        v0 = np.minimum(params["max_speed"], self.speed_limit)
+        a = params["accel"]
+        b = params["decel"]
+
+        v = self.speed
+        dv = v - v[rows, self.leader]
+        s = np.maximum(self.headway, 1e-3)
+        s_star = params["min_gap"] + np.maximum(
+            0, v * params["tau"] + v * dv / (2 * np.sqrt(a * b))
+        )
+
+        return a * (1 - (v / v0) ** 4 - (s_star / s) ** 2)
+
+    def step(self, target_speed=None):
+        """Advance all copies of the network by one step.
+
+        Parameters
+        ----------
+        target_speed : np.ndarray, optional
+            speeds requested for every vehicle in the next step, of shape
+            (num_rings, num_vehicles). Vehicles with a NaN target speed, or
+            all vehicles if no target is given, follow the car following model
+        """
+        if self.num_vehicles == 0:
+            self.time += self.sim_step
+            return
+
+        params = self.params
+        dt = self.sim_step
+        rows = np.arange(self.num_rings)[:, None]
+        v = self.speed
+        max_speed = np.minimum(params["max_speed"], self.speed_limit)
+
+        # speeds assigned by the car following model
+        model_accel = np.minimum(self.model_accel(), params["accel"])
+        self.default_speed = np.clip(v + model_accel * dt, 0, max_speed)
+
+        if target_speed is None:
+            v_next = self.default_speed.copy()
+        else:
+            v_next = np.where(np.isnan(target_speed), self.default_speed, target_speed)
+        v_next = np.clip(v_next, 0, max_speed)
+
+        # bounds specified by the speed modes of the vehicles
+        mode = params["speed_mode"]
+        if np.any(mode & MAX_ACCEL):
+            v_next = np.where(
+                mode & MAX_ACCEL, np.minimum(v_next, v + params["accel"] * dt), v_next
+            )
+        if np.any(mode & MAX_DECEL):
+            v_next = np.where(
+                mode & MAX_DECEL, np.maximum(v_next, v - params["decel"] * dt), v_next
+            )
+        if np.any(mode & SAFE_SPEED):
+            # speed at which a vehicle can still stop behind its leader if the
+            # latter were to brake at the same deceleration, capped by the
+            # speed at which it would reach its leader within a step
+            b_tau = params["decel"] * params["tau"]
+            gap = np.maximum(self.headway - params["min_gap"], 0)
+            v_lead = v[rows, self.leader]
+            v_safe = -b_tau + np.sqrt(b_tau**2 + v_lead**2 + 2 * params["decel"] * gap)
+            v_safe = np.minimum(v_safe, np.maximum(self.headway, 0) / dt)
+            v_next = np.where(mode & SAFE_SPEED, np.minimum(v_next, v_safe), v_next)
+
+        # vehicles collide if they travel past the back of their leader, in
+        # which case they may have overtaken it by the end of the step
+        advance = v_next * dt
+        collided = (advance - advance[rows, self.leader] > self.headway).any(axis=1)
+
+        self.speed = v_next
+        self.pos = (self.pos + advance) % self.length
+        self.distance = self.distance + advance
+        self.time += dt
+        self.update_leaders()
+        self.collided |= collided
+
+
+class RingSimulator(object):
+    """Single copy of a closed network, used by the headless kernels.
+
+    This object plays the role of the TraCI connection for the headless
+    simulator: vehicles are added and removed by their names, and vehicles
+    that are added are only inserted into the network at the end of the next
+    simulation step, as in sumo.
+
+    Attributes
+    ----------
+    engine : RingEngine
+        the engine the network is simulated with
+    ids : list of str
+        names of the vehicles in the network, in the order of their indices in
+        the engine
+    index : dict <str, int>
+        index of every vehicle in the engine
+    departed_ids : list of str
+        names of the vehicles that were inserted in the last step
+    """
+
+    def __init__(self, length, sim_step=0.1, speed_limit=np.inf):
+        """Instantiate the simulator.
+
+        Parameters
+        ----------
+        length : float
+            length of the closed network, in meters
+        sim_step : float, optional
+            seconds per simulation step
+        speed_limit : float, optional
+            speed limit of the network, in m/s
+        """
+        self.engine = RingEngine(length, sim_step, speed_limit, num_rings=1)
+        self.ids = []
+        self.index = {}
+        self.departed_ids = []
+        self._pending = {}
+        self._target_speed = np.zeros((1, 0))
+
+    def add(self, veh_id, pos, speed, **params):
+        """Request a vehicle to be inserted at the end of the next step."""
+        self._pending[veh_id] = (pos, speed, params)
+
+    def remove(self, veh_id):
+        """Remove a vehicle from the network."""
+        self._pending.pop(veh_id, None)
+        if veh_id in self.index:
+            index = self.index[veh_id]
+            self.engine.remove_vehicles([index])
+            if index < self._target_speed.shape[1]:
+                # keep the speeds requested for the other vehicles, which are
+                # shifted along with their indices
+                self._target_speed = np.delete(self._target_speed, index, axis=1)
+            self.ids.remove(veh_id)
+            self.index = {veh_id: i for i, veh_id in enumerate(self.ids)}
+
+    def set_speed(self, veh_id, speed):
+        """Request a speed for a vehicle in the next step."""
+        if veh_id in self.index:
+            self._reset_target()
+            self._target_speed[0, self.index[veh_id]] = speed
+
+    def set_speeds(self, veh_ids, speeds):
+        """Request speeds for several vehicles in the next step.
+
+        Vehicles that are not in the network are ignored.
+        """
+        get = self.index.get
+        index = np.fromiter(
+            (get(veh_id, -1) for veh_id in veh_ids), dtype=int, count=len(veh_ids)
+        )
+        found = index >= 0
+        self._reset_target()
+        self._target_speed[0, index[found]] = np.asarray(speeds, dtype=float)[found]
+
+    def _reset_target(self):
+        # the number of vehicles only changes with pending requests when
+        # vehicles are removed, in which case the requests are already kept by
+        # remove. Vehicles are inserted after the requests are cleared in step
+        if self._target_speed.shape[1] != self.engine.num_vehicles:
+            self._target_speed = np.full((1, self.engine.num_vehicles), np.nan)
+
+    def step(self):
+        """Advance the network by one step, and insert pending vehicles."""
+        self._reset_target()
+        self.engine.step(self._target_speed)
+        self._target_speed.fill(np.nan)
+
+        self.departed_ids = list(self._pending)
+        if self.departed_ids:
+            pending = [self._pending[veh_id] for veh_id in self.departed_ids]
+            params = {
+                key: [p.get(key, default) for _, _, p in pending]
+                for key, default in VEHICLE_PARAMS.items()
+            }
+            self.engine.add_vehicles(
+                [pos for pos, _, _ in pending],
+                [speed for _, speed, _ in pending],
+                **params
+            )
+            self.ids.extend(self.departed_ids)
+            self.index = {veh_id: i for i, veh_id in enumerate(self.ids)}
+            self._pending.clear()
@@ -1,17 +1,22 @@
 """Script containing the TraCI simulation kernel class."""
 
 from flow.core.kernel.simulation import KernelSimulation
+from flow.core.kernel.simulation.emission import EmissionWriter
 from flow.core.util import ensure_dir
 import flow.config as config
 import traci.constants as tc
 import traci
+import sumolib
+import collections
+from copy import deepcopy
 import traceback
 import os
 import time
 import logging
 import subprocess
 import signal
-import csv
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 
 
 # Number of retries on restarting SUMO before giving up
@@ -34,20 +39,20 @@ class TraCISimulation(KernelSimulation):
         output is not generated if this value is not specified
     time : float
         used to internally keep track of the simulation time
-    stored_data : dict <str, dict <float, dict <str, Any>>>
-        a dict object used to store additional data if an emission file is
-        provided. The first key corresponds to the name of the vehicle, the
-        second corresponds to the time the sample was issued, and the final
-        keys represent the additional data stored at every given time for every
-        vehicle, and consists of the following keys:
-
-        * acceleration (no noise): the accelerations issued to the vehicle,
-          excluding noise
-        * acceleration (requested): the requested acceleration by the vehicle,
-          including noise
-        * acceleration (actual): the actual acceleration by the vehicle,
-          collected by computing the difference between the speeds of the
-          vehicle and dividing it by the sim_step term
+    emission_format : str
+        format of the emission files, one of
+        flow.core.kernel.simulation.emission.EMISSION_FORMATS
+    emission_writer : flow.core.kernel.simulation.emission.EmissionWriter
+        streaming writer of the emission data of the current rollout, or None
+        if no data was collected since the last emission file was saved. The
+        following data is stored for every vehicle at every time step:
+
+        * the position, speed, headway, leader and follower of the vehicle
+        * target_accel_*: the accelerations issued to the vehicle, with and
+          without noise and failsafes
+        * realized_accel: the actual acceleration by the vehicle, collected by
+          computing the difference between the speeds of the vehicle and
+          dividing it by the sim_step term
     """
 
     def __init__(self, master_kernel):
@@ -64,8 +69,14 @@ class TraCISimulation(KernelSimulation):
         self.sumo_proc = None
         self.sim_step = None
         self.emission_path = None
+        self.emission_format = "csv"
+        self.emission_writer = None
         self.time = 0
-        self.stored_data = dict()
+        # sumo instances launched in the background, to be used by the next
+        # calls to start_simulation, and the files and parameters they were
+        # launched with
+        self._warm_instances = collections.deque()
+        self._launcher = None
 
     def pass_api(self, kernel_api):
         """See parent class.
@@ -90,7 +101,11 @@ class TraCISimulation(KernelSimulation):
         )
 
     def simulation_step(self):
-        """See parent class."""
+        """See parent class.
+
+        The traffic light states set during the step are sent first.
+        """
+        self.master_kernel.traffic_light.flush()
         self.kernel_api.simulationStep()
 
     def update(self, reset):
@@ -102,51 +117,59 @@ class TraCISimulation(KernelSimulation):
 
         # Collect the additional data to store in the emission file.
         if self.emission_path is not None:
-            kv = self.master_kernel.vehicle
-            for veh_id in self.master_kernel.vehicle.get_ids():
-                t = round(self.time, 2)
-
-                # some miscellaneous pre-processing
-                position = kv.get_2d_position(veh_id)
-
-                # Make sure dictionaries corresponding to the vehicle and
-                # time are available.
-                if veh_id not in self.stored_data.keys():
-                    self.stored_data[veh_id] = dict()
-                if t not in self.stored_data[veh_id].keys():
-                    self.stored_data[veh_id][t] = dict()
-
-                # Add the speed, position, and lane data.
-                self.stored_data[veh_id][t].update(
-                    {
-                        "speed": kv.get_speed(veh_id),
-                        "lane_number": kv.get_lane(veh_id),
-                        "edge_id": kv.get_edge(veh_id),
-                        "relative_position": kv.get_position(veh_id),
-                        "x": position[0],
-                        "y": position[1],
-                        "headway": kv.get_headway(veh_id),
-                        "leader_id": kv.get_leader(veh_id),
-                        "follower_id": kv.get_follower(veh_id),
-                        "leader_rel_speed": kv.get_speed(kv.get_leader(veh_id))
-                        - kv.get_speed(veh_id),
-                        "target_accel_with_noise_with_failsafe": kv.get_accel(
-                            veh_id, noise=True, failsafe=True
-                        ),
-                        "target_accel_no_noise_no_failsafe": kv.get_accel(
-                            veh_id, noise=False, failsafe=False
-                        ),
-                        "target_accel_with_noise_no_failsafe": kv.get_accel(
-                            veh_id, noise=True, failsafe=False
-                        ),
-                        "target_accel_no_noise_with_failsafe": kv.get_accel(
-                            veh_id, noise=False, failsafe=True
-                        ),
-                        "realized_accel": kv.get_realized_accel(veh_id),
-                        "road_grade": kv.get_road_grade(veh_id),
-                        "distance": kv.get_distance(veh_id),
-                    }
-                )
+            self._append_emission()
+
+    def _append_emission(self):
+        """Append the current state of all vehicles to the emission file."""
+        kv = self.master_kernel.vehicle
+        veh_ids = kv.get_ids()
+        if len(veh_ids) == 0:
+            return
+
+        if self.emission_writer is None:
+            # the partial file is named after the process, so that processes
+            # running rollouts in parallel do not write to the same file
+            self.emission_writer = EmissionWriter(
+                self._emission_file("part-{}".format(os.getpid())),
+                fmt=self.emission_format,
+            )
+
+        # every field is read once per step for all vehicles
+        x, y = np.array(
+            kv.get_2d_position(veh_ids, error=(-1001, -1001)), dtype=float
+        ).T
+        speeds = np.asarray(kv.get_speed(veh_ids), dtype=float)
+        leader_ids = kv.get_leader(veh_ids)
+
+        self.emission_writer.append(
+            time=[round(self.time, 2)] * len(veh_ids),
+            id=veh_ids,
+            x=x,
+            y=y,
+            speed=speeds,
+            headway=kv.get_headway(veh_ids),
+            leader_id=leader_ids,
+            target_accel_with_noise_with_failsafe=kv.get_accel(
+                veh_ids, noise=True, failsafe=True
+            ),
+            target_accel_no_noise_no_failsafe=kv.get_accel(
+                veh_ids, noise=False, failsafe=False
+            ),
+            target_accel_with_noise_no_failsafe=kv.get_accel(
+                veh_ids, noise=True, failsafe=False
+            ),
+            target_accel_no_noise_with_failsafe=kv.get_accel(
+                veh_ids, noise=False, failsafe=True
+            ),
+            realized_accel=kv.get_realized_accel(veh_ids),
+            road_grade=kv.get_road_grade(veh_ids),
+            edge_id=kv.get_edge(veh_ids),
+            lane_number=kv.get_lane(veh_ids),
+            distance=kv.get_distance(veh_ids),
+            relative_position=kv.get_position(veh_ids),
+            follower_id=kv.get_follower(veh_ids),
+            leader_rel_speed=np.asarray(kv.get_speed(leader_ids), dtype=float) - speeds,
+        )
 
     def close(self):
         """See parent class."""
@@ -156,6 +179,19 @@ class TraCISimulation(KernelSimulation):
 
         self.kernel_api.close()
 
+    def save_state(self, path):
+        """See parent class."""
+        self.kernel_api.simulation.saveState(path)
+
+    def load_state(self, path):
+        """See parent class.
+
+        Note that loading a state replaces all vehicles in sumo and drops all
+        subscriptions, so the kernel api must then be passed again to all
+        kernels in order to renew their subscriptions.
+        """
+        self.kernel_api.simulation.loadState(path)
+
     def check_collision(self):
         """See parent class."""
         return self.kernel_api.simulation.getStartingTeleportNumber() != 0
@@ -172,99 +208,221 @@ class TraCISimulation(KernelSimulation):
            initialize a sumo instance.
         3. Finally, It initializes a traci connection to interface with sumo
            from Python and returns the connection.
+
+        If an instance was launched in the background for the same network
+        files and simulation parameters (see ``launch_warm_instance``), this
+        already running and connected instance is used instead of starting a
+        new one. Instances launched for other files or parameters are stale,
+        and are terminated.
         """
         # Save the simulation step size (for later use).
         self.sim_step = sim_params.sim_step
 
         # Update the emission path term.
         self.emission_path = sim_params.emission_path
+        self.emission_format = getattr(sim_params, "emission_format", "csv")
         if self.emission_path is not None:
             ensure_dir(self.emission_path)
 
-        error = None
-        for _ in range(RETRIES_ON_ERROR):
+        traci_connection = None
+        if self.has_warm_instance(network, sim_params):
+            _, future = self._warm_instances.popleft()
             try:
-                # port number the sumo instance will be run on
-                port = sim_params.port
-
-                sumo_binary = "sumo"
-
-                # command used to start sumo
-                sumo_call = [
-                    sumo_binary,
-                    "-c",
-                    network.cfg,
-                    "--remote-port",
-                    str(sim_params.port),
-                    "--num-clients",
-                    str(sim_params.num_clients),
-                    "--step-length",
-                    str(sim_params.sim_step),
-                ]
-
-                # use a ballistic integration step (if request)
-                if sim_params.use_ballistic:
-                    sumo_call.append("--step-method.ballistic")
-
-                # ignore step logs (if requested)
-                if sim_params.no_step_log:
-                    sumo_call.append("--no-step-log")
-
-                # add the lateral resolution of the sublanes (if requested)
-                if sim_params.lateral_resolution is not None:
-                    sumo_call.append("--lateral-resolution")
-                    sumo_call.append(str(sim_params.lateral_resolution))
-
-                if sim_params.overtake_right:
-                    sumo_call.append("--lanechange.overtake-right")
-                    sumo_call.append("true")
-
-                # specify a simulation seed (if requested)
-                if sim_params.seed is not None:
-                    sumo_call.append("--seed")
-                    sumo_call.append(str(sim_params.seed))
-
-                if not sim_params.print_warnings:
-                    sumo_call.append("--no-warnings")
-                    sumo_call.append("true")
-
-                # set the time it takes for a gridlock teleport to occur
-                sumo_call.append("--time-to-teleport")
-                sumo_call.append(str(int(sim_params.teleport_time)))
-
-                # check collisions at intersections
-                sumo_call.append("--collision.check-junctions")
-                sumo_call.append("true")
-
-                logging.info(" Starting SUMO on port " + str(port))
-                logging.debug(" Cfg file: " + str(network.cfg))
-                if sim_params.num_clients > 1:
-                    logging.info(" Num clients are" + str(sim_params.num_clients))
-                logging.debug(" Emission file: " + str(self.emission_path))
-                logging.debug(" Step length: " + str(sim_params.sim_step))
-
-                # Opening the I/O thread to SUMO
-                self.sumo_proc = subprocess.Popen(
-                    sumo_call, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
-                )
-
-                # wait a small period of time for the subprocess to activate
-                # before trying to connect with traci
-                if os.environ.get("TEST_FLAG", 0):
-                    time.sleep(0.1)
-                else:
-                    time.sleep(config.SUMO_SLEEP)
-
-                traci_connection = traci.connect(port, numRetries=100)
-                traci_connection.setOrder(0)
-                traci_connection.simulationStep()
-
-                return traci_connection
-            except Exception as e:
+                self.sumo_proc, traci_connection = future.result()
+            except Exception:
                 print("Error during start: {}".format(traceback.format_exc()))
-                error = e
-                self.teardown_sumo()
-        raise error
+        else:
+            self.close_warm_instances()
+
+        if traci_connection is None:
+            error = None
+            for _ in range(RETRIES_ON_ERROR):
+                try:
+                    self.sumo_proc, traci_connection = self._launch_sumo(
+                        network.cfg, sim_params, sim_params.port
+                    )
+                    break
+                except Exception as e:
+                    print("Error during start: {}".format(traceback.format_exc()))
+                    error = e
+            else:
+                raise error
+
+        return traci_connection
+
+    def launch_warm_instance(self, network, sim_params):
+        """Launch a sumo instance in the background.
+
+        The instance is used by the next call to start_simulation if the
+        network files and simulation parameters (including the seed) are then
+        the same. Instances are used in the order they are launched.
+
+        Parameters
+        ----------
+        network : flow.core.kernel.network.TraCIKernelNetwork
+            the network kernel, containing the paths to the sumo configuration
+            files
+        sim_params : flow.core.params.SumoParams
+            simulation-specific parameters. The instance is launched with a
+            copy of them, so later changes have no effect on it.
+        """
+        sim_params = deepcopy(sim_params)
+        if self._launcher is None:
+            self._launcher = ThreadPoolExecutor(max_workers=1)
+        future = self._launcher.submit(
+            self._launch_sumo,
+            network.cfg,
+            sim_params,
+            sumolib.miscutils.getFreeSocketPort(),
+        )
+        self._warm_instances.append(
+            (self._instance_key(network, sim_params), future)
+        )
+
+    @staticmethod
+    def _instance_key(network, sim_params):
+        """Return the network files and parameters a sumo instance runs with."""
+        return network.cfg, vars(sim_params)
+
+    @property
+    def num_warm_instances(self):
+        """Return the number of warm instances launched in the background."""
+        return len(self._warm_instances)
+
+    def has_warm_instance(self, network, sim_params):
+        """Return whether the next instance can be used by start_simulation.
+
+        This is the case if the next instance launched in the background was
+        launched with the given network files and simulation parameters.
+        """
+        if len(self._warm_instances) == 0:
+            return False
+        key, _ = self._warm_instances[0]
+        return key == self._instance_key(network, sim_params)
+
+    def close_warm_instances(self):
+        """Terminate all sumo instances launched in the background."""
+        while len(self._warm_instances) > 0:
+            _, future = self._warm_instances.popleft()
+            if future.cancel():
+                continue
+            try:
+                sumo_proc, traci_connection = future.result()
+                traci_connection.close()
+                sumo_proc.kill()
+                sumo_proc.wait()
+            except Exception as e:
+                print("Error during teardown: {}".format(e))
+
+        if self._launcher is not None:
+            self._launcher.shutdown()
+            self._launcher = None
+
+    def _launch_sumo(self, cfg, sim_params, port):
+        """Start a sumo process and connect to it.
+
+        Parameters
+        ----------
+        cfg : str
+            path to the sumo configuration file
+        sim_params : flow.core.params.SumoParams
+            simulation-specific parameters
+        port : int
+            port number the sumo instance will be run on
+
+        Returns
+        -------
+        subprocess.Popen
+            the sumo process
+        traci.connection.Connection
+            the traci connection to the sumo process
+        """
+        sumo_binary = "sumo"
+
+        # command used to start sumo
+        sumo_call = [
+            sumo_binary,
+            "-c",
+            cfg,
+            "--remote-port",
+            str(port),
+            "--num-clients",
+            str(sim_params.num_clients),
+            "--step-length",
+            str(sim_params.sim_step),
+        ]
+
+        # use a ballistic integration step (if request)
+        if sim_params.use_ballistic:
+            sumo_call.append("--step-method.ballistic")
+
+        # ignore step logs (if requested)
+        if sim_params.no_step_log:
+            sumo_call.append("--no-step-log")
+
+        # add the lateral resolution of the sublanes (if requested)
+        if sim_params.lateral_resolution is not None:
+            sumo_call.append("--lateral-resolution")
+            sumo_call.append(str(sim_params.lateral_resolution))
+
+        if sim_params.overtake_right:
+            sumo_call.append("--lanechange.overtake-right")
+            sumo_call.append("true")
+
+        # specify a simulation seed (if requested)
+        if sim_params.seed is not None:
+            sumo_call.append("--seed")
+            sumo_call.append(str(sim_params.seed))
+
+        if not sim_params.print_warnings:
+            sumo_call.append("--no-warnings")
+            sumo_call.append("true")
+
+        # set the time it takes for a gridlock teleport to occur
+        sumo_call.append("--time-to-teleport")
+        sumo_call.append(str(int(sim_params.teleport_time)))
+
+        # check collisions at intersections
+        sumo_call.append("--collision.check-junctions")
+        sumo_call.append("true")
+
+        if getattr(sim_params, "reset_mode", "add") == "snapshot":
+            # skip the validation of saved states against their xml schema,
+            # which otherwise dominates the time needed to load a state
+            sumo_call.append("--xml-validation")
+            sumo_call.append("never")
+            # save states with enough digits to restore them exactly
+            sumo_call.append("--save-state.precision")
+            sumo_call.append("8")
+
+        logging.info(" Starting SUMO on port " + str(port))
+        logging.debug(" Cfg file: " + str(cfg))
+        if sim_params.num_clients > 1:
+            logging.info(" Num clients are" + str(sim_params.num_clients))
+        logging.debug(" Emission file: " + str(self.emission_path))
+        logging.debug(" Step length: " + str(sim_params.sim_step))
+
+        # Opening the I/O thread to SUMO
+        sumo_proc = subprocess.Popen(
+            sumo_call, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+
+        try:
+            # wait a small period of time for the subprocess to activate
+            # before trying to connect with traci
+            if os.environ.get("TEST_FLAG", 0):
+                time.sleep(0.1)
+            else:
+                time.sleep(config.SUMO_SLEEP)
+
+            traci_connection = traci.connect(port, numRetries=100)
+            traci_connection.setOrder(0)
+            traci_connection.simulationStep()
+        except Exception:
+            sumo_proc.kill()
+            raise
+
+        return sumo_proc, traci_connection
 
     def teardown_sumo(self):
         """Kill the sumo subprocess instance."""
@@ -274,10 +432,11 @@ class TraCISimulation(KernelSimulation):
             print("Error during teardown: {}".format(e))
 
     def save_emission(self, run_id=0):
-        """Save any collected emission data to a csv file.
+        """Save any collected emission data to a file.
 
-        If not data was collected, nothing happens. Moreover, any internally
-        stored data by this class is clear whenever data is stored.
+        If not data was collected, nothing happens. The data is streamed to a
+        temporary file while it is collected, which is closed and renamed here.
+        Any data collected afterwards is stored in a new file.
 
         Parameters
         ----------
@@ -287,52 +446,16 @@ class TraCISimulation(KernelSimulation):
         """
         # If there is no stored data, ignore this operation. This is to ensure
         # that data isn't deleted if the operation is called twice.
-        if len(self.stored_data) == 0:
+        if self.emission_writer is None:
             return
 
-        # Get a csv name for the emission file.
-        name = "{}-{}_emission.csv".format(
-            self.master_kernel.network.network.name, run_id
-        )
+        self.emission_writer.close()
+        os.replace(self.emission_writer.path, self._emission_file(run_id))
+        self.emission_writer = None
 
-        # The name of all stored data-points (excluding id and time)
-        stored_ids = [
-            "x",
-            "y",
-            "speed",
-            "headway",
-            "leader_id",
-            "target_accel_with_noise_with_failsafe",
-            "target_accel_no_noise_no_failsafe",
-            "target_accel_with_noise_no_failsafe",
-            "target_accel_no_noise_with_failsafe",
-            "realized_accel",
-            "road_grade",
-            "edge_id",
-            "lane_number",
-            "distance",
-            "relative_position",
-            "follower_id",
-            "leader_rel_speed",
-        ]
-
-        # Update the stored data to push to the csv file.
-        final_data = {"time": [], "id": []}
-        final_data.update({key: [] for key in stored_ids})
-
-        for veh_id in self.stored_data.keys():
-            for t in self.stored_data[veh_id].keys():
-                final_data["time"].append(t)
-                final_data["id"].append(veh_id)
-                for key in stored_ids:
-                    final_data[key].append(self.stored_data[veh_id][t][key])
-
-        with open(os.path.join(self.emission_path, name), "w") as f:
-            print(os.path.join(self.emission_path, name), self.emission_path)
-            writer = csv.writer(f, delimiter=",")
-            writer.writerow(final_data.keys())
-            writer.writerows(zip(*final_data.values()))
-
-        # Clear all memory from the stored data. This is useful if this
-        # function is called in between resets.
-        self.stored_data.clear()
+    def _emission_file(self, run_id):
+        """Return the path to the emission file of a rollout."""
+        name = "{}-{}_emission.{}".format(
+            self.master_kernel.network.network.name, run_id, self.emission_format
+        )
+        return os.path.join(self.emission_path, name)
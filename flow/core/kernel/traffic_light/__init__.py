@@ -3,6 +3,12 @@
 from flow.core.kernel.traffic_light.base import KernelTrafficLight
 from flow.core.kernel.traffic_light.traci import TraCITrafficLight
 from flow.core.kernel.traffic_light.aimsun import AimsunKernelTrafficLight
+from flow.core.kernel.traffic_light.headless import HeadlessTrafficLight
 
 
-__all__ = ["KernelTrafficLight", "TraCITrafficLight", "AimsunKernelTrafficLight"]
+__all__ = [
+    "KernelTrafficLight",
+    "TraCITrafficLight",
+    "AimsunKernelTrafficLight",
+    "HeadlessTrafficLight",
+]
@@ -83,6 +83,15 @@ class KernelTrafficLight(object):
         """
         raise NotImplementedError
 
+    def flush(self):
+        """Send the states set since the last simulation step to the simulator.
+
+        This is called by the simulation kernel before every simulation step,
+        so that kernels may buffer the states set during a step and send them
+        at once. By default, states are sent immediately by set_state.
+        """
+        pass
+
     def get_state(self, node_id):
         """Return the state of the traffic light(s) at the specified node.
 
@@ -0,0 +1,36 @@
+"""Script containing the headless traffic light kernel class."""
+from flow.core.kernel.traffic_light.base import KernelTrafficLight
+
+
+class HeadlessTrafficLight(KernelTrafficLight):
+    """Headless traffic light kernel.
+
+    The networks supported by the headless simulator do not contain any
+    traffic lights, so this kernel is empty.
+    """
+
+    def __init__(self, master_kernel):
+        """See parent class."""
+        KernelTrafficLight.__init__(self, master_kernel)
+
+        self.num_traffic_lights = 0
+
+    def pass_api(self, kernel_api):
+        """See parent class."""
+        self.kernel_api = kernel_api
+
+    def update(self, reset):
+        """See parent class."""
+        pass
+
+    def get_ids(self):
+        """See parent class."""
+        return []
+
+    def set_state(self, node_id, state, link_index="all"):
+        """See parent class."""
+        raise KeyError("No traffic light at node {}.".format(node_id))
+
+    def get_state(self, node_id):
+        """See parent class."""
+        raise KeyError("No traffic light at node {}.".format(node_id))
@@ -8,6 +8,12 @@ class TraCITrafficLight(KernelTrafficLight):
     """Sumo traffic light kernel.
 
     Implements all methods discussed in the base traffic light kernel class.
+
+    The states set by set_state are buffered, and sent to sumo by flush before
+    the next simulation step. Since sumo holds a state once it is set, a state
+    is not sent again if it is both the last state sent for the node and its
+    current state. The state may otherwise have been changed since, e.g. by
+    the traffic light program or by other traci commands.
     """
 
     def __init__(self, master_kernel):
@@ -23,6 +29,8 @@ class TraCITrafficLight(KernelTrafficLight):
 
         self.__tls = dict()  # contains current time step traffic light data
         self.__tls_properties = dict()  # traffic light xml properties
+        self.__pending = dict()  # states to send at the next flush
+        self.__sent = dict()  # last state sent for every node
 
         # names of nodes with traffic lights
         self.__ids = []
@@ -43,6 +51,10 @@ class TraCITrafficLight(KernelTrafficLight):
         # number of traffic light nodes
         self.num_traffic_lights = len(self.__ids)
 
+        # the states of the previous connection do not apply to this one
+        self.__pending.clear()
+        self.__sent.clear()
+
         # subscribe the traffic light signal data
         for node_id in self.__ids:
             self.kernel_api.trafficlight.subscribe(
@@ -51,10 +63,13 @@ class TraCITrafficLight(KernelTrafficLight):
 
     def update(self, reset):
         """See parent class."""
-        tls_obs = {}
-        for tl_id in self.__ids:
-            tls_obs[tl_id] = self.kernel_api.trafficlight.getSubscriptionResults(tl_id)
-        self.__tls = tls_obs.copy()
+        # collect the subscription results of all traffic lights at once
+        self.__tls = dict(self.kernel_api.trafficlight.getAllSubscriptionResults())
+
+        # the states may have been restored by the reset, so the next states
+        # are sent regardless of the previous ones
+        if reset:
+            self.__sent.clear()
 
     def get_ids(self):
         """See parent class."""
@@ -62,16 +77,26 @@ class TraCITrafficLight(KernelTrafficLight):
 
     def set_state(self, node_id, state, link_index="all"):
         """See parent class."""
-        if link_index == "all":
-            # if lights on all lanes are changed
-            self.kernel_api.trafficlight.setRedYellowGreenState(
-                tlsID=node_id, state=state
-            )
-        else:
-            # if lights on a single lane is changed
-            self.kernel_api.trafficlight.setLinkState(
-                tlsID=node_id, tlsLinkIndex=link_index, state=state
-            )
+        if link_index != "all":
+            # if lights on a single lane is changed, the lights on the other
+            # lanes keep their latest state
+            if node_id in self.__pending:
+                current = self.__pending[node_id]
+            else:
+                current = self.get_state(node_id)
+            next_index = link_index + 1
+            state = current[:link_index] + state + current[next_index:]
+
+        self.__pending[node_id] = state
+
+    def flush(self):
+        """See parent class."""
+        for node_id, state in self.__pending.items():
+            current = self.__tls.get(node_id, {}).get(tc.TL_RED_YELLOW_GREEN_STATE)
+            if self.__sent.get(node_id) != state or current != state:
+                self.kernel_api.trafficlight.setRedYellowGreenState(node_id, state)
+                self.__sent[node_id] = state
+        self.__pending.clear()
 
     def get_state(self, node_id):
         """See parent class."""
@@ -3,6 +3,7 @@
 from flow.core.kernel.vehicle.base import KernelVehicle
 from flow.core.kernel.vehicle.traci import TraCIVehicle
 from flow.core.kernel.vehicle.aimsun import AimsunKernelVehicle
+from flow.core.kernel.vehicle.headless import HeadlessVehicle
 
 
-__all__ = ["KernelVehicle", "TraCIVehicle", "AimsunKernelVehicle"]
+__all__ = ["KernelVehicle", "TraCIVehicle", "AimsunKernelVehicle", "HeadlessVehicle"]
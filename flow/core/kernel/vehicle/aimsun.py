@@ -1,8 +1,16 @@
 """Script containing the base vehicle kernel class."""
+
 from flow.core.kernel.vehicle.base import KernelVehicle
+from flow.core.kernel.vehicle.edge_stats import EdgeStatsIndex
+from flow.core.kernel.vehicle.counters import get_rate_counter, get_rate
 import collections
 import numpy as np
-from flow.utils.aimsun.struct import InfVeh
+from flow.utils.aimsun.struct import (
+    InfVeh,
+    LEADER_INFOS,
+    make_bitmap,
+    tracking_fields,
+)
 from flow.controllers.car_following_models import SimCarFollowingController
 from flow.controllers.rlcontroller import RLController
 from flow.controllers.lane_change_controllers import SimLaneChangeController
@@ -14,31 +22,6 @@ WHITE = (255, 255, 255)
 CYAN = (0, 255, 255)
 RED = (255, 0, 0)
 
-# this is used when identifying if a specific object is tracked
-INFOS_ATTR_BY_INDEX = [
-    "CurrentPos",
-    "distance2End",
-    "xCurrentPos",
-    "yCurrentPos",
-    "zCurrentPos",
-    "xCurrentPosBack",
-    "yCurrentPosBack",
-    "zCurrentPosBack",
-    "CurrentSpeed",
-    "TotalDistance",
-    "SectionEntranceT",
-    "CurrentStopTime",
-    "stopped",
-    "idSection",
-    "segment",
-    "numberLane",
-    "idJunction",
-    "idSectionFrom",
-    "idLaneFrom",
-    "idSectionTo",
-    "idLaneTo",
-]
-
 
 class AimsunKernelVehicle(KernelVehicle):
     """Aimsun vehicle kernel.
@@ -72,12 +55,16 @@ class AimsunKernelVehicle(KernelVehicle):
         # list of vehicle ids located in each edge in the network
         self._ids_by_edge = dict()
 
-        # number of vehicles that entered the network for every time-step
-        self._num_departed = []
-        self._departed_ids = []
+        # aggregate statistics of the vehicles on every edge. These are
+        # computed when first requested during a step, and are marked as stale
+        # on every update.
+        self._edge_stats = None
+        self._edge_stats_stale = True
 
-        # number of vehicles to exit the network for every time-step
-        self._num_arrived = []
+        # number of vehicles that entered ("departed") and exited ("arrived")
+        # the network at the last steps
+        self._flow_counts = get_rate_counter(sim_params)
+        self._departed_ids = []
         self._arrived_ids = []
         self._arrived_rl_ids = []
 
@@ -139,6 +126,7 @@ class AimsunKernelVehicle(KernelVehicle):
         self.num_rl_vehicles = 0
 
         self.__vehicles.clear()
+        self._edge_stats = None
         for typ in vehicles.initial:
             for i in range(typ["num_vehicles"]):
                 veh_id = "{}_{}".format(typ["veh_id"], i)
@@ -174,12 +162,7 @@ class AimsunKernelVehicle(KernelVehicle):
             a corresponding bitmap to be used in the
             self.kernel_api.get_vehicle_tracking_info function
         """
-        bitmap = ""
-
-        for attr in INFOS_ATTR_BY_INDEX:
-            bitmap += "1" if attr in infos else "0"
-
-        return bitmap
+        return make_bitmap(infos)
 
     ###########################################################################
     #               Methods for interacting with the simulator                #
@@ -195,6 +178,8 @@ class AimsunKernelVehicle(KernelVehicle):
         #           self.num_type[veh_type], ", total since start:",
         #           self.total_num_type[veh_type])
 
+        self._edge_stats_stale = True
+
         # collect the entered and exited vehicle_ids
         added_vehicles = self.kernel_api.get_entered_ids()
         exited_vehicles = self.kernel_api.get_exited_ids()
@@ -219,18 +204,27 @@ class AimsunKernelVehicle(KernelVehicle):
 
         # start = time.time()
 
-        for veh_id in self.__ids:
-            aimsun_id = self._id_flow2aimsun[veh_id]
-
-            # update the vehicle's tracking information
-            self.__vehicles[veh_id][
-                "tracking_info"
-            ] = self.kernel_api.get_vehicle_tracking_info(
-                aimsun_id, self.tracked_info_bitmap
-            )
-
+        # collect the tracking information and leaders of all tracked vehicles
+        # at once
+        records = self.kernel_api.get_bulk_tracking_info(
+            [self._id_flow2aimsun[veh_id] for veh_id in self.__ids],
+            self.tracked_info_bitmap,
+        )
+        names = records.dtype.names
+        tracked_attrs = [attr for attr, _ in tracking_fields(self.tracked_info_bitmap)]
+
+        # update the tracking information of all vehicles before computing the
+        # headways, so that the leaders' information is that of this step
+        records = [dict(zip(names, record)) for record in records.tolist()]
+        for veh_id, record in zip(self.__ids, records):
+            inf_veh = InfVeh()
+            for attr in tracked_attrs:
+                setattr(inf_veh, attr, record[attr])
+            self.__vehicles[veh_id]["tracking_info"] = inf_veh
+
+        for veh_id, record in zip(self.__ids, records):
             # get the leader, follower, and headway for each tracked vehicle
-            lead_id_aimsun = self.kernel_api.get_vehicle_leader(aimsun_id)
+            lead_id_aimsun = record["leader"]
             if lead_id_aimsun < -1:
                 self.__vehicles[veh_id]["leader"] = None
                 self.__vehicles[veh_id]["headway"] = 1000
@@ -244,29 +238,17 @@ class AimsunKernelVehicle(KernelVehicle):
                     self.__vehicles[veh_id]["leader"] = lead_id
                     self.__vehicles[lead_id]["follower"] = veh_id
                 else:
-                    # TODO can be hardcoded when we won't change it anymore
-                    tracked_info_leader = self.make_bitmap_for_tracking(
-                        {
-                            "CurrentPos",
-                            "distance2End",
-                            "idSection",
-                            "idJunction",
-                            "idSectionFrom",
-                            "idSectionTo",
-                        }
-                    )
-
-                    inf_veh_leader = self.kernel_api.get_vehicle_tracking_info(
-                        lead_id_aimsun, tracked_info_leader, tracked=False
-                    )
-                    leader_length = self.kernel_api.get_vehicle_length(lead_id_aimsun)
+                    # the leader is not tracked by Flow, so its information
+                    # is part of the record of the vehicle
+                    inf_veh_leader = InfVeh()
+                    for attr in LEADER_INFOS:
+                        setattr(inf_veh_leader, attr, record["leader_" + attr])
+                    leader_length = record["leader_length"]
                     self.__vehicles[veh_id]["leader"] = -1
 
                 # FIXME can be simplified
                 if inf_veh.idSection != -1:  # vehicle is in a section
-                    next_section = self.kernel_api.get_next_section(
-                        aimsun_id, inf_veh.idSection
-                    )
+                    next_section = record["next_section"]
                     # leader is in a section
                     if inf_veh_leader.idSection != -1:
                         # veh in section and leader in same section
@@ -434,9 +416,9 @@ class AimsunKernelVehicle(KernelVehicle):
             next_section=next_section,
         )
 
-        self.__vehicles[veh_id][
-            "static_info"
-        ] = self.kernel_api.get_vehicle_static_info(aimsun_id)
+        self.__vehicles[veh_id]["static_info"] = (
+            self.kernel_api.get_vehicle_static_info(aimsun_id)
+        )
         self.__vehicles[veh_id]["tracking_info"] = InfVeh()
 
         # set the Aimsun/Flow vehicle ID converters
@@ -492,12 +474,15 @@ class AimsunKernelVehicle(KernelVehicle):
             veh_id = [veh_id]
             acc = [acc]
 
+        # the speeds of all vehicles are set with a single command
+        aimsun_ids = []
+        speeds = []
         for i, veh_id in enumerate(veh_id):
             if acc[i] is not None:
                 this_vel = self.get_speed(veh_id)
-                next_vel = max(this_vel + acc[i] * self.sim_step, 0)
-                aimsun_id = self._id_flow2aimsun[veh_id]
-                self.kernel_api.set_speed(aimsun_id, next_vel)
+                aimsun_ids.append(self._id_flow2aimsun[veh_id])
+                speeds.append(max(this_vel + acc[i] * self.sim_step, 0))
+        self.kernel_api.set_speeds(aimsun_ids, speeds)
 
     def apply_lane_change(self, veh_id, direction):
         """Apply an instantaneous lane-change to a set of vehicles.
@@ -534,6 +519,9 @@ class AimsunKernelVehicle(KernelVehicle):
                 or 1."
             )
 
+        # the lane changes of all vehicles are applied with a single command
+        aimsun_ids = []
+        target_lanes = []
         for i, veh_id in enumerate(veh_id):
             # check for no lane change
             if direction[i] == 0:
@@ -550,12 +538,14 @@ class AimsunKernelVehicle(KernelVehicle):
 
             # perform the requested lane action action in Aimsun
             if target_lane != this_lane:
-                aimsun_id = self._id_flow2aimsun[veh_id]
-                self.kernel_api.apply_lane_change(aimsun_id, int(target_lane))
+                aimsun_ids.append(self._id_flow2aimsun[veh_id])
+                target_lanes.append(int(target_lane))
 
                 if veh_id in self.get_rl_ids():
                     self.prev_last_lc[veh_id] = self.__vehicles[veh_id]["last_lc"]
 
+        self.kernel_api.apply_lane_changes(aimsun_ids, target_lanes)
+
     def choose_routes(self, veh_id, route_choices):
         """Update the route choice of vehicles in the network.
 
@@ -659,32 +649,56 @@ class AimsunKernelVehicle(KernelVehicle):
         """See parent class."""
         return self.__rl_ids
 
+    def get_routing_ids(self):
+        """See parent class.
+
+        All vehicles with a routing controller are returned.
+        """
+        return [
+            veh_id
+            for veh_id in self.__ids
+            if self.__vehicles[veh_id].get("router") is not None
+        ]
+
     def get_ids_by_edge(self, edges):
         """See parent class."""
         if isinstance(edges, (list, np.ndarray)):
             return sum([self.get_ids_by_edge(edge) for edge in edges], [])
         return [veh for veh in self.__ids if self.get_edge(veh) == edges]
 
+    def get_edge_stats(self, edges, segments=1, by_lane=True):
+        """See parent class."""
+        if self._edge_stats is None:
+            self._edge_stats = EdgeStatsIndex(self.master_kernel.network)
+        if self._edge_stats_stale:
+            veh_ids = self.get_ids()
+            rl_ids = set(self.get_rl_ids())
+            self._edge_stats.update(
+                self.get_edge(veh_ids),
+                self.get_lane(veh_ids),
+                self.get_position(veh_ids),
+                self.get_speed(veh_ids),
+                [veh_id in rl_ids for veh_id in veh_ids],
+            )
+            self._edge_stats_stale = False
+        return self._edge_stats.get(edges, segments, by_lane)
+
     def get_inflow_rate(self, time_span):
         """See parent class."""
-        if len(self._num_departed) == 0:
-            return 0
-        num_inflow = self._num_departed[-int(time_span / self.sim_step) :]
-        return 3600 * sum(num_inflow) / (len(num_inflow) * self.sim_step)
+        return get_rate(self._flow_counts, "departed", time_span, self.sim_step)
 
-    def get_outflow_rate(self, time_span):
-        """See parent class."""
-        if len(self._num_arrived) == 0:
+    def get_outflow_rate(self, time_span, edge=None):
+        """See parent class.
+
+        The outflow of individual edges is not supported by Aimsun yet.
+        """
+        if edge is not None:
             return 0
-        num_outflow = self._num_arrived[-int(time_span / self.sim_step) :]
-        return 3600 * sum(num_outflow) / (len(num_outflow) * self.sim_step)
+        return get_rate(self._flow_counts, "arrived", time_span, self.sim_step)
 
     def get_num_arrived(self):
         """See parent class."""
-        if len(self._num_arrived) > 0:
-            return self._num_arrived[-1]
-        else:
-            return 0
+        return self._flow_counts.last("arrived")
 
     def get_arrived_ids(self):
         """See parent class."""
@@ -871,6 +885,8 @@ class AimsunKernelVehicle(KernelVehicle):
 
     def get_x_by_id(self, veh_id):
         """See parent class."""
+        if isinstance(veh_id, (list, np.ndarray)):
+            return [self.get_x_by_id(veh) for veh in veh_id]
         return self.master_kernel.network.get_x(
             self.get_edge(veh_id), self.get_position(veh_id)
         )
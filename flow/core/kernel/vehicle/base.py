@@ -125,6 +125,71 @@ class KernelVehicle(object, metaclass=ABCMeta):
         """
         pass
 
+    def reinsert(self, veh_ids, edges, pos, speed):
+        """Remove vehicles and add them back on new edges.
+
+        Every vehicle keeps its id, type and lane. Simulator kernels may
+        override this method to perform the removals and insertions in bulk.
+
+        Parameters
+        ----------
+        veh_ids : list of str
+            unique identifiers of the vehicles to be reinserted
+        edges : list of str
+            starting edge of every reinserted vehicle
+        pos : float
+            starting position of the reinserted vehicles
+        speed : float
+            starting speed of the reinserted vehicles
+        """
+        for veh_id, edge in zip(veh_ids, edges):
+            type_id = self.get_type(veh_id)
+            lane = self.get_lane(veh_id)
+            self.remove(veh_id)
+            self.add(
+                veh_id=veh_id,
+                type_id=str(type_id),
+                edge=edge,
+                pos=pos,
+                lane=str(lane),
+                speed=speed,
+            )
+
+    def remove_all(self):
+        """Remove all vehicles from the network and the vehicles kernel.
+
+        This is used when resetting the environment. Simulator kernels may
+        override this method to perform the removals in bulk.
+        """
+        for veh_id in list(self.get_ids()):
+            self.remove(veh_id)
+
+    def add_all(self, veh_ids, states):
+        """Add several vehicles to the network.
+
+        This is used when resetting the environment. Simulator kernels may
+        override this method to perform the insertions in bulk.
+
+        Parameters
+        ----------
+        veh_ids : list of str
+            unique identifiers of the vehicles to be added, in the order in
+            which they are added
+        states : dict < str, tuple >
+            type, starting edge, lane, position and speed of every vehicle to
+            be added (see Env.initial_state)
+        """
+        for veh_id in veh_ids:
+            type_id, edge, lane, pos, speed = states[veh_id]
+            self.add(
+                veh_id=veh_id,
+                type_id=type_id,
+                edge=edge,
+                lane=lane,
+                pos=pos,
+                speed=speed,
+            )
+
     @abstractmethod
     def apply_acceleration(self, veh_id, acc, smooth=True):
         """Apply the acceleration requested by a vehicle in the simulator.
@@ -284,6 +349,16 @@ class KernelVehicle(object, metaclass=ABCMeta):
         """Return the names of all rl-controlled vehicles in the network."""
         pass
 
+    @abstractmethod
+    def get_routing_ids(self):
+        """Return the names of the vehicles whose routes may need updating.
+
+        These are the vehicles with a routing controller, except for vehicles
+        whose controller only acts on the last edge of their route (see
+        BaseRouter.final_edge_only) and that did not just enter this edge.
+        """
+        pass
+
     @abstractmethod
     def get_ids_by_edge(self, edges):
         """Return the names of all vehicles in the specified edge.
@@ -292,19 +367,38 @@ class KernelVehicle(object, metaclass=ABCMeta):
         """
         pass
 
+    @abstractmethod
+    def get_edge_stats(self, edges, segments=1, by_lane=True):
+        """Return aggregate statistics of the vehicles on the specified edges.
+
+        The vehicles on every edge are binned by segment and lane, and the
+        number of vehicles, number of RL vehicles, and sums of their speeds are
+        returned for every bin. The statistics are computed at most once per
+        step for any set of arguments.
+
+        See flow.core.kernel.vehicle.edge_stats.EdgeStatsIndex.get for a
+        description of the arguments and of the returned statistics.
+        """
+        pass
+
     @abstractmethod
     def get_inflow_rate(self, time_span):
         """Return the inflow rate (in veh/hr) of vehicles from the network.
 
-        This value is computed over the specified **time_span** seconds.
+        This value is computed over the specified **time_span** seconds, up to
+        the ``rate_window`` term of the simulation parameters.
         """
         pass
 
     @abstractmethod
-    def get_outflow_rate(self, time_span):
+    def get_outflow_rate(self, time_span, edge=None):
         """Return the outflow rate (in veh/hr) of vehicles from the network.
 
-        This value is computed over the specified **time_span** seconds.
+        This value is computed over the specified **time_span** seconds, up to
+        the ``rate_window`` term of the simulation parameters. If an **edge**
+        is specified, the rate at which vehicles leave this edge is returned
+        instead. Vehicles leaving an edge are only counted from the first time
+        its outflow is requested.
         """
         pass
 
@@ -718,8 +812,8 @@ class KernelVehicle(object, metaclass=ABCMeta):
 
         Parameters
         ----------
-        veh_id : str
-            vehicle identifier
+        veh_id : str or list of str
+            vehicle id, or list of vehicle ids
 
         Returns
         -------
@@ -755,7 +849,11 @@ class KernelVehicle(object, metaclass=ABCMeta):
 
     @abstractmethod
     def update_accel(self, veh_id, accel, noise=True, failsafe=True):
-        """Update stored acceleration of vehicle with veh_id."""
+        """Update stored acceleration of vehicle with veh_id.
+
+        If veh_id is a list, accel is a list of the accelerations of every
+        vehicle in veh_id.
+        """
         pass
 
     @abstractmethod
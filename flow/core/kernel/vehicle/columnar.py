@@ -0,0 +1,245 @@
+"""Script containing the columnar (array-backed) vehicle state store."""
+
+import numpy as np
+
+# fields stored by the columnar store, and the dtype of each column
+FIELDS = {
+    "speed": np.float64,
+    "previous_speed": np.float64,
+    "default_speed": np.float64,
+    "position": np.float64,
+    "lane": np.int32,
+    "edge": np.int32,
+    "headway": np.float64,
+    "length": np.float64,
+    "distance": np.float64,
+    "fuel_consumption": np.float64,
+}
+
+# value assigned to a column when a slot is released or not yet populated
+EMPTY = {
+    "speed": -1001,
+    "previous_speed": 0,
+    "default_speed": -1001,
+    "position": -1001,
+    "lane": -1001,
+    "edge": -1,
+    "headway": -1001,
+    "length": -1001,
+    "distance": -1001,
+    "fuel_consumption": -1001,
+}
+
+
+class ColumnarVehicleState(object):
+    """Array-backed storage of per-vehicle state.
+
+    Every vehicle in the network is assigned a slot, i.e. a row index into a
+    set of NumPy arrays (one array per field, see ``FIELDS``). Slots are
+    recycled when vehicles leave the network, so the arrays only grow when the
+    number of vehicles currently in the network exceeds the capacity of the
+    store. Bulk getters use fancy indexing on these arrays, which avoids
+    calling into Python once per vehicle.
+
+    The columns of all vehicles are written at once with ``assign`` (e.g.
+    from the subscription results of a simulation step), and read with fancy
+    indexing by ``get``, which returns arrays.
+
+    Edges are stored as integer codes. The mapping between edge names and
+    codes is kept by the store and never recycled, so codes remain valid
+    across vehicle arrivals and departures.
+
+    Attributes
+    ----------
+    capacity : int
+        number of slots currently allocated
+    columns : dict <str, np.ndarray>
+        the array of each field, indexed by slot
+    """
+
+    def __init__(self, capacity=64):
+        """Instantiate the store.
+
+        Parameters
+        ----------
+        capacity : int, optional
+            number of slots to allocate initially. The store grows
+            automatically if more vehicles are added.
+        """
+        self.capacity = 0
+        self.columns = {key: np.empty(0, dtype=dtype) for key, dtype in FIELDS.items()}
+        # slot occupied by each vehicle
+        self._slot = {}
+        # vehicle id stored in each slot ("" if free)
+        self._slot_ids = np.empty(0, dtype=object)
+        # slots that have been released and may be reused
+        self._free = []
+        # mapping between edge names and integer codes
+        self._edge_codes = {}
+        self._edge_names = []
+
+        self._grow(capacity)
+
+    def __len__(self):
+        """Return the number of vehicles in the store."""
+        return len(self._slot)
+
+    def __contains__(self, veh_id):
+        """Return True if the vehicle is in the store."""
+        return veh_id in self._slot
+
+    def _grow(self, capacity):
+        """Extend all columns to the specified capacity."""
+        if capacity <= self.capacity:
+            return
+        for key, dtype in FIELDS.items():
+            column = np.full(capacity, EMPTY[key], dtype=dtype)
+            column[: self.capacity] = self.columns[key]
+            self.columns[key] = column
+        slot_ids = np.full(capacity, "", dtype=object)
+        slot_ids[: self.capacity] = self._slot_ids
+        self._slot_ids = slot_ids
+        # pop from the end of the list, so add new slots in decreasing order
+        self._free.extend(range(capacity - 1, self.capacity - 1, -1))
+        self.capacity = capacity
+
+    def add(self, veh_id):
+        """Assign a slot to a vehicle and return it.
+
+        If the vehicle is already in the store, its current slot is returned.
+        """
+        if veh_id in self._slot:
+            return self._slot[veh_id]
+        if len(self._free) == 0:
+            self._grow(max(2 * self.capacity, 1))
+        slot = self._free.pop()
+        self._slot[veh_id] = slot
+        self._slot_ids[slot] = veh_id
+        return slot
+
+    def remove(self, veh_id):
+        """Release the slot of a vehicle, if it is in the store."""
+        slot = self._slot.pop(veh_id, None)
+        if slot is None:
+            return
+        for key in FIELDS:
+            self.columns[key][slot] = EMPTY[key]
+        self._slot_ids[slot] = ""
+        self._free.append(slot)
+
+    def clear(self):
+        """Remove all vehicles from the store."""
+        for veh_id in list(self._slot):
+            self.remove(veh_id)
+
+    def slot(self, veh_id):
+        """Return the slot of a vehicle, or -1 if it is not in the store."""
+        return self._slot.get(veh_id, -1)
+
+    def slots(self, veh_ids):
+        """Return the slots of a list of vehicles as an array.
+
+        Vehicles that are not in the store are assigned a slot of -1.
+        """
+        get = self._slot.get
+        return np.fromiter(
+            (get(veh_id, -1) for veh_id in veh_ids), dtype=np.int64, count=len(veh_ids)
+        )
+
+    def occupied(self):
+        """Return the slots that are currently assigned to a vehicle."""
+        return np.fromiter(self._slot.values(), dtype=np.int64, count=len(self._slot))
+
+    def vehicle_ids(self):
+        """Return the vehicles in the store, in the order of ``occupied``."""
+        return list(self._slot)
+
+    def ids(self, slots):
+        """Return the vehicle ids stored in the specified slots."""
+        return self._slot_ids[slots]
+
+    def edge_code(self, edge):
+        """Return the integer code of an edge, creating one if needed.
+
+        Vehicles that are not on any edge (edge name "") are assigned a code
+        of -1.
+        """
+        if edge == "":
+            return -1
+        code = self._edge_codes.get(edge)
+        if code is None:
+            code = len(self._edge_names)
+            self._edge_codes[edge] = code
+            self._edge_names.append(edge)
+        return code
+
+    def edge_name(self, code, error=""):
+        """Return the name of the edge with the specified integer code."""
+        if code < 0:
+            return error
+        return self._edge_names[code]
+
+    def assign(self, field, slots, values):
+        """Set the value of a field for several vehicles at once.
+
+        Parameters
+        ----------
+        field : str
+            name of the field, see ``FIELDS``
+        slots : np.ndarray
+            slots of the vehicles, see ``occupied``
+        values : array_like
+            value of the field for every vehicle. Edges are specified by name.
+        """
+        if field == "edge":
+            values = np.fromiter(
+                map(self.edge_code, values), dtype=np.int32, count=len(slots)
+            )
+        self.columns[field][slots] = values
+
+    def set(self, field, veh_id, value):
+        """Set the value of a field for a single vehicle."""
+        if field == "edge":
+            value = self.edge_code(value)
+        self.columns[field][self._slot[veh_id]] = value
+
+    def get(self, field, veh_ids, error=-1001):
+        """Return the value of a field for a list of vehicles.
+
+        Parameters
+        ----------
+        field : str
+            name of the field, see ``FIELDS``
+        veh_ids : list of str or np.ndarray
+            vehicle ids
+        error : any, optional
+            value returned for vehicles that are not in the store
+
+        Returns
+        -------
+        np.ndarray
+            the value of the field for every vehicle, in the order of veh_ids
+        """
+        slots = self.slots(veh_ids)
+        values = self.columns[field][slots]
+        missing = slots < 0
+        if missing.any():
+            values = values.astype(np.result_type(values, np.asarray(error)))
+            values[missing] = error
+        return values
+
+    def get_one(self, field, veh_id, error=-1001):
+        """Return the value of a field for a single vehicle."""
+        slot = self._slot.get(veh_id)
+        if slot is None:
+            return error
+        return self.columns[field][slot]
+
+    def get_edges(self, veh_ids, error=""):
+        """Return the edge names of a list of vehicles as an object array."""
+        codes = self.get("edge", veh_ids, error=-1)
+        # the last name is used for code -1 (vehicles not on any edge)
+        names = np.empty(len(self._edge_names) + 1, dtype=object)
+        names[:-1] = self._edge_names
+        names[-1] = error
+        return names[codes]
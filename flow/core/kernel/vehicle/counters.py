@@ -0,0 +1,168 @@
+"""Script containing the rolling counters used to compute flow rates."""
+
+import numpy as np
+
+# default maximum time span (in seconds) over which flow rates are computed
+RATE_WINDOW = 3600
+
+
+class RollingCounter(object):
+    """Rolling per-step counts of any number of named series.
+
+    Every call to ``append`` adds the counts of a new step, e.g. the number of
+    vehicles that entered and exited the network. Only the running totals of
+    the last ``max_steps`` steps are kept, in a ring buffer, so that the sum of
+    any series over the last n steps is the difference of two running totals,
+    and memory does not grow with the horizon:
+
+    >>> counter = RollingCounter(max_steps=3)
+    >>> counter.append({"arrived": 2})
+    >>> counter.append({"arrived": 1, "departed": 4})
+    >>> counter.sum("arrived", 2)
+    3
+
+    Series are added the first time they are counted, and are assumed to have
+    been zero before that.
+
+    Attributes
+    ----------
+    max_steps : int
+        maximum number of steps over which sums can be computed
+    """
+
+    def __init__(self, max_steps):
+        """Instantiate the counter.
+
+        Parameters
+        ----------
+        max_steps : int
+            maximum number of steps over which sums can be computed
+        """
+        self.max_steps = max(int(max_steps), 1)
+        self._rows = {}
+        self._totals = np.zeros((0, self.max_steps + 1), dtype=np.int64)
+        self._steps = 0
+
+    @property
+    def num_steps(self):
+        """Return the number of steps counted since the last clear."""
+        return self._steps
+
+    def append(self, counts):
+        """Add the counts of a new step.
+
+        Parameters
+        ----------
+        counts : dict <hashable, int>
+            count of every series at this step. Series that are not specified
+            have a count of zero.
+        """
+        size = self.max_steps + 1
+        prev = self._steps % size
+        slot = (self._steps + 1) % size
+        self._totals[:, slot] = self._totals[:, prev]
+        for name, count in counts.items():
+            row = self._rows.get(name)
+            if row is None:
+                row = self._rows[name] = len(self._rows)
+                self._totals = np.vstack(
+                    (self._totals, np.zeros((1, size), dtype=np.int64))
+                )
+            self._totals[row, slot] += count
+        self._steps += 1
+
+    def window(self, num_steps):
+        """Return the number of steps that a window actually spans.
+
+        Parameters
+        ----------
+        num_steps : int
+            requested number of steps. If this is not positive, the window
+            spans all available steps.
+
+        Returns
+        -------
+        int
+            the requested number of steps, clipped to the number of steps
+            counted so far and to max_steps
+        """
+        available = min(self._steps, self.max_steps)
+        if num_steps <= 0:
+            return available
+        return min(num_steps, available)
+
+    def sum(self, name, num_steps):
+        """Return the sum of a series over the last steps.
+
+        Parameters
+        ----------
+        name : hashable
+            name of the series
+        num_steps : int
+            number of steps, see ``window``
+
+        Returns
+        -------
+        int
+            sum of the counts of the series over the window
+        """
+        row = self._rows.get(name)
+        if row is None:
+            return 0
+        size = self.max_steps + 1
+        start = (self._steps - self.window(num_steps)) % size
+        totals = self._totals[row]
+        return int(totals[self._steps % size] - totals[start])
+
+    def last(self, name):
+        """Return the count of a series at the last step."""
+        return self.sum(name, 1)
+
+    def clear(self):
+        """Reset the counts of all series, e.g. at the start of a rollout."""
+        self._totals[:] = 0
+        self._steps = 0
+
+
+def get_rate_counter(sim_params):
+    """Return a counter sized for the rate window of the simulation.
+
+    Parameters
+    ----------
+    sim_params : flow.core.params.SimParams
+        simulation-specific parameters. The maximum time span over which rates
+        can be computed is given by the ``rate_window`` term, in seconds.
+
+    Returns
+    -------
+    RollingCounter
+        an empty counter
+    """
+    rate_window = getattr(sim_params, "rate_window", RATE_WINDOW)
+    return RollingCounter(int(np.ceil(rate_window / sim_params.sim_step)))
+
+
+def get_rate(counter, name, time_span, sim_step):
+    """Return the rate of a series, in counts per hour.
+
+    Parameters
+    ----------
+    counter : RollingCounter
+        the counter containing the series
+    name : hashable
+        name of the series
+    time_span : float
+        time span over which the rate is computed, in seconds. If fewer steps
+        have been counted, the rate is computed over all counted steps.
+    sim_step : float
+        seconds per simulation step
+
+    Returns
+    -------
+    float
+        the rate of the series over the time span, or 0 if nothing was counted
+    """
+    num_steps = counter.window(int(time_span / sim_step))
+    if num_steps == 0:
+        return 0
+    return 3600 * counter.sum(name, num_steps) / (num_steps * sim_step)
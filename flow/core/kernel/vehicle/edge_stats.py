@@ -0,0 +1,218 @@
+"""Script containing the per-step aggregate statistics of vehicles by edge."""
+
+import numpy as np
+
+# names of the statistics returned by EdgeStatsIndex.get
+EDGE_STATS = ["count", "speed_sum", "rl_count", "rl_speed_sum"]
+
+
+class EdgeStatsIndex(object):
+    """Aggregate statistics of the vehicles on every edge, lane and segment.
+
+    The vehicles are sorted by edge once per step (see ``update``). The
+    statistics of any set of edges are then computed by binning the vehicles
+    on these edges by (edge, segment, lane) and summing over every bin with
+    ``np.bincount``. The statistics of every query are cached until the next
+    update, so environments and reward functions that request the same
+    statistics during a step share the result.
+
+    Attributes
+    ----------
+    edges : list of str
+        names of all edges and junctions in the network, in the order of their
+        index
+    edge_index : dict <str, int>
+        index of every edge and junction
+    num_lanes : np.ndarray
+        number of lanes on every edge
+    edge_length : np.ndarray
+        length of every edge
+    """
+
+    def __init__(self, network):
+        """Precompute the edge tables of a network.
+
+        Parameters
+        ----------
+        network : flow.core.kernel.network.BaseKernelNetwork
+            the network kernel, after the network has been generated
+        """
+        self.edges = list(network.get_edge_list()) + list(network.get_junction_list())
+        self.edge_index = {edge: i for i, edge in enumerate(self.edges)}
+        self.num_lanes = np.array(
+            [network.num_lanes(edge) for edge in self.edges], dtype=np.int64
+        )
+        self.edge_length = np.array(
+            [network.edge_length(edge) for edge in self.edges], dtype=np.float64
+        )
+
+        self._edge_idx = np.zeros(0, dtype=np.int64)
+        self._lanes = np.zeros(0, dtype=np.int64)
+        self._positions = np.zeros(0)
+        self._speeds = np.zeros(0)
+        self._is_rl = np.zeros(0)
+        self._edge_start = np.zeros(len(self.edges) + 1, dtype=np.int64)
+        self._cache = {}
+
+    def update(self, edges, lanes, positions, speeds, is_rl):
+        """Index the vehicles in the network at the current step.
+
+        Parameters
+        ----------
+        edges : list of str
+            edge of every vehicle ("" if the vehicle is not on any edge)
+        lanes : array_like
+            lane index of every vehicle
+        positions : array_like
+            position of every vehicle on its edge
+        speeds : array_like
+            speed of every vehicle
+        is_rl : array_like
+            whether every vehicle is an RL vehicle
+        """
+        num_veh = len(edges)
+        edge_idx = np.fromiter(
+            (self.edge_index.get(edge, -1) for edge in edges),
+            dtype=np.int64,
+            count=num_veh,
+        )
+
+        # group the vehicles on a known edge by edge. The sort is stable, so
+        # vehicles are kept in their original order within every edge.
+        valid = np.flatnonzero(edge_idx >= 0)
+        order = valid[np.argsort(edge_idx[valid], kind="stable")]
+        self._edge_idx = edge_idx[order]
+        self._lanes = np.asarray(lanes, dtype=np.int64).reshape(num_veh)[order]
+        self._positions = np.asarray(positions, dtype=np.float64).reshape(num_veh)[
+            order
+        ]
+        self._speeds = np.asarray(speeds, dtype=np.float64).reshape(num_veh)[order]
+        self._is_rl = np.asarray(is_rl, dtype=np.float64).reshape(num_veh)[order]
+
+        count = np.bincount(edge_idx[order], minlength=len(self.edges))
+        self._edge_start = np.concatenate(([0], np.cumsum(count)))
+        self._cache.clear()
+
+    def get(self, edges, segments=1, by_lane=True):
+        """Return aggregate statistics of the vehicles on a set of edges.
+
+        Parameters
+        ----------
+        edges : str or list of str
+            edges (or junctions) whose statistics are returned
+        segments : int or array_like or list, optional
+            the segments every edge is split into. This is either the number
+            of segments of equal length, or the boundaries of the segments,
+            e.g. ``np.linspace(0, edge_length, num_segments + 1)``. Vehicles
+            outside of the boundaries are assigned to the closest segment. May
+            also be a list with one such element for every edge. Defaults to a
+            single segment per edge.
+        by_lane : bool, optional
+            whether the segments are further split by lane
+
+        Returns
+        -------
+        dict <str, np.ndarray>
+            the following statistics for every bin, ordered by edge, then
+            segment, then lane (if by_lane is set):
+
+            * count: number of vehicles
+            * speed_sum: sum of the speeds of all vehicles
+            * rl_count: number of RL vehicles
+            * rl_speed_sum: sum of the speeds of all RL vehicles
+
+            The arrays are shared by all calls during the current step, and
+            are therefore read-only.
+        """
+        if isinstance(edges, str):
+            edges = [edges]
+        if not isinstance(segments, list):
+            segments = [segments] * len(edges)
+        key = (
+            tuple(edges),
+            tuple(s if np.isscalar(s) else tuple(s) for s in segments),
+            by_lane,
+        )
+        if key in self._cache:
+            return self._cache[key]
+
+        edge_idx = np.array([self.edge_index[edge] for edge in edges], dtype=np.int64)
+        one_segment = all(np.isscalar(s) and s == 1 for s in segments)
+        if one_segment and len(set(edges)) == len(edges):
+            bins, veh, offset = self._bin_by_edge(edge_idx, by_lane)
+        else:
+            bins, veh, offset = self._bin_by_segment(edge_idx, segments, by_lane)
+
+        speeds = self._speeds[veh]
+        is_rl = self._is_rl[veh]
+        stats = {
+            "count": np.bincount(bins, minlength=offset).astype(np.float64),
+            "speed_sum": np.bincount(bins, weights=speeds, minlength=offset),
+            "rl_count": np.bincount(bins, weights=is_rl, minlength=offset),
+            "rl_speed_sum": np.bincount(bins, weights=speeds * is_rl, minlength=offset),
+        }
+        for value in stats.values():
+            value.flags.writeable = False
+
+        self._cache[key] = stats
+        return stats
+
+    def _bin_by_edge(self, edge_idx, by_lane):
+        """Assign the vehicles on a set of distinct edges to bins, by lane.
+
+        Returns
+        -------
+        np.ndarray
+            bin of every vehicle on the edges
+        np.ndarray
+            index of every vehicle on the edges in the sorted arrays
+        int
+            number of bins
+        """
+        num_bins = self.num_lanes[edge_idx] if by_lane else np.ones(len(edge_idx))
+        num_bins = num_bins.astype(np.int64)
+        offsets = np.cumsum(num_bins) - num_bins
+
+        # position of the edge of every vehicle in edge_idx, or -1
+        position = np.full(len(self.edges), -1, dtype=np.int64)
+        position[edge_idx] = np.arange(len(edge_idx))
+        veh = np.flatnonzero(position[self._edge_idx] >= 0)
+        veh_position = position[self._edge_idx[veh]]
+
+        bins = offsets[veh_position]
+        if by_lane:
+            bins = bins + np.clip(self._lanes[veh], 0, num_bins[veh_position] - 1)
+
+        return bins, veh, int(num_bins.sum())
+
+    def _bin_by_segment(self, edge_idx, segments, by_lane):
+        """Assign the vehicles on a set of edges to bins, by segment and lane.
+
+        See _bin_by_edge for the returned values.
+        """
+        bins = []
+        veh = []
+        offset = 0
+        for i, segment in zip(edge_idx, segments):
+            if np.isscalar(segment):
+                bounds = np.linspace(0, self.edge_length[i], int(segment) + 1)
+            else:
+                bounds = np.asarray(segment, dtype=np.float64)
+            num_segments = len(bounds) - 1
+            num_lanes = self.num_lanes[i] if by_lane else 1
+
+            start, end = self._edge_start[i], self._edge_start[i + 1]
+            seg = np.searchsorted(bounds, self._positions[start:end], side="right") - 1
+            seg = np.clip(seg, 0, num_segments - 1)
+            if by_lane:
+                lane = np.clip(self._lanes[start:end], 0, num_lanes - 1)
+            else:
+                lane = 0
+            bins.append(offset + seg * num_lanes + lane)
+            veh.append(np.arange(start, end))
+            offset += num_segments * num_lanes
+
+        bins = np.concatenate(bins) if bins else np.zeros(0, dtype=np.int64)
+        veh = np.concatenate(veh) if veh else np.zeros(0, dtype=np.int64)
+
+        return bins, veh, offset
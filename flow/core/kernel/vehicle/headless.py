@@ -0,0 +1,822 @@
+"""Script containing the headless vehicle kernel class."""
+import collections
+import warnings
+
+import numpy as np
+
+from flow.core.kernel.vehicle import KernelVehicle
+from flow.core.kernel.vehicle.edge_stats import EdgeStatsIndex
+from flow.core.kernel.vehicle.counters import get_rate_counter, get_rate
+from flow.controllers.car_following_models import SimCarFollowingController
+from flow.controllers.rlcontroller import RLController
+from flow.controllers.lane_change_controllers import SimLaneChangeController
+from flow.core.kernel.simulation.ring_engine import VEHICLE_LENGTH
+
+# colors for vehicles
+WHITE = (255, 255, 255)
+CYAN = (0, 255, 255)
+RED = (255, 0, 0)
+
+
+class HeadlessVehicle(KernelVehicle):
+    """Flow vehicle kernel for the headless simulator.
+
+    The state of all vehicles is read from the arrays of the headless engine
+    (see flow/core/kernel/simulation/ring_engine.py) once per step, and
+    accelerations are applied by requesting speeds from the engine. The
+    getters index these arrays directly, so the state of a list of vehicles
+    is collected with one array operation rather than one call per vehicle.
+    Lane
+    changes and route choices are not simulated, since the supported networks
+    are single-lane closed networks. Fuel consumption is not modeled, and is
+    always zero.
+
+    Extends flow.core.kernel.vehicle.base.KernelVehicle
+    """
+
+    def __init__(self, master_kernel, sim_params):
+        """See parent class."""
+        KernelVehicle.__init__(self, master_kernel, sim_params)
+
+        self.__ids = []  # ids of all vehicles
+        self.__human_ids = []  # ids of human-driven vehicles
+        self.__controlled_ids = []  # ids of flow-controlled vehicles
+        self.__controlled_lc_ids = []  # ids of flow lc-controlled vehicles
+        self.__rl_ids = []  # ids of rl-controlled vehicles
+        self.__observed_ids = []  # ids of the observed vehicles
+
+        # vehicles: Key = Vehicle ID, Value = Dictionary describing the vehicle
+        # Ordered dictionary used to keep neural net inputs in order
+        self.__vehicles = collections.OrderedDict()
+
+        # state of all vehicles at the current time step, copied from the
+        # engine, and the index of every vehicle in these arrays
+        self._index = {}
+        self._obs = {}
+        # indices of the lists of vehicles requested since the last update
+        self._lookups = {}
+        self._time_step = 0
+        self._time_delta = 0
+
+        # total number of vehicles in the network
+        self.num_vehicles = 0
+        # number of rl vehicles in the network
+        self.num_rl_vehicles = 0
+        # number of vehicles  loaded but not departed vehicles
+        self.num_not_departed = 0
+
+        # contains the parameters associated with each type of vehicle
+        self.type_parameters = {}
+
+        # contain the minGap attribute of each type of vehicle
+        self.minGap = {}
+
+        # list of vehicle ids located in each edge in the network
+        self._ids_by_edge = dict()
+
+        # vehicles whose routing controllers are called at the next step
+        self._routing_ids = []
+
+        # aggregate statistics of the vehicles on every edge. These are
+        # computed when first requested during a step, and are marked as stale
+        # on every update.
+        self._edge_stats = None
+        self._edge_stats_stale = True
+
+        # number of vehicles that entered ("departed") and exited ("arrived")
+        # the network, and that exited every tracked edge, at the last steps
+        self._flow_counts = get_rate_counter(sim_params)
+        self._departed_ids = 0
+        self._arrived_ids = 0
+
+        # vehicles on every edge whose outflow is tracked, at the last step
+        self._outflow_edges = dict()
+        self._arrived_rl_ids = []
+
+        self.time_counter = 0
+        self.prev_last_lc = dict()
+
+        # old speeds used to compute accelerations
+        self.previous_speeds = {}
+
+    def initialize(self, vehicles):
+        """Initialize vehicle state information.
+
+        This is responsible for collecting vehicle type information from the
+        VehicleParams object and placing them within the Vehicles kernel.
+
+        Parameters
+        ----------
+        vehicles : flow.core.params.VehicleParams
+            initial vehicle parameter information, including the types of
+            individual vehicles and their initial speeds
+        """
+        self.type_parameters = vehicles.type_parameters
+        self.minGap = vehicles.minGap
+        self.num_vehicles = 0
+        self.num_rl_vehicles = 0
+        self.num_not_departed = 0
+
+        self.__vehicles.clear()
+        self._edge_stats = None
+        for typ in vehicles.initial:
+            for i in range(typ["num_vehicles"]):
+                veh_id = "{}_{}".format(typ["veh_id"], i)
+                self.__vehicles[veh_id] = dict()
+                self.__vehicles[veh_id]["type"] = typ["veh_id"]
+                self.__vehicles[veh_id]["initial_speed"] = typ["initial_speed"]
+                self.num_vehicles += 1
+                if typ["acceleration_controller"][0] == RLController:
+                    self.num_rl_vehicles += 1
+
+    def update(self, reset):
+        """See parent class.
+
+        The state of all vehicles is copied from the engine, and vehicles that
+        were inserted in the last step are introduced to the vehicles class.
+        """
+        self._edge_stats_stale = True
+
+        # copy over the previous speeds
+        if "speed" in self._obs:
+            self.previous_speeds.update(
+                zip(self._index, self.get_speed(list(self._index)))
+            )
+
+        # add entering vehicles into the vehicles class
+        departed_ids = self.kernel_api.departed_ids
+        for veh_id in departed_ids:
+            self._add_departed(veh_id, self.__vehicles[veh_id]["type"])
+
+        if reset:
+            self.time_counter = 0
+
+            # reset all necessary values
+            self.prev_last_lc = dict()
+            for veh_id in self.__rl_ids:
+                self.__vehicles[veh_id]["last_lc"] = -float("inf")
+                self.prev_last_lc[veh_id] = -float("inf")
+            self._flow_counts.clear()
+            self._outflow_edges = dict.fromkeys(self._outflow_edges, set())
+            self._departed_ids = 0
+            self._arrived_ids = 0
+            self._arrived_rl_ids.clear()
+            self.num_not_departed = 0
+        else:
+            self.time_counter += 1
+            flow_counts = {"departed": len(departed_ids), "arrived": 0}
+            self._departed_ids = departed_ids
+            self._arrived_ids = []
+            self._arrived_rl_ids.append([])
+
+        # copy the state of the vehicles from the engine
+        engine = self.kernel_api.engine
+        network = self.master_kernel.network
+        engine_ids = np.array(self.kernel_api.ids, dtype=object)
+        self._index = dict(self.kernel_api.index)
+        self._lookups.clear()
+        self._obs = {
+            "speed": engine.speed[0].copy(),
+            "default_speed": engine.default_speed[0].copy(),
+            "x": engine.pos[0].copy(),
+            "distance": engine.distance[0].copy(),
+            "headway": engine.headway[0].copy(),
+            "max_speed": engine.params["max_speed"].copy(),
+            "lane": np.zeros(len(engine_ids), dtype=int),
+            "fuel": np.zeros(len(engine_ids)),
+        }
+        self._obs["edge"], self._obs["position"] = network.get_edges(self._obs["x"])
+        self._obs["2d_position"], self._obs["angle"] = network.get_2d_position(
+            self._obs["x"]
+        )
+        self._time_step = engine.time * 1000
+        self._time_delta = engine.sim_step * 1000
+
+        self._ids_by_edge = {
+            edge: engine_ids[self._obs["edge"] == edge].tolist()
+            for edge in network.get_edge_list()
+        }
+
+        # update the "leader" and "follower" variables. Single-lane networks,
+        # so the lane leaders and followers are the leaders and followers
+        leaders = engine.leader[0]
+        self._obs["leader"] = engine_ids[leaders]
+        self._obs["follower"] = np.full(len(engine_ids), "", dtype=object)
+        self._obs["follower"][leaders] = engine_ids
+        self._obs["follower_headway"] = np.full(len(engine_ids), 1e3)
+        self._obs["follower_headway"][leaders] = self._obs["headway"]
+
+        # find the vehicles that need to be routed at the next step
+        self._update_routing_ids()
+
+        # count the vehicles that left every tracked edge
+        if not reset:
+            for edge, prev_ids in self._outflow_edges.items():
+                ids = set(self.get_ids_by_edge(edge))
+                flow_counts[("outflow", edge)] = len(prev_ids - ids)
+                self._outflow_edges[edge] = ids
+            self._flow_counts.append(flow_counts)
+
+        # make sure the rl vehicle list is still sorted
+        self.__rl_ids.sort()
+
+    def _update_routing_ids(self):
+        """Find the vehicles whose routes may need to be updated.
+
+        Vehicles whose routing controller only acts on the last edge of their
+        route are only selected when they are on this edge, and their edge or
+        the last edge of their route changed since their route was last set
+        (see choose_routes).
+        """
+        routing_ids = []
+        for veh_id, edge in zip(self.__ids, self.get_edge(self.__ids)):
+            vehicle = self.__vehicles[veh_id]
+            router = vehicle.get("router")
+            if router is None:
+                continue
+            elif not router.final_edge_only:
+                routing_ids.append(veh_id)
+                continue
+
+            route = vehicle.get("route", [])
+            route_end = (edge, route[-1] if len(route) > 0 else None)
+            if vehicle.get("route_end") != route_end:
+                if edge == route_end[1]:
+                    routing_ids.append(veh_id)
+                else:
+                    vehicle["route_end"] = route_end
+
+        self._routing_ids = routing_ids
+
+    def _add_departed(self, veh_id, veh_type):
+        """Add a vehicle that entered the network.
+
+        Parameters
+        ----------
+        veh_id: str
+            name of the vehicle
+        veh_type: str
+            type of vehicle
+        """
+        if veh_type not in self.type_parameters:
+            raise KeyError("Entering vehicle is not a valid type.")
+
+        if veh_id not in self.__ids:
+            self.__ids.append(veh_id)
+
+        car_following_params = self.type_parameters[veh_type]["car_following_params"]
+
+        # specify the acceleration controller class
+        accel_controller = self.type_parameters[veh_type]["acceleration_controller"]
+        self.__vehicles[veh_id]["acc_controller"] = accel_controller[0](
+            veh_id, car_following_params=car_following_params, **accel_controller[1]
+        )
+
+        # specify the lane-changing controller class
+        lc_controller = self.type_parameters[veh_type]["lane_change_controller"]
+        self.__vehicles[veh_id]["lane_changer"] = lc_controller[0](
+            veh_id=veh_id, **lc_controller[1]
+        )
+
+        # specify the routing controller class
+        rt_controller = self.type_parameters[veh_type]["routing_controller"]
+        if rt_controller is not None:
+            self.__vehicles[veh_id]["router"] = rt_controller[0](
+                veh_id=veh_id, router_params=rt_controller[1]
+            )
+        else:
+            self.__vehicles[veh_id]["router"] = None
+
+        # add the vehicle's id to the list of vehicle ids
+        if accel_controller[0] == RLController:
+            if veh_id not in self.__rl_ids:
+                self.__rl_ids.append(veh_id)
+        else:
+            if veh_id not in self.__human_ids:
+                self.__human_ids.append(veh_id)
+                if accel_controller[0] != SimCarFollowingController:
+                    self.__controlled_ids.append(veh_id)
+                if lc_controller[0] != SimLaneChangeController:
+                    self.__controlled_lc_ids.append(veh_id)
+
+        # set the "last_lc" parameter of the vehicle
+        self.__vehicles[veh_id]["last_lc"] = -float("inf")
+
+        # specify the initial speed
+        self.__vehicles[veh_id]["initial_speed"] = self.type_parameters[veh_type][
+            "initial_speed"
+        ]
+
+        # make sure that the order of rl_ids is kept sorted
+        self.__rl_ids.sort()
+        self.num_vehicles = len(self.__ids)
+        self.num_rl_vehicles = len(self.__rl_ids)
+
+    def add(self, veh_id, type_id, edge, pos, lane, speed):
+        """See parent class."""
+        network = self.master_kernel.network
+        params = self.type_parameters[type_id]["car_following_params"]
+        cf_params = params.controller_params
+
+        if veh_id not in self.__vehicles:
+            self.__vehicles[veh_id] = dict()
+        self.__vehicles[veh_id]["type"] = type_id
+        self.__vehicles[veh_id]["length"] = VEHICLE_LENGTH
+        self.__vehicles[veh_id]["route"] = network.rts[edge][0][0]
+
+        self.kernel_api.add(
+            veh_id,
+            network.get_x(edge, pos),
+            speed,
+            length=VEHICLE_LENGTH,
+            accel=cf_params["accel"],
+            decel=cf_params["decel"],
+            tau=cf_params["tau"],
+            min_gap=cf_params["minGap"],
+            max_speed=cf_params["maxSpeed"],
+            speed_mode=int(params.speed_mode),
+        )
+
+    def reset(self):
+        """See parent class."""
+        self.previous_speeds = {}
+
+    def remove(self, veh_id):
+        """See parent class."""
+        self.kernel_api.remove(veh_id)
+        self._index.pop(veh_id, None)
+        self._lookups.clear()
+
+        if veh_id in self.__ids:
+            self.__ids.remove(veh_id)
+
+        # remove from the vehicles kernel
+        if veh_id in self.__vehicles:
+            del self.__vehicles[veh_id]
+
+        # remove it from all other id lists (if it is there)
+        if veh_id in self.__human_ids:
+            self.__human_ids.remove(veh_id)
+            if veh_id in self.__controlled_ids:
+                self.__controlled_ids.remove(veh_id)
+            if veh_id in self.__controlled_lc_ids:
+                self.__controlled_lc_ids.remove(veh_id)
+        elif veh_id in self.__rl_ids:
+            self.__rl_ids.remove(veh_id)
+
+        # modify the number of vehicles and RL vehicles
+        self.num_vehicles = len(self.get_ids())
+        self.num_rl_vehicles = len(self.get_rl_ids())
+
+    def _lookup(self, veh_ids):
+        """Return the index of every vehicle in the state arrays, or -1.
+
+        The same lists of vehicles (e.g. all vehicles, or all controlled
+        vehicles) are usually requested several times per step, so the
+        indices are stored until the next update.
+        """
+        key = tuple(veh_ids)
+        index = self._lookups.get(key)
+        if index is None:
+            get = self._index.get
+            index = np.fromiter(
+                (get(veh_id, -1) for veh_id in key), dtype=int, count=len(key)
+            )
+            self._lookups[key] = index
+        return index
+
+    def _get(self, name, veh_id, error):
+        """Return a state variable of one or several vehicles.
+
+        The values of a list of vehicles are collected from the state arrays
+        with a single indexing operation.
+        """
+        values = self._obs[name]
+        if isinstance(veh_id, (list, np.ndarray)):
+            index = self._lookup(veh_id)
+            found = index >= 0
+            if found.all():
+                return values[index].tolist()
+            result = [error] * len(index)
+            for i, value in zip(np.flatnonzero(found), values[index[found]].tolist()):
+                result[i] = value
+            return result
+        i = self._index.get(veh_id)
+        if i is None:
+            return error
+        value = values[i]
+        return value.item() if isinstance(value, np.generic) else value
+
+    def apply_acceleration(self, veh_ids, acc, smooth=True):
+        """See parent class."""
+        # to handle the case of a single vehicle
+        if isinstance(veh_ids, str):
+            veh_ids = [veh_ids]
+            acc = [acc]
+
+        acc = np.array(acc, dtype=float)
+        index = self._lookup(veh_ids)
+        valid = np.flatnonzero((index >= 0) & ~np.isnan(acc))
+        next_vel = np.maximum(
+            self._obs["speed"][index[valid]] + acc[valid] * self.sim_step, 0
+        )
+        self.kernel_api.set_speeds([veh_ids[i] for i in valid], next_vel)
+
+    def apply_lane_change(self, veh_ids, direction):
+        """See parent class.
+
+        Lane changes are not simulated, since all networks have one lane.
+        """
+        # to hand the case of a single vehicle
+        if isinstance(veh_ids, str):
+            direction = [direction]
+
+        # if any of the directions are not -1, 0, or 1, raise a ValueError
+        if any(d not in [-1, 0, 1] for d in direction):
+            raise ValueError(
+                "Direction values for lane changes may only be: -1, 0, or 1."
+            )
+
+    def choose_routes(self, veh_ids, route_choices):
+        """See parent class.
+
+        The routes are stored, but do not affect the simulation, since all
+        routes in a closed network traverse the same loop.
+        """
+        # to hand the case of a single vehicle
+        if isinstance(veh_ids, str):
+            veh_ids = [veh_ids]
+            route_choices = [route_choices]
+
+        for i, veh_id in enumerate(veh_ids):
+            if route_choices[i] is not None and veh_id in self.__vehicles:
+                route = route_choices[i]
+                self.__vehicles[veh_id]["route"] = route
+                # the vehicle is routed again once it reaches the end of its
+                # new route (see _update_routing_ids)
+                self.__vehicles[veh_id]["route_end"] = (
+                    self.get_edge(veh_id),
+                    route[-1] if len(route) > 0 else None,
+                )
+
+    def set_max_speed(self, veh_id, max_speed):
+        """See parent class."""
+        if veh_id in self.kernel_api.index:
+            i = self.kernel_api.index[veh_id]
+            self.kernel_api.engine.params["max_speed"][i] = max_speed
+
+    def update_vehicle_colors(self):
+        """See parent class.
+
+        The colors of all vehicles are updated as follows:
+        - red: autonomous (rl) vehicles
+        - white: unobserved human-driven vehicles
+        - cyan: observed human-driven vehicles
+        """
+        for veh_id in self.get_rl_ids():
+            self.set_color(veh_id=veh_id, color=RED)
+
+        for veh_id in self.get_human_ids():
+            color = CYAN if veh_id in self.get_observed_ids() else WHITE
+            self.set_color(veh_id=veh_id, color=color)
+
+        # clear the list of observed vehicles
+        for veh_id in self.get_observed_ids():
+            self.remove_observed(veh_id)
+
+    def set_observed(self, veh_id):
+        """See parent class."""
+        if veh_id not in self.__observed_ids:
+            self.__observed_ids.append(veh_id)
+
+    def remove_observed(self, veh_id):
+        """See parent class."""
+        if veh_id in self.__observed_ids:
+            self.__observed_ids.remove(veh_id)
+
+    def get_observed_ids(self):
+        """See parent class."""
+        return self.__observed_ids
+
+    def get_color(self, veh_id):
+        """See parent class."""
+        return self.__vehicles[veh_id].get("color", WHITE)
+
+    def set_color(self, veh_id, color):
+        """See parent class."""
+        self.__vehicles[veh_id]["color"] = color
+
+    def get_orientation(self, veh_id):
+        """See parent class."""
+        i = self._index[veh_id]
+        return self._obs["2d_position"][i].tolist() + [float(self._obs["angle"][i])]
+
+    def get_timestep(self, veh_id):
+        """See parent class."""
+        return self._time_step
+
+    def get_timedelta(self, veh_id):
+        """See parent class."""
+        return self._time_delta
+
+    def get_type(self, veh_id):
+        """Return the type of the vehicle of veh_id."""
+        return self.__vehicles[veh_id]["type"]
+
+    def get_initial_speed(self, veh_id):
+        """Return the initial speed of the vehicle of veh_id."""
+        return self.__vehicles[veh_id]["initial_speed"]
+
+    def get_ids(self):
+        """See parent class."""
+        return self.__ids
+
+    def get_human_ids(self):
+        """See parent class."""
+        return self.__human_ids
+
+    def get_controlled_ids(self):
+        """See parent class."""
+        return self.__controlled_ids
+
+    def get_controlled_lc_ids(self):
+        """See parent class."""
+        return self.__controlled_lc_ids
+
+    def get_rl_ids(self):
+        """See parent class."""
+        return self.__rl_ids
+
+    def get_routing_ids(self):
+        """See parent class."""
+        return self._routing_ids
+
+    def get_ids_by_edge(self, edges):
+        """See parent class."""
+        if isinstance(edges, (list, np.ndarray)):
+            return sum([self.get_ids_by_edge(edge) for edge in edges], [])
+        return self._ids_by_edge.get(edges, [])
+
+    def get_edge_stats(self, edges, segments=1, by_lane=True):
+        """See parent class."""
+        if self._edge_stats is None:
+            self._edge_stats = EdgeStatsIndex(self.master_kernel.network)
+        if self._edge_stats_stale:
+            veh_ids = self.get_ids()
+            rl_ids = set(self.get_rl_ids())
+            self._edge_stats.update(
+                self.get_edge(veh_ids),
+                self.get_lane(veh_ids),
+                self.get_position(veh_ids),
+                self.get_speed(veh_ids),
+                [veh_id in rl_ids for veh_id in veh_ids],
+            )
+            self._edge_stats_stale = False
+        return self._edge_stats.get(edges, segments, by_lane)
+
+    def get_inflow_rate(self, time_span):
+        """See parent class."""
+        return get_rate(self._flow_counts, "departed", time_span, self.sim_step)
+
+    def get_outflow_rate(self, time_span, edge=None):
+        """See parent class."""
+        if edge is None:
+            return get_rate(self._flow_counts, "arrived", time_span, self.sim_step)
+        if edge not in self._outflow_edges:
+            self._outflow_edges[edge] = set(self.get_ids_by_edge(edge))
+        return get_rate(
+            self._flow_counts, ("outflow", edge), time_span, self.sim_step
+        )
+
+    def get_num_arrived(self):
+        """See parent class."""
+        return self._flow_counts.last("arrived")
+
+    def get_arrived_ids(self):
+        """See parent class."""
+        return self._arrived_ids
+
+    def get_arrived_rl_ids(self, k=1):
+        """See parent class."""
+        if len(self._arrived_rl_ids) > 0:
+            arrived = []
+            for arr in self._arrived_rl_ids[-k:]:
+                arrived.extend(arr)
+            return arrived
+        else:
+            return 0
+
+    def get_departed_ids(self):
+        """See parent class."""
+        return self._departed_ids
+
+    def get_num_not_departed(self):
+        """See parent class."""
+        return self.num_not_departed
+
+    def get_fuel_consumption(self, veh_id, error=-1001):
+        """See parent class.
+
+        Fuel consumption is not modeled by the headless simulator.
+        """
+        return self._get("fuel", veh_id, error)
+
+    def get_previous_speed(self, veh_id, error=-1001):
+        """See parent class."""
+        if isinstance(veh_id, (list, np.ndarray)):
+            get = self.previous_speeds.get
+            return [get(vehID, 0) for vehID in veh_id]
+        return self.previous_speeds.get(veh_id, 0)
+
+    def get_speed(self, veh_id, error=-1001):
+        """See parent class."""
+        return self._get("speed", veh_id, error)
+
+    def get_default_speed(self, veh_id, error=-1001):
+        """See parent class."""
+        return self._get("default_speed", veh_id, error)
+
+    def get_position(self, veh_id, error=-1001):
+        """See parent class."""
+        return self._get("position", veh_id, error)
+
+    def get_edge(self, veh_id, error=""):
+        """See parent class."""
+        return self._get("edge", veh_id, error)
+
+    def get_lane(self, veh_id, error=-1001):
+        """See parent class."""
+        return self._get("lane", veh_id, error)
+
+    def get_route(self, veh_id, error=None):
+        """See parent class."""
+        if error is None:
+            error = list()
+        if isinstance(veh_id, (list, np.ndarray)):
+            return [self.get_route(vehID, error) for vehID in veh_id]
+        return self.__vehicles.get(veh_id, {}).get("route", error)
+
+    def get_length(self, veh_id, error=-1001):
+        """See parent class."""
+        if isinstance(veh_id, (list, np.ndarray)):
+            return [self.get_length(vehID, error) for vehID in veh_id]
+        return self.__vehicles.get(veh_id, {}).get("length", error)
+
+    def get_leader(self, veh_id, error=""):
+        """See parent class."""
+        return self._get("leader", veh_id, error)
+
+    def get_follower(self, veh_id, error=""):
+        """See parent class."""
+        return self._get("follower", veh_id, error)
+
+    def get_headway(self, veh_id, error=-1001):
+        """See parent class."""
+        return self._get("headway", veh_id, error)
+
+    def get_last_lc(self, veh_id, error=-1001):
+        """See parent class."""
+        if isinstance(veh_id, (list, np.ndarray)):
+            return [self.get_last_lc(vehID, error) for vehID in veh_id]
+
+        if veh_id not in self.__rl_ids:
+            warnings.warn(
+                'Vehicle {} is not RL vehicle, "last_lc" term set to'
+                " {}.".format(veh_id, error)
+            )
+            return error
+        else:
+            return self.__vehicles.get(veh_id, {}).get("last_lc", error)
+
+    def get_acc_controller(self, veh_id, error=None):
+        """See parent class."""
+        if isinstance(veh_id, (list, np.ndarray)):
+            return [self.get_acc_controller(vehID, error) for vehID in veh_id]
+        return self.__vehicles.get(veh_id, {}).get("acc_controller", error)
+
+    def get_lane_changing_controller(self, veh_id, error=None):
+        """See parent class."""
+        if isinstance(veh_id, (list, np.ndarray)):
+            return [self.get_lane_changing_controller(vehID, error) for vehID in veh_id]
+        return self.__vehicles.get(veh_id, {}).get("lane_changer", error)
+
+    def get_routing_controller(self, veh_id, error=None):
+        """See parent class."""
+        if isinstance(veh_id, (list, np.ndarray)):
+            return [self.get_routing_controller(vehID, error) for vehID in veh_id]
+        return self.__vehicles.get(veh_id, {}).get("router", error)
+
+    def get_lane_headways(self, veh_id, error=None):
+        """See parent class."""
+        if error is None:
+            error = list()
+        if isinstance(veh_id, (list, np.ndarray)):
+            return [self.get_lane_headways(vehID, error) for vehID in veh_id]
+        if veh_id not in self._index:
+            return error
+        return [self._get("headway", veh_id, error)]
+
+    def get_lane_leaders_speed(self, veh_id, error=None):
+        """See parent class."""
+        lane_leaders = self.get_lane_leaders(veh_id)
+        return [self.get_speed(lane_leader) for lane_leader in lane_leaders]
+
+    def get_lane_followers_speed(self, veh_id, error=None):
+        """See parent class."""
+        lane_followers = self.get_lane_followers(veh_id)
+        return [self.get_speed(lane_follower) for lane_follower in lane_followers]
+
+    def get_lane_leaders(self, veh_id, error=None):
+        """See parent class."""
+        if error is None:
+            error = list()
+        if isinstance(veh_id, (list, np.ndarray)):
+            return [self.get_lane_leaders(vehID, error) for vehID in veh_id]
+        if veh_id not in self._index:
+            return error
+        return [self._get("leader", veh_id, error)]
+
+    def get_lane_tailways(self, veh_id, error=None):
+        """See parent class."""
+        if error is None:
+            error = list()
+        if isinstance(veh_id, (list, np.ndarray)):
+            return [self.get_lane_tailways(vehID, error) for vehID in veh_id]
+        if veh_id not in self._index:
+            return error
+        return [self._get("follower_headway", veh_id, error)]
+
+    def get_lane_followers(self, veh_id, error=None):
+        """See parent class."""
+        if error is None:
+            error = list()
+        if isinstance(veh_id, (list, np.ndarray)):
+            return [self.get_lane_followers(vehID, error) for vehID in veh_id]
+        if veh_id not in self._index:
+            return error
+        return [self._get("follower", veh_id, error)]
+
+    def get_x_by_id(self, veh_id):
+        """See parent class."""
+        return self._get("x", veh_id, 0.0)
+
+    def get_max_speed(self, veh_id, error=-1001):
+        """See parent class."""
+        return self._get("max_speed", veh_id, error)
+
+    def get_accel(self, veh_id, noise=True, failsafe=True):
+        """See parent class."""
+        metric_name = "accel"
+        if noise:
+            metric_name += "_with_noise"
+        else:
+            metric_name += "_no_noise"
+        if failsafe:
+            metric_name += "_with_falsafe"
+        else:
+            metric_name += "_no_failsafe"
+
+        if metric_name not in self.__vehicles[veh_id]:
+            self.__vehicles[veh_id][metric_name] = None
+        return self.__vehicles[veh_id][metric_name]
+
+    def update_accel(self, veh_id, accel, noise=True, failsafe=True):
+        """See parent class."""
+        metric_name = "accel"
+        if noise:
+            metric_name += "_with_noise"
+        else:
+            metric_name += "_no_noise"
+        if failsafe:
+            metric_name += "_with_falsafe"
+        else:
+            metric_name += "_no_failsafe"
+
+        if isinstance(veh_id, (list, np.ndarray)):
+            for vehID, acc in zip(veh_id, accel):
+                self.__vehicles[vehID][metric_name] = acc
+        else:
+            self.__vehicles[veh_id][metric_name] = accel
+
+    def get_realized_accel(self, veh_id):
+        """See parent class."""
+        if self.get_distance(veh_id) == 0:
+            return 0
+        return (
+            self.get_speed(veh_id) - self.get_previous_speed(veh_id)
+        ) / self.sim_step
+
+    def get_2d_position(self, veh_id, error=-1001):
+        """See parent class."""
+        i = self._index.get(veh_id)
+        if i is None:
+            return error
+        return tuple(self._obs["2d_position"][i].tolist())
+
+    def get_distance(self, veh_id, error=-1001):
+        """See parent class."""
+        return self._get("distance", veh_id, error)
+
+    def get_road_grade(self, veh_id):
+        """See parent class."""
+        return 0
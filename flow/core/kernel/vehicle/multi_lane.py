@@ -0,0 +1,336 @@
+"""Script containing the vectorized multi-lane leader/follower computation."""
+
+import numpy as np
+
+# headway/tailway assigned to lanes without a leader/follower
+DEFAULT_GAP = 1000
+
+
+class MultiLaneHeadways(object):
+    """Vectorized computation of lane leaders, followers, headways and tailways.
+
+    All vehicles are sorted once per step by (edge, lane, position) with a
+    single ``np.lexsort``. The lane leaders and followers of every lane of
+    every queried vehicle are then located with a vectorized binary search on
+    this ordering. Lanes with no leader (follower) on the current edge are
+    resolved by walking the next (previous) edge tables of all unresolved
+    lanes simultaneously.
+
+    This produces the same outputs as the per-vehicle implementation in
+    ``TraCIVehicle._multi_lane_headways_util``: only the first connection of
+    every edge/lane pair is followed, and the walk stops after at most as many
+    hops as there are edges and junctions in the network.
+
+    Attributes
+    ----------
+    edges : list of str
+        names of all edges and junctions in the network, in the order of their
+        index
+    edge_index : dict <str, int>
+        index of every edge and junction
+    num_lanes : np.ndarray
+        number of lanes on every edge
+    max_lanes : int
+        maximum number of lanes on any edge
+    edge_length : np.ndarray
+        length of every edge
+    next_edge : np.ndarray
+        index of the edge reached from every (edge, lane) pair, or -1
+    next_lane : np.ndarray
+        lane reached from every (edge, lane) pair
+    prev_edge : np.ndarray
+        index of the edge leading to every (edge, lane) pair, or -1
+    prev_lane : np.ndarray
+        lane leading to every (edge, lane) pair
+    """
+
+    def __init__(self, network):
+        """Precompute the edge tables of a network.
+
+        Parameters
+        ----------
+        network : flow.core.kernel.network.BaseKernelNetwork
+            the network kernel, after the network has been generated
+        """
+        self.edges = list(network.get_edge_list()) + list(network.get_junction_list())
+        self.num_non_junctions = len(network.get_edge_list())
+        self.edge_index = {edge: i for i, edge in enumerate(self.edges)}
+        num_edges = len(self.edges)
+
+        self.num_lanes = np.array(
+            [network.num_lanes(edge) for edge in self.edges], dtype=np.int64
+        )
+        self.max_lanes = int(self.num_lanes.max()) if num_edges > 0 else 1
+        self.edge_length = np.array(
+            [network.edge_length(edge) for edge in self.edges], dtype=np.float64
+        )
+
+        shape = (num_edges, self.max_lanes)
+        self.next_edge = np.full(shape, -1, dtype=np.int64)
+        self.next_lane = np.zeros(shape, dtype=np.int64)
+        self.prev_edge = np.full(shape, -1, dtype=np.int64)
+        self.prev_lane = np.zeros(shape, dtype=np.int64)
+        for i, edge in enumerate(self.edges):
+            for lane in range(self.max_lanes):
+                for table_edge, table_lane, conn in (
+                    (self.next_edge, self.next_lane, network.next_edge(edge, lane)),
+                    (self.prev_edge, self.prev_lane, network.prev_edge(edge, lane)),
+                ):
+                    if len(conn) > 0 and conn[0][0] in self.edge_index:
+                        table_edge[i, lane] = self.edge_index[conn[0][0]]
+                        table_lane[i, lane] = conn[0][1]
+
+    def compute(self, veh_ids, edges, lanes, positions, lengths, query_ids):
+        """Compute multi-lane data for a set of vehicles.
+
+        Parameters
+        ----------
+        veh_ids : list of str
+            ids of all vehicles in the network
+        edges : list of str
+            edge of every vehicle ("" if the vehicle is not on any edge)
+        lanes : array_like
+            lane index of every vehicle
+        positions : array_like
+            position of every vehicle on its edge
+        lengths : array_like
+            length of every vehicle
+        query_ids : list of str
+            ids of the vehicles whose lane leaders and followers are needed
+
+        Returns
+        -------
+        dict <str, tuple>
+            Key = id of a queried vehicle on an edge of the network. Element =
+            (headways, tailways, leaders, followers), each a list with one
+            element per lane of the vehicle's current edge
+        dict <str, list of str>
+            Key = edge/junction id. Element = ids of the vehicles on this edge,
+            sorted by lane and then by position. Edges without any vehicles
+            are set to None, and junctions without any vehicles are omitted.
+        """
+        veh_ids = list(veh_ids)
+        num_veh = len(veh_ids)
+        edge_idx = np.fromiter(
+            (self.edge_index.get(edge, -1) for edge in edges),
+            dtype=np.int64,
+            count=num_veh,
+        )
+        lanes = np.asarray(lanes, dtype=np.int64).reshape(num_veh)
+        positions = np.asarray(positions, dtype=np.float64).reshape(num_veh)
+        lengths = np.asarray(lengths, dtype=np.float64).reshape(num_veh)
+
+        # sort all vehicles on a known edge by (edge, lane, position). The
+        # sort is stable, so ties are kept in the order of veh_ids.
+        valid = np.flatnonzero(edge_idx >= 0)
+        order = valid[np.lexsort((positions[valid], lanes[valid], edge_idx[valid]))]
+        sorted_keys = edge_idx[order] * self.max_lanes + lanes[order]
+        sorted_pos = positions[order]
+
+        # first element and number of elements of every (edge, lane) group
+        num_groups = len(self.edges) * self.max_lanes
+        group_count = np.bincount(sorted_keys, minlength=num_groups)
+        group_start = np.concatenate(([0], np.cumsum(group_count)[:-1]))
+
+        ids_by_edge = self._ids_by_edge(veh_ids, order, edge_idx)
+
+        # one query for every lane of every queried vehicle on a known edge
+        index = {veh_id: i for i, veh_id in enumerate(veh_ids)}
+        q_veh = np.array(
+            [index[veh_id] for veh_id in query_ids if veh_id in index],
+            dtype=np.int64,
+        )
+        q_veh = q_veh[edge_idx[q_veh] >= 0]
+        if len(q_veh) == 0:
+            return {}, ids_by_edge
+
+        lanes_per_veh = self.num_lanes[edge_idx[q_veh]]
+        offsets = np.concatenate(([0], np.cumsum(lanes_per_veh)))
+        q_owner = np.repeat(q_veh, lanes_per_veh)
+        q_lane = np.arange(offsets[-1]) - np.repeat(offsets[:-1], lanes_per_veh)
+        q_edge = edge_idx[q_owner]
+        q_pos = positions[q_owner]
+        q_key = q_edge * self.max_lanes + q_lane
+        q_start = group_start[q_key]
+        q_count = group_count[q_key]
+
+        # index of the first vehicle in every queried lane whose position is
+        # not smaller than the position of the queried vehicle
+        q_index = self._bisect_left(sorted_keys, sorted_pos, q_key, q_pos) - q_start
+
+        num_q = len(q_owner)
+        headway = np.full(num_q, DEFAULT_GAP, dtype=np.float64)
+        tailway = np.full(num_q, DEFAULT_GAP, dtype=np.float64)
+        leader = np.full(num_q, -1, dtype=np.int64)
+        follower = np.full(num_q, -1, dtype=np.int64)
+
+        # lane leaders on the current edge
+        same_lane = q_lane == lanes[q_owner]
+        has_leader = (same_lane & (q_index < q_count - 1)) | (
+            ~same_lane & (q_index < q_count)
+        )
+        cand = np.minimum(q_start + q_index, len(order) - 1)
+        cand = cand + (order[cand] == q_owner)
+        cand = np.minimum(cand, len(order) - 1)
+        leader[has_leader] = order[cand[has_leader]]
+        lead = leader[has_leader]
+        headway[has_leader] = positions[lead] - q_pos[has_leader] - lengths[lead]
+
+        # lane followers on the current edge
+        has_follower = q_index > 0
+        follower[has_follower] = order[(q_start + q_index - 1)[has_follower]]
+        follow = follower[has_follower]
+        tailway[has_follower] = (
+            q_pos[has_follower] - positions[follow] - lengths[q_owner[has_follower]]
+        )
+
+        # lane leaders on the next edges
+        search = np.flatnonzero(~has_leader)
+        found, group, add_length = self._walk(
+            search, q_edge, q_lane, group_count, forward=True
+        )
+        lead = order[group_start[group]]
+        leader[found] = lead
+        headway[found] = positions[lead] - q_pos[found] + add_length - lengths[lead]
+
+        # lane followers on the previous edges
+        search = np.flatnonzero(~has_follower)
+        found, group, add_length = self._walk(
+            search, q_edge, q_lane, group_count, forward=False
+        )
+        follow = order[group_start[group] + group_count[group] - 1]
+        follower[found] = follow
+        tailway[found] = (
+            q_pos[found] - positions[follow] + add_length - lengths[q_owner[found]]
+        )
+
+        # split the results by queried vehicle
+        names = np.array(veh_ids + [""], dtype=object)
+        leader_names = names[leader].tolist()
+        follower_names = names[follower].tolist()
+        headway = headway.tolist()
+        tailway = tailway.tolist()
+        results = {}
+        for i, veh in enumerate(q_veh.tolist()):
+            start, end = offsets[i], offsets[i + 1]
+            results[veh_ids[veh]] = (
+                headway[start:end],
+                tailway[start:end],
+                leader_names[start:end],
+                follower_names[start:end],
+            )
+
+        return results, ids_by_edge
+
+    @staticmethod
+    def _bisect_left(sorted_keys, sorted_pos, q_key, q_pos):
+        """Locate queries in a list sorted by (key, position).
+
+        Returns, for every query, the number of sorted elements that are
+        smaller than (q_key, q_pos) in lexicographic order. This is equivalent
+        to calling ``bisect_left`` on every (key, position) group separately,
+        and then adding the start of the group.
+        """
+        num = len(sorted_keys)
+        keys = np.concatenate((sorted_keys, q_key))
+        pos = np.concatenate((sorted_pos, q_pos))
+        # queries are placed before elements with the same key and position
+        is_elem = np.concatenate((np.ones(num, np.int8), np.zeros(len(q_key), np.int8)))
+        combined = np.lexsort((is_elem, pos, keys))
+        rank = np.empty(len(combined), dtype=np.int64)
+        rank[combined] = np.arange(len(combined))
+        # number of queries located before each query in the combined order
+        num_queries_before = np.cumsum(is_elem[combined] == 0) - 1
+        q_rank = rank[num:]
+        return q_rank - num_queries_before[q_rank]
+
+    def _walk(self, search, q_edge, q_lane, group_count, forward):
+        """Search for the first non-empty lane on the next/previous edges.
+
+        Parameters
+        ----------
+        search : np.ndarray
+            indices of the queries to search for
+        q_edge : np.ndarray
+            edge of every query
+        q_lane : np.ndarray
+            lane of every query
+        group_count : np.ndarray
+            number of vehicles in every (edge, lane) group
+        forward : bool
+            whether to follow the next (True) or previous (False) edges
+
+        Returns
+        -------
+        np.ndarray
+            indices of the queries that found a vehicle
+        np.ndarray
+            (edge, lane) group in which each vehicle was found
+        np.ndarray
+            accumulated edge lengths of the queries that found a vehicle
+        """
+        if forward:
+            table_edge, table_lane = self.next_edge, self.next_lane
+        else:
+            table_edge, table_lane = self.prev_edge, self.prev_lane
+
+        active = search
+        edge = q_edge[active]
+        lane = q_lane[active]
+        add_length = np.zeros(len(active))
+
+        found_q, found_group, found_length = [], [], []
+        for _ in range(len(self.edges)):
+            if len(active) == 0:
+                break
+            new_edge = table_edge[edge, lane]
+            moved = new_edge >= 0
+            active, edge, lane = active[moved], edge[moved], lane[moved]
+            add_length, new_edge = add_length[moved], new_edge[moved]
+            lane = table_lane[edge, lane]
+
+            # leaders add the length of the edge they leave, followers the
+            # length of the edge they enter
+            if forward:
+                add_length = add_length + self.edge_length[edge]
+                edge = new_edge
+            else:
+                edge = new_edge
+                add_length = add_length + self.edge_length[edge]
+
+            group = edge * self.max_lanes + lane
+            hit = group_count[group] > 0
+            found_q.append(active[hit])
+            found_group.append(group[hit])
+            found_length.append(add_length[hit])
+            active, edge, lane = active[~hit], edge[~hit], lane[~hit]
+            add_length = add_length[~hit]
+
+        if len(found_q) == 0:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty, np.zeros(0)
+
+        return (
+            np.concatenate(found_q),
+            np.concatenate(found_group),
+            np.concatenate(found_length),
+        )
+
+    def _ids_by_edge(self, veh_ids, order, edge_idx):
+        """Return the ids of the vehicles on every edge.
+
+        Vehicles are sorted by lane and then by position. Edges without any
+        vehicles are set to None, and junctions without any vehicles are
+        omitted.
+        """
+        ids_by_edge = dict.fromkeys(self.edges[: self.num_non_junctions])
+        if len(order) == 0:
+            return ids_by_edge
+        sorted_edges = edge_idx[order]
+        bounds = np.flatnonzero(np.diff(sorted_edges)) + 1
+        starts = np.concatenate(([0], bounds)).tolist()
+        ends = np.concatenate((bounds, [len(order)])).tolist()
+        sorted_ids = [veh_ids[i] for i in order.tolist()]
+        for start, end in zip(starts, ends):
+            ids_by_edge[self.edges[sorted_edges[start]]] = sorted_ids[start:end]
+        return ids_by_edge
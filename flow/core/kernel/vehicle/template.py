@@ -0,0 +1,87 @@
+"""Script containing the template used to restart the vehicles kernel."""
+
+from copy import deepcopy
+
+# keys of the records of VehicleParams.initial read by the vehicles kernels
+INITIAL_KEYS = ["veh_id", "num_vehicles", "initial_speed", "acceleration_controller"]
+
+
+class VehicleTemplate(object):
+    """Compact template of the initial state of a vehicles kernel.
+
+    When the simulation is restarted at the start of a rollout, the vehicles
+    kernel is replaced by a kernel in the state it had before any vehicle
+    entered the network. Instead of deep copying a whole kernel, the template
+    only stores what the kernel is created from:
+
+    * the class of the kernel and the simulation parameters,
+    * the parameters of every vehicle type, including the classes and the
+      parameters of their controllers. Controllers are only instantiated once
+      a vehicle departs, so no controller object is stored,
+    * the number and initial speed of the vehicles of every type.
+
+    The records are copied once, when the template is created, and shared by
+    all restored kernels, which only read them. The template can be passed to
+    the ``initialize`` method of the vehicles kernels in place of a
+    VehicleParams object.
+
+    >>> template = VehicleTemplate(env.k.vehicle, env.sim_params,
+    ...                            env.network.vehicles)
+    >>> env.k.vehicle = template.restore(env.k)
+
+    Attributes
+    ----------
+    vehicles : flow.core.params.VehicleParams
+        the vehicle parameters the template was created from
+    kernel_class : type
+        class of the vehicles kernel
+    sim_params : flow.core.params.SimParams
+        simulation-specific parameters the kernel is created with
+    type_parameters : dict
+        parameters of every vehicle type, see VehicleParams.type_parameters
+    minGap : dict
+        minimum gap of every vehicle type, see VehicleParams.minGap
+    initial : list of dict
+        type, number, initial speed and acceleration controller of the
+        initial vehicles of every type
+    """
+
+    def __init__(self, kernel, sim_params, vehicles):
+        """Instantiate the template.
+
+        Parameters
+        ----------
+        kernel : flow.core.kernel.vehicle.KernelVehicle
+            the vehicles kernel to restore
+        sim_params : flow.core.params.SimParams
+            simulation-specific parameters
+        vehicles : flow.core.params.VehicleParams
+            initial vehicle parameter information, as passed to the
+            ``initialize`` method of the kernel
+        """
+        self.vehicles = vehicles
+        self.kernel_class = type(kernel)
+        self.sim_params = sim_params
+        self.type_parameters = deepcopy(vehicles.type_parameters)
+        self.minGap = dict(vehicles.minGap)
+        self.initial = [
+            {key: typ[key] for key in INITIAL_KEYS} for typ in vehicles.initial
+        ]
+
+    def restore(self, master_kernel):
+        """Return a new vehicles kernel in its initial state.
+
+        Parameters
+        ----------
+        master_kernel : flow.core.kernel.Kernel
+            the higher level kernel of the new vehicles kernel
+
+        Returns
+        -------
+        flow.core.kernel.vehicle.KernelVehicle
+            the new vehicles kernel. The kernel api is passed to it when the
+            simulation is started.
+        """
+        kernel = self.kernel_class(master_kernel, self.sim_params)
+        kernel.initialize(self)
+        return kernel
@@ -2,6 +2,10 @@
 import traceback
 
 from flow.core.kernel.vehicle import KernelVehicle
+from flow.core.kernel.vehicle.columnar import ColumnarVehicleState
+from flow.core.kernel.vehicle.counters import get_rate_counter, get_rate
+from flow.core.kernel.vehicle.edge_stats import EdgeStatsIndex
+from flow.core.kernel.vehicle.multi_lane import MultiLaneHeadways
 import traci.constants as tc
 from traci.exceptions import FatalTraCIError, TraCIException
 import numpy as np
@@ -12,6 +16,8 @@ from flow.controllers.rlcontroller import RLController
 from flow.controllers.lane_change_controllers import SimLaneChangeController
 from bisect import bisect_left
 import itertools
+from itertools import repeat
+from operator import methodcaller
 from copy import deepcopy
 
 # colors for vehicles
@@ -27,6 +33,34 @@ rdelta = 255 / STEPS
 # smoothly go from red to green as the speed increases
 color_bins = [[int(255 - rdelta * i), int(rdelta * i), 0] for i in range(STEPS + 1)]
 
+# variables subscribed to for every vehicle in the network
+SUBSCRIBED_VARIABLES = [
+    tc.VAR_LANE_INDEX,
+    tc.VAR_LANEPOSITION,
+    tc.VAR_ROAD_ID,
+    tc.VAR_SPEED,
+    tc.VAR_EDGES,
+    tc.VAR_POSITION,
+    tc.VAR_ANGLE,
+    tc.VAR_SPEED_WITHOUT_TRACI,
+    tc.VAR_FUELCONSUMPTION,
+    tc.VAR_DISTANCE,
+]
+
+# additional variables collected by the context subscription. These replace
+# the getTypeID and getLength calls issued for every departed vehicle.
+CONTEXT_VARIABLES = SUBSCRIBED_VARIABLES + [tc.VAR_TYPE, tc.VAR_LENGTH]
+
+# range used by the simulation-level context subscription. This domain does
+# not filter by distance, but a range must still be provided.
+CONTEXT_RANGE = 1e9
+
+# valid options for the subscription_mode term in SumoParams
+SUBSCRIPTION_MODES = ["vehicle", "context"]
+
+# conversion from the fuel consumption reported by sumo (ml/s) to gallons/s
+ML_TO_GALLONS = 0.000264172
+
 
 class TraCIVehicle(KernelVehicle):
     """Flow kernel for the TraCI API.
@@ -69,13 +103,23 @@ class TraCIVehicle(KernelVehicle):
         # list of vehicle ids located in each edge in the network
         self._ids_by_edge = dict()
 
-        # number of vehicles that entered the network for every time-step
-        self._num_departed = []
-        self._departed_ids = 0
+        # vehicles whose routing controllers are called at the next step
+        self._routing_ids = []
 
-        # number of vehicles to exit the network for every time-step
-        self._num_arrived = []
+        # aggregate statistics of the vehicles on every edge. These are
+        # computed when first requested during a step, and are marked as stale
+        # on every update.
+        self._edge_stats = None
+        self._edge_stats_stale = True
+
+        # number of vehicles that entered ("departed") and exited ("arrived")
+        # the network, and that exited every tracked edge, at the last steps
+        self._flow_counts = get_rate_counter(sim_params)
+        self._departed_ids = 0
         self._arrived_ids = 0
+
+        # vehicles on every edge whose outflow is tracked, at the last step
+        self._outflow_edges = dict()
         self._arrived_rl_ids = []
 
         # whether or not to automatically color vehicles
@@ -90,6 +134,39 @@ class TraCIVehicle(KernelVehicle):
         # old speeds used to compute accelerations
         self.previous_speeds = {}
 
+        # array-backed copy of the vehicle states, used by the bulk getters
+        # (if requested). All columns are written at once at every update.
+        if getattr(sim_params, "columnar_state", False):
+            self._state = ColumnarVehicleState()
+        else:
+            self._state = None
+
+        # vectorized engine used to compute lane leaders and followers. This
+        # is created once the network is available.
+        self._lane_engine = None
+
+        # method used to collect the state of vehicles from sumo
+        self._subscription_mode = getattr(sim_params, "subscription_mode", "vehicle")
+        if self._subscription_mode not in SUBSCRIPTION_MODES:
+            raise ValueError(
+                "Invalid subscription_mode: {}. Must be one of: {}".format(
+                    self._subscription_mode, SUBSCRIPTION_MODES
+                )
+            )
+
+    def pass_api(self, kernel_api):
+        """See parent class.
+
+        If the "context" subscription mode is used, this also subscribes to the
+        variables of all vehicles in the simulation.
+        """
+        KernelVehicle.pass_api(self, kernel_api)
+
+        if self._subscription_mode == "context":
+            self.kernel_api.simulation.subscribeContext(
+                "", tc.CMD_GET_VEHICLE_VARIABLE, CONTEXT_RANGE, CONTEXT_VARIABLES
+            )
+
     def initialize(self, vehicles):
         """Initialize vehicle state information.
 
@@ -109,6 +186,10 @@ class TraCIVehicle(KernelVehicle):
         self.num_not_departed = 0
 
         self.__vehicles.clear()
+        if self._state is not None:
+            self._state.clear()
+        self._lane_engine = None
+        self._edge_stats = None
         for typ in vehicles.initial:
             for i in range(typ["num_vehicles"]):
                 veh_id = "{}_{}".format(typ["veh_id"], i)
@@ -136,12 +217,27 @@ class TraCIVehicle(KernelVehicle):
             specifies whether the simulator was reset in the last simulation
             step
         """
-        # copy over the previous speeds
+        self._edge_stats_stale = True
 
-        vehicle_obs = {}
+        # copy over the previous speeds
         for veh_id in self.__ids:
             self.previous_speeds[veh_id] = self.get_speed(veh_id)
-            vehicle_obs[veh_id] = self.kernel_api.vehicle.getSubscriptionResults(veh_id)
+
+        if self._subscription_mode == "context":
+            # the variables of all vehicles, and the leaders of all vehicles,
+            # are each collected from a single subscription
+            vehicle_obs = self.kernel_api.simulation.getContextSubscriptionResults("")
+            vehicle_obs = dict(vehicle_obs or {})
+            leaders = self.kernel_api.vehicle.getAllSubscriptionResults()
+            for veh_id in self.__ids:
+                if veh_id in vehicle_obs and veh_id in leaders:
+                    vehicle_obs[veh_id].update(leaders[veh_id])
+        else:
+            vehicle_obs = {}
+            for veh_id in self.__ids:
+                vehicle_obs[veh_id] = self.kernel_api.vehicle.getSubscriptionResults(
+                    veh_id
+                )
         sim_obs = self.kernel_api.simulation.getSubscriptionResults()
 
         arrived_rl_ids = []
@@ -153,22 +249,32 @@ class TraCIVehicle(KernelVehicle):
                 # this is meant to resolve the KeyError bug when there are
                 # collisions
                 vehicle_obs[veh_id] = self.__sumo_obs[veh_id]
-            self.remove(veh_id)
+            if self._subscription_mode == "context":
+                # the vehicle already left the simulation, so there is no need
+                # to check whether it needs to be removed from sumo
+                self._remove_from_kernel(veh_id)
+            else:
+                self.remove(veh_id)
             # remove exiting vehicles from the vehicle subscription if they
             # haven't been removed already
-            if vehicle_obs[veh_id] is None:
+            if vehicle_obs.get(veh_id) is None:
                 vehicle_obs.pop(veh_id, None)
         self._arrived_rl_ids.append(arrived_rl_ids)
 
         # add entering vehicles into the vehicles class
         for veh_id in sim_obs[tc.VAR_DEPARTED_VEHICLES_IDS]:
-            if veh_id in self.get_ids() and vehicle_obs[veh_id] is not None:
+            if veh_id in self.get_ids() and vehicle_obs.get(veh_id) is not None:
                 # this occurs when a vehicle is actively being removed and
                 # placed again in the network to ensure a constant number of
                 # total vehicles (e.g. TrafficLightGridEnv). In this case, the vehicle
                 # is already in the class; its state data just needs to be
                 # updated
                 pass
+            elif vehicle_obs.get(veh_id) and self._subscription_mode == "context":
+                veh_type = vehicle_obs[veh_id][tc.VAR_TYPE]
+                obs = self._add_departed(veh_id, veh_type, vehicle_obs[veh_id])
+                # add the subscription information of the new vehicle
+                vehicle_obs[veh_id] = obs
             else:
                 veh_type = self.kernel_api.vehicle.getTypeID(veh_id)
                 obs = self._add_departed(veh_id, veh_type)
@@ -183,8 +289,8 @@ class TraCIVehicle(KernelVehicle):
             for veh_id in self.__rl_ids:
                 self.__vehicles[veh_id]["last_lc"] = -float("inf")
                 self.prev_last_lc[veh_id] = -float("inf")
-            self._num_departed.clear()
-            self._num_arrived.clear()
+            self._flow_counts.clear()
+            self._outflow_edges = dict.fromkeys(self._outflow_edges, set())
             self._departed_ids = 0
             self._arrived_ids = 0
             self._arrived_rl_ids.clear()
@@ -210,9 +316,11 @@ class TraCIVehicle(KernelVehicle):
                 if vehicle_obs[veh_id][tc.VAR_LANE_INDEX] != prev_lane:
                     self.__vehicles[veh_id]["last_lc"] = self.time_counter
 
-            # updated the list of departed and arrived vehicles
-            self._num_departed.append(sim_obs[tc.VAR_LOADED_VEHICLES_NUMBER])
-            self._num_arrived.append(sim_obs[tc.VAR_ARRIVED_VEHICLES_NUMBER])
+            # updated the number of departed and arrived vehicles
+            flow_counts = {
+                "departed": sim_obs[tc.VAR_LOADED_VEHICLES_NUMBER],
+                "arrived": sim_obs[tc.VAR_ARRIVED_VEHICLES_NUMBER],
+            }
             self._departed_ids = sim_obs[tc.VAR_DEPARTED_VEHICLES_IDS]
             self._arrived_ids = sim_obs[tc.VAR_ARRIVED_VEHICLES_IDS]
 
@@ -259,13 +367,104 @@ class TraCIVehicle(KernelVehicle):
         # update the sumo observations variable
         self.__sumo_obs = vehicle_obs.copy()
 
+        # write the new states to the columnar store (if used)
+        if self._state is not None:
+            self._update_columnar_state(vehicle_obs)
+
         # update the lane leaders data for each vehicle
         self._multi_lane_headways()
 
+        # find the vehicles that need to be routed at the next step
+        self._update_routing_ids()
+
+        # count the vehicles that left every tracked edge
+        if not reset:
+            for edge, prev_ids in self._outflow_edges.items():
+                ids = set(self.get_ids_by_edge(edge))
+                flow_counts[("outflow", edge)] = len(prev_ids - ids)
+                self._outflow_edges[edge] = ids
+            self._flow_counts.append(flow_counts)
+
         # make sure the rl vehicle list is still sorted
         self.__rl_ids.sort()
 
-    def _add_departed(self, veh_id, veh_type):
+    def _update_columnar_state(self, vehicle_obs):
+        """Write the subscription results of all vehicles to the store.
+
+        Every column is extracted from the results with a single pass in C
+        (map and np.fromiter), and written with a single indexed assignment.
+        """
+        veh_ids = self._state.vehicle_ids()
+        slots = self._state.occupied()
+        obs = [vehicle_obs.get(veh_id) or {} for veh_id in veh_ids]
+        vehicles = [self.__vehicles[veh_id] for veh_id in veh_ids]
+
+        def column(values, dtype=np.float64):
+            return np.fromiter(values, dtype=dtype, count=len(veh_ids))
+
+        def sumo_column(var, dtype=np.float64):
+            return column(map(methodcaller("get", var, -1001), obs), dtype)
+
+        assign = self._state.assign
+        assign(
+            "previous_speed",
+            slots,
+            column(map(self.previous_speeds.get, veh_ids, repeat(0))),
+        )
+        assign("speed", slots, sumo_column(tc.VAR_SPEED))
+        assign("default_speed", slots, sumo_column(tc.VAR_SPEED_WITHOUT_TRACI))
+        assign("position", slots, sumo_column(tc.VAR_LANEPOSITION))
+        assign("lane", slots, sumo_column(tc.VAR_LANE_INDEX, np.int32))
+        assign("edge", slots, map(methodcaller("get", tc.VAR_ROAD_ID, ""), obs))
+        assign("distance", slots, sumo_column(tc.VAR_DISTANCE))
+        assign(
+            "fuel_consumption",
+            slots,
+            sumo_column(tc.VAR_FUELCONSUMPTION) * ML_TO_GALLONS,
+        )
+        assign(
+            "headway",
+            slots,
+            column(map(methodcaller("get", "headway", -1001), vehicles)),
+        )
+        assign(
+            "length", slots, column(map(methodcaller("get", "length", -1001), vehicles))
+        )
+
+    def _update_routing_ids(self):
+        """Find the vehicles whose routes may need to be updated.
+
+        Vehicles whose routing controller only acts on the last edge of their
+        route are only selected when they are on this edge, and their edge or
+        the last edge of their route changed since their route was last set
+        (see choose_routes).
+        """
+        routing_ids = []
+        for veh_id in self.__ids:
+            vehicle = self.__vehicles[veh_id]
+            router = vehicle.get("router")
+            if router is None:
+                continue
+            elif not router.final_edge_only:
+                routing_ids.append(veh_id)
+                continue
+
+            route_end = self._route_end(veh_id)
+            if vehicle.get("route_end") != route_end:
+                if route_end[0] == route_end[1]:
+                    routing_ids.append(veh_id)
+                else:
+                    vehicle["route_end"] = route_end
+
+        self._routing_ids = routing_ids
+
+    def _route_end(self, veh_id):
+        """Return the current edge and the last edge of a vehicle's route."""
+        obs = self.__sumo_obs.get(veh_id) or {}
+        route = obs.get(tc.VAR_EDGES, ())
+        return obs.get(tc.VAR_ROAD_ID, ""), route[-1] if len(route) > 0 else None
+
+    def _add_departed(self, veh_id, veh_type, context_obs=None):
         """Add a vehicle that entered the network from an inflow or reset.
 
         Parameters
@@ -274,6 +473,10 @@ class TraCIVehicle(KernelVehicle):
             name of the vehicle
         veh_type: str
             type of vehicle, as specified to sumo
+        context_obs: dict, optional
+            the results of the context subscription for this vehicle. If
+            provided, the vehicle is not subscribed to separately and its
+            initial state is read from these results.
 
         Returns
         -------
@@ -285,6 +488,8 @@ class TraCIVehicle(KernelVehicle):
 
         if veh_id not in self.__ids:
             self.__ids.append(veh_id)
+        if self._state is not None:
+            self._state.add(veh_id)
         if veh_id not in self.__vehicles:
             self.num_vehicles += 1
             self.__vehicles[veh_id] = dict()
@@ -328,25 +533,16 @@ class TraCIVehicle(KernelVehicle):
                     self.__controlled_lc_ids.append(veh_id)
 
         # subscribe the new vehicle
-        self.kernel_api.vehicle.subscribe(
-            veh_id,
-            [
-                tc.VAR_LANE_INDEX,
-                tc.VAR_LANEPOSITION,
-                tc.VAR_ROAD_ID,
-                tc.VAR_SPEED,
-                tc.VAR_EDGES,
-                tc.VAR_POSITION,
-                tc.VAR_ANGLE,
-                tc.VAR_SPEED_WITHOUT_TRACI,
-                tc.VAR_FUELCONSUMPTION,
-                tc.VAR_DISTANCE,
-            ],
-        )
+        if context_obs is None:
+            self.kernel_api.vehicle.subscribe(veh_id, SUBSCRIBED_VARIABLES)
         self.kernel_api.vehicle.subscribeLeader(veh_id, 2000)
 
         # some constant vehicle parameters to the vehicles class
-        self.__vehicles[veh_id]["length"] = self.kernel_api.vehicle.getLength(veh_id)
+        if context_obs is None:
+            length = self.kernel_api.vehicle.getLength(veh_id)
+        else:
+            length = context_obs[tc.VAR_LENGTH]
+        self.__vehicles[veh_id]["length"] = length
 
         # set the "last_lc" parameter of the vehicle
         self.__vehicles[veh_id]["last_lc"] = -float("inf")
@@ -364,6 +560,18 @@ class TraCIVehicle(KernelVehicle):
         lc_mode = self.type_parameters[veh_type]["lane_change_params"].lane_change_mode
         self.kernel_api.vehicle.setLaneChangeMode(veh_id, lc_mode)
 
+        # make sure that the order of rl_ids is kept sorted
+        self.__rl_ids.sort()
+        self.num_rl_vehicles = len(self.__rl_ids)
+
+        if context_obs is not None:
+            # the initial state info is already available. Only the leader
+            # needs to be collected from the new subscription.
+            new_obs = dict(context_obs)
+            new_obs.update(self.kernel_api.vehicle.getSubscriptionResults(veh_id))
+            self.__sumo_obs[veh_id] = new_obs
+            return new_obs
+
         # get initial state info
         self.__sumo_obs[veh_id] = dict()
         self.__sumo_obs[veh_id][tc.VAR_ROAD_ID] = self.kernel_api.vehicle.getRoadID(
@@ -380,10 +588,6 @@ class TraCIVehicle(KernelVehicle):
             tc.VAR_FUELCONSUMPTION
         ] = self.kernel_api.vehicle.getFuelConsumption(veh_id)
 
-        # make sure that the order of rl_ids is kept sorted
-        self.__rl_ids.sort()
-        self.num_rl_vehicles = len(self.__rl_ids)
-
         # get the subscription results from the new vehicle
         new_obs = self.kernel_api.vehicle.getSubscriptionResults(veh_id)
 
@@ -393,6 +597,31 @@ class TraCIVehicle(KernelVehicle):
         """See parent class."""
         self.previous_speeds = {}
 
+    def reload(self):
+        """Re-add all vehicles after the state of sumo was loaded from a file.
+
+        Loading a state replaces all vehicles in sumo and drops their
+        subscriptions. The vehicles currently in the kernel are accordingly
+        removed, and the vehicles in sumo are added to the kernel as if they
+        had just departed. This should be called after the kernel api was
+        passed to the kernel again, in order to renew the subscriptions.
+        """
+        for veh_id in list(self.__ids):
+            self._remove_from_kernel(veh_id)
+
+        if self._subscription_mode == "context":
+            context_obs = self.kernel_api.simulation.getContextSubscriptionResults("")
+            context_obs = dict(context_obs or {})
+        else:
+            context_obs = {}
+
+        for veh_id in self.kernel_api.vehicle.getIDList():
+            if veh_id in context_obs:
+                veh_type = context_obs[veh_id][tc.VAR_TYPE]
+            else:
+                veh_type = self.kernel_api.vehicle.getTypeID(veh_id)
+            self._add_departed(veh_id, veh_type, context_obs.get(veh_id))
+
     def remove(self, veh_id):
         """See parent class."""
         # remove from sumo
@@ -400,6 +629,83 @@ class TraCIVehicle(KernelVehicle):
             self.kernel_api.vehicle.unsubscribe(veh_id)
             self.kernel_api.vehicle.remove(veh_id)
 
+        self._remove_from_kernel(veh_id)
+
+    def reinsert(self, veh_ids, edges, pos, speed):
+        """See parent class.
+
+        The list of vehicles in sumo is only queried once, instead of once
+        per vehicle as in remove.
+        """
+        type_ids = [self.get_type(veh_id) for veh_id in veh_ids]
+        lanes = self.get_lane(veh_ids)
+
+        # remove from sumo
+        sumo_ids = set(self.kernel_api.vehicle.getIDList())
+        for veh_id in veh_ids:
+            if veh_id in sumo_ids:
+                self.kernel_api.vehicle.unsubscribe(veh_id)
+                self.kernel_api.vehicle.remove(veh_id)
+            self._remove_from_kernel(veh_id)
+
+        for veh_id, type_id, edge, lane in zip(veh_ids, type_ids, edges, lanes):
+            self.add(
+                veh_id=veh_id,
+                type_id=str(type_id),
+                edge=edge,
+                pos=pos,
+                lane=str(lane),
+                speed=speed,
+            )
+
+    def remove_all(self):
+        """See parent class.
+
+        The list of vehicles in sumo is only queried once, and the vehicles
+        are removed from all id lists at once. Vehicles that cannot be removed
+        from sumo are reported, but still removed from the kernel.
+        """
+        sumo_ids = self.kernel_api.vehicle.getIDList()
+        for veh_id in sumo_ids:
+            try:
+                self.kernel_api.vehicle.unsubscribe(veh_id)
+                self.kernel_api.vehicle.remove(veh_id)
+            except (FatalTraCIError, TraCIException):
+                print(traceback.format_exc())
+
+        for veh_id in set(sumo_ids) | set(self.__ids):
+            self.__vehicles.pop(veh_id, None)
+            self.__sumo_obs.pop(veh_id, None)
+            if self._state is not None:
+                self._state.remove(veh_id)
+
+        del self.__ids[:]
+        del self.__human_ids[:]
+        del self.__controlled_ids[:]
+        del self.__controlled_lc_ids[:]
+        del self.__rl_ids[:]
+
+        self.num_vehicles = 0
+        self.num_rl_vehicles = 0
+
+    def add_all(self, veh_ids, states):
+        """See parent class.
+
+        Vehicles that cannot be added, e.g. because a vehicle with the same
+        id was not removed from sumo, are removed and added again.
+        """
+        for veh_id in veh_ids:
+            type_id, edge, lane, pos, speed = states[veh_id]
+            try:
+                self.add(veh_id, type_id, edge, pos, lane, speed)
+            except (FatalTraCIError, TraCIException):
+                # if a vehicle was not removed in the first attempt, remove it
+                # now and then reintroduce it
+                self.remove(veh_id)
+                self.add(veh_id, type_id, edge, pos, lane, speed)
+
+    def _remove_from_kernel(self, veh_id):
+        """Remove all traces of a vehicle from the kernel, but not from sumo."""
         if veh_id in self.__ids:
             self.__ids.remove(veh_id)
 
@@ -410,6 +716,9 @@ class TraCIVehicle(KernelVehicle):
         if veh_id in self.__sumo_obs:
             del self.__sumo_obs[veh_id]
 
+        if self._state is not None:
+            self._state.remove(veh_id)
+
         # remove it from all other id lists (if it is there)
         if veh_id in self.__human_ids:
             self.__human_ids.remove(veh_id)
@@ -429,10 +738,14 @@ class TraCIVehicle(KernelVehicle):
     def test_set_speed(self, veh_id, speed):
         """Set the speed of the specified vehicle."""
         self.__sumo_obs[veh_id][tc.VAR_SPEED] = speed
+        if self._state is not None and veh_id in self._state:
+            self._state.set("speed", veh_id, speed)
 
     def test_set_edge(self, veh_id, edge):
         """Set the speed of the specified vehicle."""
         self.__sumo_obs[veh_id][tc.VAR_ROAD_ID] = edge
+        if self._state is not None and veh_id in self._state:
+            self._state.set("edge", veh_id, edge)
 
     def set_follower(self, veh_id, follower):
         """Set the follower of the specified vehicle."""
@@ -441,6 +754,8 @@ class TraCIVehicle(KernelVehicle):
     def set_headway(self, veh_id, headway):
         """Set the headway of the specified vehicle."""
         self.__vehicles[veh_id]["headway"] = headway
+        if self._state is not None and veh_id in self._state:
+            self._state.set("headway", veh_id, headway)
 
     def get_orientation(self, veh_id):
         """See parent class."""
@@ -496,32 +811,51 @@ class TraCIVehicle(KernelVehicle):
         """See parent class."""
         return self.__observed_ids
 
+    def get_routing_ids(self):
+        """See parent class."""
+        return self._routing_ids
+
     def get_ids_by_edge(self, edges):
         """See parent class."""
         if isinstance(edges, (list, np.ndarray)):
             return sum([self.get_ids_by_edge(edge) for edge in edges], [])
         return self._ids_by_edge.get(edges, []) or []
 
+    def get_edge_stats(self, edges, segments=1, by_lane=True):
+        """See parent class."""
+        if self._edge_stats is None:
+            self._edge_stats = EdgeStatsIndex(self.master_kernel.network)
+        if self._edge_stats_stale:
+            veh_ids = self.get_ids()
+            rl_ids = set(self.get_rl_ids())
+            obs = [self.__sumo_obs.get(veh_id) or {} for veh_id in veh_ids]
+            self._edge_stats.update(
+                [o.get(tc.VAR_ROAD_ID, "") for o in obs],
+                [o.get(tc.VAR_LANE_INDEX, -1001) for o in obs],
+                [o.get(tc.VAR_LANEPOSITION, -1001) for o in obs],
+                [o.get(tc.VAR_SPEED, -1001) for o in obs],
+                [veh_id in rl_ids for veh_id in veh_ids],
+            )
+            self._edge_stats_stale = False
+        return self._edge_stats.get(edges, segments, by_lane)
+
     def get_inflow_rate(self, time_span):
         """See parent class."""
-        if len(self._num_departed) == 0:
-            return 0
-        num_inflow = self._num_departed[-int(time_span / self.sim_step) :]
-        return 3600 * sum(num_inflow) / (len(num_inflow) * self.sim_step)
+        return get_rate(self._flow_counts, "departed", time_span, self.sim_step)
 
-    def get_outflow_rate(self, time_span):
+    def get_outflow_rate(self, time_span, edge=None):
         """See parent class."""
-        if len(self._num_arrived) == 0:
-            return 0
-        num_outflow = self._num_arrived[-int(time_span / self.sim_step) :]
-        return 3600 * sum(num_outflow) / (len(num_outflow) * self.sim_step)
+        if edge is None:
+            return get_rate(self._flow_counts, "arrived", time_span, self.sim_step)
+        if edge not in self._outflow_edges:
+            self._outflow_edges[edge] = set(self.get_ids_by_edge(edge))
+        return get_rate(
+            self._flow_counts, ("outflow", edge), time_span, self.sim_step
+        )
 
     def get_num_arrived(self):
         """See parent class."""
-        if len(self._num_arrived) > 0:
-            return self._num_arrived[-1]
-        else:
-            return 0
+        return self._flow_counts.last("arrived")
 
     def get_arrived_ids(self):
         """See parent class."""
@@ -547,47 +881,60 @@ class TraCIVehicle(KernelVehicle):
 
     def get_fuel_consumption(self, veh_id, error=-1001):
         """Return fuel consumption in gallons/s."""
-        ml_to_gallons = 0.000264172
         if isinstance(veh_id, (list, np.ndarray)):
+            if self._state is not None:
+                return self._state.get("fuel_consumption", veh_id, error)
             return [self.get_fuel_consumption(vehID, error) for vehID in veh_id]
         return (
             self.__sumo_obs.get(veh_id, {}).get(tc.VAR_FUELCONSUMPTION, error)
-            * ml_to_gallons
+            * ML_TO_GALLONS
         )
 
     def get_previous_speed(self, veh_id, error=-1001):
         """See parent class."""
         if isinstance(veh_id, (list, np.ndarray)):
+            if self._state is not None:
+                return self._state.get("previous_speed", veh_id, 0)
             return [self.get_previous_speed(vehID, error) for vehID in veh_id]
         return self.previous_speeds.get(veh_id, 0)
 
     def get_speed(self, veh_id, error=-1001):
         """See parent class."""
         if isinstance(veh_id, (list, np.ndarray)):
+            if self._state is not None:
+                return self._state.get("speed", veh_id, error)
             return [self.get_speed(vehID, error) for vehID in veh_id]
         return self.__sumo_obs.get(veh_id, {}).get(tc.VAR_SPEED, error)
 
     def get_default_speed(self, veh_id, error=-1001):
         """See parent class."""
         if isinstance(veh_id, (list, np.ndarray)):
+            if self._state is not None:
+                return self._state.get("default_speed", veh_id, error)
             return [self.get_default_speed(vehID, error) for vehID in veh_id]
         return self.__sumo_obs.get(veh_id, {}).get(tc.VAR_SPEED_WITHOUT_TRACI, error)
 
     def get_position(self, veh_id, error=-1001):
         """See parent class."""
         if isinstance(veh_id, (list, np.ndarray)):
+            if self._state is not None:
+                return self._state.get("position", veh_id, error)
             return [self.get_position(vehID, error) for vehID in veh_id]
         return self.__sumo_obs.get(veh_id, {}).get(tc.VAR_LANEPOSITION, error)
 
     def get_edge(self, veh_id, error=""):
         """See parent class."""
         if isinstance(veh_id, (list, np.ndarray)):
+            if self._state is not None:
+                return self._state.get_edges(veh_id, error)
             return [self.get_edge(vehID, error) for vehID in veh_id]
         return self.__sumo_obs.get(veh_id, {}).get(tc.VAR_ROAD_ID, error)
 
     def get_lane(self, veh_id, error=-1001):
         """See parent class."""
         if isinstance(veh_id, (list, np.ndarray)):
+            if self._state is not None:
+                return self._state.get("lane", veh_id, error)
             return [self.get_lane(vehID, error) for vehID in veh_id]
         return self.__sumo_obs.get(veh_id, {}).get(tc.VAR_LANE_INDEX, error)
 
@@ -602,6 +949,8 @@ class TraCIVehicle(KernelVehicle):
     def get_length(self, veh_id, error=-1001):
         """See parent class."""
         if isinstance(veh_id, (list, np.ndarray)):
+            if self._state is not None:
+                return self._state.get("length", veh_id, error)
             return [self.get_length(vehID, error) for vehID in veh_id]
         return self.__vehicles.get(veh_id, {}).get("length", error)
 
@@ -620,6 +969,8 @@ class TraCIVehicle(KernelVehicle):
     def get_headway(self, veh_id, error=-1001):
         """See parent class."""
         if isinstance(veh_id, (list, np.ndarray)):
+            if self._state is not None:
+                return self._state.get("headway", veh_id, error)
             return [self.get_headway(vehID, error) for vehID in veh_id]
         return self.__vehicles.get(veh_id, {}).get("headway", error)
 
@@ -719,13 +1070,54 @@ class TraCIVehicle(KernelVehicle):
             return [self.get_lane_followers(vehID, error) for vehID in veh_id]
         return self.__vehicles.get(veh_id, {}).get("lane_followers", error)
 
-    def _multi_lane_headways(self):
+    def _multi_lane_headways(self, query_ids=None):
         """Compute multi-lane data for all vehicles.
 
-        This includes the lane leaders/followers/headways/tailways/
-        leader velocity/follower velocity for all
-        vehicles in the network.
+        This includes the lane leaders/followers/headways/tailways for all RL
+        vehicles in the network, as well as the ids of the vehicles on every
+        edge. The computation is vectorized over all vehicles; see
+        flow.core.kernel.vehicle.multi_lane.MultiLaneHeadways.
+
+        Parameters
+        ----------
+        query_ids : list of str, optional
+            vehicles whose lane leaders/followers/headways/tailways should be
+            computed. Defaults to the RL vehicles.
+        """
+        if query_ids is None:
+            query_ids = self.get_rl_ids()
+
+        if self._lane_engine is None:
+            self._lane_engine = MultiLaneHeadways(self.master_kernel.network)
+
+        veh_ids = self.get_ids()
+        obs = [self.__sumo_obs.get(veh_id) or {} for veh_id in veh_ids]
+        results, self._ids_by_edge = self._lane_engine.compute(
+            veh_ids,
+            [o.get(tc.VAR_ROAD_ID, "") for o in obs],
+            [o.get(tc.VAR_LANE_INDEX, -1001) for o in obs],
+            [o.get(tc.VAR_LANEPOSITION, -1001) for o in obs],
+            [self.__vehicles[veh_id].get("length", -1001) for veh_id in veh_ids],
+            query_ids,
+        )
+
+        # add the above values to the vehicles class
+        for veh_id, (headways, tailways, leaders, followers) in results.items():
+            self.set_lane_headways(veh_id, headways)
+            self.set_lane_tailways(veh_id, tailways)
+            self.set_lane_leaders(veh_id, leaders)
+            self.set_lane_followers(veh_id, followers)
+
+    def _multi_lane_headways_python(self, query_ids=None):
+        """Compute multi-lane data for all vehicles, one vehicle at a time.
+
+        This is the reference implementation of ``_multi_lane_headways``. It
+        is no longer used during simulations, but is kept to validate and
+        benchmark the vectorized implementation.
         """
+        if query_ids is None:
+            query_ids = self.get_rl_ids()
+
         edge_list = self.master_kernel.network.get_edge_list()
         junction_list = self.master_kernel.network.get_junction_list()
         tot_list = edge_list + junction_list
@@ -761,7 +1153,7 @@ class TraCIVehicle(KernelVehicle):
                 for lane in range(max_lanes):
                     edge_dict[edge][lane].sort(key=lambda x: x[1])
 
-        for veh_id in self.get_rl_ids():
+        for veh_id in query_ids:
             # collect the lane leaders, followers, headways, and tailways for
             # each vehicle
             edge = self.get_edge(veh_id)
@@ -1044,6 +1436,10 @@ class TraCIVehicle(KernelVehicle):
                 self.kernel_api.vehicle.setRoute(
                     vehID=veh_id, edgeList=route_choices[i]
                 )
+                # the vehicle is routed again once it reaches the end of its
+                # new route (see _update_routing_ids)
+                if veh_id in self.__vehicles:
+                    self.__vehicles[veh_id]["route_end"] = self._route_end(veh_id)
 
     def get_x_by_id(self, veh_id):
         """See parent class."""
@@ -1183,6 +1579,8 @@ class TraCIVehicle(KernelVehicle):
         else:
             metric_name += "_no_failsafe"
 
+        if isinstance(veh_id, (list, np.ndarray)):
+            return [self.__vehicles[veh].get(metric_name) for veh in veh_id]
         if metric_name not in self.__vehicles[veh_id]:
             self.__vehicles[veh_id][metric_name] = None
         return self.__vehicles[veh_id][metric_name]
@@ -1199,10 +1597,19 @@ class TraCIVehicle(KernelVehicle):
         else:
             metric_name += "_no_failsafe"
 
-        self.__vehicles[veh_id][metric_name] = accel
+        if isinstance(veh_id, (list, np.ndarray)):
+            for vehID, acc in zip(veh_id, accel):
+                self.__vehicles[vehID][metric_name] = acc
+        else:
+            self.__vehicles[veh_id][metric_name] = accel
 
     def get_realized_accel(self, veh_id):
         """See parent class."""
+        if isinstance(veh_id, (list, np.ndarray)):
+            speed = np.asarray(self.get_speed(veh_id), dtype=float)
+            prev_speed = np.asarray(self.get_previous_speed(veh_id), dtype=float)
+            distance = np.asarray(self.get_distance(veh_id), dtype=float)
+            return np.where(distance == 0, 0, (speed - prev_speed) / self.sim_step)
         if self.get_distance(veh_id) == 0:
             return 0
         return (
@@ -1211,13 +1618,21 @@ class TraCIVehicle(KernelVehicle):
 
     def get_2d_position(self, veh_id, error=-1001):
         """See parent class."""
+        if isinstance(veh_id, (list, np.ndarray)):
+            return [self.get_2d_position(vehID, error) for vehID in veh_id]
         return self.__sumo_obs.get(veh_id, {}).get(tc.VAR_POSITION, error)
 
     def get_distance(self, veh_id, error=-1001):
         """See parent class."""
+        if isinstance(veh_id, (list, np.ndarray)):
+            if self._state is not None:
+                return self._state.get("distance", veh_id, error)
+            return [self.get_distance(vehID, error) for vehID in veh_id]
         return self.__sumo_obs.get(veh_id, {}).get(tc.VAR_DISTANCE, error)
 
     def get_road_grade(self, veh_id):
         """See parent class."""
         # TODO : Brent
+        if isinstance(veh_id, (list, np.ndarray)):
+            return [0] * len(veh_id)
         return 0
@@ -0,0 +1,131 @@
+"""Script containing the fixed-layout observation builder of environments.
+
+Environments declare the layout of their observations once, as a sequence of
+named fields of fixed shape, e.g. a block of features for every RL vehicle
+followed by features of every edge:
+
+>>> builder = ObservationBuilder()
+>>> builder.add("rl", (num_rl, 4))
+>>> builder.add("edges", (num_edges, 2))
+>>> builder.set_slots(rl_ids)
+
+At every step, ``new`` returns a flat float32 observation, filled with the
+default value of every field, and a view of every field into it. The features
+are written in place, with the slot of every RL vehicle found in a dictionary,
+and the observation is returned by the environment without further copies.
+Since every step uses a new observation, agents may keep references to the
+previous ones:
+
+>>> obs, fields = builder.new()
+>>> fields["rl"][builder.slots[veh_id]] = [x, speed, lane, edge]
+>>> return obs
+"""
+
+import numpy as np
+from gymnasium.spaces.box import Box
+
+
+class ObservationBuilder(object):
+    """Layout of the observations of an environment.
+
+    Attributes
+    ----------
+    size : int
+        total number of elements of an observation
+    fields : dict <str, (int, tuple)>
+        offset and shape of every field, in the order in which they were added
+    slots : dict <str, int>
+        slot (i.e. index along the first axis of the fields) of every vehicle
+        set with set_slots
+    """
+
+    def __init__(self):
+        """Instantiate an empty layout."""
+        self.size = 0
+        self.fields = {}
+        self.slots = {}
+        self._fill = np.zeros(0, dtype=np.float32)
+        self._views = {}
+
+    def add(self, name, shape, fill=0):
+        """Append a field to the layout.
+
+        Parameters
+        ----------
+        name : str
+            name of the field
+        shape : int or tuple of int
+            shape of the field
+        fill : float, optional
+            value of the elements of the field that are not written to
+        """
+        shape = (shape,) if isinstance(shape, (int, np.integer)) else tuple(shape)
+        if name in self.fields:
+            raise ValueError("Field {} was already added.".format(name))
+        size = int(np.prod(shape))
+        self.fields[name] = (self.size, shape)
+        # the reshape is only needed for multi-dimensional fields
+        self._views[name] = (
+            slice(self.size, self.size + size),
+            shape if len(shape) > 1 else None,
+        )
+        self.size += size
+        self._fill = np.concatenate((self._fill, np.full(size, fill, dtype=np.float32)))
+
+    def set_slots(self, ids):
+        """Assign a slot to every vehicle, in the order of the list.
+
+        Parameters
+        ----------
+        ids : list of str
+            ids of the vehicles, e.g. the initial RL vehicles
+        """
+        self.slots = {veh_id: i for i, veh_id in enumerate(ids)}
+
+    def new(self):
+        """Return a new observation and the views of its fields.
+
+        Returns
+        -------
+        np.ndarray
+            flat float32 observation, filled with the fill value of every field
+        dict <str, np.ndarray>
+            view of every field into the observation, with the field's shape
+        """
+        obs = self._fill.copy()
+        return obs, {name: self.view(obs, name) for name in self._views}
+
+    def view(self, obs, name):
+        """Return the view of a field into an observation.
+
+        Parameters
+        ----------
+        obs : np.ndarray
+            flat observation, as returned by new
+        name : str
+            name of the field
+
+        Returns
+        -------
+        np.ndarray
+            view of the field, with the field's shape
+        """
+        index, shape = self._views[name]
+        return obs[index] if shape is None else obs[index].reshape(shape)
+
+    def space(self, low=-float("inf"), high=float("inf")):
+        """Return the observation space matching the layout.
+
+        Parameters
+        ----------
+        low : float, optional
+            lower bound of all elements
+        high : float, optional
+            upper bound of all elements
+
+        Returns
+        -------
+        gymnasium.spaces.Box
+            the observation space
+        """
+        return Box(low=low, high=high, shape=(self.size,), dtype=np.float32)
@@ -396,6 +396,22 @@ class SimParams(object):
         specifies rendering resolution (pixel / meter)
     force_color_update : bool, optional
         whether or not to automatically color vehicles according to their types
+    profile : bool or str, optional
+        specifies whether the phases of every environment step are timed (see
+        flow/core/profiler.py). Must be one of:
+
+        * False (default): no profiling
+        * True: the timings are available through the profiler attribute of
+          the environment
+        * "infos": the timings are also added to the infos returned by every
+          environment step, under the "profile" key
+    rate_window : float, optional
+        maximum time span over which inflow and outflow rates can be computed
+        (in seconds). Only the vehicle counts of this many seconds are kept.
+        Defaults to 3600.
+    save_render_step : int, optional
+        only every save_render_step-th rendered frame is saved when
+        save_render is set to True. Defaults to 1 (all frames).
     """
 
     def __init__(
@@ -409,6 +425,9 @@ class SimParams(object):
         show_radius=False,
         pxpm=2,
         force_color_update=False,
+        profile=False,
+        rate_window=3600,
+        save_render_step=1,
     ):
         """Instantiate SimParams."""
         self.sim_step = sim_step
@@ -420,6 +439,9 @@ class SimParams(object):
         self.pxpm = pxpm
         self.show_radius = show_radius
         self.force_color_update = force_color_update
+        self.profile = profile
+        self.rate_window = rate_window
+        self.save_render_step = save_render_step
 
 
 class AimsunParams(SimParams):
@@ -477,6 +499,15 @@ class AimsunParams(SimParams):
         Aimsun template containing a subnetwork in order to only load
         the objects contained in this subnetwork. If set to None or if the
         specified subnetwork does not exist, the whole network will be loaded.
+    profile : bool or str, optional
+        specifies whether the phases of every environment step are timed, see
+        SimParams
+    rate_window : float, optional
+        time span (in seconds) over which inflow and outflow rates can be
+        computed, see SimParams
+    save_render_step : int, optional
+        only every save_render_step-th rendered frame is saved when
+        save_render is set to True. Defaults to 1 (all frames).
     """
 
     def __init__(
@@ -497,6 +528,9 @@ class AimsunParams(SimParams):
         replication_name="Replication 870",
         centroid_config_name=None,
         subnetwork_name=None,
+        profile=False,
+        rate_window=3600,
+        save_render_step=1,
     ):
         """Instantiate AimsunParams."""
         super(AimsunParams, self).__init__(
@@ -508,6 +542,9 @@ class AimsunParams(SimParams):
             sight_radius,
             show_radius,
             pxpm,
+            profile=profile,
+            rate_window=rate_window,
+            save_render_step=save_render_step,
         )
         self.network_name = network_name
         self.experiment_name = experiment_name
@@ -584,6 +621,53 @@ class SumoParams(SimParams):
         current time step
     use_ballistic: bool, optional
         If true, use a ballistic integration step instead of an euler step
+    columnar_state : bool, optional
+        If true, getters such as ``get_speed`` read the states of lists of
+        vehicles from NumPy arrays indexed by vehicle, instead of querying
+        every vehicle separately. The arrays are written from the subscription
+        results once per step, and the getters then return NumPy arrays
+        instead of lists.
+    subscription_mode : str, optional
+        method used to collect the state of vehicles from sumo at every step.
+        Must be one of:
+
+        * "vehicle" (default): every vehicle is subscribed to separately, and
+          the results are collected with one call per vehicle.
+        * "context": a single simulation-level context subscription collects
+          the state of all vehicles in one call per step.
+
+    reset_mode : str, optional
+        method used to return the vehicles to their initial state when the
+        environment is reset. Must be one of:
+
+        * "add" (default): all vehicles are removed from the network and the
+          initial vehicles are added again, one at a time.
+        * "snapshot": the state of the simulation at the end of the first
+          reset (after any warm-up steps) is saved with sumo's saveState, and
+          all subsequent resets restore it with a single loadState call. Every
+          rollout then starts from the exact same state, and initial
+          positions are not shuffled in between rollouts.
+    num_warm_instances : int, optional
+        number of sumo instances of the same network that are launched and
+        connected to in the background, and used when the simulation is
+        restarted (see restart_instance). The instances are launched with the
+        seeds of the next restarts, and are only used if the network and the
+        simulation parameters did not change in the meantime. Defaults to 0,
+        in which case a new sumo instance is started on every restart.
+    emission_format : str, optional
+        format of the emission files created in emission_path. The emission
+        data is streamed to disk during the simulation. Must be one of "csv"
+        (default), "csv.gz", "parquet", or "arrow" (the last two require
+        pyarrow).
+    profile : bool or str, optional
+        specifies whether the phases of every environment step are timed, see
+        SimParams
+    rate_window : float, optional
+        time span (in seconds) over which inflow and outflow rates can be
+        computed, see SimParams
+    save_render_step : int, optional
+        only every save_render_step-th rendered frame is saved when
+        save_render is set to True. Defaults to 1 (all frames).
     """
 
     def __init__(
@@ -607,6 +691,14 @@ class SumoParams(SimParams):
         num_clients=1,
         color_by_speed=False,
         use_ballistic=False,
+        columnar_state=False,
+        subscription_mode="vehicle",
+        reset_mode="add",
+        num_warm_instances=0,
+        emission_format="csv",
+        profile=False,
+        rate_window=3600,
+        save_render_step=1,
     ):
         """Instantiate SumoParams."""
         super(SumoParams, self).__init__(
@@ -619,6 +711,9 @@ class SumoParams(SimParams):
             show_radius,
             pxpm,
             force_color_update,
+            profile,
+            rate_window,
+            save_render_step,
         )
         self.port = port
         self.lateral_resolution = lateral_resolution
@@ -630,6 +725,11 @@ class SumoParams(SimParams):
         self.num_clients = num_clients
         self.color_by_speed = color_by_speed
         self.use_ballistic = use_ballistic
+        self.columnar_state = columnar_state
+        self.subscription_mode = subscription_mode
+        self.reset_mode = reset_mode
+        self.num_warm_instances = num_warm_instances
+        self.emission_format = emission_format
 
 
 class EnvParams:
@@ -663,6 +763,12 @@ class EnvParams:
         specifies whether to clip actions from the policy by their range when
         they are inputted to the reward function. Note that the actions are
         still clipped before they are provided to `apply_rl_actions`.
+    batch_controllers : bool, optional
+        specifies whether the actions of the acceleration controllers of
+        human-driven vehicles are computed in batches, grouping vehicles by
+        controller class and parameters (see
+        flow.controllers.base_controller.get_batch_actions). Otherwise, the
+        get_action method of every controller is called separately.
     """
 
     def __init__(
@@ -673,6 +779,7 @@ class EnvParams:
         sims_per_step=1,
         evaluate=False,
         clip_actions=True,
+        batch_controllers=False,
     ):
         """Instantiate EnvParams."""
         self.additional_params = (
@@ -683,6 +790,7 @@ class EnvParams:
         self.sims_per_step = sims_per_step
         self.evaluate = evaluate
         self.clip_actions = clip_actions
+        self.batch_controllers = batch_controllers
 
     def get_additional_param(self, key):
         """Return a variable from additional_params."""
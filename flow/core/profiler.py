@@ -0,0 +1,282 @@
+"""Script containing the profiler of the steps of Flow environments.
+
+The profiler times every phase of an environment step separately, e.g. the
+computation of the accelerations of the controllers, the simulation step in
+the simulator, or the update of the vehicle kernel. Resets of the environment
+are timed as well (see RESET_PHASES). This is enabled with the
+``profile`` term in SimParams:
+
+>>> from flow.core.params import SumoParams
+>>> sim_params = SumoParams(profile=True)
+
+The timings are then available through the profiler of the environment:
+
+>>> env.profiler.summary()["simulation_step"]["mean"]
+
+When profiling is disabled, the environment uses a profiler whose methods do
+nothing, so that instrumented code does not need to check whether profiling is
+enabled.
+"""
+
+import time
+
+import numpy as np
+
+# phases of an environment step timed by the profiler, in the order in which
+# they are performed
+STEP_PHASES = [
+    "controllers",
+    "lane_change",
+    "routing",
+    "apply_rl_actions",
+    "additional_command",
+    "simulation_step",
+    "update_vehicle",
+    "update_traffic_light",
+    "update_network",
+    "update_simulation",
+    "get_state",
+    "compute_reward",
+]
+
+# phases of an environment reset timed by the profiler. "reset" is the total
+# time spent in Env.reset (excluding warm-up steps), which includes the time
+# spent restarting the simulator and removing and adding back the vehicles.
+RESET_PHASES = [
+    "restart_simulation",
+    "reset_vehicles",
+    "reset",
+]
+
+# valid options for the profile term in SimParams
+PROFILE_MODES = [False, True, "infos"]
+
+# default number of timings kept for every phase
+WINDOW = 1000
+
+
+class StepProfiler(object):
+    """Rolling timings of the phases of environment steps.
+
+    Every phase is timed with a pair of calls to ``tic`` and ``toc``:
+
+    >>> t = profiler.tic()
+    >>> env.k.simulation.simulation_step()
+    >>> t = profiler.toc("simulation_step", t)
+
+    Since ``toc`` returns the current time, consecutive phases can be timed
+    with a single call each. The last ``window`` timings of every phase are
+    kept in a ring buffer, from which histograms and summary statistics are
+    computed. The timings of the phases of the current environment step (see
+    ``start_step``) are also available through ``last_step``.
+
+    Attributes
+    ----------
+    enabled : bool
+        whether timings are recorded
+    window : int
+        number of timings kept for every phase
+    """
+
+    enabled = True
+
+    def __init__(self, window=WINDOW):
+        """Instantiate the profiler.
+
+        Parameters
+        ----------
+        window : int, optional
+            number of timings kept for every phase
+        """
+        self.window = window
+        self._times = {}
+        self._count = {}
+        self._step = {}
+
+    def tic(self):
+        """Return the current time, in seconds."""
+        return time.perf_counter()
+
+    def toc(self, phase, start):
+        """Record the time elapsed since the start of a phase.
+
+        Parameters
+        ----------
+        phase : str
+            name of the phase, e.g. one of STEP_PHASES
+        start : float
+            time at the start of the phase, as returned by tic or toc
+
+        Returns
+        -------
+        float
+            the current time, in seconds
+        """
+        now = time.perf_counter()
+        self.record(phase, now - start)
+        return now
+
+    def record(self, phase, duration):
+        """Record the duration of a phase.
+
+        Parameters
+        ----------
+        phase : str
+            name of the phase
+        duration : float
+            duration of the phase, in seconds
+        """
+        if phase not in self._times:
+            self._times[phase] = np.zeros(self.window)
+            self._count[phase] = 0
+        self._times[phase][self._count[phase] % self.window] = duration
+        self._count[phase] += 1
+        self._step[phase] = self._step.get(phase, 0.0) + duration
+
+    def start_step(self):
+        """Start a new environment step.
+
+        The timings returned by ``last_step`` are cleared.
+        """
+        self._step = {}
+
+    def last_step(self):
+        """Return the total time spent in every phase in the current step.
+
+        Returns
+        -------
+        dict <str, float>
+            time spent in every phase since the last call to start_step, in
+            seconds. Phases that were not performed are omitted.
+        """
+        return dict(self._step)
+
+    def get_times(self, phase):
+        """Return the last timings of a phase, from oldest to newest.
+
+        Parameters
+        ----------
+        phase : str
+            name of the phase
+
+        Returns
+        -------
+        np.ndarray
+            up to the last ``window`` durations of the phase, in seconds
+        """
+        if phase not in self._times:
+            return np.zeros(0)
+        count = self._count[phase]
+        if count <= self.window:
+            return self._times[phase][:count].copy()
+        return np.roll(self._times[phase], -(count % self.window))
+
+    def histogram(self, phase, bins=20):
+        """Return the histogram of the last timings of a phase.
+
+        Parameters
+        ----------
+        phase : str
+            name of the phase
+        bins : int or array_like, optional
+            number of bins, or bin edges (see numpy.histogram)
+
+        Returns
+        -------
+        np.ndarray
+            number of timings in every bin
+        np.ndarray
+            edges of the bins, in seconds
+        """
+        return np.histogram(self.get_times(phase), bins=bins)
+
+    def summary(self):
+        """Return summary statistics of the last timings of every phase.
+
+        Returns
+        -------
+        dict <str, dict>
+            for every recorded phase, in the order of STEP_PHASES and
+            RESET_PHASES (followed by any other phase), the following
+            statistics of the last ``window`` timings, in seconds:
+
+            * count: total number of timings recorded
+            * mean: mean duration
+            * p50: median duration
+            * p95: 95th percentile of the duration
+            * max: maximum duration
+        """
+        phases = [p for p in STEP_PHASES + RESET_PHASES if p in self._times]
+        phases += [p for p in self._times if p not in phases]
+
+        summary = {}
+        for phase in phases:
+            times = self.get_times(phase)
+            summary[phase] = {
+                "count": self._count[phase],
+                "mean": float(np.mean(times)),
+                "p50": float(np.percentile(times, 50)),
+                "p95": float(np.percentile(times, 95)),
+                "max": float(np.max(times)),
+            }
+        return summary
+
+    def reset(self):
+        """Clear all recorded timings."""
+        self._times = {}
+        self._count = {}
+        self._step = {}
+
+
+class NullProfiler(StepProfiler):
+    """Profiler used when profiling is disabled.
+
+    All methods do as little as possible, and no timing is recorded.
+    """
+
+    enabled = False
+
+    def tic(self):
+        """See parent class."""
+        return 0.0
+
+    def toc(self, phase, start):
+        """See parent class."""
+        return 0.0
+
+    def record(self, phase, duration):
+        """See parent class."""
+        pass
+
+    def start_step(self):
+        """See parent class."""
+        pass
+
+
+def get_profiler(sim_params):
+    """Return the profiler matching the simulation parameters.
+
+    Parameters
+    ----------
+    sim_params : flow.core.params.SimParams
+        simulation-specific parameters
+
+    Returns
+    -------
+    StepProfiler
+        a StepProfiler if profiling is enabled, and a NullProfiler otherwise
+
+    Raises
+    ------
+    ValueError
+        if the profile term of sim_params is not valid
+    """
+    profile = getattr(sim_params, "profile", False)
+    # the types are compared as well, since 0 == False and 1 == True
+    if not any(
+        type(profile) is type(mode) and profile == mode for mode in PROFILE_MODES
+    ):
+        raise ValueError(
+            "Invalid profile: {}. Must be one of: {}".format(profile, PROFILE_MODES)
+        )
+    return StepProfiler() if profile else NullProfiler()
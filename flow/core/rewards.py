@@ -1,16 +1,16 @@
 """A series of reward functions."""
 
+from functools import cached_property
+
 import numpy as np
 
 
-def local_desired_velocity(env, veh_ids, fail=False):
-    """
-    Encourage proximity to a desired velocity.
-    We only observe the velocity of the specified car.
-    If a collison or failure occurs, we return 0.
+def _desired_velocity(env, vel, fail=False):
+    """Return the desired velocity reward of a set of vehicle speeds.
+
+    See desired_velocity for a description of the reward.
     """
-    vel = np.array(env.k.vehicle.get_speed(veh_ids))
-    num_vehicles = len(veh_ids)
+    num_vehicles = len(vel)
 
     if any(vel < -100) or fail or num_vehicles == 0:
         return 0.0
@@ -28,6 +28,16 @@ def local_desired_velocity(env, veh_ids, fail=False):
     return max(max_cost - cost, 0) / (max_cost + eps)
 
 
+def local_desired_velocity(env, veh_ids, fail=False):
+    """
+    Encourage proximity to a desired velocity.
+    We only observe the velocity of the specified car.
+    If a collison or failure occurs, we return 0.
+    """
+    vel = np.array(env.k.vehicle.get_speed(veh_ids))
+    return _desired_velocity(env, vel, fail)
+
+
 def desired_velocity(env, fail=False, edge_list=None):
     r"""Encourage proximity to a desired velocity.
 
@@ -66,22 +76,7 @@ def desired_velocity(env, fail=False, edge_list=None):
         veh_ids = env.k.vehicle.get_ids_by_edge(edge_list)
 
     vel = np.array(env.k.vehicle.get_speed(veh_ids))
-    num_vehicles = len(veh_ids)
-
-    if any(vel < -100) or fail or num_vehicles == 0:
-        return 0.0
-
-    target_vel = env.env_params.additional_params["target_velocity"]
-    max_cost = np.array([target_vel] * num_vehicles)
-    max_cost = np.linalg.norm(max_cost)
-
-    cost = vel - target_vel
-    cost = np.linalg.norm(cost)
-
-    # epsilon term (to deal with ZeroDivisionError exceptions)
-    eps = np.finfo(np.float32).eps
-
-    return max(max_cost - cost, 0) / (max_cost + eps)
+    return _desired_velocity(env, vel, fail)
 
 
 def average_velocity(env, fail=False):
@@ -188,11 +183,10 @@ def avg_delay_specified_vehicles(env, veh_ids):
     float
         average delay
     """
-    sum = 0
-    for edge in env.k.network.get_edge_list():
-        for veh_id in env.k.vehicle.get_ids_by_edge(edge):
-            v_top = env.k.network.speed_limit(edge)
-            sum += (v_top - env.k.vehicle.get_speed(veh_id)) / v_top
+    edge_list = env.k.network.get_edge_list()
+    stats = env.k.vehicle.get_edge_stats(edge_list, by_lane=False)
+    v_top = np.array([env.k.network.speed_limit(edge) for edge in edge_list])
+    sum = np.sum(stats["count"] - stats["speed_sum"] / v_top)
     time_step = env.sim_step
     try:
         cost = time_step * sum
@@ -216,7 +210,14 @@ def min_delay_unscaled(env):
         reward value
     """
     vel = np.array(env.k.vehicle.get_speed(env.k.vehicle.get_ids()))
+    return _min_delay_unscaled(env, vel)
+
 
+def _min_delay_unscaled(env, vel):
+    """Return the average delay of a set of vehicle speeds.
+
+    See min_delay_unscaled for a description of the reward.
+    """
     vel = vel[vel >= -1e-6]
     v_top = max(
         env.k.network.speed_limit(edge) for edge in env.k.network.get_edge_list()
@@ -463,61 +464,142 @@ def miles_per_gallon(env, veh_ids=None, gain=0.001):
     return mpg * gain
 
 
+class RewardFeatures(object):
+    """Snapshot of the vehicle features used by the reward registry.
+
+    The features of all vehicles are collected from the vehicle kernel in a
+    single sweep, and are shared by all the reward functions in
+    REWARD_REGISTRY that are evaluated during a step. Environments compute
+    this object at most once per step, see ``flow.envs.Env.reward_features``.
+    Features that are only used by a few rewards (headways, leaders and lane
+    changes) are collected the first time they are read.
+
+    Attributes
+    ----------
+    ids : list of str
+        ids of all vehicles in the network
+    speed : np.ndarray
+        speed of every vehicle, in the order of ids
+    headway : np.ndarray
+        headway of every vehicle, in the order of ids
+    leader : list of str
+        leader of every vehicle, in the order of ids
+    has_leader : np.ndarray of bool
+        whether each vehicle has a leader
+    is_rl : np.ndarray of bool
+        whether each vehicle is an RL vehicle
+    is_bus : np.ndarray of bool
+        whether each vehicle is a bus, i.e. its id starts with "bus"
+    rl_last_lc : np.ndarray
+        last lane change time of every RL vehicle, in the order of the RL ids
+        of the vehicle kernel
+    """
+
+    def __init__(self, env):
+        """Collect the features of all vehicles in the network.
+
+        Parameters
+        ----------
+        env : flow.envs.Env
+            the environment variable, which contains information on the
+            current state of the system.
+        """
+        vehicles = env.k.vehicle
+        self._vehicles = vehicles
+        self.ids = list(vehicles.get_ids())
+        self._index = {veh_id: i for i, veh_id in enumerate(self.ids)}
+
+        self.speed = np.asarray(vehicles.get_speed(self.ids), dtype=float)
+
+        self.is_rl = np.zeros(len(self.ids), dtype=bool)
+        rl_index = self.indices(vehicles.get_rl_ids())
+        self.is_rl[rl_index[rl_index >= 0]] = True
+        self.is_bus = np.array(
+            [veh_id[:3] == "bus" for veh_id in self.ids], dtype=bool
+        )
+
+    @cached_property
+    def headway(self):
+        """See class definition."""
+        return np.asarray(self._vehicles.get_headway(self.ids), dtype=float)
+
+    @cached_property
+    def leader(self):
+        """See class definition."""
+        return self._vehicles.get_leader(self.ids)
+
+    @cached_property
+    def has_leader(self):
+        """See class definition."""
+        return np.array(
+            [lead_id not in ["", None] for lead_id in self.leader], dtype=bool
+        )
+
+    @cached_property
+    def rl_last_lc(self):
+        """See class definition."""
+        rl_ids = self._vehicles.get_rl_ids()
+        return np.asarray(self._vehicles.get_last_lc(rl_ids), dtype=float)
+
+    def indices(self, veh_ids):
+        """Return the index of each vehicle, or -1 if it is not in the network."""
+        get = self._index.get
+        return np.array([get(veh_id, -1) for veh_id in veh_ids], dtype=int)
+
+    def get_speed(self, veh_ids, error=-1001):
+        """Return the speed of a list of vehicles.
+
+        Vehicles that are not in the network are assigned a speed of error.
+        """
+        index = self.indices(veh_ids)
+        found = index >= 0
+        speed = np.full(len(index), error, dtype=float)
+        speed[found] = self.speed[index[found]]
+        return speed
+
+
 ###################################### REWARD REGISTRY ######################################
 def upweight_bus_vel(env, rl_actions):
-    bus_vel = np.array(
-        [
-            env.k.vehicle.get_speed(veh_id)
-            for veh_id in env.k.vehicle.get_ids()
-            if veh_id[:3] == "bus"
-        ]
-    )
-    other_vel = np.array(
-        [
-            env.k.vehicle.get_speed(veh_id)
-            for veh_id in env.k.vehicle.get_ids()
-            if veh_id[:3] != "bus"
-        ]
-    )
+    features = env.reward_features
+    bus_vel = features.speed[features.is_bus]
+    other_vel = features.speed[~features.is_bus]
     bus = np.mean(bus_vel) if bus_vel.size != 0 else 0
     other = np.mean(other_vel) if other_vel.size != 0 else 0
     return 60 * bus + other
 
 
 def global_vel_all(env, rl_actions):
-    vel = np.array(
-        [env.k.vehicle.get_speed(veh_id) for veh_id in env.k.vehicle.get_ids()]
-    )
+    vel = env.reward_features.speed
     return np.mean(vel) if vel.size != 0 else 0
 
 
 def commute_time(env, rl_actions):
-    vel = np.array(env.k.vehicle.get_speed(env.k.vehicle.get_ids()))
+    vel = env.reward_features.speed
 
     if any(vel < -100):
         return -10000.0
     if len(vel) == 0:
         return -10000.0
 
-    commute = np.array([(v + 0.001) ** -1 for v in vel])
+    commute = (vel + 0.001) ** -1
     commute = commute[commute > 0]
     return -np.mean(commute)
 
 
 def desired_velocity_all(env, rl_actions):
-    return desired_velocity(env)
+    return _desired_velocity(env, env.reward_features.speed)
 
 
 def local_desired_vel_first(env, rl_actions):
-    return local_desired_velocity(env, env.rl_veh[:2])
+    return _desired_velocity(env, env.reward_features.get_speed(env.rl_veh[:2]))
 
 
 def local_desired_vel_last(env, rl_actions):
-    return local_desired_velocity(env, env.rl_veh[-2:])
+    return _desired_velocity(env, env.reward_features.get_speed(env.rl_veh[-2:]))
 
 
 def local_desired_vel_all(env, rl_actions):
-    return local_desired_velocity(env, env.rl_veh)
+    return _desired_velocity(env, env.reward_features.get_speed(env.rl_veh))
 
 
 def outflow(env, rl_actions):
@@ -525,29 +607,30 @@ def outflow(env, rl_actions):
 
 
 def forward_progress(env, rl_actions):
-    rl_vel = env.k.vehicle.get_speed(env.k.vehicle.get_rl_ids())
-    return np.linalg.norm(rl_vel, 1)
+    features = env.reward_features
+    return np.linalg.norm(features.speed[features.is_rl], 1)
 
 
 def penalize_mean_delay(env, rl_actions):
-    return -min_delay_unscaled(env)
+    return -_min_delay_unscaled(env, env.reward_features.speed)
 
 
 def penalize_still(env, rl_actions):
-    return penalize_standstill(env)
+    return -np.count_nonzero(env.reward_features.speed == 0)
 
 
 def penalize_headway(env, rl_actions):
-    cost = 0
+    features = env.reward_features
     t_min = 1  # smallest acceptable time headway
-    for rl_id in env.rl_veh:
-        lead_id = env.k.vehicle.get_leader(rl_id)
-        if lead_id not in ["", None] and env.k.vehicle.get_speed(rl_id) > 0:
-            t_headway = max(
-                env.k.vehicle.get_headway(rl_id) / env.k.vehicle.get_speed(rl_id), 0
-            )
-            cost += min((t_headway - t_min) / t_min, 0)
-    return cost
+
+    index = features.indices(env.rl_veh)
+    index = index[index >= 0]
+    index = index[features.has_leader[index] & (features.speed[index] > 0)]
+    if len(index) == 0:
+        return 0
+
+    t_headway = np.maximum(features.headway[index] / features.speed[index], 0)
+    return np.sum(np.minimum((t_headway - t_min) / t_min, 0))
 
 
 def penalize_accel(env, rl_actions):
@@ -559,11 +642,9 @@ def penalize_accel(env, rl_actions):
 
 
 def penalize_lane_change(env, rl_actions):
-    reward = 0
-    for veh_id in env.k.vehicle.get_rl_ids():
-        if env.k.vehicle.get_last_lc(veh_id) == env.time_counter:
-            reward -= 0.1
-    return reward
+    return -0.1 * np.count_nonzero(
+        env.reward_features.rl_last_lc == env.time_counter
+    )
 
 
 def penalize_boolean_lane_change(env, rl_actions):
@@ -582,7 +663,7 @@ def penalize_light_change(env, rl_actions):
 
 
 def penalize_cars(env, rl_actions):
-    return -len(env.k.vehicle.get_ids())
+    return -len(env.reward_features.ids)
 
 
 REWARD_REGISTRY = {
@@ -1,6 +1,7 @@
 """Base environment class. This is the parent of all other environments."""
 
 from abc import ABCMeta, abstractmethod
+import collections
 from copy import deepcopy
 import os
 import atexit
@@ -10,26 +11,34 @@ import numpy as np
 import logging
 import random
 import shutil
-import subprocess
-from flow.renderer.pyglet_renderer import PygletRenderer as Renderer
+import tempfile
+from flow.renderer.recorder import VideoRecorder
 from flow.utils.flow_warnings import deprecated_attribute
 
 import gymnasium as gym
 from gymnasium.spaces import Box
 from gymnasium.spaces import Tuple
-from traci.exceptions import FatalTraCIError
-from traci.exceptions import TraCIException
 
 import sumolib
 
 
 from flow.core.util import ensure_dir
+from flow.controllers.base_controller import get_batch_actions
 from flow.core.kernel import Kernel
+from flow.core.kernel.simulation.emission import EMISSION_FORMATS
+from flow.core.kernel.vehicle.template import VehicleTemplate
+from flow.core.rewards import RewardFeatures
 from flow.utils.exceptions import FatalFlowError
 
 
 logger = logging.getLogger(__name__)
 
+# valid options for the reset_mode term in SumoParams
+RESET_MODES = ["add", "snapshot"]
+
+# number of simulated seconds shown in one second of saved videos
+VIDEO_SPEEDUP = 10
+
 
 class Env(gym.Env, metaclass=ABCMeta):
     """Base environment class.
@@ -65,7 +74,10 @@ class Env(gym.Env, metaclass=ABCMeta):
     network : flow.networks.Network
         see flow/networks/base.py
     simulator : str
-        the simulator used, one of {'traci', 'aimsun'}
+        the simulator used, one of {'traci', 'aimsun', 'headless'}
+    reset_mode : str
+        method used to return the vehicles to their initial state on reset,
+        one of {'add', 'snapshot'} (see the reset_mode attribute of SumoParams)
     k : flow.core.kernel.Kernel
         Flow kernel object, using for state acquisition and issuing commands to
         the certain components of the simulator. For more information, see:
@@ -98,10 +110,20 @@ class Env(gym.Env, metaclass=ABCMeta):
         the available_routes variable contains a dictionary of routes vehicles
         can traverse; to be used when routes need to be chosen dynamically.
         Equivalent to `network.rts`.
+    route_tables : dict <str, (list, np.ndarray)>
+        for every edge in available_routes, the routes starting at this edge
+        and the cumulative fractions of times they are chosen
     renderer : flow.renderer.pyglet_renderer.PygletRenderer or None
         renderer class, used to collect image-based representations of the
         traffic network. This attribute is set to None if `sim_params.render`
         is set to True or False.
+    reward_features : flow.core.rewards.RewardFeatures
+        snapshot of the vehicle features used by the reward functions in
+        flow.core.rewards.REWARD_REGISTRY. This is computed once per step, the
+        first time it is accessed.
+    profiler : flow.core.profiler.StepProfiler
+        timings of the phases of the steps of the environment, recorded if the
+        profile term of sim_params is set (see flow/core/profiler.py)
     """
 
     def __init__(
@@ -125,7 +147,8 @@ class Env(gym.Env, metaclass=ABCMeta):
         network : flow.networks.Network
             see flow/networks/base.py
         simulator : str
-            the simulator used, one of {'traci', 'aimsun'}. Defaults to 'traci'
+            the simulator used, one of {'traci', 'aimsun', 'headless'}.
+            Defaults to 'traci'
 
         Raises
         ------
@@ -156,6 +179,8 @@ class Env(gym.Env, metaclass=ABCMeta):
         self.initial_state = {}
         self.state = None
         self.obs_var_labels = []
+        # reward features of the current step, computed once needed
+        self._reward_features = None
 
         self.use_safe_policy_actions = use_safe_policy_actions
 
@@ -165,15 +190,56 @@ class Env(gym.Env, metaclass=ABCMeta):
         # the simulator used by this environment
         self.simulator = simulator
 
+        # method used to return the vehicles to their initial state on reset
+        self.reset_mode = getattr(self.sim_params, "reset_mode", "add")
+        if self.reset_mode not in RESET_MODES:
+            raise ValueError(
+                "Invalid reset_mode: {}. Must be one of: {}".format(
+                    self.reset_mode, RESET_MODES
+                )
+            )
+        if self.reset_mode == "snapshot" and self.simulator != "traci":
+            raise FatalFlowError(
+                "The snapshot reset mode is only supported by the traci simulator."
+            )
+        if self.reset_mode == "snapshot" and hasattr(
+            self.network, "template_vehicles"
+        ):
+            raise FatalFlowError(
+                "The snapshot reset mode does not support network templates "
+                "with vehicles."
+            )
+        emission_format = getattr(self.sim_params, "emission_format", "csv")
+        if emission_format not in EMISSION_FORMATS:
+            raise ValueError(
+                "Invalid emission_format: {}. Must be one of: {}".format(
+                    emission_format, EMISSION_FORMATS
+                )
+            )
+        # file storing the state of the simulation at the end of the first
+        # reset, if the snapshot reset mode is used
+        self._snapshot_path = None
+        self._snapshot_time_counter = 0
+        # seeds of the next restarts of the simulation, drawn ahead for the
+        # sumo instances launched in the background
+        self._restart_seeds = collections.deque()
+
         # create the Flow kernel
         self.k = Kernel(simulator=self.simulator, sim_params=self.sim_params)
+        self.profiler = self.k.profiler
 
         # use the network class's network parameters to generate the necessary
         # network components within the network kernel
         self.k.network.generate_network(self.network)
 
+        # compact template of the initial state of the vehicles kernel, used
+        # to restart the simulation (see flow/core/kernel/vehicle/template.py)
+        self._vehicle_template = VehicleTemplate(
+            self.k.vehicle, self.sim_params, self.network.vehicles
+        )
+
         # initial the vehicles kernel using the VehicleParams object
-        self.k.vehicle.initialize(deepcopy(self.network.vehicles))
+        self.k.vehicle.initialize(self._vehicle_template)
 
         # initialize the simulation using the simulation kernel. This will use
         # the network kernel as an input in order to determine what network
@@ -185,11 +251,28 @@ class Env(gym.Env, metaclass=ABCMeta):
         # pass the kernel api to the kernel and it's subclasses
         self.k.pass_api(kernel_api)
 
+        # launch sumo instances for the next restarts in the background
+        self._launch_warm_instances()
+
         # the available_routes variable contains a dictionary of routes
         # vehicles can traverse; to be used when routes need to be chosen
         # dynamically
         self.available_routes = self.k.network.rts
 
+        # precompute the cumulative fractions of times every route is chosen,
+        # used by routing controllers such as ContinuousRouter
+        self.route_tables = {}
+        for edge, routes in (self.available_routes or {}).items():
+            if len(routes) == 0:
+                continue
+            if isinstance(routes[0], str):
+                routes = [(routes, 1)]
+            cum_frac = np.cumsum([frac for _, frac in routes], dtype=np.float64)
+            self.route_tables[edge] = (
+                [route for route, _ in routes],
+                cum_frac / cum_frac[-1],
+            )
+
         # store the initial vehicle ids
         self.initial_ids = deepcopy(self.network.vehicles.ids)
 
@@ -203,6 +286,11 @@ class Env(gym.Env, metaclass=ABCMeta):
 
         self.setup_initial_state()
 
+        # only every save_render_step-th frame is saved, and the saved videos
+        # are sped up accordingly
+        self.save_render_step = getattr(self.sim_params, "save_render_step", 1)
+        fps = VIDEO_SPEEDUP / (self.sim_step * self.save_render_step)
+
         # use pyglet to render the simulation
         if self.should_render in ["gray", "dgray", "rgb", "drgb"]:
             save_render = self.sim_params.save_render
@@ -218,6 +306,9 @@ class Env(gym.Env, metaclass=ABCMeta):
                 lane_poly = [i for pt in _lane_poly for i in pt]
                 network.append(lane_poly)
 
+            # the renderer (and pyglet) is only imported when it is needed
+            from flow.renderer.pyglet_renderer import PygletRenderer as Renderer
+
             # instantiate a pyglet renderer
             self.renderer = Renderer(
                 network,
@@ -227,6 +318,8 @@ class Env(gym.Env, metaclass=ABCMeta):
                 pxpm=pxpm,
                 show_radius=show_radius,
                 path=path,
+                save_render_step=self.save_render_step,
+                fps=fps,
             )
 
             # render a frame
@@ -238,6 +331,10 @@ class Env(gym.Env, metaclass=ABCMeta):
                     os.path.expanduser("~") + "/flow_rendering/" + self.network.name
                 )
                 os.makedirs(self.path, exist_ok=True)
+                # the screenshots of sumo-gui are streamed to a video, and
+                # deleted once they are encoded
+                self.video = VideoRecorder(self.path + ".mp4", fps)
+                self._screenshot = None
         else:
             raise FatalFlowError("Mode %s is not supported!" % self.sim_params.render)
         atexit.register(self.terminate)
@@ -258,11 +355,7 @@ class Env(gym.Env, metaclass=ABCMeta):
         render : bool, optional
             specifies whether to use the gui
         """
-        self.k.close()
-
-        # killed the sumo process if using sumo/TraCI
-        if self.simulator == "traci":
-            self.k.simulation.sumo_proc.kill()
+        t = self.profiler.tic()
 
         if render is not None:
             self.sim_params.render = render
@@ -271,15 +364,78 @@ class Env(gym.Env, metaclass=ABCMeta):
             ensure_dir(sim_params.emission_path)
             self.sim_params.emission_path = sim_params.emission_path
 
-        self.k.network.generate_network(self.network)
-        self.k.vehicle.initialize(deepcopy(self.network.vehicles))
+        # if an instance of the same network and parameters is already running
+        # in the background, the network files do not need to be regenerated
+        use_warm_instance = (
+            self.simulator == "traci"
+            and self.k.network.network is self.network
+            and self.k.simulation.has_warm_instance(self.k.network, self.sim_params)
+        )
+
+        if use_warm_instance:
+            self.k.simulation.close()
+        else:
+            # the instances launched in the background are stale, and are
+            # terminated before their network files are deleted
+            if self.simulator == "traci":
+                self.k.simulation.close_warm_instances()
+            self.k.close()
+
+        # killed the sumo process if using sumo/TraCI
+        if self.simulator == "traci":
+            self.k.simulation.sumo_proc.kill()
+
+        if not use_warm_instance:
+            self.k.network.generate_network(self.network)
+
+        # the vehicles of the network may have been replaced since the
+        # template was created (e.g. in BottleneckDesiredVelocityEnv)
+        if self._vehicle_template.vehicles is not self.network.vehicles:
+            self._vehicle_template = VehicleTemplate(
+                self.k.vehicle, self.sim_params, self.network.vehicles
+            )
+        self.k.vehicle.initialize(self._vehicle_template)
         kernel_api = self.k.simulation.start_simulation(
             network=self.k.network, sim_params=self.sim_params
         )
         self.k.pass_api(kernel_api)
 
+        # launch replacements for the used instance in the background
+        self._launch_warm_instances()
+
         self.setup_initial_state()
 
+        self.profiler.toc("restart_simulation", t)
+
+    def _restart_seed(self):
+        """Return a random seed for the next restart of the simulation.
+
+        The seeds of the instances launched in the background are drawn ahead
+        (see _launch_warm_instances), and are used in the same order.
+        """
+        if len(self._restart_seeds) > 0:
+            return self._restart_seeds.popleft()
+        return random.randint(0, 1e5)
+
+    def _launch_warm_instances(self):
+        """Launch sumo instances for the next restarts in the background.
+
+        Every instance is launched with the current network and simulation
+        parameters, and the seed of the restart it is meant for (see the
+        num_warm_instances attribute of SumoParams).
+        """
+        if self.simulator != "traci":
+            return
+
+        num_warm_instances = getattr(self.sim_params, "num_warm_instances", 0)
+        sim_params = deepcopy(self.sim_params)
+        while self.k.simulation.num_warm_instances < num_warm_instances:
+            i = self.k.simulation.num_warm_instances
+            while len(self._restart_seeds) <= i:
+                self._restart_seeds.append(random.randint(0, 1e5))
+            sim_params.seed = self._restart_seeds[i]
+            self.k.simulation.launch_warm_instance(self.k.network, sim_params)
+
     def setup_initial_state(self):
         """Store information on the initial state of vehicles in the network.
 
@@ -338,20 +494,29 @@ class Env(gym.Env, metaclass=ABCMeta):
         """
         # compute the info for each agent
         infos = {}
+        profiler = self.profiler
+        profiler.start_step()
 
         for _ in range(self.env_params.sims_per_step):
             self.time_counter += 1
             self.step_counter += 1
+            t = profiler.tic()
 
             # perform acceleration actions for controlled human-driven vehicles
             if len(self.k.vehicle.get_controlled_ids()) > 0:
-                accel = []
-                for veh_id in self.k.vehicle.get_controlled_ids():
-                    action = self.k.vehicle.get_acc_controller(veh_id).get_action(self)
-                    accel.append(action)
+                if self.env_params.batch_controllers:
+                    accel = get_batch_actions(self, self.k.vehicle.get_controlled_ids())
+                else:
+                    accel = []
+                    for veh_id in self.k.vehicle.get_controlled_ids():
+                        action = self.k.vehicle.get_acc_controller(veh_id).get_action(
+                            self
+                        )
+                        accel.append(action)
                 self.k.vehicle.apply_acceleration(
                     self.k.vehicle.get_controlled_ids(), accel
                 )
+            t = profiler.toc("controllers", t)
 
             # perform lane change actions for controlled human-driven vehicles
             if len(self.k.vehicle.get_controlled_lc_ids()) > 0:
@@ -364,18 +529,19 @@ class Env(gym.Env, metaclass=ABCMeta):
                 self.k.vehicle.apply_lane_change(
                     self.k.vehicle.get_controlled_lc_ids(), direction=direction
                 )
+            t = profiler.toc("lane_change", t)
 
-            # perform (optionally) routing actions for all vehicles in the
-            # network, including RL and SUMO-controlled vehicles
-            routing_ids = []
-            routing_actions = []
-            for veh_id in self.k.vehicle.get_ids():
-                if self.k.vehicle.get_routing_controller(veh_id) is not None:
-                    routing_ids.append(veh_id)
-                    route_contr = self.k.vehicle.get_routing_controller(veh_id)
-                    routing_actions.append(route_contr.choose_route(self))
+            # perform (optionally) routing actions for the vehicles whose
+            # routes may need to be updated, including RL and SUMO-controlled
+            # vehicles
+            routing_ids = self.k.vehicle.get_routing_ids()
+            routing_actions = [
+                self.k.vehicle.get_routing_controller(veh_id).choose_route(self)
+                for veh_id in routing_ids
+            ]
 
             self.k.vehicle.choose_routes(routing_ids, routing_actions)
+            t = profiler.toc("routing", t)
 
             if self.get_additional_rl_control_info() is not None:
                 acc_controller_actions = self.get_additional_rl_control_info()
@@ -410,14 +576,18 @@ class Env(gym.Env, metaclass=ABCMeta):
                 self.apply_rl_actions(acc_controller_actions)
             else:
                 self.apply_rl_actions(rl_actions)
+            t = profiler.toc("apply_rl_actions", t)
 
             self.additional_command()
+            t = profiler.toc("additional_command", t)
 
             # advance the simulation in the simulator by one step
             self.k.simulation.simulation_step()
+            profiler.toc("simulation_step", t)
 
             # store new observations in the vehicles and traffic lights class
             self.k.update(reset=False)
+            self._reward_features = None
 
             # update the colors of vehicles
             #             if self.sim_params.render:
@@ -433,14 +603,19 @@ class Env(gym.Env, metaclass=ABCMeta):
             # render a frame
             self.render()
 
+        t = profiler.tic()
         states = self.get_state()
+        profiler.toc("get_state", t)
 
-        # collect information of the state of the network based on the
-        # environment class used
-        self.state = np.asarray(states).T
+        # collect observation new state associated with action. This is only
+        # copied if the state is not already a float32 array (see
+        # flow.core.observation.ObservationBuilder)
+        next_observation = np.asarray(states, dtype=np.float32)
 
-        # collect observation new state associated with action
-        next_observation = np.copy(states).astype(np.float32)
+        # collect information of the state of the network based on the
+        # environment class used. This is a copy, so that changes made by the
+        # caller to the returned observation do not affect it
+        self.state = np.array(next_observation.T, copy=True)
 
         # test if the environment should terminate due to a collision or the
         # time horizon being met
@@ -454,11 +629,16 @@ class Env(gym.Env, metaclass=ABCMeta):
         infos["crash"] = crash
 
         # compute the reward
+        t = profiler.tic()
         if self.env_params.clip_actions:
             rl_clipped = self.clip_actions(rl_actions)
             reward = self.compute_reward(rl_clipped, fail=crash)
         else:
             reward = self.compute_reward(rl_actions, fail=crash)
+        profiler.toc("compute_reward", t)
+
+        if getattr(self.sim_params, "profile", False) == "infos":
+            infos["profile"] = profiler.last_step()
 
         return next_observation, reward, terminated, truncated, infos
 
@@ -482,6 +662,8 @@ class Env(gym.Env, metaclass=ABCMeta):
             the initial observation of the space. The initial reward is assumed
             to be zero.
         """
+        t = self.profiler.tic()
+
         # reset the time counter
         self.time_counter = 0
 
@@ -514,10 +696,9 @@ class Env(gym.Env, metaclass=ABCMeta):
         ):
             self.step_counter = 0
             # issue a random seed to induce randomness into the next rollout
-            self.sim_params.seed = random.randint(0, 1e5)
+            self.sim_params.seed = self._restart_seed()
 
-            self.k.vehicle = deepcopy(self.initial_vehicles)
-            self.k.vehicle.master_kernel = self.k
+            self.k.vehicle = self._vehicle_template.restore(self.k)
             # restart the sumo instance
             self.restart_simulation(self.sim_params)
 
@@ -525,62 +706,28 @@ class Env(gym.Env, metaclass=ABCMeta):
         elif self.initial_config.shuffle:
             self.setup_initial_state()
 
-        # clear all vehicles from the network and the vehicles class
-        if self.simulator == "traci":
-            for veh_id in self.k.kernel_api.vehicle.getIDList():  # FIXME: hack
-                try:
-                    self.k.vehicle.remove(veh_id)
-                except (FatalTraCIError, TraCIException):
-                    print(traceback.format_exc())
-
-        # clear all vehicles from the network and the vehicles class
-        # FIXME (ev, ak) this is weird and shouldn't be necessary
-        for veh_id in list(self.k.vehicle.get_ids()):
-            # do not try to remove the vehicles from the network in the first
-            # step after initializing the network, as there will be no vehicles
-            if self.step_counter == 0:
-                continue
-            try:
-                self.k.vehicle.remove(veh_id)
-            except (FatalTraCIError, TraCIException):
-                print("Error during start: {}".format(traceback.format_exc()))
+        # restore the state saved at the end of the first reset (if any),
+        # instead of removing and adding back all vehicles
+        if self._snapshot_path is not None:
+            self._load_snapshot()
 
-        # do any additional resetting of the vehicle class needed
-        self.k.vehicle.reset()
+            observation = np.asarray(self.get_state(), dtype=np.float32)
+            self.state = np.array(observation.T, copy=True)
+            self.profiler.toc("reset", t)
 
-        # reintroduce the initial vehicles to the network
-        for veh_id in self.initial_ids:
-            type_id, edge, lane_index, pos, speed = self.initial_state[veh_id]
-
-            try:
-                self.k.vehicle.add(
-                    veh_id=veh_id,
-                    type_id=type_id,
-                    edge=edge,
-                    lane=lane_index,
-                    pos=pos,
-                    speed=speed,
-                )
-            except (FatalTraCIError, TraCIException):
-                # if a vehicle was not removed in the first attempt, remove it
-                # now and then reintroduce it
-                self.k.vehicle.remove(veh_id)
-                if self.simulator == "traci":
-                    self.k.kernel_api.vehicle.remove(veh_id)  # FIXME: hack
-                self.k.vehicle.add(
-                    veh_id=veh_id,
-                    type_id=type_id,
-                    edge=edge,
-                    lane=lane_index,
-                    pos=pos,
-                    speed=speed,
-                )
+            # render a frame
+            self.render(reset=True)
+
+            return observation, {}
+
+        self._reset_vehicles()
 
         # advance the simulation in the simulator by one step
         self.k.simulation.simulation_step()
 
         # update the information in each kernel to match the current state
         self.k.update(reset=True)
+        self._reward_features = None
 
         # update the colors of vehicles
         #         if self.sim_params.render:
@@ -602,24 +749,72 @@ class Env(gym.Env, metaclass=ABCMeta):
                 msg += "- {}: {}\n".format(veh_id, self.initial_state[veh_id])
             raise FatalFlowError(msg=msg)
 
-        states = self.get_state()
+        # observation associated with the reset (no warm-up steps)
+        observation = np.asarray(self.get_state(), dtype=np.float32)
 
         # collect information of the state of the network based on the
-        # environment class used
-        self.state = np.asarray(states).T
-
-        # observation associated with the reset (no warm-up steps)
-        observation = np.copy(states).astype(np.float32)
+        # environment class used (a copy, see step)
+        self.state = np.array(observation.T, copy=True)
+        self.profiler.toc("reset", t)
 
         # perform (optional) warm-up steps before training
         for _ in range(self.env_params.warmup_steps):
-            observation, _, _, _ = self.step(rl_actions=None)
+            observation, _, _, _, _ = self.step(rl_actions=None)
+
+        # save the current state, to be restored by the following resets
+        if self.reset_mode == "snapshot":
+            self._save_snapshot()
 
         # render a frame
         self.render(reset=True)
 
         return observation, {}
 
+    def _reset_vehicles(self):
+        """Remove all vehicles and add back the initial vehicles.
+
+        The removals and insertions are performed in bulk by the vehicles
+        kernel (see the remove_all and add_all methods of the kernel).
+        """
+        t = self.profiler.tic()
+
+        # clear all vehicles from the network and the vehicles class. Do not
+        # try to remove the vehicles from the network in the first step after
+        # initializing the network, as there will be no vehicles
+        if self.simulator == "traci" or self.step_counter > 0:
+            self.k.vehicle.remove_all()
+
+        # do any additional resetting of the vehicle class needed
+        self.k.vehicle.reset()
+
+        # reintroduce the initial vehicles to the network
+        self.k.vehicle.add_all(self.initial_ids, self.initial_state)
+
+        self.profiler.toc("reset_vehicles", t)
+
+    def _save_snapshot(self):
+        """Save the current state of the simulation to a temporary file."""
+        fd, self._snapshot_path = tempfile.mkstemp(suffix=".state.xml")
+        os.close(fd)
+        self.k.simulation.save_state(self._snapshot_path)
+        self._snapshot_time_counter = self.time_counter
+
+    def _load_snapshot(self):
+        """Restore the state of the simulation saved by _save_snapshot.
+
+        Loading the state replaces all vehicles in the simulation and drops
+        all subscriptions, so the kernels are synchronized with the restored
+        state afterwards.
+        """
+        self.k.simulation.load_state(self._snapshot_path)
+        self.k.pass_api(self.k.kernel_api)
+        self.k.vehicle.reset()
+        self.k.vehicle.reload()
+        self.k.update(reset=True)
+        self._reward_features = None
+
+        self.time_counter = self._snapshot_time_counter
+
     def additional_command(self):
         """Additional commands that may be performed by the step method."""
         pass
@@ -691,6 +886,23 @@ class Env(gym.Env, metaclass=ABCMeta):
         """
         pass
 
+    @property
+    def reward_features(self):
+        """Return the reward features of the current step.
+
+        The features are computed the first time this is called after the
+        simulation is advanced, and are shared by all reward functions
+        evaluated during the step.
+
+        Returns
+        -------
+        flow.core.rewards.RewardFeatures
+            snapshot of the state of all vehicles in the network
+        """
+        if self._reward_features is None:
+            self._reward_features = RewardFeatures(self)
+        return self._reward_features
+
     @property
     @abstractmethod
     def action_space(self):
@@ -747,30 +959,23 @@ class Env(gym.Env, metaclass=ABCMeta):
         environment opens the TraCI connection.
         """
         try:
+            # terminate the sumo instances launched in the background (before
+            # their network files are deleted)
+            if self.simulator == "traci":
+                self.k.simulation.close_warm_instances()
             # close everything within the kernel
             self.k.close()
+            # delete the saved state of the simulation
+            if self._snapshot_path is not None:
+                os.remove(self._snapshot_path)
+                self._snapshot_path = None
             # close pyglet renderer
             if self.sim_params.render in ["gray", "dgray", "rgb", "drgb"]:
                 self.renderer.close()
-            # generate video
+            # finish the video
             elif (self.sim_params.render is True) and self.sim_params.save_render:
-                images_dir = self.path.split("/")[-1]
-                speedup = 10  # multiplier: renders video so that `speedup` seconds is rendered in 1 real second
-                fps = speedup // self.sim_step
-                p = subprocess.Popen(
-                    [
-                        "ffmpeg",
-                        "-y",
-                        "-r",
-                        str(fps),
-                        "-i",
-                        self.path + "/frame_%06d.png",
-                        "-pix_fmt",
-                        "yuv420p",
-                        "%s/../%s.mp4" % (self.path, images_dir),
-                    ]
-                )
-                p.wait()
+                self._record_screenshot()
+                self.video.close()
                 shutil.rmtree(self.path)
         except FileNotFoundError:
             # Skip automatic termination. Connection is probably already closed
@@ -803,9 +1008,20 @@ class Env(gym.Env, metaclass=ABCMeta):
                     self.sights_buffer.pop(0)
         elif (self.sim_params.render is True) and self.sim_params.save_render:
             # sumo-gui render
-            self.k.kernel_api.gui.screenshot(
-                "View #0", self.path + "/frame_%06d.png" % self.time_counter
-            )
+            self._record_screenshot()
+            if self.time_counter % self.save_render_step == 0:
+                self._screenshot = self.path + "/frame_%06d.png" % self.time_counter
+                self.k.kernel_api.gui.screenshot("View #0", self._screenshot)
+
+    def _record_screenshot(self):
+        """Pass the last screenshot of sumo-gui to the video recorder.
+
+        sumo-gui only saves a screenshot during the following simulation step,
+        so every screenshot is recorded with a delay of one step.
+        """
+        if self._screenshot is not None:
+            self.video.append_file(self._screenshot, remove=True)
+            self._screenshot = None
 
     def pyglet_render(self):
         """Render a frame using pyglet."""
@@ -21,6 +21,8 @@ import numpy as np
 from gymnasium.spaces.box import Box
 
 from flow.core import rewards
+from flow.core.kernel.vehicle.counters import RollingCounter
+from flow.core.observation import ObservationBuilder
 from flow.envs.base import Env
 
 MAX_LANES = 4  # base number of largest number of lanes in the network
@@ -183,15 +185,10 @@ class BottleneckEnv(Env):
         bottleneck from a given traffic light.
     feedback_coeff : float
         This is the gain on the feedback in the ALINEA algorithm
-    smoothed_num : np.ndarray
-        Numpy array keeping track of how many vehicles were in edge 4 over the
-        last 10 time seconds. This provides a more stable estimate of the
-        number of vehicles in edge 4.
-    outflow_index : int
-        Keeps track of which index of smoothed_num we should update with the
-        latest number of vehicles in the bottleneck. Should eventually be
-        deprecated as smoothed_num should be switched to a queue instead of an
-        array.
+    smoothed_num : flow.core.kernel.vehicle.counters.RollingCounter
+        Keeps track of how many vehicles were in edge 4 over the last 10 time
+        steps. This provides a more stable estimate of the number of vehicles
+        in edge 4.
     """
 
     def __init__(
@@ -250,8 +247,7 @@ class BottleneckEnv(Env):
         self.green_time = 4
         self.feedback_coeff = env_add_params.get("feedback_coeff", 20)
 
-        self.smoothed_num = np.zeros(10)  # averaged number of vehs in '4'
-        self.outflow_index = 0
+        self.smoothed_num = RollingCounter(10)  # averaged number of vehs in '4'
 
     def additional_command(self):
         """Build a dict with vehicle information.
@@ -285,8 +281,7 @@ class BottleneckEnv(Env):
 
         # compute the outflow
         veh_ids = self.k.vehicle.get_ids_by_edge("4")
-        self.smoothed_num[self.outflow_index] = len(veh_ids)
-        self.outflow_index = (self.outflow_index + 1) % self.smoothed_num.shape[0]
+        self.smoothed_num.append({"4": len(veh_ids)})
 
     def ramp_meter_lane_change_control(self):
         """Control lane change behavior of vehicles near the ramp meters.
@@ -363,7 +358,7 @@ class BottleneckEnv(Env):
             # now implement the integral controller update
             # find all the vehicles in an edge
             q_update = self.feedback_coeff * (
-                self.n_crit - np.average(self.smoothed_num)
+                self.n_crit - self.smoothed_num.sum("4", 10) / 10
             )
             self.q = np.clip(self.q + q_update, a_min=self.q_min, a_max=self.q_max)
             # convert q to cycle time
@@ -568,6 +563,18 @@ class BottleneckAccelEnv(BottleneckEnv):
         self.num_rl = deepcopy(self.initial_vehicles.num_rl_vehicles)
         self.rl_id_list = deepcopy(self.initial_vehicles.get_rl_ids())
         self.max_speed = self.k.network.max_speed()
+        self._edge_list = self.k.network.get_edge_list()
+        self._edge_lengths = np.array(
+            [self.k.network.edge_length(edge) for edge in self._edge_list]
+        )
+
+        # layout of the observations: the data of every rl vehicle, their
+        # relative data in every lane, and the data of every edge
+        self.obs_builder = ObservationBuilder()
+        self.obs_builder.add("rl", (self.num_rl, 4))
+        self.obs_builder.add("relative", (self.num_rl, 4, MAX_LANES * self.scaling))
+        self.obs_builder.add("edges", (len(self._edge_list), 2))
+        self.obs_builder.set_slots(self.rl_id_list)
 
         if "eta" in env_params.additional_params:
             self.eta = float(env_params.additional_params["eta"])
@@ -575,122 +582,76 @@ class BottleneckAccelEnv(BottleneckEnv):
     @property
     def observation_space(self):
         """See class definition."""
-        num_edges = len(self.k.network.get_edge_list())
-        num_rl_veh = self.num_rl
-        num_obs = (
-            2 * num_edges + 4 * MAX_LANES * self.scaling * num_rl_veh + 4 * num_rl_veh
-        )
-
-        return Box(
-            low=-float("inf"), high=float("inf"), shape=(num_obs,), dtype=np.float32
-        )
+        return self.obs_builder.space()
 
     def get_state(self):
         """See class definition."""
         headway_scale = 1000
-
-        rl_ids = self.k.vehicle.get_rl_ids()
-
-        # rl vehicle data (absolute position, speed, and lane index)
-        rl_obs = np.empty(0)
-        id_counter = 0
-        for veh_id in rl_ids:
-            # check if we have skipped a vehicle, if not, pad
-            rl_id_num = self.rl_id_list.index(veh_id)
-            if rl_id_num != id_counter:
-                rl_obs = np.concatenate(
-                    (rl_obs, np.zeros(4 * (rl_id_num - id_counter)))
-                )
-                id_counter = rl_id_num + 1
-            else:
-                id_counter += 1
-
+        obs, fields = self.obs_builder.new()
+        slots = self.obs_builder.slots
+
+        # rl vehicles are placed at their slot in the initial order, and the
+        # slots of missing vehicles are padded with zeros
+        rl_ids = [veh_id for veh_id in self.k.vehicle.get_rl_ids() if veh_id in slots]
+        rl_slots = [slots[veh_id] for veh_id in rl_ids]
+
+        # rl vehicle data (absolute position, speed, lane index, and edge
+        # number)
+        rl_obs = fields["rl"]
+        rl_obs[rl_slots, 0] = np.asarray(self.k.vehicle.get_x_by_id(rl_ids)) / 1000
+        rl_obs[rl_slots, 1] = (
+            np.asarray(self.k.vehicle.get_speed(rl_ids)) / self.max_speed
+        )
+        rl_obs[rl_slots, 2] = np.asarray(self.k.vehicle.get_lane(rl_ids)) / MAX_LANES
+        for slot, edge in zip(rl_slots, self.k.vehicle.get_edge(rl_ids)):
             # get the edge and convert it to a number
-            edge_num = self.k.vehicle.get_edge(veh_id)
-            if edge_num is None or edge_num == "" or edge_num[0] == ":":
-                edge_num = -1
+            if edge is None or edge == "" or edge[0] == ":":
+                rl_obs[slot, 3] = -1
             else:
-                edge_num = int(edge_num) / 6
-            rl_obs = np.concatenate(
-                (
-                    rl_obs,
-                    [
-                        self.k.vehicle.get_x_by_id(veh_id) / 1000,
-                        (self.k.vehicle.get_speed(veh_id) / self.max_speed),
-                        (self.k.vehicle.get_lane(veh_id) / MAX_LANES),
-                        edge_num,
-                    ],
-                )
-            )
-
-        # if all the missing vehicles are at the end, pad
-        diff = self.num_rl - int(rl_obs.shape[0] / 4)
-        if diff > 0:
-            rl_obs = np.concatenate((rl_obs, np.zeros(4 * diff)))
+                rl_obs[slot, 3] = int(edge) / 6
 
         # relative vehicles data (lane headways, tailways, vel_ahead, and
         # vel_behind)
-        relative_obs = np.empty(0)
-        id_counter = 0
-        for veh_id in rl_ids:
-            # check if we have skipped a vehicle, if not, pad
-            rl_id_num = self.rl_id_list.index(veh_id)
-            if rl_id_num != id_counter:
-                pad_mat = np.zeros(
-                    4 * MAX_LANES * self.scaling * (rl_id_num - id_counter)
-                )
-                relative_obs = np.concatenate((relative_obs, pad_mat))
-                id_counter = rl_id_num + 1
-            else:
-                id_counter += 1
-            num_lanes = MAX_LANES * self.scaling
-            headway = np.asarray([1000] * num_lanes) / headway_scale
-            tailway = np.asarray([1000] * num_lanes) / headway_scale
-            vel_in_front = np.asarray([0] * num_lanes) / self.max_speed
-            vel_behind = np.asarray([0] * num_lanes) / self.max_speed
-
-            lane_leaders = self.k.vehicle.get_lane_leaders(veh_id)
-            lane_followers = self.k.vehicle.get_lane_followers(veh_id)
+        relative_obs = fields["relative"]
+        for veh_id, slot in zip(rl_ids, rl_slots):
+            headway, tailway, vel_in_front, vel_behind = relative_obs[slot]
+            # the absence of a vehicle implies a large headway
+            headway[:] = 1
+            tailway[:] = 1
+
             lane_headways = self.k.vehicle.get_lane_headways(veh_id)
             lane_tailways = self.k.vehicle.get_lane_tailways(veh_id)
-            headway[0 : len(lane_headways)] = np.asarray(lane_headways) / headway_scale
-            tailway[0 : len(lane_tailways)] = np.asarray(lane_tailways) / headway_scale
-            for i, lane_leader in enumerate(lane_leaders):
+            headway[: len(lane_headways)] = np.asarray(lane_headways) / headway_scale
+            tailway[: len(lane_tailways)] = np.asarray(lane_tailways) / headway_scale
+            for i, lane_leader in enumerate(self.k.vehicle.get_lane_leaders(veh_id)):
                 if lane_leader != "":
                     vel_in_front[i] = (
                         self.k.vehicle.get_speed(lane_leader) / self.max_speed
                     )
-            for i, lane_follower in enumerate(lane_followers):
-                if lane_followers != "":
+            for i, lane_follower in enumerate(
+                self.k.vehicle.get_lane_followers(veh_id)
+            ):
+                if lane_follower != "":
                     vel_behind[i] = (
                         self.k.vehicle.get_speed(lane_follower) / self.max_speed
                     )
 
-            relative_obs = np.concatenate(
-                (relative_obs, headway, tailway, vel_in_front, vel_behind)
-            )
-
-        # if all the missing vehicles are at the end, pad
-        diff = self.num_rl - int(relative_obs.shape[0] / (4 * MAX_LANES))
-        if diff > 0:
-            relative_obs = np.concatenate(
-                (relative_obs, np.zeros(4 * MAX_LANES * diff))
+        # per edge data (average speed, density)
+        stats = self.k.vehicle.get_edge_stats(self._edge_list, by_lane=False)
+        num_veh = stats["count"]
+        edge_obs = fields["edges"]
+        edge_obs[:, 0] = (
+            np.divide(
+                stats["speed_sum"],
+                num_veh,
+                out=np.zeros_like(num_veh),
+                where=num_veh > 0,
             )
+            / self.max_speed
+        )
+        edge_obs[:, 1] = num_veh / self._edge_lengths
 
-        # per edge data (average speed, density
-        edge_obs = []
-        for edge in self.k.network.get_edge_list():
-            veh_ids = self.k.vehicle.get_ids_by_edge(edge)
-            if len(veh_ids) > 0:
-                avg_speed = (
-                    sum(self.k.vehicle.get_speed(veh_ids)) / len(veh_ids)
-                ) / self.max_speed
-                density = len(veh_ids) / self.k.network.edge_length(edge)
-                edge_obs += [avg_speed, density]
-            else:
-                edge_obs += [0, 0]
-
-        return np.concatenate((rl_obs, relative_obs, edge_obs))
+        return obs
 
     def compute_reward(self, rl_actions, **kwargs):
         """See class definition."""
@@ -768,7 +729,7 @@ class BottleneckAccelEnv(BottleneckEnv):
             )
             for rl_id in diff_list:
                 # distribute rl cars evenly over lanes
-                lane_num = self.rl_id_list.index(rl_id) % MAX_LANES * self.scaling
+                lane_num = self.obs_builder.slots[rl_id] % MAX_LANES * self.scaling
                 # reintroduce it at the start of the network
                 try:
                     self.k.vehicle.add(
@@ -966,64 +927,28 @@ class BottleneckDesiredVelocityEnv(BottleneckEnv):
         Finally, we also append the total outflow of the bottleneck over the
         last 20 * self.sim_step seconds.
         """
-        num_vehicles_list = []
-        num_rl_vehicles_list = []
-        vehicle_speeds_list = []
-        rl_speeds_list = []
-        for i, edge in enumerate(EDGE_LIST):
-            num_lanes = self.k.network.num_lanes(edge)
-            num_vehicles = np.zeros((self.num_obs_segments[i], num_lanes))
-            num_rl_vehicles = np.zeros((self.num_obs_segments[i], num_lanes))
-            vehicle_speeds = np.zeros((self.num_obs_segments[i], num_lanes))
-            rl_vehicle_speeds = np.zeros((self.num_obs_segments[i], num_lanes))
-            ids = self.k.vehicle.get_ids_by_edge(edge)
-            lane_list = self.k.vehicle.get_lane(ids)
-            pos_list = self.k.vehicle.get_position(ids)
-            for i, id in enumerate(ids):
-                segment = np.searchsorted(self.obs_slices[edge], pos_list[i]) - 1
-                if id in self.k.vehicle.get_rl_ids():
-                    rl_vehicle_speeds[
-                        segment, lane_list[i]
-                    ] += self.k.vehicle.get_speed(id)
-                    num_rl_vehicles[segment, lane_list[i]] += 1
-                else:
-                    vehicle_speeds[segment, lane_list[i]] += self.k.vehicle.get_speed(
-                        id
-                    )
-                    num_vehicles[segment, lane_list[i]] += 1
-
-            # normalize
-
-            num_vehicles /= NUM_VEHICLE_NORM
-            num_rl_vehicles /= NUM_VEHICLE_NORM
-            num_vehicles_list += num_vehicles.flatten().tolist()
-            num_rl_vehicles_list += num_rl_vehicles.flatten().tolist()
-            vehicle_speeds_list += vehicle_speeds.flatten().tolist()
-            rl_speeds_list += rl_vehicle_speeds.flatten().tolist()
-
-        unnorm_veh_list = np.asarray(num_vehicles_list) * NUM_VEHICLE_NORM
-        unnorm_rl_list = np.asarray(num_rl_vehicles_list) * NUM_VEHICLE_NORM
+        stats = self.k.vehicle.get_edge_stats(
+            EDGE_LIST, [self.obs_slices[edge] for edge in EDGE_LIST]
+        )
+        num_rl_vehicles = stats["rl_count"]
+        num_vehicles = stats["count"] - num_rl_vehicles
+        rl_speeds = stats["rl_speed_sum"]
+        vehicle_speeds = stats["speed_sum"] - rl_speeds
 
         # compute the mean speed if the speed isn't zero
-        num_rl = len(num_rl_vehicles_list)
-        num_veh = len(num_vehicles_list)
-        mean_speed = np.nan_to_num(
-            [
-                vehicle_speeds_list[i] / unnorm_veh_list[i]
-                if int(unnorm_veh_list[i])
-                else 0
-                for i in range(num_veh)
-            ]
+        mean_speed = np.divide(
+            vehicle_speeds,
+            num_vehicles,
+            out=np.zeros_like(vehicle_speeds),
+            where=num_vehicles > 0,
         )
         mean_speed_norm = mean_speed / 50
         mean_rl_speed = (
-            np.nan_to_num(
-                [
-                    rl_speeds_list[i] / unnorm_rl_list[i]
-                    if int(unnorm_rl_list[i])
-                    else 0
-                    for i in range(num_rl)
-                ]
+            np.divide(
+                rl_speeds,
+                num_rl_vehicles,
+                out=np.zeros_like(rl_speeds),
+                where=num_rl_vehicles > 0,
             )
             / 50
         )
@@ -1032,8 +957,8 @@ class BottleneckDesiredVelocityEnv(BottleneckEnv):
         )
         return np.concatenate(
             (
-                num_vehicles_list,
-                num_rl_vehicles_list,
+                num_vehicles / NUM_VEHICLE_NORM,
+                num_rl_vehicles / NUM_VEHICLE_NORM,
                 mean_speed_norm,
                 mean_rl_speed,
                 [outflow],
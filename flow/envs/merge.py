@@ -7,6 +7,7 @@ TODO(ak): add paper after it has been published.
 
 from flow.envs.base import Env
 from flow.core import rewards
+from flow.core.observation import ObservationBuilder
 
 from gymnasium.spaces.box import Box
 
@@ -90,6 +91,10 @@ class MergePOEnv(Env):
         # maximum number of controlled vehicles
         self.num_rl = env_params.additional_params["num_rl"]
 
+        # layout of the observations: the data of every controlled vehicle
+        self.obs_builder = ObservationBuilder()
+        self.obs_builder.add("rl", (self.num_rl, 5))
+
         # queue of rl vehicles waiting to be controlled
         self.rl_queue = collections.deque()
 
@@ -123,7 +128,7 @@ class MergePOEnv(Env):
     @property
     def observation_space(self):
         """See class definition."""
-        return Box(low=-np.inf, high=np.inf, shape=(5 * self.num_rl,), dtype=np.float32)
+        return self.obs_builder.space()
 
     def get_additional_rl_control_info(self):
         acc_controller_actions = []
@@ -157,7 +162,8 @@ class MergePOEnv(Env):
         max_speed = self.k.network.max_speed()
         max_length = self.k.network.length()
 
-        observation = [0 for _ in range(5 * self.num_rl)]
+        observation, fields = self.obs_builder.new()
+        rl_obs = fields["rl"]
         for i, rl_id in enumerate(self.rl_veh):
             this_speed = self.k.vehicle.get_speed(rl_id)
             lead_id = self.k.vehicle.get_leader(rl_id)
@@ -185,11 +191,13 @@ class MergePOEnv(Env):
                 follow_speed = self.k.vehicle.get_speed(follower)
                 follow_head = self.k.vehicle.get_headway(follower)
 
-            observation[5 * i + 0] = this_speed / max_speed
-            observation[5 * i + 1] = (lead_speed - this_speed) / max_speed
-            observation[5 * i + 2] = lead_head / max_length
-            observation[5 * i + 3] = (this_speed - follow_speed) / max_speed
-            observation[5 * i + 4] = follow_head / max_length
+            rl_obs[i] = [
+                this_speed / max_speed,
+                (lead_speed - this_speed) / max_speed,
+                lead_head / max_length,
+                (this_speed - follow_speed) / max_speed,
+                follow_head / max_length,
+            ]
 
         return observation
 
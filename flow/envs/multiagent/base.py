@@ -1,16 +1,11 @@
 """Environment for training multi-agent experiments."""
 
-from copy import deepcopy
 import numpy as np
-import random
-import traceback
 from gymnasium.spaces import Box
 
-from traci.exceptions import FatalTraCIError
-from traci.exceptions import TraCIException
-
 from ray.rllib.env import MultiAgentEnv
 
+from flow.controllers.base_controller import get_batch_actions
 from flow.envs.base import Env
 from flow.utils.exceptions import FatalFlowError
 
@@ -48,20 +43,28 @@ class MultiEnv(MultiAgentEnv, Env):
         info : dict
             contains other diagnostic information from the previous action
         """
+        profiler = self.profiler
+        profiler.start_step()
+
         for _ in range(self.env_params.sims_per_step):
             self.time_counter += 1
             self.step_counter += 1
+            t = profiler.tic()
 
             # perform acceleration actions for controlled human-driven vehicles
             if len(self.k.vehicle.get_controlled_ids()) > 0:
-                accel = []
-                for veh_id in self.k.vehicle.get_controlled_ids():
-                    accel_contr = self.k.vehicle.get_acc_controller(veh_id)
-                    action = accel_contr.get_action(self)
-                    accel.append(action)
+                if self.env_params.batch_controllers:
+                    accel = get_batch_actions(self, self.k.vehicle.get_controlled_ids())
+                else:
+                    accel = []
+                    for veh_id in self.k.vehicle.get_controlled_ids():
+                        accel_contr = self.k.vehicle.get_acc_controller(veh_id)
+                        action = accel_contr.get_action(self)
+                        accel.append(action)
                 self.k.vehicle.apply_acceleration(
                     self.k.vehicle.get_controlled_ids(), accel
                 )
+            t = profiler.toc("controllers", t)
 
             # perform lane change actions for controlled human-driven vehicles
             if len(self.k.vehicle.get_controlled_lc_ids()) > 0:
@@ -74,27 +77,32 @@ class MultiEnv(MultiAgentEnv, Env):
                 self.k.vehicle.apply_lane_change(
                     self.k.vehicle.get_controlled_lc_ids(), direction=direction
                 )
-
-            # perform (optionally) routing actions for all vehicle in the
-            # network, including rl and sumo-controlled vehicles
-            routing_ids = []
-            routing_actions = []
-            for veh_id in self.k.vehicle.get_ids():
-                if self.k.vehicle.get_routing_controller(veh_id) is not None:
-                    routing_ids.append(veh_id)
-                    route_contr = self.k.vehicle.get_routing_controller(veh_id)
-                    routing_actions.append(route_contr.choose_route(self))
+            t = profiler.toc("lane_change", t)
+
+            # perform (optionally) routing actions for the vehicles whose
+            # routes may need to be updated, including rl and sumo-controlled
+            # vehicles
+            routing_ids = self.k.vehicle.get_routing_ids()
+            routing_actions = [
+                self.k.vehicle.get_routing_controller(veh_id).choose_route(self)
+                for veh_id in routing_ids
+            ]
             self.k.vehicle.choose_routes(routing_ids, routing_actions)
+            t = profiler.toc("routing", t)
 
             self.apply_rl_actions(rl_actions)
+            t = profiler.toc("apply_rl_actions", t)
 
             self.additional_command()
+            t = profiler.toc("additional_command", t)
 
             # advance the simulation in the simulator by one step
             self.k.simulation.simulation_step()
+            profiler.toc("simulation_step", t)
 
             # store new observations in the vehicles and traffic lights class
             self.k.update(reset=False)
+            self._reward_features = None
 
             # update the colors of vehicles
             if self.sim_params.render:
@@ -107,7 +115,9 @@ class MultiEnv(MultiAgentEnv, Env):
             if crash:
                 break
 
+        t = profiler.tic()
         states = self.get_state()
+        profiler.toc("get_state", t)
         done = {key: key in self.k.vehicle.get_arrived_ids() for key in states.keys()}
         if crash or (
             self.time_counter
@@ -120,11 +130,18 @@ class MultiEnv(MultiAgentEnv, Env):
         infos = {key: {} for key in states.keys()}
 
         # compute the reward
+        t = profiler.tic()
         if self.env_params.clip_actions:
             clipped_actions = self.clip_actions(rl_actions)
             reward = self.compute_reward(clipped_actions, fail=crash)
         else:
             reward = self.compute_reward(rl_actions, fail=crash)
+        profiler.toc("compute_reward", t)
+
+        if getattr(self.sim_params, "profile", False) == "infos":
+            profile = profiler.last_step()
+            for key in infos:
+                infos[key]["profile"] = profile
 
         for rl_id in self.k.vehicle.get_arrived_rl_ids(self.env_params.sims_per_step):
             done[rl_id] = True
@@ -149,6 +166,8 @@ class MultiEnv(MultiAgentEnv, Env):
             the initial observation of the space. The initial reward is assumed
             to be zero.
         """
+        t = self.profiler.tic()
+
         # reset the time counter
         self.time_counter = 0
 
@@ -181,10 +200,9 @@ class MultiEnv(MultiAgentEnv, Env):
         ):
             self.step_counter = 0
             # issue a random seed to induce randomness into the next rollout
-            self.sim_params.seed = random.randint(0, 1e5)
+            self.sim_params.seed = self._restart_seed()
 
-            self.k.vehicle = deepcopy(self.initial_vehicles)
-            self.k.vehicle.master_kernel = self.k
+            self.k.vehicle = self._vehicle_template.restore(self.k)
             # restart the sumo instance
             self.restart_simulation(self.sim_params)
 
@@ -192,62 +210,25 @@ class MultiEnv(MultiAgentEnv, Env):
         elif self.initial_config.shuffle:
             self.setup_initial_state()
 
-        # clear all vehicles from the network and the vehicles class
-        if self.simulator == "traci":
-            for veh_id in self.k.kernel_api.vehicle.getIDList():  # FIXME: hack
-                try:
-                    self.k.vehicle.remove(veh_id)
-                except (FatalTraCIError, TraCIException):
-                    print(traceback.format_exc())
-
-        # clear all vehicles from the network and the vehicles class
-        # FIXME (ev, ak) this is weird and shouldn't be necessary
-        for veh_id in list(self.k.vehicle.get_ids()):
-            # do not try to remove the vehicles from the network in the first
-            # step after initializing the network, as there will be no vehicles
-            if self.step_counter == 0:
-                continue
-            try:
-                self.k.vehicle.remove(veh_id)
-            except (FatalTraCIError, TraCIException):
-                print("Error during start: {}".format(traceback.format_exc()))
-
-        # do any additional resetting of the vehicle class needed
-        self.k.vehicle.reset()
-
-        # reintroduce the initial vehicles to the network
-        for veh_id in self.initial_ids:
-            type_id, edge, lane_index, pos, speed = self.initial_state[veh_id]
-
-            try:
-                self.k.vehicle.add(
-                    veh_id=veh_id,
-                    type_id=type_id,
-                    edge=edge,
-                    lane=lane_index,
-                    pos=pos,
-                    speed=speed,
-                )
-            except (FatalTraCIError, TraCIException):
-                # if a vehicle was not removed in the first attempt, remove it
-                # now and then reintroduce it
-                self.k.vehicle.remove(veh_id)
-                if self.simulator == "traci":
-                    self.k.kernel_api.vehicle.remove(veh_id)  # FIXME: hack
-                self.k.vehicle.add(
-                    veh_id=veh_id,
-                    type_id=type_id,
-                    edge=edge,
-                    lane=lane_index,
-                    pos=pos,
-                    speed=speed,
-                )
+        # restore the state saved at the end of the first reset (if any),
+        # instead of removing and adding back all vehicles
+        if self._snapshot_path is not None:
+            self._load_snapshot()
+            self.profiler.toc("reset", t)
+
+            # render a frame
+            self.render(reset=True)
+
+            return self.get_state()
+
+        self._reset_vehicles()
 
         # advance the simulation in the simulator by one step
         self.k.simulation.simulation_step()
 
         # update the information in each kernel to match the current state
         self.k.update(reset=True)
+        self._reward_features = None
 
         # update the colors of vehicles
         if self.sim_params.render:
@@ -266,10 +247,16 @@ class MultiEnv(MultiAgentEnv, Env):
                 msg += "- {}: {}\n".format(veh_id, self.initial_state[veh_id])
             raise FatalFlowError(msg=msg)
 
+        self.profiler.toc("reset", t)
+
         # perform (optional) warm-up steps before training
         for _ in range(self.env_params.warmup_steps):
             observation, _, _, _ = self.step(rl_actions=None)
 
+        # save the current state, to be restored by the following resets
+        if self.reset_mode == "snapshot":
+            self._save_snapshot()
+
         # render a frame
         self.render(reset=True)
 
@@ -11,13 +11,11 @@ abs/1710.05465, 2017. [Online]. Available: https://arxiv.org/abs/1710.05465
 import numpy as np
 from gymnasium.spaces.box import Box
 import random
-from scipy.optimize import fsolve
-from copy import deepcopy
 
 from flow.core.params import InitialConfig
 from flow.core.params import NetParams
 from flow.envs.multiagent.base import MultiEnv
-from flow.envs.ring.wave_attenuation import v_eq_max_function
+from flow.envs.ring.wave_attenuation import get_v_eq_max
 
 
 ADDITIONAL_ENV_PARAMS = {
@@ -309,15 +307,10 @@ class MultiAgentWaveAttenuationPOEnv(MultiEnv):
         self.network = self.network.__class__(
             self.network.orig_name, self.network.vehicles, net_params, initial_config
         )
-        self.k.vehicle = deepcopy(self.initial_vehicles)
-        self.k.vehicle.kernel_api = self.k.kernel_api
-        self.k.vehicle.master_kernel = self.k
+        self.k.vehicle = self._vehicle_template.restore(self.k)
 
         # solve for the velocity upper bound of the ring
-        v_guess = 4
-        v_eq_max = fsolve(
-            v_eq_max_function, np.array(v_guess), args=(len(self.initial_ids), length)
-        )[0]
+        v_eq_max = get_v_eq_max(len(self.initial_ids), length)
 
         print("\n-----------------------")
         print("ring length:", net_params.additional_params["length"])
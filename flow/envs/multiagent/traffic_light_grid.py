@@ -54,6 +54,23 @@ class MultiTrafficLightGridPOEnv(TrafficLightGridPOEnv, MultiEnv):
         # number of nearest edges to observe, defaults to 4
         self.num_local_edges = env_params.additional_params.get("num_local_edges", 4)
 
+        # indices of the local edges in the edge list, and of the local lights,
+        # of every traffic light
+        edge_list = self.k.network.get_edge_list()
+        self._local_indices = {}
+        for rl_id, edges in self.network.node_mapping:
+            rl_id_num = int(rl_id.split("center")[ID_IDX])
+            self._local_indices[rl_id] = (
+                [edge_list.index(e) for e in edges],
+                [
+                    rl_id_num,
+                    self._get_relative_node(rl_id, "top"),
+                    self._get_relative_node(rl_id, "bottom"),
+                    self._get_relative_node(rl_id, "left"),
+                    self._get_relative_node(rl_id, "right"),
+                ],
+            )
+
     @property
     def observation_space(self):
         """State space that is partially observed.
@@ -94,87 +111,30 @@ class MultiTrafficLightGridPOEnv(TrafficLightGridPOEnv, MultiEnv):
         included), gives the traffic light information, including the last
         change time, light direction (i.e. phase), and a currently_yellow flag.
         """
-        # Normalization factors
-        max_speed = max(
-            self.k.network.speed_limit(edge) for edge in self.k.network.get_edge_list()
-        )
-        grid_array = self.net_params.additional_params["grid_array"]
-        max_dist = max(
-            grid_array["short_length"],
-            grid_array["long_length"],
-            grid_array["inner_length"],
-        )
-
-        # TODO(cathywu) refactor TrafficLightGridPOEnv with convenience
-        # methods for observations, but remember to flatten for single-agent
-
-        # Observed vehicle information
-        speeds = []
-        dist_to_intersec = []
-        edge_number = []
-        all_observed_ids = []
-        for _, edges in self.network.node_mapping:
-            local_speeds = []
-            local_dists_to_intersec = []
-            local_edge_numbers = []
-            for edge in edges:
-                observed_ids = self.get_closest_to_intersection(edge, self.num_observed)
-                all_observed_ids.append(observed_ids)
-
-                # check which edges we have so we can always pad in the right
-                # positions
-                local_speeds.extend(
-                    [
-                        self.k.vehicle.get_speed(veh_id) / max_speed
-                        for veh_id in observed_ids
-                    ]
-                )
-                local_dists_to_intersec.extend(
-                    [
-                        (
-                            self.k.network.edge_length(self.k.vehicle.get_edge(veh_id))
-                            - self.k.vehicle.get_position(veh_id)
-                        )
-                        / max_dist
-                        for veh_id in observed_ids
-                    ]
-                )
-                local_edge_numbers.extend(
-                    [
-                        self._convert_edge(self.k.vehicle.get_edge(veh_id))
-                        / (self.k.network.network.num_edges - 1)
-                        for veh_id in observed_ids
-                    ]
-                )
-
-                if len(observed_ids) < self.num_observed:
-                    diff = self.num_observed - len(observed_ids)
-                    local_speeds.extend([1] * diff)
-                    local_dists_to_intersec.extend([1] * diff)
-                    local_edge_numbers.extend([0] * diff)
+        max_speed = self._max_speed
 
-            speeds.append(local_speeds)
-            dist_to_intersec.append(local_dists_to_intersec)
-            edge_number.append(local_edge_numbers)
+        # Observed vehicle information, with one row for every incoming edge
+        self._update_observed_vehicles(pad=1)
+        speeds = self._observed_speeds
+        dist_to_intersec = self._observed_dists
+        edge_number = self._observed_edge_nums
 
         # Edge information
-        density = []
-        velocity_avg = []
-        for edge in self.k.network.get_edge_list():
-            ids = self.k.vehicle.get_ids_by_edge(edge)
-            if len(ids) > 0:
-                # TODO(cathywu) Why is there a 5 here?
-                density += [5 * len(ids) / self.k.network.edge_length(edge)]
-                velocity_avg += [
-                    np.mean([self.k.vehicle.get_speed(veh_id) for veh_id in ids])
-                    / max_speed
-                ]
-            else:
-                density += [0]
-                velocity_avg += [0]
-        density = np.array(density)
-        velocity_avg = np.array(velocity_avg)
-        self.observed_ids = all_observed_ids
+        stats = self.k.vehicle.get_edge_stats(
+            self.k.network.get_edge_list(), by_lane=False
+        )
+        num_veh = stats["count"]
+        # TODO(cathywu) Why is there a 5 here?
+        density = 5 * num_veh / self._edge_lengths
+        velocity_avg = (
+            np.divide(
+                stats["speed_sum"],
+                num_veh,
+                out=np.zeros_like(num_veh),
+                where=num_veh > 0,
+            )
+            / max_speed
+        )
 
         # Traffic light information
         direction = self.direction.flatten()
@@ -188,27 +148,16 @@ class MultiTrafficLightGridPOEnv(TrafficLightGridPOEnv, MultiEnv):
 
         obs = {}
         # TODO(cathywu) allow differentiation between rl and non-rl lights
-        node_to_edges = self.network.node_mapping
         for rl_id in self.k.traffic_light.get_ids():
-            rl_id_num = int(rl_id.split("center")[ID_IDX])
-            local_edges = node_to_edges[rl_id_num][1]
-            local_edge_numbers = [
-                self.k.network.get_edge_list().index(e) for e in local_edges
-            ]
-            local_id_nums = [
-                rl_id_num,
-                self._get_relative_node(rl_id, "top"),
-                self._get_relative_node(rl_id, "bottom"),
-                self._get_relative_node(rl_id, "left"),
-                self._get_relative_node(rl_id, "right"),
-            ]
+            rows = self._node_edges[rl_id]
+            local_edge_numbers, local_id_nums = self._local_indices[rl_id]
 
             observation = np.array(
                 np.concatenate(
                     [
-                        speeds[rl_id_num],
-                        dist_to_intersec[rl_id_num],
-                        edge_number[rl_id_num],
+                        speeds[rows].flatten(),
+                        dist_to_intersec[rows].flatten(),
+                        edge_number[rows].flatten(),
                         density[local_edge_numbers],
                         velocity_avg[local_edge_numbers],
                         direction[local_id_nums],
@@ -282,10 +231,3 @@ class MultiTrafficLightGridPOEnv(TrafficLightGridPOEnv, MultiEnv):
         for rl_id in rl_actions.keys():
             rews[rl_id] = rew
         return rews
-
-    def additional_command(self):
-        """See class definition."""
-        # specify observed vehicles
-        for veh_ids in self.observed_ids:
-            for veh_id in veh_ids:
-                self.k.vehicle.set_observed(veh_id)
@@ -1,6 +1,7 @@
 """Environment for training the acceleration behavior of vehicles in a ring."""
 
 from flow.core import rewards
+from flow.core.observation import ObservationBuilder
 from flow.envs.base import Env
 
 from gymnasium.spaces.box import Box
@@ -79,6 +80,12 @@ class AccelEnv(Env):
         self.eta = float(env_params.additional_params["eta"])
         super().__init__(env_params, sim_params, network, simulator, path=path)
 
+        # layout of the observations: the speed and position of every vehicle
+        num_vehicles = self.initial_vehicles.num_vehicles
+        self.obs_builder = ObservationBuilder()
+        self.obs_builder.add("speed", num_vehicles)
+        self.obs_builder.add("pos", num_vehicles)
+
     @property
     def action_space(self):
         """See class definition."""
@@ -93,12 +100,7 @@ class AccelEnv(Env):
     def observation_space(self):
         """See class definition."""
         self.obs_var_labels = ["Velocity", "Absolute_pos"]
-        return Box(
-            low=0,
-            high=1,
-            shape=(2 * self.initial_vehicles.num_vehicles,),
-            dtype=np.float32,
-        )
+        return self.obs_builder.space(low=0, high=1)
 
     def _apply_rl_actions(self, rl_actions):
         """See class definition."""
@@ -142,17 +144,21 @@ class AccelEnv(Env):
         return float(reward)
 
     def get_state(self):
-        """See class definition."""
-        speed = [
-            self.k.vehicle.get_speed(veh_id) / self.k.network.max_speed()
-            for veh_id in self.sorted_ids
-        ]
-        pos = [
-            self.k.vehicle.get_x_by_id(veh_id) / self.k.network.length()
-            for veh_id in self.sorted_ids
-        ]
+        """See class definition.
 
-        return np.array(speed + pos)
+        Vehicles in excess of the initial number of vehicles are not observed,
+        and the entries of missing vehicles are padded with zeros.
+        """
+        obs, fields = self.obs_builder.new()
+        ids = self.sorted_ids[: len(fields["speed"])]
+        fields["speed"][: len(ids)] = (
+            np.asarray(self.k.vehicle.get_speed(ids)) / self.k.network.max_speed()
+        )
+        fields["pos"][: len(ids)] = (
+            np.asarray(self.k.vehicle.get_x_by_id(ids)) / self.k.network.length()
+        )
+
+        return obs
 
     def additional_command(self):
         """See parent class.
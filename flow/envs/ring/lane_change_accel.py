@@ -76,6 +76,9 @@ class LaneChangeAccelEnv(AccelEnv):
 
         super().__init__(env_params, sim_params, network, simulator, path=path)
 
+        # the lane of every vehicle is also observed
+        self.obs_builder.add("lane", self.initial_vehicles.num_vehicles)
+
     @property
     def action_space(self):
         """See class definition."""
@@ -90,12 +93,7 @@ class LaneChangeAccelEnv(AccelEnv):
     @property
     def observation_space(self):
         """See class definition."""
-        return Box(
-            low=0,
-            high=1,
-            shape=(3 * self.initial_vehicles.num_vehicles,),
-            dtype=np.float32,
-        )
+        return self.obs_builder.space(low=0, high=1)
 
     def compute_reward(self, rl_actions, **kwargs):
         """See class definition."""
@@ -112,25 +110,17 @@ class LaneChangeAccelEnv(AccelEnv):
         return reward
 
     def get_state(self):
-        """See class definition."""
-        # normalizers
-        max_speed = self.k.network.max_speed()
-        length = self.k.network.length()
+        """See parent class."""
         max_lanes = max(
             self.k.network.num_lanes(edge) for edge in self.k.network.get_edge_list()
         )
 
-        speed = [
-            self.k.vehicle.get_speed(veh_id) / max_speed for veh_id in self.sorted_ids
-        ]
-        pos = [
-            self.k.vehicle.get_x_by_id(veh_id) / length for veh_id in self.sorted_ids
-        ]
-        lane = [
-            self.k.vehicle.get_lane(veh_id) / max_lanes for veh_id in self.sorted_ids
-        ]
+        obs = super().get_state()
+        lane = self.obs_builder.view(obs, "lane")
+        ids = self.sorted_ids[: len(lane)]
+        lane[: len(ids)] = np.asarray(self.k.vehicle.get_lane(ids)) / max_lanes
 
-        return np.array(speed + pos + lane)
+        return obs
 
     def _apply_rl_actions(self, actions):
         """See class definition."""
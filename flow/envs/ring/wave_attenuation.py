@@ -14,7 +14,7 @@ from flow.envs.base import Env
 
 from gymnasium.spaces.box import Box
 
-from copy import deepcopy
+from functools import lru_cache
 import numpy as np
 import random
 from scipy.optimize import fsolve
@@ -47,6 +47,30 @@ def v_eq_max_function(v, *args):
     return error
 
 
+@lru_cache(maxsize=None)
+def get_v_eq_max(num_vehicles, length):
+    """Return the velocity upper bound of a ring road.
+
+    This is the equilibrium velocity in the presence of one rl vehicle (see
+    v_eq_max_function). Ring lengths are drawn from a small set of integers
+    at every reset, so the solutions are cached.
+
+    Parameters
+    ----------
+    num_vehicles : int
+        number of vehicles in the ring
+    length : int
+        length of the ring
+
+    Returns
+    -------
+    float
+        the velocity upper bound
+    """
+    v_guess = 4
+    return fsolve(v_eq_max_function, np.array(v_guess), args=(num_vehicles, length))[0]
+
+
 class WaveAttenuationEnv(Env):
     """Fully observable wave attenuation environment.
 
@@ -189,15 +213,10 @@ class WaveAttenuationEnv(Env):
         self.network = self.network.__class__(
             self.network.orig_name, self.network.vehicles, net_params, initial_config
         )
-        self.k.vehicle = deepcopy(self.initial_vehicles)
-        self.k.vehicle.kernel_api = self.k.kernel_api
-        self.k.vehicle.master_kernel = self.k
+        self.k.vehicle = self._vehicle_template.restore(self.k)
 
         # solve for the velocity upper bound of the ring
-        v_guess = 4
-        v_eq_max = fsolve(
-            v_eq_max_function, np.array(v_guess), args=(len(self.initial_ids), length)
-        )[0]
+        v_eq_max = get_v_eq_max(len(self.initial_ids), length)
 
         print("\n-----------------------")
         print("ring length:", net_params.additional_params["length"])
@@ -86,6 +86,11 @@ class TrafficLightGridEnv(Env):
     obs_var_labels : dict
         Referenced in the visualizer. Tells the visualizer which
         metrics to track
+    tl_ids : list of str
+        Names of the nodes of the traffic lights, in the order of the actions
+    exit_edges : dict < str, str >
+        Edges where vehicles exit the network, mapped to the entrance edges
+        where they are placed back, see TrafficLightGridNetwork.exit_edges
     node_mapping : dict
         Dictionary mapping intersections / nodes (nomenclature is used
         interchangeably here) to the edges that are leading to said
@@ -120,6 +125,11 @@ class TrafficLightGridEnv(Env):
         # self.num_observed = self.grid_array.get("num_observed", 3)
         self.num_traffic_lights = self.rows * self.cols
         self.tl_type = env_params.additional_params.get("tl_type")
+        # names of the nodes of the traffic lights
+        self.tl_ids = ["center{}".format(i) for i in range(self.num_traffic_lights)]
+        # edges where vehicles exit the network, and where they re-enter it
+        self.exit_edges = network.exit_edges
+        self._exit_edge_ids = np.array(list(self.exit_edges))
 
         super().__init__(env_params, sim_params, network, simulator, path=path)
 
@@ -151,7 +161,7 @@ class TrafficLightGridEnv(Env):
 
         if self.tl_type != "actuated":
             for i in range(self.rows * self.cols):
-                self.k.traffic_light.set_state(node_id="center" + str(i), state="GrGr")
+                self.k.traffic_light.set_state(node_id=self.tl_ids[i], state="GrGr")
                 self.currently_yellow[i] = 0
 
         # # Additional Information for Plotting
@@ -247,34 +257,29 @@ class TrafficLightGridEnv(Env):
             # should happen
             rl_mask = rl_actions > 0.0
 
-        for i, action in enumerate(rl_mask):
-            if self.currently_yellow[i] == 1:  # currently yellow
-                self.last_change[i] += self.sim_step
-                # Check if our timer has exceeded the yellow phase, meaning it
-                # should switch to red
-                if self.last_change[i] >= self.min_switch_time:
-                    if self.direction[i] == 0:
-                        self.k.traffic_light.set_state(
-                            node_id="center{}".format(i), state="GrGr"
-                        )
-                    else:
-                        self.k.traffic_light.set_state(
-                            node_id="center{}".format(i), state="rGrG"
-                        )
-                    self.currently_yellow[i] = 0
+        yellow = self.currently_yellow[:, 0] == 1
+        direction = self.direction[:, 0].copy()
+
+        # the timer of the yellow lights is incremented. If it exceeded the
+        # yellow phase, the light switches to red
+        self.last_change[yellow] += self.sim_step
+        to_red = yellow & (self.last_change[:, 0] >= self.min_switch_time)
+
+        # the other lights switch to yellow if requested
+        to_yellow = ~yellow & np.asarray(rl_mask, dtype=bool)
+
+        # only the lights that change are set
+        for i in np.flatnonzero(to_red | to_yellow):
+            if to_red[i]:
+                state = "GrGr" if direction[i] == 0 else "rGrG"
             else:
-                if action:
-                    if self.direction[i] == 0:
-                        self.k.traffic_light.set_state(
-                            node_id="center{}".format(i), state="yryr"
-                        )
-                    else:
-                        self.k.traffic_light.set_state(
-                            node_id="center{}".format(i), state="ryry"
-                        )
-                    self.last_change[i] = 0.0
-                    self.direction[i] = not self.direction[i]
-                    self.currently_yellow[i] = 1
+                state = "yryr" if direction[i] == 0 else "ryry"
+            self.k.traffic_light.set_state(node_id=self.tl_ids[i], state=state)
+
+        self.currently_yellow[to_red] = 0
+        self.last_change[to_yellow] = 0.0
+        self.direction[to_yellow] = 1 - self.direction[to_yellow]
+        self.currently_yellow[to_yellow] = 1
 
     def compute_reward(self, rl_actions, **kwargs):
         """See class definition."""
@@ -435,51 +440,23 @@ class TrafficLightGridEnv(Env):
         Used to insert vehicles that are on the exit edge and place them
         back on their entrance edge.
         """
-        for veh_id in self.k.vehicle.get_ids():
-            self._reroute_if_final_edge(veh_id)
-
-    def _reroute_if_final_edge(self, veh_id):
-        """Reroute vehicle associated with veh_id.
-
-        Checks if an edge is the final edge. If it is return the route it
-        should start off at.
-        """
-        edge = self.k.vehicle.get_edge(veh_id)
-        if edge == "":
+        veh_ids = self.k.vehicle.get_ids()
+        if len(veh_ids) == 0:
             return
-        if edge[0] == ":":  # center edge
+
+        # find the vehicles on an exit edge
+        edges = np.asarray(self.k.vehicle.get_edge(veh_ids))
+        exiting = np.flatnonzero(np.isin(edges, self._exit_edge_ids))
+        if len(exiting) == 0:
             return
-        pattern = re.compile(r"[a-zA-Z]+")
-        edge_type = pattern.match(edge).group()
-        edge = edge.split(edge_type)[1].split("_")
-        row_index, col_index = [int(x) for x in edge]
-
-        # find the route that we're going to place the vehicle on if we are
-        # going to remove it
-        route_id = None
-        if edge_type == "bot" and col_index == self.cols:
-            route_id = "bot{}_0".format(row_index)
-        elif edge_type == "top" and col_index == 0:
-            route_id = "top{}_{}".format(row_index, self.cols)
-        elif edge_type == "left" and row_index == 0:
-            route_id = "left{}_{}".format(self.rows, col_index)
-        elif edge_type == "right" and row_index == self.rows:
-            route_id = "right0_{}".format(col_index)
-
-        if route_id is not None:
-            type_id = self.k.vehicle.get_type(veh_id)
-            lane_index = self.k.vehicle.get_lane(veh_id)
-            # remove the vehicle
-            self.k.vehicle.remove(veh_id)
-            # reintroduce it at the start of the network
-            self.k.vehicle.add(
-                veh_id=veh_id,
-                edge=route_id,
-                type_id=str(type_id),
-                lane=str(lane_index),
-                pos="0",
-                speed="max",
-            )
+
+        # reintroduce them at the start of the network
+        self.k.vehicle.reinsert(
+            veh_ids=[veh_ids[i] for i in exiting],
+            edges=[self.exit_edges[edges[i]] for i in exiting],
+            pos="0",
+            speed="max",
+        )
 
     def get_closest_to_intersection(self, edges, num_closest, padding=False):
         """Return the IDs of the vehicles that are closest to an intersection.
@@ -563,23 +540,68 @@ class TrafficLightGridEnv(Env):
                 "be positive".format(num_closest)
             )
 
-        if isinstance(edges, list):
-            ids = [
-                self.get_closest_to_intersection(edge, num_closest) for edge in edges
-            ]
-            # flatten the list and return it
-            return [veh_id for sublist in ids for veh_id in sublist]
-
-        # get the ids of all the vehicles on the edge 'edges' ordered by
-        # increasing distance to end of edge (intersection)
-        veh_ids_ordered = sorted(
-            self.k.vehicle.get_ids_by_edge(edges), key=self.get_distance_to_intersection
+        edge_list = edges if isinstance(edges, list) else [edges]
+        veh_ids, edge_index, rank, _ = self._closest_to_intersection(
+            edge_list, num_closest
         )
+        if not padding:
+            return veh_ids
 
         # return the ids of the num_closest vehicles closest to the
         # intersection, potentially with ""-padding.
-        pad_lst = [""] * (num_closest - len(veh_ids_ordered))
-        return veh_ids_ordered[:num_closest] + (pad_lst if padding else [])
+        padded_ids = [""] * (len(edge_list) * num_closest)
+        for veh_id, i, j in zip(veh_ids, edge_index, rank):
+            padded_ids[i * num_closest + j] = veh_id
+        return padded_ids
+
+    def _closest_to_intersection(self, edges, num_closest, edge_lengths=None):
+        """Return the vehicles closest to the intersection on several edges.
+
+        All vehicles on the edges are sorted at once, by edge and then by
+        increasing distance to the end of the edge (intersection).
+
+        Parameters
+        ----------
+        edges : list of str
+            names of the edges
+        num_closest : int
+            maximum number of vehicles returned for every edge
+        edge_lengths : array_like, optional
+            lengths of the edges. Computed from the network if not specified.
+
+        Returns
+        -------
+        list of str
+            ids of the num_closest vehicles closest to the intersection on every
+            edge, ordered by edge and then by increasing distance
+        np.ndarray
+            index of the edge of every returned vehicle in edges
+        np.ndarray
+            rank of every returned vehicle on its edge (0 for the vehicle
+            closest to the intersection)
+        np.ndarray
+            distance of every returned vehicle to the intersection
+        """
+        if edge_lengths is None:
+            edge_lengths = [self.k.network.edge_length(edge) for edge in edges]
+
+        ids_by_edge = [self.k.vehicle.get_ids_by_edge(edge) for edge in edges]
+        counts = np.array([len(ids) for ids in ids_by_edge], dtype=np.int64)
+        veh_ids = [veh_id for ids in ids_by_edge for veh_id in ids]
+        edge_index = np.repeat(np.arange(len(edges)), counts)
+        dist = np.asarray(edge_lengths, dtype=np.float64)[edge_index] - np.asarray(
+            self.k.vehicle.get_position(veh_ids), dtype=np.float64
+        )
+
+        # the sort is stable, so ties are kept in the order of the vehicles
+        # on every edge
+        order = np.lexsort((dist, edge_index))
+        start = np.cumsum(counts) - counts
+        rank = np.arange(len(order)) - start[edge_index[order]]
+        order = order[rank < num_closest]
+        rank = rank[rank < num_closest]
+
+        return [veh_ids[i] for i in order], edge_index[order], rank, dist[order]
 
 
 class TrafficLightGridPOEnv(TrafficLightGridEnv):
@@ -631,6 +653,44 @@ class TrafficLightGridPOEnv(TrafficLightGridEnv):
         # used during visualization
         self.observed_ids = []
 
+        # incoming edges of all nodes, in the order of the node mapping, and
+        # the slice of these edges corresponding to every node
+        self._observed_edges = []
+        self._node_edges = {}
+        for node, edges in self.network.node_mapping:
+            start = len(self._observed_edges)
+            self._observed_edges += edges
+            self._node_edges[node] = slice(start, len(self._observed_edges))
+        self._observed_edge_lengths = np.array(
+            [self.k.network.edge_length(edge) for edge in self._observed_edges]
+        )
+        self._observed_edge_numbers = np.array(
+            self._convert_edge(self._observed_edges), dtype=np.float64
+        ) / (self.k.network.network.num_edges - 1)
+        self._edge_lengths = np.array(
+            [
+                self.k.network.edge_length(edge)
+                for edge in self.k.network.get_edge_list()
+            ]
+        )
+
+        # normalizing terms for the speeds and distances
+        self._max_speed = max(
+            self.k.network.speed_limit(edge) for edge in self.k.network.get_edge_list()
+        )
+        self._max_dist = max(
+            self.grid_array["short_length"],
+            self.grid_array["long_length"],
+            self.grid_array["inner_length"],
+        )
+
+        # observations of the vehicles closest to every intersection, with
+        # one row for every incoming edge
+        shape = (len(self._observed_edges), self.num_observed)
+        self._observed_speeds = np.zeros(shape)
+        self._observed_dists = np.zeros(shape)
+        self._observed_edge_nums = np.zeros(shape)
+
     @property
     def observation_space(self):
         """State space that is partially observed.
@@ -658,69 +718,27 @@ class TrafficLightGridPOEnv(TrafficLightGridEnv):
         light and for each vehicle its velocity, distance to intersection,
         edge_number traffic light state. This is partially observed
         """
-        speeds = []
-        dist_to_intersec = []
-        edge_number = []
-        max_speed = max(
-            self.k.network.speed_limit(edge) for edge in self.k.network.get_edge_list()
-        )
-        grid_array = self.net_params.additional_params["grid_array"]
-        max_dist = max(
-            grid_array["short_length"],
-            grid_array["long_length"],
-            grid_array["inner_length"],
-        )
-        all_observed_ids = []
-
-        for _, edges in self.network.node_mapping:
-            for edge in edges:
-                observed_ids = self.get_closest_to_intersection(edge, self.num_observed)
-                all_observed_ids += observed_ids
-
-                # check which edges we have so we can always pad in the right
-                # positions
-                speeds += [
-                    self.k.vehicle.get_speed(veh_id) / max_speed
-                    for veh_id in observed_ids
-                ]
-                dist_to_intersec += [
-                    (
-                        self.k.network.edge_length(self.k.vehicle.get_edge(veh_id))
-                        - self.k.vehicle.get_position(veh_id)
-                    )
-                    / max_dist
-                    for veh_id in observed_ids
-                ]
-                edge_number += [
-                    self._convert_edge(self.k.vehicle.get_edge(veh_id))
-                    / (self.k.network.network.num_edges - 1)
-                    for veh_id in observed_ids
-                ]
-
-                if len(observed_ids) < self.num_observed:
-                    diff = self.num_observed - len(observed_ids)
-                    speeds += [0] * diff
-                    dist_to_intersec += [0] * diff
-                    edge_number += [0] * diff
+        max_speed = self._max_speed
+        self._update_observed_vehicles()
+        speeds = self._observed_speeds.flatten()
+        dist_to_intersec = self._observed_dists.flatten()
+        edge_number = self._observed_edge_nums.flatten()
 
         # now add in the density and average velocity on the edges
-        density = []
-        velocity_avg = []
-        for edge in self.k.network.get_edge_list():
-            ids = self.k.vehicle.get_ids_by_edge(edge)
-            if len(ids) > 0:
-                vehicle_length = 5
-                density += [
-                    vehicle_length * len(ids) / self.k.network.edge_length(edge)
-                ]
-                velocity_avg += [
-                    np.mean([self.k.vehicle.get_speed(veh_id) for veh_id in ids])
-                    / max_speed
-                ]
-            else:
-                density += [0]
-                velocity_avg += [0]
-        self.observed_ids = all_observed_ids
+        edge_list = self.k.network.get_edge_list()
+        stats = self.k.vehicle.get_edge_stats(edge_list, by_lane=False)
+        num_veh = stats["count"]
+        vehicle_length = 5
+        density = vehicle_length * num_veh / self._edge_lengths
+        velocity_avg = (
+            np.divide(
+                stats["speed_sum"],
+                num_veh,
+                out=np.zeros_like(num_veh),
+                where=num_veh > 0,
+            )
+            / max_speed
+        )
         return np.array(
             np.concatenate(
                 [
@@ -736,6 +754,38 @@ class TrafficLightGridPOEnv(TrafficLightGridEnv):
             )
         )
 
+    def _update_observed_vehicles(self, pad=0):
+        """Collect the vehicles closest to every intersection.
+
+        The normalized speed, distance to the intersection, and edge number of
+        the self.num_observed vehicles closest to the end of every incoming
+        edge are stored in the rows of the self._observed_* arrays. The ids of
+        these vehicles are stored in self.observed_ids.
+
+        Parameters
+        ----------
+        pad : float, optional
+            speed and distance of the missing vehicles on edges with less than
+            self.num_observed vehicles. Their edge number is always 0.
+        """
+        veh_ids, edge_index, rank, dist = self._closest_to_intersection(
+            self._observed_edges, self.num_observed, self._observed_edge_lengths
+        )
+
+        self._observed_speeds.fill(pad)
+        self._observed_dists.fill(pad)
+        self._observed_edge_nums.fill(0)
+        self._observed_speeds[edge_index, rank] = (
+            np.asarray(self.k.vehicle.get_speed(veh_ids), dtype=np.float64)
+            / self._max_speed
+        )
+        self._observed_dists[edge_index, rank] = dist / self._max_dist
+        self._observed_edge_nums[edge_index, rank] = self._observed_edge_numbers[
+            edge_index
+        ]
+
+        self.observed_ids = veh_ids
+
     def compute_reward(self, rl_actions, **kwargs):
         """See class definition."""
         if self.env_params.evaluate:
@@ -0,0 +1,210 @@
+"""Vectorized environment stepping several Flow environments in lockstep."""
+
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+
+import numpy as np
+from gymnasium.vector import VectorEnv
+
+
+class VectorFlowEnv(VectorEnv):
+    """Vectorized environment running several Flow environments in one process.
+
+    All sub-environments are stepped in lockstep. The steps of the different
+    sub-environments are issued concurrently from a thread pool, so that the
+    time each sub-environment spends waiting for its simulator (e.g. sumo,
+    through its own TraCI connection) overlaps with the computations of the
+    other sub-environments. The observations, rewards, and termination flags
+    of all sub-environments are collected into preallocated batched arrays.
+
+    Sub-environments that terminate or are truncated are automatically reset,
+    following the Gymnasium ``VectorEnv`` conventions: the last observation
+    and info of an episode are returned under the "final_observation" and
+    "final_info" keys of the info dict.
+
+    Usage
+    -----
+    >>> from flow.utils.registry import make_create_env
+    >>> from flow.envs.vector import VectorFlowEnv
+    >>> create_env, _ = make_create_env(flow_params)
+    >>> env = VectorFlowEnv([create_env] * 4)
+    >>> obs, info = env.reset()  # obs.shape == (4, obs_dim)
+    >>> obs, rew, terminated, truncated, info = env.step(env.action_space.sample())
+
+    Attributes
+    ----------
+    envs : list of gymnasium.Env
+        the sub-environments
+    """
+
+    def __init__(self, env_fns, max_workers=None):
+        """Instantiate the vectorized environment.
+
+        Parameters
+        ----------
+        env_fns : list of callable
+            functions creating the sub-environments. The sub-environments must
+            share the same observation and action spaces. They are created
+            one at a time, so that each of them starts its own simulator
+            instance.
+        max_workers : int, optional
+            number of threads used to step the sub-environments. Defaults to
+            the number of sub-environments.
+        """
+        self.envs = [env_fn() for env_fn in env_fns]
+        num_envs = len(self.envs)
+
+        super().__init__(
+            num_envs=num_envs,
+            observation_space=self.envs[0].observation_space,
+            action_space=self.envs[0].action_space,
+        )
+
+        self._pool = ThreadPoolExecutor(max_workers=max_workers or num_envs)
+        self._futures = None
+
+        # batched results of every step, shared across steps
+        self._observations = np.zeros(
+            (num_envs,) + self.single_observation_space.shape,
+            dtype=self.single_observation_space.dtype,
+        )
+        self._rewards = np.zeros(num_envs, dtype=np.float64)
+        self._terminated = np.zeros(num_envs, dtype=np.bool_)
+        self._truncated = np.zeros(num_envs, dtype=np.bool_)
+
+    @staticmethod
+    def _reset_env(env, seed=None, options=None):
+        """Reset a sub-environment.
+
+        Some Flow environments do not accept the seed and options arguments,
+        so these are only passed if they are specified.
+        """
+        kwargs = {}
+        if seed is not None:
+            kwargs["seed"] = seed
+        if options is not None:
+            kwargs["options"] = options
+        return env.reset(**kwargs)
+
+    def _step_env(self, env, action):
+        """Step a sub-environment, and reset it if its episode is over."""
+        obs, reward, terminated, truncated, info = env.step(action)
+
+        if terminated or truncated:
+            final_obs, final_info = obs, info
+            obs, info = self._reset_env(env)
+            info = dict(info)
+            info["final_observation"] = final_obs
+            info["final_info"] = final_info
+
+        return obs, reward, terminated, truncated, info
+
+    def reset_async(self, seed=None, options=None):
+        """See parent class."""
+        if seed is None or isinstance(seed, int):
+            seed = [None if seed is None else seed + i for i in range(self.num_envs)]
+        assert len(seed) == self.num_envs
+
+        self._futures = [
+            self._pool.submit(self._reset_env, env, s, options)
+            for env, s in zip(self.envs, seed)
+        ]
+
+    def reset_wait(self, seed=None, options=None):
+        """See parent class."""
+        futures, self._futures = self._futures, None
+
+        infos = {}
+        for i, future in enumerate(futures):
+            obs, info = future.result()
+            self._observations[i] = obs
+            infos = self._add_info(infos, info, i)
+
+        self._terminated[:] = False
+        self._truncated[:] = False
+
+        return np.copy(self._observations), infos
+
+    def step_async(self, actions):
+        """See parent class."""
+        self._futures = [
+            self._pool.submit(self._step_env, env, action)
+            for env, action in zip(self.envs, actions)
+        ]
+
+    def step_wait(self):
+        """See parent class."""
+        futures, self._futures = self._futures, None
+
+        infos = {}
+        for i, future in enumerate(futures):
+            obs, reward, terminated, truncated, info = future.result()
+            self._observations[i] = obs
+            self._rewards[i] = reward
+            self._terminated[i] = terminated
+            self._truncated[i] = truncated
+            infos = self._add_info(infos, info, i)
+
+        return (
+            np.copy(self._observations),
+            np.copy(self._rewards),
+            np.copy(self._terminated),
+            np.copy(self._truncated),
+            infos,
+        )
+
+    def call(self, name, *args, **kwargs):
+        """Call a method, or get an attribute, of every sub-environment.
+
+        Parameters
+        ----------
+        name : str
+            name of the method or attribute
+        args, kwargs : any
+            arguments passed to the method
+
+        Returns
+        -------
+        tuple
+            the result for every sub-environment
+        """
+        results = []
+        for env in self.envs:
+            function = getattr(env, name)
+            if callable(function):
+                results.append(function(*args, **kwargs))
+            else:
+                results.append(function)
+
+        return tuple(results)
+
+    def get_attr(self, name):
+        """Return an attribute of every sub-environment."""
+        return self.call(name)
+
+    def set_attr(self, name, values):
+        """Set an attribute of every sub-environment.
+
+        Parameters
+        ----------
+        name : str
+            name of the attribute
+        values : list or any
+            values of the attribute for every sub-environment, or a single
+            value that is copied to all sub-environments
+        """
+        if not isinstance(values, (list, tuple)):
+            values = [deepcopy(values) for _ in range(self.num_envs)]
+        assert len(values) == self.num_envs
+
+        for env, value in zip(self.envs, values):
+            setattr(env, name, value)
+
+    def close_extras(self, **kwargs):
+        """Terminate all sub-environments and the thread pool."""
+        for env in self.envs:
+            if hasattr(env, "terminate"):
+                env.terminate()
+            else:
+                env.close()
+        self._pool.shutdown()
@@ -1,42 +1,33 @@
-from .exp_configs.rl import singleagent, multiagent
+import importlib
+
+# tags of all experiments, and the package of their configuration module.
+# The modules are only imported when requested, since some of them depend on
+# optional packages (e.g. ray for the multi-agent experiments).
+EXPERIMENTS = {
+    "singleagent_traffic_light_grid": "singleagent",
+    "singleagent_ring": "singleagent",
+    "singleagent_merge_bus": "singleagent",
+    "singleagent_merge_bus_baseline": "singleagent",
+    "singleagent_merge_accel": "singleagent",
+    "singleagent_merge": "singleagent",
+    "singleagent_merge_baseline": "singleagent",
+    "singleagent_figure_eight": "singleagent",
+    "singleagent_bottleneck": "singleagent",
+    "singleagent_bottleneck_baseline": "singleagent",
+    "multiagent_traffic_light_grid": "multiagent",
+    "multiagent_ring": "multiagent",
+    "multiagent_merge": "multiagent",
+    "multiagent_i210": "multiagent",
+    "multiagent_highway": "multiagent",
+    "multiagent_figure_eight": "multiagent",
+    "lord_of_the_rings": "multiagent",
+    "adversarial_figure_eight": "multiagent",
+}
 
 
 def get_exp(exp_tag):
-    if exp_tag == "singleagent_traffic_light_grid":
-        return singleagent.singleagent_traffic_light_grid
-    elif exp_tag == "singleagent_ring":
-        return singleagent.singleagent_ring
-    elif exp_tag == "singleagent_merge_bus":
-        return singleagent.singleagent_merge_bus
-    elif exp_tag == "singleagent_merge_bus_baseline":
-        return singleagent.singleagent_merge_bus_baseline
-    elif exp_tag == "singleagent_merge_accel":
-        return singleagent.singleagent_merge_accel
-    elif exp_tag == "singleagent_merge":
-        return singleagent.singleagent_merge
-    elif exp_tag == "singleagent_merge_baseline":
-        return singleagent.singleagent_merge_baseline
-    elif exp_tag == "singleagent_figure_eight":
-        return singleagent.singleagent_figure_eight
-    elif exp_tag == "singleagent_bottleneck":
-        return singleagent.singleagent_bottleneck
-    elif exp_tag == "singleagent_bottleneck_baseline":
-        return singleagent.singleagent_bottleneck_baseline
-    elif exp_tag == "multiagent_traffic_light_grid":
-        return multiagent.multiagent_traffic_light_grid
-    elif exp_tag == "multiagent_ring":
-        return multiagent.multiagent_ring
-    elif exp_tag == "multiagent_merge":
-        return multiagent.multiagent_merge
-    elif exp_tag == "multiagent_i210":
-        return multiagent.multiagent_i210
-    elif exp_tag == "multiagent_highway":
-        return multiagent.multiagent_highway
-    elif exp_tag == "multiagent_figure_eight":
-        return multiagent.multiagent_figure_eight
-    elif exp_tag == "lord_of_the_rings":
-        return multiagent.lord_of_the_rings
-    elif exp_tag == "adversarial_figure_eight":
-        return multiagent.adversarial_figure_eight
-    else:
+    if exp_tag not in EXPERIMENTS:
         raise ValueError(exp_tag + " is an invalid scenario!")
+    return importlib.import_module(
+        "flow.flow_cfg.exp_configs.rl.{}.{}".format(EXPERIMENTS[exp_tag], exp_tag)
+    )
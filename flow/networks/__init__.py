@@ -1,21 +1,29 @@
-"""Contains all available networks in Flow."""
+"""Contains all available networks in Flow.
 
-# base network class
-from flow.networks.base import Network
+The networks are imported the first time they are accessed.
+"""
+from flow.utils.lazy import lazy_attributes
 
-# custom networks
-from flow.networks.bay_bridge import BayBridgeNetwork
-from flow.networks.bay_bridge_toll import BayBridgeTollNetwork
-from flow.networks.bottleneck import BottleneckNetwork
-from flow.networks.figure_eight import FigureEightNetwork
-from flow.networks.traffic_light_grid import TrafficLightGridNetwork
-from flow.networks.highway import HighwayNetwork
-from flow.networks.ring import RingNetwork
-from flow.networks.merge import MergeNetwork
-from flow.networks.multi_ring import MultiRingNetwork
-from flow.networks.minicity import MiniCityNetwork
-from flow.networks.highway_ramps import HighwayRampsNetwork
-from flow.networks.i210_subnetwork import I210SubNetwork
+__getattr__, __dir__ = lazy_attributes(
+    __name__,
+    {
+        # base network class
+        "Network": "flow.networks.base",
+        # custom networks
+        "BayBridgeNetwork": "flow.networks.bay_bridge",
+        "BayBridgeTollNetwork": "flow.networks.bay_bridge_toll",
+        "BottleneckNetwork": "flow.networks.bottleneck",
+        "FigureEightNetwork": "flow.networks.figure_eight",
+        "TrafficLightGridNetwork": "flow.networks.traffic_light_grid",
+        "HighwayNetwork": "flow.networks.highway",
+        "RingNetwork": "flow.networks.ring",
+        "MergeNetwork": "flow.networks.merge",
+        "MultiRingNetwork": "flow.networks.multi_ring",
+        "MiniCityNetwork": "flow.networks.minicity",
+        "HighwayRampsNetwork": "flow.networks.highway_ramps",
+        "I210SubNetwork": "flow.networks.i210_subnetwork",
+    },
+)
 
 __all__ = [
     "Network",
@@ -634,3 +634,29 @@ class TrafficLightGridNetwork(Network):
                 ]
 
         return sorted(mapping.items(), key=lambda x: x[0])
+
+    @property
+    def exit_edges(self):
+        """Map the exit edges to the entrance edges on the opposite side.
+
+        Vehicles that reach one of the outer edges labeled by "out" (see
+        _outer_edges) leave the network. This returns, for each of these
+        edges, the edge labeled by "in" at the other end of the same row or
+        column, which is also the id of the route starting there.
+
+        Returns
+        -------
+        dict < str, str >
+            the entrance edge of every exit edge
+        """
+        mapping = {}
+
+        for i in range(self.row_num):
+            mapping["bot{}_{}".format(i, self.col_num)] = "bot{}_0".format(i)
+            mapping["top{}_0".format(i)] = "top{}_{}".format(i, self.col_num)
+
+        for j in range(self.col_num):
+            mapping["left0_{}".format(j)] = "left{}_{}".format(self.row_num, j)
+            mapping["right{}_{}".format(self.row_num, j)] = "right0_{}".format(j)
+
+        return mapping
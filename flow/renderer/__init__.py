@@ -1,5 +1,12 @@
-"""Empty init file to ensure documentation for the renderer is created."""
+"""Empty init file to ensure documentation for the renderer is created.
 
-from flow.renderer.pyglet_renderer import PygletRenderer
+The renderer is imported the first time it is accessed, since it requires
+pyglet and OpenCV.
+"""
+from flow.utils.lazy import lazy_attributes
+
+__getattr__, __dir__ = lazy_attributes(
+    __name__, {"PygletRenderer": "flow.renderer.pyglet_renderer"}
+)
 
 __all__ = ["PygletRenderer"]
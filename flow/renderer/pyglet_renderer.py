@@ -12,6 +12,8 @@ import time
 import copy
 import warnings
 
+from flow.renderer.recorder import VideoRecorder, SightRecorder
+
 HOME = expanduser("~")
 
 
@@ -27,6 +29,11 @@ class PygletRenderer(object):
     data : list
         A list of rendering data to be saved when save_render is set to
         True.
+    video : flow.renderer.recorder.VideoRecorder
+        Recorder of the saved frames, when save_render is set to True
+    sights : flow.renderer.recorder.SightRecorder
+        Recorder of the saved sights of RL vehicles, when save_render is set
+        to True
     mode : str or bool
 
         * False: no rendering
@@ -38,6 +45,8 @@ class PygletRenderer(object):
 
     save_render : bool
         Specify whether to save rendering data to disk
+    save_render_step : int
+        Only every save_render_step-th frame is saved
     path : str
         Specify where to store the rendering data
     sight_radius : int
@@ -81,6 +90,8 @@ class PygletRenderer(object):
         show_radius=False,
         pxpm=2,
         alpha=1.0,
+        save_render_step=1,
+        fps=10,
     ):
         """Initialize Pyglet Renderer.
 
@@ -111,11 +122,16 @@ class PygletRenderer(object):
         alpha : int
             Specify opacity of the alpha channel.
             1.0 is fully opaque; 0.0 is fully transparent.
+        save_render_step : int
+            Only every save_render_step-th frame is saved
+        fps : float
+            Frames per second of the saved video
         """
         self.mode = mode
         if self.mode not in [True, False, "rgb", "drgb", "gray", "dgray"]:
             raise ValueError("Mode %s is not supported!" % self.mode)
         self.save_render = save_render
+        self.save_render_step = save_render_step
         if path is None:
             path = HOME
         path = path + "/flow_rendering"
@@ -125,6 +141,8 @@ class PygletRenderer(object):
                 os.mkdir(path)
             os.mkdir(self.path)
             self.data = [network]
+            self.video = VideoRecorder("%s/video.mp4" % self.path, fps)
+            self.sights = SightRecorder("%s/sights.npz" % self.path)
         self.sight_radius = sight_radius
         self.pxpm = pxpm  # Pixel per meter
         self.show_radius = show_radius
@@ -225,14 +243,6 @@ class PygletRenderer(object):
             A list contains the timestep (ms), timedelta (ms), and id of
             all RL vehicles
         """
-        if self.save_render:
-            _human_orientations = copy.deepcopy(human_orientations)
-            _machine_orientations = copy.deepcopy(machine_orientations)
-            _human_dynamics = copy.deepcopy(human_dynamics)
-            _machine_dynamics = copy.deepcopy(machine_dynamics)
-            _human_logs = copy.deepcopy(human_logs)
-            _machine_logs = copy.deepcopy(machine_logs)
-
         self.time += 1
 
         pyglet.gl.glClearColor(0.125, 0.125, 0.125, self.alpha)
@@ -305,21 +315,23 @@ class PygletRenderer(object):
 
         buffer = pyglet.image.get_buffer_manager().get_color_buffer()
         image_data = buffer.get_image_data()
-        frame = np.fromstring(image_data.data, dtype=np.uint8, sep="")
+        frame = np.frombuffer(image_data.data, dtype=np.uint8)
         frame = frame.reshape(buffer.height, buffer.width, 4)
         self.frame = frame[::-1, :, 0:3][..., ::-1]
         self.window.flip()
 
-        if self.save_render:
-            cv2.imwrite("%s/frame_%06d.png" % (self.path, self.time), self.frame)
+        if self._is_saved_frame():
+            self.video.append(self.frame)
+            # the lists are built anew by the caller for every frame, so they
+            # are stored without copies
             self.data.append(
                 [
-                    _human_orientations,
-                    _machine_orientations,
-                    _human_dynamics,
-                    _machine_dynamics,
-                    _human_logs,
-                    _machine_logs,
+                    human_orientations,
+                    machine_orientations,
+                    human_dynamics,
+                    machine_dynamics,
+                    human_logs,
+                    machine_logs,
                 ]
             )
         if "gray" in self.mode:
@@ -332,8 +344,14 @@ class PygletRenderer(object):
         print("Closing renderer...")
         save_path = ""
         if self.save_render:
+            self.video.close()
+            self.sights.close()
             save_path = "%s/data_%06d.npy" % (self.path, self.time)
-            np.save(save_path, self.data)
+            # the frames are ragged, so they are stored as a 1-D object array
+            data = np.empty(len(self.data), dtype=object)
+            for i, frame_data in enumerate(self.data):
+                data[i] = frame_data
+            np.save(save_path, data)
         self.window.close()
         print("Goodbye!")
         return save_path
@@ -371,15 +389,17 @@ class PygletRenderer(object):
         rotated_sight = cv2.bitwise_and(fixed_sight, fixed_sight, mask=mask)
         rotated_sight = imutils.rotate(rotated_sight, ang)
 
-        if self.save_render:
-            cv2.imwrite(
-                "%s/sight_%s_%06d.png" % (self.path, veh_id, self.time), rotated_sight
-            )
+        if self._is_saved_frame():
+            self.sights.append("sight_%s_%06d" % (veh_id, self.time), rotated_sight)
         if "gray" in self.mode:
             return rotated_sight[:, :, 0]
         else:
             return rotated_sight
 
+    def _is_saved_frame(self):
+        """Return whether the current frame is saved to disk."""
+        return self.save_render and (self.time - 1) % self.save_render_step == 0
+
     def _add_lane_polys(self):
         """Render road network polygons."""
         for lane_poly, lane_color in zip(self.lane_polys, self.lane_colors):
@@ -0,0 +1,275 @@
+"""Contains the recorders used to save renderings to disk.
+
+Rendered frames are streamed to a video encoder as they are produced, instead
+of being written to disk as one image per frame and encoded at the end of the
+experiment. The sights of the RL vehicles are likewise streamed to a single
+compressed array file.
+"""
+
+import os
+import queue
+import shutil
+import subprocess
+import threading
+import zipfile
+
+import numpy as np
+
+# maximum number of frames waiting to be encoded
+MAX_PENDING_FRAMES = 16
+
+
+class VideoRecorder(object):
+    """Streaming recorder of videos.
+
+    Frames are passed to a background thread through a bounded queue, so that
+    rendering only waits for the encoder if it falls behind by more than
+    MAX_PENDING_FRAMES frames. The thread pipes the raw frames to a long-lived
+    ffmpeg process, or writes them with OpenCV if ffmpeg is not available.
+
+    Usage
+    -----
+    >>> recorder = VideoRecorder("video.mp4", fps=10)
+    >>> recorder.append(frame)  # BGR or grayscale uint8 image
+    >>> recorder.append_file("screenshot.png", remove=True)
+    >>> recorder.close()
+
+    Attributes
+    ----------
+    path : str
+        path to the video file
+    fps : float
+        frames per second of the video
+    num_frames : int
+        number of frames appended so far
+    """
+
+    def __init__(self, path, fps):
+        """Instantiate the recorder.
+
+        The encoder is started with the first frame, once the size of the
+        frames is known.
+
+        Parameters
+        ----------
+        path : str
+            path to the video file
+        fps : float
+            frames per second of the video
+        """
+        self.path = path
+        self.fps = fps
+        self.num_frames = 0
+        self._sink = None
+        self._queue = queue.Queue(maxsize=MAX_PENDING_FRAMES)
+        self._error = None
+        self._thread = None
+
+    def append(self, frame):
+        """Append a frame to the video.
+
+        Parameters
+        ----------
+        frame : np.ndarray
+            BGR (height x width x 3) or grayscale (height x width) image. The
+            frame is copied, so the caller may reuse its buffer.
+        """
+        # the copy is also contiguous, as needed by the encoders
+        self._put(np.array(frame, dtype=np.uint8, order="C"))
+
+    def append_file(self, path, remove=False):
+        """Append an image file to the video.
+
+        The image is read by the background thread. Missing files are skipped.
+
+        Parameters
+        ----------
+        path : str
+            path to the image, e.g. a screenshot of sumo-gui
+        remove : bool, optional
+            whether to delete the file once it is read
+        """
+        self._put((path, remove))
+
+    def close(self):
+        """Encode all remaining frames and close the video file."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+        self._check_error()
+
+    def _put(self, item):
+        """Pass a frame, or the path to an image, to the background thread."""
+        self._check_error()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._write_frames, daemon=True)
+            self._thread.start()
+        # this blocks if too many frames are waiting, which bounds the memory
+        self._queue.put(item)
+        self.num_frames += 1
+
+    def _write_frames(self):
+        """Encode the frames in the queue until the recorder is closed."""
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                if isinstance(item, tuple):
+                    item = _read_image(*item)
+                    if item is None:
+                        continue
+                if item.ndim == 2:
+                    item = np.repeat(item[:, :, np.newaxis], 3, axis=2)
+                if self._sink is None:
+                    self._sink = _open_sink(self.path, self.fps, item.shape)
+                self._sink.write(item)
+        except Exception as e:
+            self._error = e
+            # keep consuming frames, so that the main thread never blocks
+            while self._queue.get() is not None:
+                pass
+        finally:
+            if self._sink is not None:
+                # closing the sink may fail too (e.g. if ffmpeg exits with an
+                # error), which is reported unless an error occurred before
+                try:
+                    self._sink.close()
+                except Exception as e:
+                    if self._error is None:
+                        self._error = e
+                self._sink = None
+
+    def _check_error(self):
+        """Raise any error that occurred in the background thread."""
+        if self._error is not None:
+            raise self._error
+
+
+class SightRecorder(object):
+    """Streaming recorder of the sights of vehicles.
+
+    Every sight is compressed and added to a single .npz file as soon as it is
+    appended, so the sights are never all kept in memory. The file can be read
+    with ``np.load``, with one array per sight.
+
+    Attributes
+    ----------
+    path : str
+        path to the .npz file
+    num_sights : int
+        number of sights appended so far
+    """
+
+    def __init__(self, path):
+        """Instantiate the recorder.
+
+        Parameters
+        ----------
+        path : str
+            path to the .npz file
+        """
+        self.path = path
+        self.num_sights = 0
+        self._file = zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED)
+
+    def append(self, name, sight):
+        """Append a sight to the file.
+
+        Parameters
+        ----------
+        name : str
+            name of the array in the file, e.g. the vehicle id and frame
+        sight : np.ndarray
+            the sight of the vehicle
+        """
+        with self._file.open(name + ".npy", "w", force_zip64=True) as f:
+            np.lib.format.write_array(f, np.asanyarray(sight), allow_pickle=False)
+        self.num_sights += 1
+
+    def close(self):
+        """Close the file."""
+        self._file.close()
+
+
+def _read_image(path, remove):
+    """Read an image file, and optionally delete it."""
+    import cv2
+
+    if not os.path.exists(path):
+        return None
+    image = cv2.imread(path)
+    if remove:
+        os.remove(path)
+    return image
+
+
+def _open_sink(path, fps, shape):
+    """Open the video encoder, based on the available tools."""
+    if shutil.which("ffmpeg") is not None:
+        return _FFmpegSink(path, fps, shape)
+    else:
+        return _OpenCVSink(path, fps, shape)
+
+
+class _FFmpegSink(object):
+    """Pipes raw frames to an ffmpeg process."""
+
+    def __init__(self, path, fps, shape):
+        height, width = shape[:2]
+        self._proc = subprocess.Popen(
+            [
+                "ffmpeg",
+                "-y",
+                "-loglevel",
+                "error",
+                "-f",
+                "rawvideo",
+                "-pix_fmt",
+                "bgr24",
+                "-s",
+                "{}x{}".format(width, height),
+                "-r",
+                str(fps),
+                "-i",
+                "-",
+                # yuv420p requires an even width and height
+                "-vf",
+                "pad=ceil(iw/2)*2:ceil(ih/2)*2",
+                "-pix_fmt",
+                "yuv420p",
+                path,
+            ],
+            stdin=subprocess.PIPE,
+        )
+
+    def write(self, frame):
+        self._proc.stdin.write(frame.data)
+
+    def close(self):
+        self._proc.stdin.close()
+        if self._proc.wait() != 0:
+            raise RuntimeError(
+                "ffmpeg exited with code {}".format(self._proc.returncode)
+            )
+
+
+class _OpenCVSink(object):
+    """Writes frames with OpenCV."""
+
+    def __init__(self, path, fps, shape):
+        import cv2
+
+        height, width = shape[:2]
+        self._writer = cv2.VideoWriter(
+            path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height)
+        )
+        if not self._writer.isOpened():
+            raise RuntimeError("Cannot open the video file {}.".format(path))
+
+    def write(self, frame):
+        self._writer.write(frame)
+
+    def close(self):
+        self._writer.release()
@@ -1,11 +1,13 @@
 """Contains the Flow/Aimsun API manager."""
+
 import socket
 import logging
 import struct
 
+import numpy as np
+
 import flow.utils.aimsun.constants as ac
 import flow.utils.aimsun.struct as aimsun_struct
-from flow.core.kernel.vehicle.aimsun import INFOS_ATTR_BY_INDEX
 
 
 def create_client(port, print_status=False):
@@ -33,6 +35,8 @@ def create_client(port, print_status=False):
         # try to connect
         try:
             s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            # send pipelined commands immediately, without waiting for acks
+            s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
             s.connect(("localhost", port))
 
             # check the connection
@@ -73,17 +77,27 @@ class FlowAimsunAPI(object):
         """
         self.port = port
         self.s = create_client(port, print_status=True)
+        self._header = struct.Struct(aimsun_struct.HEADER_FORMAT)
+        # types of the commands sent without waiting for a reply since the
+        # last reply was received
+        self._pipelined = []
 
     def _send_command(self, command_type, in_format, values, out_format):
         """Send an arbitrary command via the connection.
 
-        Commands are sent in two stages. First, the client sends the command
-        type (e.g. ac.REMOVE_VEHICLE) and waits for a conformation message from
-        the server. Once the confirmation is received, the client send a
-        encoded binary packet that the server will be prepared to decode, and
-        will then receive some return value (either the value the client was
-        requesting or a 0 signifying that the command has been executed. This
-        value is then returned by this method.
+        Every message, in both directions, consists of a header (see
+        flow.utils.aimsun.struct.HEADER_FORMAT) with the command type (e.g.
+        ac.REMOVE_VEHICLE), or the status of the reply, and the size of the
+        payload, followed by the payload itself: values packed in a
+        little-endian struct, or an utf-8 encoded string.
+
+        Commands without return values (e.g. setters) are not acknowledged by
+        the server. They are pipelined: this method returns as soon as the
+        command is sent. Since the server executes commands in order, their
+        effects are visible to all subsequent commands. For other commands,
+        this method waits for the reply of the server. Pipelined commands
+        that the server cannot execute are answered with an error, which is
+        received along with the reply of the next command that has one.
 
         Parameters
         ----------
@@ -94,65 +108,83 @@ class FlowAimsunAPI(object):
         values : tuple of Any or None
             commands to be encoded and issued to the server
         out_format : str or None
-            format of the output structure
+            format of the output structure. If set to None, the server does not
+            reply to the command.
 
         Returns
         -------
         Any
-            the final message received from the Aimsun server
+            the final message received from the Aimsun server, or None if the
+            command has no output
         """
-        # send the command type to the server
-        self.s.send(str(command_type).encode())
-
-        # wait for a response
-        unpacker = struct.Struct(format="i")
-        data = None
-        while data is None:
-            data = self.s.recv(unpacker.size)
-
-        # send the command values
-        if in_format is not None:
-            if in_format == "str":
-                self.s.send(str.encode(values[0]))
-            else:
-                packer = struct.Struct(format=in_format)
-                packed_data = packer.pack(*values)
-                self.s.send(packed_data)
+        if in_format is None:
+            payload = b""
+        elif in_format == "str":
+            payload = values[0].encode()
+        else:
+            payload = struct.pack("<" + in_format, *values)
+        self._send(command_type, payload)
+
+        if out_format is None:
+            self._pipelined.append(command_type)
+            return
+
+        payload = self._receive(command_type)
+        if out_format == "str":
+            return payload.decode("utf-8")
         else:
-            # if no command is needed, just send a status response
-            self.s.send(str.encode("1"))
-
-        # collect the return values
-        if out_format is not None:
-            if out_format == "str":
-                done = False
-                unpacked_data = ""
-                while not done:
-                    # get the next bit of data
-                    data = None
-                    while data is None or data == b"":
-                        data = self.s.recv(256)
-
-                    # concatenate the results
-                    unpacked_data += data.decode("utf-8")
-
-                    # ask for a status check (just by sending any command)
-                    self.s.send(str.encode("1"))
-
-                    # check if done
-                    unpacker = struct.Struct(format="i")
-                    data = None
-                    while data is None:
-                        data = self.s.recv(unpacker.size)
-                    done = unpacker.unpack(data)[0] == 0
-            else:
-                unpacker = struct.Struct(format=out_format)
-                data = None
-                while data is None:
-                    data = self.s.recv(unpacker.size)
-                unpacked_data = unpacker.unpack(data)
-
-            return unpacked_data
+            return struct.unpack("<" + out_format, payload)
+
+    def _send(self, command_type, payload):
+        """Send a command and its payload to the server."""
+        self.s.sendall(self._header.pack(command_type, len(payload)) + payload)
+
+    def _receive(self, command_type):
+        """Receive the payload of the reply to a command.
+
+        Errors are sent with the type of the failed command as payload. Since
+        the server executes commands in order, the errors of the commands
+        pipelined before this one are received first, and are drained here so
+        that the connection stays in sync.
+
+        Raises
+        ------
+        RuntimeError
+            if the server could not execute the command, or a command that was
+            pipelined before it
+        """
+        pipelined, self._pipelined = self._pipelined, []
+        failed = []
+        while True:
+            status, size = self._header.unpack(self._recv_exact(self._header.size))
+            payload = self._recv_exact(size)
+            if status == 0:
+                break
+            (failed_type,) = struct.unpack("<i", payload)
+            failed.append((failed_type, status))
+            if failed_type not in pipelined:
+                # this is the reply to the command itself
+                break
+            # the commands pipelined before the failed one were executed
+            del pipelined[: pipelined.index(failed_type) + 1]
+
+        if failed:
+            raise RuntimeError(
+                "Aimsun failed to execute command {} (status {}).".format(*failed[0])
+            )
+        return payload
+
+    def _recv_exact(self, size):
+        """Receive exactly size bytes from the server."""
+        data = bytearray(size)
+        view = memoryview(data)
+        pos = 0
+        while pos < size:
+            num_bytes = self.s.recv_into(view[pos:])
+            if num_bytes == 0:
+                raise ConnectionError("The connection to Aimsun was closed.")
+            pos += num_bytes
+        return data
 
     def simulation_step(self):
         """Advance the simulation by one step.
@@ -161,7 +193,7 @@ class FlowAimsunAPI(object):
         for and reconnects to the server.
         """
         self._send_command(
-            ac.SIMULATION_STEP, in_format=None, values=None, out_format=None
+            ac.SIMULATION_STEP, in_format=None, values=None, out_format="i"
         )
 
         # reconnect to the server
@@ -175,7 +207,7 @@ class FlowAimsunAPI(object):
         # inform the simulation that it should terminate the simulation and the
         # server connection
         self._send_command(
-            ac.SIMULATION_TERMINATE, in_format=None, values=None, out_format=None
+            ac.SIMULATION_TERMINATE, in_format=None, values=None, out_format="i"
         )
 
         # terminate the connection
@@ -249,7 +281,7 @@ class FlowAimsunAPI(object):
             name of the vehicle in Aimsun
         """
         self._send_command(
-            ac.REMOVE_VEHICLE, in_format="i", values=(veh_id,), out_format="i"
+            ac.REMOVE_VEHICLE, in_format="i", values=(veh_id,), out_format=None
         )
 
     def set_speed(self, veh_id, speed):
@@ -263,7 +295,26 @@ class FlowAimsunAPI(object):
             target speed
         """
         self._send_command(
-            ac.VEH_SET_SPEED, in_format="i f", values=(veh_id, speed), out_format="i"
+            ac.VEH_SET_SPEED, in_format="i f", values=(veh_id, speed), out_format=None
+        )
+
+    def set_speeds(self, veh_ids, speeds):
+        """Set the speed of many vehicles with a single command.
+
+        Parameters
+        ----------
+        veh_ids : list of int
+            names of the vehicles in Aimsun
+        speeds : list of float
+            target speed of every vehicle
+        """
+        if len(veh_ids) == 0:
+            return
+        self._send_command(
+            ac.VEH_SET_SPEEDS,
+            in_format="{0}i {0}f".format(len(veh_ids)),
+            values=list(veh_ids) + list(speeds),
+            out_format=None,
         )
 
     def apply_lane_change(self, veh_id, direction):
@@ -275,14 +326,31 @@ class FlowAimsunAPI(object):
             name of the vehicle in Aimsun
         direction : int
             target direction
+        """
+        self._send_command(
+            ac.VEH_SET_LANE,
+            in_format="i i",
+            values=(veh_id, direction),
+            out_format=None,
+        )
 
-        Returns
-        -------
-        float
-            status (should be 0)
+    def apply_lane_changes(self, veh_ids, directions):
+        """Set the lane change action of many vehicles with a single command.
+
+        Parameters
+        ----------
+        veh_ids : list of int
+            names of the vehicles in Aimsun
+        directions : list of int
+            target direction of every vehicle
         """
-        return self._send_command(
-            ac.VEH_SET_LANE, in_format="i i", values=(veh_id, direction), out_format="i"
+        if len(veh_ids) == 0:
+            return
+        self._send_command(
+            ac.VEH_SET_LANES,
+            in_format="{0}i {0}i".format(len(veh_ids)),
+            values=list(veh_ids) + list(directions),
+            out_format=None,
         )
 
     def set_route(self, veh_id, route):
@@ -313,11 +381,11 @@ class FlowAimsunAPI(object):
             red, green, blue values
         """
         r, g, b = color
-        return self._send_command(
+        self._send_command(
             ac.VEH_SET_COLOR,
             in_format="i i i i",
             values=(veh_id, r, g, b),
-            out_format="i",
+            out_format=None,
         )
 
     def get_entered_ids(self):
@@ -466,17 +534,10 @@ class FlowAimsunAPI(object):
             tracking info object
         """
         # build the output format from the bitmap
-        out_format = ""
-        for i in range(len(info_bitmap)):
-            if info_bitmap[i] == "1":
-                if i <= 12:
-                    out_format += "f "
-                else:
-                    out_format += "i "
-        if out_format == "":
+        fields = aimsun_struct.tracking_fields(info_bitmap)
+        if len(fields) == 0:
             return
-        else:
-            out_format = out_format[:-1]
+        out_format = " ".join(fmt for _, fmt in fields)
 
         # append tracked boolean and vehicle id to the bitmap
         # so that the command only has one parameter
@@ -490,14 +551,47 @@ class FlowAimsunAPI(object):
 
         # place these tracking info into a struct
         ret = aimsun_struct.InfVeh()
-        count = 0
-        for map_index in range(len(INFOS_ATTR_BY_INDEX)):
-            if info_bitmap[map_index] == "1":
-                setattr(ret, INFOS_ATTR_BY_INDEX[map_index], info[count])
-                count += 1
+        for (attr, _), value in zip(fields, info):
+            setattr(ret, attr, value)
 
         return ret
 
+    def get_bulk_tracking_info(self, veh_ids, info_bitmap):
+        """Return the tracking information and leaders of many vehicles.
+
+        This replaces the tracking info, leader, length and next section
+        commands of every vehicle and of its leader with a single round-trip.
+
+        Parameters
+        ----------
+        veh_ids : list of int
+            names of the vehicles in Aimsun. The vehicles must be tracked.
+        info_bitmap : str
+            bitmap representing the tracking info to be returned
+            (cf function make_bitmap_for_tracking in vehicle/aimsun.py)
+
+        Returns
+        -------
+        np.ndarray
+            structured array with one record per vehicle, in the order of
+            veh_ids, and the fields of
+            flow.utils.aimsun.struct.bulk_tracking_fields
+        """
+        dtype = np.dtype(
+            [
+                (name, "<f4" if fmt == "f" else "<i4")
+                for name, fmt in aimsun_struct.bulk_tracking_fields(info_bitmap)
+            ]
+        )
+        if len(veh_ids) == 0:
+            return np.zeros(0, dtype=dtype)
+
+        payload = info_bitmap.encode() + struct.pack(
+            "<{}i".format(len(veh_ids)), *veh_ids
+        )
+        self._send(ac.VEH_GET_TRACKING_BULK, payload)
+        return np.frombuffer(self._receive(ac.VEH_GET_TRACKING_BULK), dtype=dtype)
+
     def get_vehicle_leader(self, veh_id):
         """Return the leader of a specific vehicle.
 
@@ -607,14 +701,14 @@ class FlowAimsunAPI(object):
         tl_id : int
             name of the traffic light node in Aimsun
         link_index : TODO
-            TODO
-        state : str
+            not used, the state applies to the whole metering
+        state : int
             TODO
         """
         self._send_command(
             ac.TL_SET_STATE,
-            in_format="i i i",
-            values=(tl_id, link_index, state),
+            in_format="i i",
+            values=(tl_id, state),
             out_format=None,
         )
 
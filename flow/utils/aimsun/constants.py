@@ -92,6 +92,15 @@ VEH_SET_TRACKED = 0x18
 #: set vehicle as untracked in Aimsun
 VEH_SET_NO_TRACKED = 0x19
 
+#: get the tracking information and leaders of many vehicles
+VEH_GET_TRACKING_BULK = 0x1D
+
+#: set the speed of many vehicles
+VEH_SET_SPEEDS = 0x1E
+
+#: apply the lane change of many vehicles
+VEH_SET_LANES = 0x1F
+
 
 ###############################################################################
 #                           Traffic Light Commands                            #
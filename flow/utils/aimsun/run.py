@@ -1,5 +1,6 @@
 # flake8: noqa
 """Script used to interact with Aimsun's API during the simulation phase."""
+
 import flow.config as config
 import sys
 import os
@@ -11,6 +12,7 @@ sys.path.append(
 )
 
 import flow.utils.aimsun.constants as ac
+import flow.utils.aimsun.struct as aimsun_struct
 import AAPI as aimsun_api
 from AAPI import *
 from PyANGKernel import *
@@ -25,11 +27,36 @@ entered_vehicles = []
 exited_vehicles = []
 
 
-def send_message(conn, in_format, values):
+def recv_exact(conn, size):
+    """Receive exactly size bytes from the client.
+
+    Parameters
+    ----------
+    conn : socket.socket
+        socket for server connection
+    size : int
+        number of bytes to receive
+
+    Returns
+    -------
+    str
+        the received bytes
+    """
+    data = b""
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        if not chunk:
+            raise EOFError("The connection to Flow was closed.")
+        data += chunk
+    return data
+
+
+def send_message(conn, in_format, values, status=0):
     """Send a message to the client.
 
-    If the message is a string, it is sent in segments of length 256 (if the
-    string is longer than such) and concatenated on the client end.
+    The message consists of a header with the status and the size of the
+    payload, followed by the payload, i.e. the values packed in a
+    little-endian struct, or the string itself.
 
     Parameters
     ----------
@@ -39,68 +66,106 @@ def send_message(conn, in_format, values):
         format of the input structure
     values : tuple of Any
         commands to be encoded and issued to the client
+    status : int, optional
+        0 if the command was executed, an error code otherwise
     """
     if in_format == "str":
-        packer = struct.Struct(format="i")
-        values = values[0]
-
-        # when the message is too large, send value in segments and inform the
-        # client that additional information will be sent. The value will be
-        # concatenated on the other end
-        while len(values) > 256:
-            # send the next set of data
-            conn.send(values[:256])
-            values = values[256:]
-
-            # wait for a reply
-            data = None
-            while data is None:
-                data = conn.recv(2048)
-
-            # send a not-done signal
-            packed_data = packer.pack(*(1,))
-            conn.send(packed_data)
-
-        # send the remaining components of the message (which is of length less
-        # than or equal to 256)
-        conn.send(values)
-
-        # wait for a reply
-        data = None
-        while data is None:
-            data = conn.recv(2048)
-
-        # send a done signal
-        packed_data = packer.pack(*(0,))
-        conn.send(packed_data)
+        payload = values[0]
     else:
-        packer = struct.Struct(format=in_format)
-        packed_data = packer.pack(*values)
-        conn.send(packed_data)
+        payload = struct.pack("<" + in_format, *values)
+    conn.sendall(
+        struct.pack(aimsun_struct.HEADER_FORMAT, status, len(payload)) + payload
+    )
 
 
-def retrieve_message(conn, out_format):
-    """Retrieve a message from the client.
+def retrieve_message(conn):
+    """Retrieve the next command from the client.
 
     Parameters
     ----------
     conn : socket.socket
         socket for server connection
-    out_format : str or None
-        format of the output structure
 
     Returns
     -------
-    Any
-        received message
+    int
+        the command type
+    str
+        the payload of the command
     """
-    unpacker = struct.Struct(format=out_format)
-    try:
-        data = conn.recv(unpacker.size)
-        unpacked_data = unpacker.unpack(data)
-    finally:
-        pass
-    return unpacked_data
+    header = recv_exact(conn, struct.calcsize(aimsun_struct.HEADER_FORMAT))
+    command, size = struct.unpack(aimsun_struct.HEADER_FORMAT, header)
+    return command, recv_exact(conn, size)
+
+
+def unpack(in_format, payload):
+    """Unpack the values of a command.
+
+    Parameters
+    ----------
+    in_format : str
+        format of the input structure
+    payload : str
+        payload of the command
+
+    Returns
+    -------
+    tuple of Any
+        the values of the command
+    """
+    return struct.unpack("<" + in_format, payload)
+
+
+def get_bulk_tracking_info(payload):
+    """Return the records of the bulk tracking command.
+
+    Parameters
+    ----------
+    payload : str
+        the tracking bitmap, followed by the ids of the tracked vehicles
+
+    Returns
+    -------
+    str
+        format of the records
+    list of Any
+        values of the records, see
+        flow.utils.aimsun.struct.bulk_tracking_fields
+    """
+    num_infos = len(aimsun_struct.INFOS_ATTR_BY_INDEX)
+    info_bitmap = payload[:num_infos]
+    veh_ids = unpack("{}i".format((len(payload) - num_infos) // 4), payload[num_infos:])
+
+    fields = aimsun_struct.bulk_tracking_fields(info_bitmap)
+    tracking_attrs = [attr for attr, _ in aimsun_struct.tracking_fields(info_bitmap)]
+    requested = set(veh_ids)
+
+    values = []
+    for veh_id in veh_ids:
+        tracking_info = aimsun_api.AKIVehTrackedGetInf(veh_id)
+        values.extend(getattr(tracking_info, attr) for attr in tracking_attrs)
+
+        leader = aimsun_api.AKIVehGetLeaderId(veh_id)
+        values.append(leader)
+
+        # the next section is only needed for vehicles in sections
+        if tracking_info.idSection != -1:
+            values.append(AKIVehInfPathGetNextSection(veh_id, tracking_info.idSection))
+        else:
+            values.append(-1)
+
+        # the information of the requested leaders is already in the records
+        if leader >= -1 and leader not in requested:
+            leader_info = aimsun_api.AKIVehGetInf(leader)
+            values.extend(
+                getattr(leader_info, attr) for attr in aimsun_struct.LEADER_INFOS
+            )
+            values.append(aimsun_api.AKIVehGetStaticInf(leader).length)
+        else:
+            values.extend([0] * (len(aimsun_struct.LEADER_INFOS) + 1))
+
+    record_format = "".join(fmt for _, fmt in fields)
+    return record_format * len(veh_ids), values
 
 
 def threaded_client(conn):
@@ -109,369 +174,285 @@ def threaded_client(conn):
     This process is called every simulation step to interact with the aimsun
     server, and terminates once the simulation is ready to execute a new step.
 
+    Commands without return values (the setters) are not acknowledged, so
+    that the client can pipeline them. Unknown commands are answered with an
+    error whose payload is the command type, which lets the client match the
+    error to a pipelined command.
+
     Parameters
     ----------
     conn : socket.socket
         socket for server connection
     """
+    conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
     # send feedback that the connection is active
     conn.send(b"Ready.")
 
     done = False
     while not done:
-        # receive the next message
-        data = conn.recv(2048)
-
-        if data is not None:
-            # if the message is empty, search for the next message
-            if data == "":
-                continue
-
-            # convert to integer
-            data = int(data)
-
-            # if the simulation step is over, terminate the ring and let
-            # the step be executed
-            if data == ac.SIMULATION_STEP:
-                send_message(conn, in_format="i", values=(0,))
-                done = True
-
-            # Note that alongside this, the process is closed in Flow,
-            # thereby terminating the socket connection as well.
-            elif data == ac.SIMULATION_TERMINATE:
-                send_message(conn, in_format="i", values=(0,))
-                done = True
-
-            elif data == ac.ADD_VEHICLE:
-                send_message(conn, in_format="i", values=(0,))
-
-                edge, lane, type_id, pos, speed, next_section = retrieve_message(
-                    conn, "i i i f f i"
-                )
-
-                # 1 if tracked, 0 otherwise
-                tracking = 1
-
-                veh_id = aimsun_api.AKIPutVehTrafficFlow(
-                    edge, lane + 1, type_id, pos, speed, next_section, tracking
-                )
-
-                send_message(conn, in_format="i", values=(veh_id,))
-
-            elif data == ac.REMOVE_VEHICLE:
-                send_message(conn, in_format="i", values=(0,))
-                (veh_id,) = retrieve_message(conn, "i")
-                aimsun_api.AKIVehTrackedRemove(veh_id)
-                send_message(conn, in_format="i", values=(0,))
-
-            elif data == ac.VEH_SET_SPEED:
-                send_message(conn, in_format="i", values=(0,))
-                veh_id, speed = retrieve_message(conn, "i f")
-                new_speed = speed * 3.6
-                # aimsun_api.AKIVehTrackedForceSpeed(veh_id, new_speed)
-                aimsun_api.AKIVehTrackedModifySpeed(veh_id, new_speed)
-                send_message(conn, in_format="i", values=(0,))
-
-            elif data == ac.VEH_SET_LANE:
-                conn.send(b"Set vehicle lane.")
-                veh_id, target_lane = retrieve_message(conn, "i i")
+        # receive the next command
+        data, payload = retrieve_message(conn)
+
+        # if the simulation step is over, terminate the ring and let
+        # the step be executed
+        if data == ac.SIMULATION_STEP:
+            send_message(conn, in_format="i", values=(0,))
+            done = True
+
+        # Note that alongside this, the process is closed in Flow,
+        # thereby terminating the socket connection as well.
+        elif data == ac.SIMULATION_TERMINATE:
+            send_message(conn, in_format="i", values=(0,))
+            done = True
+
+        elif data == ac.ADD_VEHICLE:
+            edge, lane, type_id, pos, speed, next_section = unpack(
+                "i i i f f i", payload
+            )
+
+            # 1 if tracked, 0 otherwise
+            tracking = 1
+
+            veh_id = aimsun_api.AKIPutVehTrafficFlow(
+                edge, lane + 1, type_id, pos, speed, next_section, tracking
+            )
+
+            send_message(conn, in_format="i", values=(veh_id,))
+
+        elif data == ac.REMOVE_VEHICLE:
+            (veh_id,) = unpack("i", payload)
+            aimsun_api.AKIVehTrackedRemove(veh_id)
+
+        elif data == ac.VEH_SET_SPEED:
+            veh_id, speed = unpack("i f", payload)
+            new_speed = speed * 3.6
+            # aimsun_api.AKIVehTrackedForceSpeed(veh_id, new_speed)
+            aimsun_api.AKIVehTrackedModifySpeed(veh_id, new_speed)
+
+        elif data == ac.VEH_SET_SPEEDS:
+            num_vehicles = len(payload) // 8
+            values = unpack("{0}i {0}f".format(num_vehicles), payload)
+            for veh_id, speed in zip(values[:num_vehicles], values[num_vehicles:]):
+                aimsun_api.AKIVehTrackedModifySpeed(veh_id, speed * 3.6)
+
+        elif data == ac.VEH_SET_LANE:
+            veh_id, target_lane = unpack("i i", payload)
+            aimsun_api.AKIVehTrackedModifyLane(veh_id, target_lane)
+
+        elif data == ac.VEH_SET_LANES:
+            num_vehicles = len(payload) // 8
+            values = unpack("{0}i {0}i".format(num_vehicles), payload)
+            for veh_id, target_lane in zip(
+                values[:num_vehicles], values[num_vehicles:]
+            ):
                 aimsun_api.AKIVehTrackedModifyLane(veh_id, target_lane)
-                send_message(conn, in_format="i", values=(0,))
-
-            elif data == ac.VEH_SET_ROUTE:
-                send_message(conn, in_format="i", values=(0,))
-                # TODO
-
-            elif data == ac.VEH_SET_COLOR:
-                send_message(conn, in_format="i", values=(0,))
-                veh_id, r, g, b = retrieve_message(conn, "i i i i")
-                # TODO
-                send_message(conn, in_format="i", values=(0,))
-
-            elif data == ac.VEH_SET_TRACKED:
-                send_message(conn, in_format="i", values=(0,))
-                (veh_id,) = retrieve_message(conn, "i")
-                aimsun_api.AKIVehSetAsTracked(veh_id)
-
-            elif data == ac.VEH_SET_NO_TRACKED:
-                send_message(conn, in_format="i", values=(0,))
-                (veh_id,) = retrieve_message(conn, "i")
-                aimsun_api.AKIVehSetAsNoTracked(veh_id)
-
-            elif data == ac.VEH_GET_ENTERED_IDS:
-                send_message(conn, in_format="i", values=(0,))
-
-                data = None
-                while data is None:
-                    data = conn.recv(256)
-
-                global entered_vehicles
-                if len(entered_vehicles) == 0:
-                    output = "-1"
-                else:
-                    output = ":".join([str(e) for e in entered_vehicles])
-                send_message(conn, in_format="str", values=(output,))
-                entered_vehicles = []
-
-            elif data == ac.VEH_GET_EXITED_IDS:
-                send_message(conn, in_format="i", values=(0,))
-
-                data = None
-                while data is None:
-                    data = conn.recv(256)
-
-                global exited_vehicles
-                if len(exited_vehicles) == 0:
-                    output = "-1"
-                else:
-                    output = ":".join([str(e) for e in exited_vehicles])
-                send_message(conn, in_format="str", values=(output,))
-                exited_vehicles = []
-
-            elif data == ac.VEH_GET_TYPE_ID:
-                send_message(conn, in_format="i", values=(0,))
-
-                # get the type ID in flow
-                type_id = None
-                while type_id is None:
-                    type_id = conn.recv(2048)
-
-                # convert the edge name to an edge name in Aimsun
-                model = GKSystem.getSystem().getActiveModel()
-                type_vehicle = model.getType("GKVehicle")
-                vehicle = model.getCatalog().findByName(type_id, type_vehicle)
-                aimsun_type = vehicle.getId()
-                aimsun_type_pos = AKIVehGetVehTypeInternalPosition(aimsun_type)
-
-                send_message(conn, in_format="i", values=(aimsun_type_pos,))
-
-            # FIXME can probably be done more efficiently cf. VEH_GET_TYPE_ID
-            elif data == ac.VEH_GET_TYPE_NAME:
-                send_message(conn, in_format="i", values=(0,))
-                (veh_id,) = retrieve_message(conn, "i")
-
-                static_info = aimsun_api.AKIVehGetStaticInf(veh_id)
-                typename = aimsun_api.AKIVehGetVehTypeName(static_info.type)
-
-                anyNonAsciiChar = aimsun_api.boolp()
-                output = str(
-                    aimsun_api.AKIConvertToAsciiString(typename, True, anyNonAsciiChar)
-                )
-
-                send_message(conn, in_format="str", values=(output,))
-
-            elif data == ac.VEH_GET_LENGTH:
-                send_message(conn, in_format="i", values=(0,))
-                (veh_id,) = retrieve_message(conn, "i")
-
-                static_info = aimsun_api.AKIVehGetStaticInf(veh_id)
-                output = static_info.length
-
-                send_message(conn, in_format="f", values=(output,))
-
-            elif data == ac.VEH_GET_STATIC:
-                send_message(conn, in_format="i", values=(0,))
-                (veh_id,) = retrieve_message(conn, "i")
-
-                static_info = aimsun_api.AKIVehGetStaticInf(veh_id)
-                output = (
-                    static_info.report,
-                    static_info.idVeh,
-                    static_info.type,
-                    static_info.length,
-                    static_info.width,
-                    static_info.maxDesiredSpeed,
-                    static_info.maxAcceleration,
-                    static_info.normalDeceleration,
-                    static_info.maxDeceleration,
-                    static_info.speedAcceptance,
-                    static_info.minDistanceVeh,
-                    static_info.giveWayTime,
-                    static_info.guidanceAcceptance,
-                    static_info.enrouted,
-                    static_info.equipped,
-                    static_info.tracked,
-                    static_info.keepfastLane,
-                    static_info.headwayMin,
-                    static_info.sensitivityFactor,
-                    static_info.reactionTime,
-                    static_info.reactionTimeAtStop,
-                    static_info.reactionTimeAtTrafficLight,
-                    static_info.centroidOrigin,
-                    static_info.centroidDest,
-                    static_info.idsectionExit,
-                    static_info.idLine,
-                )
-
-                send_message(
-                    conn,
-                    in_format="i i i f f f f f f f f f f i i i ? " "f f f f f i i i i",
-                    values=output,
-                )
-
-            elif data == ac.VEH_GET_TRACKING:
-                send_message(conn, in_format="i", values=(0,))
-
-                info_bitmap = None
-                while info_bitmap is None:
-                    info_bitmap = conn.recv(2048)
-
-                # bitmap is built as follows:
-                #   21 bits representing what information is to be returned
-                #   a ':' character
-                #   the id of the vehicle
-                #   a bit representing whether or not the vehicle is tracked
-
-                # retrieve the tracked boolean
-                tracked = info_bitmap[-1]
-                info_bitmap = info_bitmap[:-1]
-
-                # separate the actual bitmap from the vehicle id
-                s = ""
-                for i in range(len(info_bitmap)):
-                    if info_bitmap[i] == ":":
-                        info_bitmap = info_bitmap[i + 1 :]
-                        break
-                    s += info_bitmap[i]
-                veh_id = int(s)
-
-                # retrieve the tracking info of the vehicle
-                if tracked == "1":
-                    tracking_info = aimsun_api.AKIVehTrackedGetInf(veh_id)
-                else:
-                    tracking_info = aimsun_api.AKIVehGetInf(veh_id)
-
-                data = (
-                    # tracking_info.report,
-                    # tracking_info.idVeh,
-                    # tracking_info.type,
-                    tracking_info.CurrentPos,
-                    tracking_info.distance2End,
-                    tracking_info.xCurrentPos,
-                    tracking_info.yCurrentPos,
-                    tracking_info.zCurrentPos,
-                    tracking_info.xCurrentPosBack,
-                    tracking_info.yCurrentPosBack,
-                    tracking_info.zCurrentPosBack,
-                    tracking_info.CurrentSpeed,
-                    # tracking_info.PreviousSpeed,
-                    tracking_info.TotalDistance,
-                    # tracking_info.SystemGenerationT,
-                    # tracking_info.SystemEntranceT,
-                    tracking_info.SectionEntranceT,
-                    tracking_info.CurrentStopTime,
-                    tracking_info.stopped,
-                    tracking_info.idSection,
-                    tracking_info.segment,
-                    tracking_info.numberLane,
-                    tracking_info.idJunction,
-                    tracking_info.idSectionFrom,
-                    tracking_info.idLaneFrom,
-                    tracking_info.idSectionTo,
-                    tracking_info.idLaneTo,
-                )
-
-                # form the output and output format according to the bitmap
-                output = []
-                in_format = ""
-                for i in range(len(info_bitmap)):
-                    if info_bitmap[i] == "1":
-                        if i <= 12:
-                            in_format += "f "
-                        else:
-                            in_format += "i "
-                        output.append(data[i])
-                if in_format == "":
-                    return
-                else:
-                    in_format = in_format[:-1]
-
-                if len(output) == 0:
-                    output = None
-
-                send_message(conn, in_format=in_format, values=output)
-
-            elif data == ac.VEH_GET_LEADER:
-                send_message(conn, in_format="i", values=(0,))
-                (veh_id,) = retrieve_message(conn, "i")
-                leader = aimsun_api.AKIVehGetLeaderId(veh_id)
-                send_message(conn, in_format="i", values=(leader,))
-
-            elif data == ac.VEH_GET_FOLLOWER:
-                send_message(conn, in_format="i", values=(0,))
-                (veh_id,) = retrieve_message(conn, "i")
-                follower = aimsun_api.AKIVehGetFollowerId(veh_id)
-                send_message(conn, in_format="i", values=(follower,))
-
-            elif data == ac.VEH_GET_NEXT_SECTION:
-                send_message(conn, in_format="i", values=(0,))
-                veh_id, section = retrieve_message(conn, "i i")
-                next_section = AKIVehInfPathGetNextSection(veh_id, section)
-                send_message(conn, in_format="i", values=(next_section,))
-
-            elif data == ac.VEH_GET_ROUTE:
-                send_message(conn, in_format="i", values=(0,))
-                # veh_id, = retrieve_message(conn, 'i')
-                # TODO
-
-            elif data == ac.TL_GET_IDS:
-                send_message(conn, in_format="i", values=(0,))
-
-                data = None
-                while data is None:
-                    data = conn.recv(256)
-
-                num_meters = aimsun_api.ECIGetNumberMeterings()
-                if num_meters == 0:
-                    output = "-1"
-                else:
-                    meter_ids = []
-                    for i in range(1, num_meters + 1):
-                        struct_metering = ECIGetMeteringProperties(i)
-                        meter_id = struct_metering.Id
-                        meter_ids.append(meter_id)
-                    output = ":".join([str(e) for e in meter_ids])
-                send_message(conn, in_format="str", values=(output,))
-
-            elif data == ac.TL_SET_STATE:
-                send_message(conn, in_format="i", values=(0,))
-                meter_aimsun_id, state = retrieve_message(conn, "i i")
-                time = AKIGetCurrentSimulationTime()  # simulation time
-                sim_step = AKIGetSimulationStepTime()
-                identity = 0
-                ECIChangeStateMeteringById(
-                    meter_aimsun_id, state, time, sim_step, identity
-                )
-                send_message(conn, in_format="i", values=(0,))
-
-            elif data == ac.TL_GET_STATE:
-                send_message(conn, in_format="i", values=(0,))
-                meter_aimsun_id = retrieve_message(conn, "i")
-                lane_id = 1  # TODO double check
-                state = ECIGetCurrentStateofMeteringById(meter_aimsun_id, lane_id)
-                send_message(conn, in_format="i", values=(state,))
-
-            elif data == ac.GET_EDGE_NAME:
-                send_message(conn, in_format="i", values=(0,))
-
-                # get the edge ID in flow
-                edge = None
-                while edge is None:
-                    edge = conn.recv(2048)
-
-                model = GKSystem.getSystem().getActiveModel()
-                edge_aimsun = model.getCatalog().findByName(
-                    edge, model.getType("GKSection")
-                )
-
-                if edge_aimsun:
-                    send_message(conn, in_format="i", values=(edge_aimsun.getId(),))
-                else:
-                    send_message(conn, in_format="i", values=(int(edge),))
-
-            # in case the message is unknown, return -1001
+
+        elif data == ac.VEH_SET_ROUTE:
+            pass
+            # TODO
+
+        elif data == ac.VEH_SET_COLOR:
+            veh_id, r, g, b = unpack("i i i i", payload)
+            # TODO
+
+        elif data == ac.VEH_SET_TRACKED:
+            (veh_id,) = unpack("i", payload)
+            aimsun_api.AKIVehSetAsTracked(veh_id)
+
+        elif data == ac.VEH_SET_NO_TRACKED:
+            (veh_id,) = unpack("i", payload)
+            aimsun_api.AKIVehSetAsNoTracked(veh_id)
+
+        elif data == ac.VEH_GET_ENTERED_IDS:
+            global entered_vehicles
+            if len(entered_vehicles) == 0:
+                output = "-1"
             else:
-                send_message(conn, in_format="i", values=(-1001,))
+                output = ":".join([str(e) for e in entered_vehicles])
+            send_message(conn, in_format="str", values=(output,))
+            entered_vehicles = []
+
+        elif data == ac.VEH_GET_EXITED_IDS:
+            global exited_vehicles
+            if len(exited_vehicles) == 0:
+                output = "-1"
+            else:
+                output = ":".join([str(e) for e in exited_vehicles])
+            send_message(conn, in_format="str", values=(output,))
+            exited_vehicles = []
+
+        elif data == ac.VEH_GET_TYPE_ID:
+            # get the type ID in flow
+            type_id = payload
+
+            # convert the edge name to an edge name in Aimsun
+            model = GKSystem.getSystem().getActiveModel()
+            type_vehicle = model.getType("GKVehicle")
+            vehicle = model.getCatalog().findByName(type_id, type_vehicle)
+            aimsun_type = vehicle.getId()
+            aimsun_type_pos = AKIVehGetVehTypeInternalPosition(aimsun_type)
+
+            send_message(conn, in_format="i", values=(aimsun_type_pos,))
+
+        # FIXME can probably be done more efficiently cf. VEH_GET_TYPE_ID
+        elif data == ac.VEH_GET_TYPE_NAME:
+            (veh_id,) = unpack("i", payload)
+
+            static_info = aimsun_api.AKIVehGetStaticInf(veh_id)
+            typename = aimsun_api.AKIVehGetVehTypeName(static_info.type)
+
+            anyNonAsciiChar = aimsun_api.boolp()
+            output = str(
+                aimsun_api.AKIConvertToAsciiString(typename, True, anyNonAsciiChar)
+            )
+
+            send_message(conn, in_format="str", values=(output,))
+
+        elif data == ac.VEH_GET_LENGTH:
+            (veh_id,) = unpack("i", payload)
+
+            static_info = aimsun_api.AKIVehGetStaticInf(veh_id)
+            output = static_info.length
+
+            send_message(conn, in_format="f", values=(output,))
+
+        elif data == ac.VEH_GET_STATIC:
+            (veh_id,) = unpack("i", payload)
+
+            static_info = aimsun_api.AKIVehGetStaticInf(veh_id)
+            output = (
+                static_info.report,
+                static_info.idVeh,
+                static_info.type,
+                static_info.length,
+                static_info.width,
+                static_info.maxDesiredSpeed,
+                static_info.maxAcceleration,
+                static_info.normalDeceleration,
+                static_info.maxDeceleration,
+                static_info.speedAcceptance,
+                static_info.minDistanceVeh,
+                static_info.giveWayTime,
+                static_info.guidanceAcceptance,
+                static_info.enrouted,
+                static_info.equipped,
+                static_info.tracked,
+                static_info.keepfastLane,
+                static_info.headwayMin,
+                static_info.sensitivityFactor,
+                static_info.reactionTime,
+                static_info.reactionTimeAtStop,
+                static_info.reactionTimeAtTrafficLight,
+                static_info.centroidOrigin,
+                static_info.centroidDest,
+                static_info.idsectionExit,
+                static_info.idLine,
+            )
+
+            send_message(
+                conn,
+                in_format="i i i f f f f f f f f f f i i i ? " "f f f f f i i i i",
+                values=output,
+            )
+
+        elif data == ac.VEH_GET_TRACKING:
+            info_bitmap = payload
+
+            # bitmap is built as follows:
+            #   the id of the vehicle
+            #   a ':' character
+            #   21 bits representing what information is to be returned
+            #   a bit representing whether or not the vehicle is tracked
+
+            # retrieve the tracked boolean
+            tracked = info_bitmap[-1]
+            info_bitmap = info_bitmap[:-1]
+
+            # separate the actual bitmap from the vehicle id
+            veh_id, info_bitmap = info_bitmap.split(":")
+            veh_id = int(veh_id)
+
+            # retrieve the tracking info of the vehicle
+            if tracked == "1":
+                tracking_info = aimsun_api.AKIVehTrackedGetInf(veh_id)
+            else:
+                tracking_info = aimsun_api.AKIVehGetInf(veh_id)
+
+            # form the output and output format according to the bitmap
+            fields = aimsun_struct.tracking_fields(info_bitmap)
+            in_format = " ".join(fmt for _, fmt in fields)
+            output = [getattr(tracking_info, attr) for attr, _ in fields]
+
+            send_message(conn, in_format=in_format, values=output)
+
+        elif data == ac.VEH_GET_TRACKING_BULK:
+            in_format, output = get_bulk_tracking_info(payload)
+            send_message(conn, in_format=in_format, values=output)
+
+        elif data == ac.VEH_GET_LEADER:
+            (veh_id,) = unpack("i", payload)
+            leader = aimsun_api.AKIVehGetLeaderId(veh_id)
+            send_message(conn, in_format="i", values=(leader,))
+
+        elif data == ac.VEH_GET_FOLLOWER:
+            (veh_id,) = unpack("i", payload)
+            follower = aimsun_api.AKIVehGetFollowerId(veh_id)
+            send_message(conn, in_format="i", values=(follower,))
+
+        elif data == ac.VEH_GET_NEXT_SECTION:
+            veh_id, section = unpack("i i", payload)
+            next_section = AKIVehInfPathGetNextSection(veh_id, section)
+            send_message(conn, in_format="i", values=(next_section,))
+
+        elif data == ac.VEH_GET_ROUTE:
+            send_message(conn, in_format="i", values=(0,))
+            # veh_id, = unpack("i", payload)
+            # TODO
+
+        elif data == ac.TL_GET_IDS:
+            num_meters = aimsun_api.ECIGetNumberMeterings()
+            if num_meters == 0:
+                output = "-1"
+            else:
+                meter_ids = []
+                for i in range(1, num_meters + 1):
+                    struct_metering = ECIGetMeteringProperties(i)
+                    meter_id = struct_metering.Id
+                    meter_ids.append(meter_id)
+                output = ":".join([str(e) for e in meter_ids])
+            send_message(conn, in_format="str", values=(output,))
+
+        elif data == ac.TL_SET_STATE:
+            meter_aimsun_id, state = unpack("i i", payload)
+            time = AKIGetCurrentSimulationTime()  # simulation time
+            sim_step = AKIGetSimulationStepTime()
+            identity = 0
+            ECIChangeStateMeteringById(meter_aimsun_id, state, time, sim_step, identity)
+
+        elif data == ac.TL_GET_STATE:
+            (meter_aimsun_id,) = unpack("i", payload)
+            lane_id = 1  # TODO double check
+            state = ECIGetCurrentStateofMeteringById(meter_aimsun_id, lane_id)
+            send_message(conn, in_format="i", values=(state,))
+
+        elif data == ac.GET_EDGE_NAME:
+            # get the edge ID in flow
+            edge = payload
+
+            model = GKSystem.getSystem().getActiveModel()
+            edge_aimsun = model.getCatalog().findByName(
+                edge, model.getType("GKSection")
+            )
+
+            if edge_aimsun:
+                send_message(conn, in_format="i", values=(edge_aimsun.getId(),))
+            else:
+                send_message(conn, in_format="i", values=(int(edge),))
+
+        # in case the message is unknown, return -1001 and the command type
+        else:
+            send_message(conn, in_format="i", values=(data,), status=-1001)
 
     # close the connection
     conn.close()
@@ -1,4 +1,115 @@
-"""Script containing objects used to store vehicle information in Aimsun."""
+"""Script containing objects used to store vehicle information in Aimsun.
+
+This script is also imported by the Aimsun run script, and must therefore
+remain compatible with the Python version of Aimsun.
+"""
+
+#: format of the header of every message exchanged with the Aimsun server: the
+#: command (or status of the reply) and the size of the payload that follows
+HEADER_FORMAT = "<ii"
+
+#: tracking information of vehicles, in the order of the tracking bitmaps
+INFOS_ATTR_BY_INDEX = [
+    "CurrentPos",
+    "distance2End",
+    "xCurrentPos",
+    "yCurrentPos",
+    "zCurrentPos",
+    "xCurrentPosBack",
+    "yCurrentPosBack",
+    "zCurrentPosBack",
+    "CurrentSpeed",
+    "TotalDistance",
+    "SectionEntranceT",
+    "CurrentStopTime",
+    "stopped",
+    "idSection",
+    "segment",
+    "numberLane",
+    "idJunction",
+    "idSectionFrom",
+    "idLaneFrom",
+    "idSectionTo",
+    "idLaneTo",
+]
+
+#: number of floats at the start of INFOS_ATTR_BY_INDEX, the others are ints
+NUM_FLOAT_INFOS = 13
+
+#: tracking information returned for leaders that are not tracked by Flow
+LEADER_INFOS = [
+    "CurrentPos",
+    "distance2End",
+    "idSection",
+    "idJunction",
+    "idSectionFrom",
+    "idSectionTo",
+]
+
+
+def make_bitmap(infos):
+    """Return the tracking bitmap of a set of tracking information.
+
+    Parameters
+    ----------
+    infos : set of str
+        names of the tracking information, see INFOS_ATTR_BY_INDEX
+
+    Returns
+    -------
+    str
+        "1" for every element of INFOS_ATTR_BY_INDEX in infos, "0" otherwise
+    """
+    return "".join("1" if attr in infos else "0" for attr in INFOS_ATTR_BY_INDEX)
+
+
+def tracking_fields(info_bitmap):
+    """Return the name and struct format of the infos of a tracking bitmap.
+
+    Parameters
+    ----------
+    info_bitmap : str
+        tracking bitmap, see make_bitmap
+
+    Returns
+    -------
+    list of (str, str)
+        name and format ("f" or "i") of every selected tracking information
+    """
+    return [
+        (attr, "f" if i < NUM_FLOAT_INFOS else "i")
+        for i, attr in enumerate(INFOS_ATTR_BY_INDEX)
+        if info_bitmap[i] == "1"
+    ]
+
+
+def bulk_tracking_fields(info_bitmap):
+    """Return the fields of the records of the bulk tracking command.
+
+    Every vehicle is described by one record of packed little-endian values:
+    the tracking information selected by the bitmap, the id of its leader, the
+    next section of the vehicle (-1 if it is in a junction), and the tracking
+    information in LEADER_INFOS and the length of the leader. The information
+    of the leader is only filled if the leader is not one of the requested
+    vehicles, and is zero otherwise.
+
+    Parameters
+    ----------
+    info_bitmap : str
+        tracking bitmap of the requested vehicles, see make_bitmap
+
+    Returns
+    -------
+    list of (str, str)
+        name and format ("f" or "i") of every field of a record
+    """
+    leader_fields = tracking_fields(make_bitmap(LEADER_INFOS))
+    return (
+        tracking_fields(info_bitmap)
+        + [("leader", "i"), ("next_section", "i")]
+        + [("leader_" + attr, fmt) for attr, fmt in leader_fields]
+        + [("leader_length", "f")]
+    )
 
 
 class InfVeh(object):
@@ -163,7 +274,7 @@ class StaticInfVeh(object):
     idsectionExit : int
         Identifier of exit section destination of the vehicle, when the
         destination centroid uses percentages as destination (otherwise is
-        –1) and the traffic conditions are defined by an OD matrix
+        -1) and the traffic conditions are defined by an OD matrix
     idLine : int
         Identifier of Public Transport Line, when the vehicle has been
         generated as a public transport vehicle
@@ -0,0 +1,60 @@
+"""Lazy loading of the attributes of packages.
+
+Packages that expose many classes (e.g. all environments or networks) import
+the module of a class only the first time the class is accessed, using module
+level ``__getattr__`` and ``__dir__`` functions (PEP 562):
+
+>>> __getattr__, __dir__ = lazy_attributes(__name__, {
+...     "RingNetwork": "flow.networks.ring",
+... })
+
+Importing a single module of the package, or the package itself, then does
+not import the dependencies of every other module.
+"""
+
+import importlib
+import sys
+
+
+def lazy_attributes(package, attributes):
+    """Return the ``__getattr__`` and ``__dir__`` functions of a package.
+
+    Parameters
+    ----------
+    package : str
+        name of the package, i.e. its ``__name__``
+    attributes : dict < str, str >
+        name of the module defining every lazily loaded attribute
+
+    Returns
+    -------
+    function
+        module level ``__getattr__``, which imports the module defining an
+        attribute and stores the attribute in the package. Subpackages and
+        submodules that were not imported yet are also imported.
+    function
+        module level ``__dir__``, which includes the attributes that were not
+        loaded yet
+    """
+
+    def __getattr__(name):
+        module = attributes.get(name)
+        if module is not None:
+            value = getattr(importlib.import_module(module), name)
+        else:
+            try:
+                value = importlib.import_module("{}.{}".format(package, name))
+            except ModuleNotFoundError as e:
+                if e.name != "{}.{}".format(package, name):
+                    raise
+                raise AttributeError(
+                    "module '{}' has no attribute '{}'".format(package, name)
+                ) from None
+        # store the attribute, so that it is only loaded once
+        setattr(sys.modules[package], name, value)
+        return value
+
+    def __dir__():
+        return sorted(set(vars(sys.modules[package])) | set(attributes))
+
+    return __getattr__, __dir__
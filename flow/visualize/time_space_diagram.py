@@ -6,7 +6,9 @@ being the time (in seconds), the y-axis being the position of a vehicle, and
 color representing the speed of te vehicles.
 
 If the number of simulation steps is too dense, you can plot every nth step in
-the plot by setting the input `--steps=n`.
+the plot by setting the input `--steps=n`. If the number of line segments
+exceeds `--max_segments`, the mean speed in bins of time and space is plotted
+as an image instead.
 
 Note: This script assumes that the provided network has only one lane on the
 each edge, or one lane on the main highway in the case of MergeNetwork.
@@ -24,6 +26,7 @@ from flow.networks import (
     I210SubNetwork,
     HighwayNetwork,
 )
+from flow.core.kernel.simulation.emission import EMISSION_COLUMNS, CHUNK_SIZE
 
 import argparse
 from collections import defaultdict
@@ -40,6 +43,7 @@ from matplotlib.patches import Rectangle
 import matplotlib.colors as colors
 import numpy as np
 import pandas as pd
+from pandas.api.types import union_categoricals
 
 
 # networks that can be plotted by this method
@@ -51,14 +55,48 @@ ACCEPTABLE_NETWORKS = [
     HighwayNetwork,
 ]
 
+# columns of the trajectory files that are used by the time-space diagrams
+TSD_COLUMNS = [
+    "time",
+    "id",
+    "x",
+    "speed",
+    "edge_id",
+    "lane_number",
+    "distance",
+    "relative_position",
+]
+
+# dtypes of these columns. Older emission files name the time and lane
+# columns "time_step" and "lane_id".
+TSD_DTYPES = {
+    name: str if dtype is object else dtype
+    for name, dtype in EMISSION_COLUMNS
+    if name in TSD_COLUMNS
+}
+TSD_DTYPES["time_step"] = TSD_DTYPES["time"]
+TSD_DTYPES["lane_id"] = TSD_DTYPES["lane_number"]
+
+# number of line segments above which diagrams are rendered as a raster
+MAX_SEGMENTS = 500000
 
-def import_data_from_trajectory(fp, params=dict()):
+# default number of time and space bins of the raster
+RASTER_BINS = (1000, 500)
+
+
+def import_data_from_trajectory(fp, params=dict(), chunksize=CHUNK_SIZE):
     r"""Import and preprocess data from the Flow trajectory (.csv) file.
 
+    Only the columns needed by the time-space diagrams are kept. Csv files
+    are read in chunks of rows with explicit dtypes, and the vehicle and edge
+    ids are stored as categoricals, so that long emission files fit in memory.
+
     Parameters
     ----------
     fp : str
-        file path (for the .csv formatted file)
+        file path (for the .csv formatted file). Compressed (.csv.gz),
+        Parquet (.parquet), and Arrow IPC (.arrow) emission files are also
+        supported
     params : dict
         flow-specific parameters, including:
 
@@ -68,32 +106,143 @@ def import_data_from_trajectory(fp, params=dict()):
         * "net_params" (flow.core.params.NetParams): network-specific
           parameters. This is used to collect the lengths of various network
           links.
+    chunksize : int, optional
+        number of rows of the csv file that are read at a time
 
     Returns
     -------
     pd.DataFrame
     """
-    # Read trajectory csv into pandas dataframe
-    df = pd.read_csv(fp)
+    # Read trajectory file in chunks of rows
+    if fp.endswith(".parquet"):
+        chunks = [pd.read_parquet(fp)]
+    elif fp.endswith(".arrow"):
+        chunks = [pd.read_feather(fp)]
+    else:
+        chunks = pd.read_csv(
+            fp,
+            usecols=lambda column: column in TSD_DTYPES,
+            dtype=TSD_DTYPES,
+            chunksize=chunksize,
+        )
+
+    df = _concat_chunks([_prepare_chunk(chunk, params) for chunk in chunks])
+
+    # Compute line segment ends from the next sample of every vehicle
+    df["next_pos"], df["next_time"], has_next = _get_next_sample(
+        df["id"], df["distance"], df["time_step"]
+    )
+
+    # Remove samples without a next sample from data
+    df = df[has_next]
+
+    return df
+
+
+def _prepare_chunk(chunk, params):
+    """Select, rename and complete the columns of a chunk of trajectory data.
+
+    Parameters
+    ----------
+    chunk : pd.DataFrame
+        rows of the trajectory file
+    params : dict
+        flow-specific parameters
+
+    Returns
+    -------
+    pd.DataFrame
+        the chunk, with ids stored as categoricals
+    """
+    chunk = chunk[[column for column in chunk.columns if column in TSD_DTYPES]]
 
     # Convert column names for backwards compatibility using emissions csv
     column_conversions = {
         "time": "time_step",
         "lane_number": "lane_id",
     }
-    df = df.rename(columns=column_conversions)
-    if "distance" not in df.columns:
-        df["distance"] = _get_abs_pos(df, params)
+    chunk = chunk.rename(columns=column_conversions)
+    for column in ("id", "edge_id"):
+        if column in chunk.columns:
+            chunk[column] = chunk[column].astype("category")
+    if "distance" not in chunk.columns:
+        chunk["distance"] = _get_abs_pos(chunk, params)
 
-    # Compute line segment ends by shifting dataframe by 1 row
-    df[["next_pos", "next_time"]] = df.groupby("id")[["distance", "time_step"]].shift(
-        -1
-    )
+    return chunk
 
-    # Remove nans from data
-    df = df[df["next_time"].notna()]
 
-    return df
+def _concat_chunks(chunks):
+    """Concatenate chunks of trajectory data.
+
+    The categories of the ids of all chunks are merged, instead of falling
+    back to object columns.
+
+    Parameters
+    ----------
+    chunks : list of pd.DataFrame
+        chunks returned by _prepare_chunk
+
+    Returns
+    -------
+    pd.DataFrame
+        all rows of the chunks, with a new index
+    """
+    if len(chunks) == 1:
+        return chunks[0].reset_index(drop=True)
+
+    columns = {}
+    for column, dtype in chunks[0].dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            columns[column] = union_categoricals(
+                [chunk[column] for chunk in chunks], sort_categories=True
+            )
+        else:
+            columns[column] = np.concatenate(
+                [chunk[column].to_numpy() for chunk in chunks]
+            )
+
+    return pd.DataFrame(columns)
+
+
+def _get_next_sample(ids, distance, time_step):
+    """Return the position and time of the next sample of the same vehicle.
+
+    This is equivalent to shifting the data of every vehicle by one row, but
+    done with a single stable sort of the rows by vehicle.
+
+    Parameters
+    ----------
+    ids : pd.Series
+        vehicle id of every sample
+    distance : pd.Series
+        position of every sample
+    time_step : pd.Series
+        time of every sample
+
+    Returns
+    -------
+    np.ndarray
+        position of the next sample, or nan for the last sample of a vehicle
+    np.ndarray
+        time of the next sample, or nan for the last sample of a vehicle
+    np.ndarray
+        whether every sample has a next sample
+    """
+    codes = pd.Categorical(ids).codes
+    order = np.argsort(codes, kind="stable")
+    same_vehicle = codes[order[1:]] == codes[order[:-1]]
+
+    # index of the next sample of the same vehicle, for samples that have one
+    next_index = np.full(len(codes), -1)
+    next_index[order[:-1][same_vehicle]] = order[1:][same_vehicle]
+    has_next = next_index >= 0
+
+    next_pos = np.full(len(codes), np.nan)
+    next_time = np.full(len(codes), np.nan)
+    next_pos[has_next] = distance.to_numpy()[next_index[has_next]]
+    next_time[has_next] = time_step.to_numpy()[next_index[has_next]]
+
+    return next_pos, next_time, has_next
 
 
 def get_time_space_data(data, params):
@@ -154,6 +303,30 @@ def get_time_space_data(data, params):
     return segs, data
 
 
+def _get_segments(data):
+    """Return the line segments of the samples of the trajectory data.
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        cleaned dataframe of the trajectory data
+
+    Returns
+    -------
+    ndarray
+        3d array (n_segments x 2 x 2) containing segments to be plotted.
+        every inner 2d array is comprised of two 1d arrays representing
+        [start time, start distance] and [end time, end distance] pairs.
+    """
+    segs = np.empty((len(data), 2, 2))
+    segs[:, 0, 0] = data["time_step"].to_numpy()
+    segs[:, 0, 1] = data["distance"].to_numpy()
+    segs[:, 1, 0] = data["next_time"].to_numpy()
+    segs[:, 1, 1] = data["next_pos"].to_numpy()
+
+    return segs
+
+
 def _merge(data):
     r"""Generate time and position data for the merge.
 
@@ -178,9 +351,7 @@ def _merge(data):
     keep_edges = {"inflow_merge", "bottom", ":bottom_0"}
     data = data[data["edge_id"].isin(keep_edges)]
 
-    segs = data[["time_step", "distance", "next_time", "next_pos"]].values.reshape(
-        (len(data), 2, 2)
-    )
+    segs = _get_segments(data)
 
     return segs, data
 
@@ -202,9 +373,7 @@ def _highway(data):
     pd.DataFrame
         modified trajectory dataframe
     """
-    segs = data[["time_step", "distance", "next_time", "next_pos"]].values.reshape(
-        (len(data), 2, 2)
-    )
+    segs = _get_segments(data)
 
     return segs, data
 
@@ -229,9 +398,7 @@ def _ring_road(data):
     pd.DataFrame
         unmodified trajectory dataframe
     """
-    segs = data[["time_step", "distance", "next_time", "next_pos"]].values.reshape(
-        (len(data), 2, 2)
-    )
+    segs = _get_segments(data)
 
     return segs, data
 
@@ -264,9 +431,7 @@ def _i210_subnetwork(data):
 
     segs = dict()
     for lane, df in data.groupby("lane_id"):
-        segs[lane] = df[
-            ["time_step", "distance", "next_time", "next_pos"]
-        ].values.reshape((len(df), 2, 2))
+        segs[lane] = _get_segments(df)
 
     return segs, data
 
@@ -292,9 +457,7 @@ def _figure_eight(data):
     pd.DataFrame
         unmodified trajectory dataframe
     """
-    segs = data[["time_step", "distance", "next_time", "next_pos"]].values.reshape(
-        (len(data), 2, 2)
-    )
+    segs = _get_segments(data)
 
     return segs, data
 
@@ -397,7 +560,14 @@ def _get_abs_pos(df, params):
     else:
         edgestarts = defaultdict(float)
 
-    ret = df.apply(lambda x: x["relative_position"] + edgestarts[x["edge_id"]], axis=1)
+    # look up the start of the edge of every sample from its category code.
+    # Missing edges have a code of -1, i.e. the start appended last.
+    edge_ids = df["edge_id"].astype("category")
+    codes = edge_ids.cat.codes.to_numpy()
+    starts = [edgestarts[edge] for edge in edge_ids.cat.categories]
+    if (codes < 0).any():
+        starts.append(edgestarts[np.nan])
+    ret = df["relative_position"] + np.asarray(starts, dtype=np.float64)[codes]
 
     if params["network"] == FigureEightNetwork:
         # reorganize data for space-time plot
@@ -422,6 +592,8 @@ def plot_tsd(ax, df, segs, args, lane=None, ghost_edges=None, ghost_bounds=None)
     """Plot the time-space diagram.
 
     Take the pre-processed segments and other meta-data, then plot all the line segments.
+    If there are more than ``args.max_segments`` segments, the mean speed in
+    bins of time and space is plotted as an image instead.
 
     Parameters
     ----------
@@ -454,10 +626,14 @@ def plot_tsd(ax, df, segs, args, lane=None, ghost_edges=None, ghost_bounds=None)
     ax.set_xlim(xmin - xbuffer, xmax + xbuffer)
     ax.set_ylim(ymin - ybuffer, ymax + ybuffer)
 
-    lc = LineCollection(segs, cmap=my_cmap, norm=norm)
-    lc.set_array(df["speed"].values)
-    lc.set_linewidth(1)
-    ax.add_collection(lc)
+    if len(segs) > getattr(args, "max_segments", MAX_SEGMENTS):
+        bins = getattr(args, "raster_bins", RASTER_BINS)
+        lc = _plot_raster(ax, segs, df["speed"].values, norm, bins)
+    else:
+        lc = LineCollection(segs, cmap=my_cmap, norm=norm)
+        lc.set_array(df["speed"].values)
+        lc.set_linewidth(1)
+        ax.add_collection(lc)
     ax.autoscale()
 
     rects = []
@@ -505,6 +681,50 @@ def plot_tsd(ax, df, segs, args, lane=None, ghost_edges=None, ghost_bounds=None)
     cbar.ax.tick_params(labelsize=18)
 
 
+def _plot_raster(ax, segs, speed, norm, bins):
+    """Plot the mean speed of the segments in bins of time and space.
+
+    Every segment is binned by its start, so the cost of rendering does not
+    depend on the number of segments.
+
+    Parameters
+    ----------
+    ax : matplotlib.axes.Axes
+        figure axes that will be plotted on
+    segs : np.ndarray
+        line segments to be plotted, see get_time_space_data
+    speed : np.ndarray
+        speed of every segment
+    norm : matplotlib.colors.Normalize
+        normalization of the speeds to the color range
+    bins : (int, int)
+        number of time and space bins
+
+    Returns
+    -------
+    matplotlib.image.AxesImage
+        the image, with empty bins left transparent
+    """
+    time, pos = segs[:, 0, 0], segs[:, 0, 1]
+    extent = (time.min(), time.max(), pos.min(), pos.max())
+    bin_range = (extent[:2], extent[2:])
+
+    count, _, _ = np.histogram2d(time, pos, bins=bins, range=bin_range)
+    total, _, _ = np.histogram2d(time, pos, bins=bins, range=bin_range, weights=speed)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_speed = total / count
+
+    return ax.imshow(
+        mean_speed.T,
+        origin="lower",
+        extent=extent,
+        aspect="auto",
+        interpolation="nearest",
+        cmap=my_cmap,
+        norm=norm,
+    )
+
+
 if __name__ == "__main__":
     # create the parser
     parser = argparse.ArgumentParser(
@@ -542,6 +762,21 @@ if __name__ == "__main__":
         "--start", type=float, default=0, help="initial time (in sec) in the plot."
     )
 
+    parser.add_argument(
+        "--max_segments",
+        type=int,
+        default=MAX_SEGMENTS,
+        help="number of line segments above which the diagram is rendered "
+        "as an image of the mean speed in bins of time and space.",
+    )
+    parser.add_argument(
+        "--raster_bins",
+        type=int,
+        nargs=2,
+        default=RASTER_BINS,
+        help="number of time and space bins of the rendered image.",
+    )
+
     args = parser.parse_args()
 
     # flow_params is imported as a dictionary
@@ -123,6 +123,7 @@ def visualizer_rllib(args):
             sim_params.render = "drgb"
             sim_params.pxpm = 4
         sim_params.save_render = True
+        sim_params.save_render_step = args.save_render_step
 
     # Create and register a gym+rllib env
     create_env, env_name = make_create_env(params=flow_params, version=0)
@@ -386,6 +387,12 @@ def create_parser():
         help="Saves a rendered video to a file. NOTE: Overrides render_mode "
         "with pyglet rendering.",
     )
+    parser.add_argument(
+        "--save_render_step",
+        type=int,
+        default=1,
+        help="Only saves every n-th rendered frame when --save_render is set.",
+    )
     parser.add_argument("--horizon", type=int, help="Specifies the horizon.")
     return parser
 
@@ -3,7 +3,10 @@
 This script creates a dummy server mimicking the functionality in the Aimsun
 runner script. Used for testing purposes.
 """
-from thread import start_new_thread
+try:
+    from thread import start_new_thread
+except ImportError:
+    from _thread import start_new_thread
 import socket
 import struct
 import sys
@@ -11,18 +14,46 @@ import os
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 import flow.utils.aimsun.constants as ac  # noqa
+import flow.utils.aimsun.struct as aimsun_struct  # noqa
 
 PORT = 9999
 entered_vehicles = [1, 2, 3, 4, 5]
 exited_vehicles = [6, 7, 8, 9, 10]
 tl_ids = [1, 2, 3, 4, 5]
+# speeds (in km/h) and lanes set by the batched setters
+speeds = {}
+lanes = {}
 
 
-def send_message(conn, in_format, values):
+def recv_exact(conn, size):
+    """Receive exactly size bytes from the client.
+
+    Parameters
+    ----------
+    conn : socket.socket
+        socket for server connection
+    size : int
+        number of bytes to receive
+
+    Returns
+    -------
+    bytes
+        the received bytes
+    """
+    data = b''
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        if not chunk:
+            raise EOFError('The connection to Flow was closed.')
+        data += chunk
+    return data
+
+
+def send_message(conn, in_format, values, status=0):
     """Send a message to the client.
 
-    If the message is a string, it is sent in segments of length 256 (if the
-    string is longer than such) and concatenated on the client end.
+    The message consists of a header with the status and the size of the
+    payload, followed by the payload.
 
     Parameters
     ----------
@@ -32,68 +63,68 @@ def send_message(conn, in_format, values):
         format of the input structure
     values : tuple of Any
         commands to be encoded and issued to the client
+    status : int, optional
+        0 if the command was executed, an error code otherwise
     """
     if in_format == 'str':
-        packer = struct.Struct(format='i')
-        values = values[0]
-
-        # when the message is too large, send value in segments and inform the
-        # client that additional information will be sent. The value will be
-        # concatenated on the other end
-        while len(values) > 256:
-            # send the next set of data
-            conn.send(values[:256])
-            values = values[256:]
-
-            # wait for a reply
-            data = None
-            while data is None:
-                data = conn.recv(2048)
-
-            # send a not-done signal
-            packed_data = packer.pack(*(1,))
-            conn.send(packed_data)
-
-        # send the remaining components of the message (which is of length less
-        # than or equal to 256)
-        conn.send(values)
-
-        # wait for a reply
-        data = None
-        while data is None:
-            data = conn.recv(2048)
-
-        # send a done signal
-        packed_data = packer.pack(*(0,))
-        conn.send(packed_data)
+        payload = values[0].encode()
     else:
-        packer = struct.Struct(format=in_format)
-        packed_data = packer.pack(*values)
-        conn.send(packed_data)
+        payload = struct.pack('<' + in_format, *values)
+    conn.sendall(struct.pack(aimsun_struct.HEADER_FORMAT, status,
+                             len(payload)) + payload)
 
 
-def retrieve_message(conn, out_format):
-    """Retrieve a message from the client.
+def retrieve_message(conn):
+    """Retrieve the next command from the client.
 
     Parameters
     ----------
     conn : socket.socket
         socket for server connection
-    out_format : str or None
-        format of the output structure
 
     Returns
     -------
-    Any
-        received message
+    int
+        the command type
+    bytes
+        the payload of the command
     """
-    unpacker = struct.Struct(format=out_format)
-    try:
-        data = conn.recv(unpacker.size)
-        unpacked_data = unpacker.unpack(data)
-    finally:
-        pass
-    return unpacked_data
+    header = recv_exact(conn, struct.calcsize(aimsun_struct.HEADER_FORMAT))
+    command, size = struct.unpack(aimsun_struct.HEADER_FORMAT, header)
+    return command, recv_exact(conn, size)
+
+
+def get_bulk_tracking_info(payload):
+    """Return dummy records of the bulk tracking command.
+
+    Every tracking info of a vehicle is equal to its id, except the speed and
+    lane, which are the last ones set. The leader of every vehicle is the
+    vehicle with the next id, of length 5.
+    """
+    num_infos = len(aimsun_struct.INFOS_ATTR_BY_INDEX)
+    info_bitmap = payload[:num_infos].decode()
+    num_vehicles = (len(payload) - num_infos) // 4
+    veh_ids = struct.unpack('<{}i'.format(num_vehicles), payload[num_infos:])
+    fields = aimsun_struct.bulk_tracking_fields(info_bitmap)
+
+    values = []
+    for veh_id in veh_ids:
+        for attr, _ in aimsun_struct.tracking_fields(info_bitmap):
+            if attr == 'CurrentSpeed':
+                values.append(speeds.get(veh_id, 0))
+            elif attr == 'numberLane':
+                values.append(lanes.get(veh_id, 0))
+            else:
+                values.append(veh_id)
+        leader = veh_id + 1
+        values += [leader, -1]
+        if leader not in veh_ids:
+            values += [leader] * len(aimsun_struct.LEADER_INFOS) + [5]
+        else:
+            values += [0] * (len(aimsun_struct.LEADER_INFOS) + 1)
+
+    record_format = ''.join(fmt for _, fmt in fields)
+    return record_format * len(veh_ids), values
 
 
 def threaded_client(conn):
@@ -106,86 +137,83 @@ def threaded_client(conn):
     conn : socket.socket
         socket for server connection
     """
+    global entered_vehicles, exited_vehicles, tl_ids
+
     # send feedback that the connection is active
     conn.send(b'Ready.')
 
     done = False
     while not done:
-        # receive the next message
-        data = conn.recv(256)
-
-        if data is not None:
-            # if the message is empty, search for the next message
-            if data == '':
-                continue
-
-            # convert to integer
-            data = int(data)
-
-            if data == ac.VEH_GET_ENTERED_IDS:
-                send_message(conn, in_format='i', values=(0,))
-                data = None
-                while data is None:
-                    data = conn.recv(256)
-                global entered_vehicles
-                if len(entered_vehicles) == 0:
-                    output = '-1'
-                else:
-                    output = ':'.join([str(e) for e in entered_vehicles])
-                send_message(conn, in_format='str', values=(output,))
-                entered_vehicles = []
-
-            elif data == ac.VEH_GET_EXITED_IDS:
-                send_message(conn, in_format='i', values=(0,))
-                data = None
-                while data is None:
-                    data = conn.recv(256)
-                global exited_vehicles
-                if len(exited_vehicles) == 0:
-                    output = '-1'
-                else:
-                    output = ':'.join([str(e) for e in exited_vehicles])
-                send_message(conn, in_format='str', values=(output,))
-                exited_vehicles = []
-
-            elif data == ac.VEH_GET_STATIC:
-                send_message(conn, in_format='i', values=(0,))
-                retrieve_message(conn, 'i')
-                output = (1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15,
-                          16, False, 18, 19, 20, 21, 22, 23, 24, 25, 26)
-                send_message(conn,
-                             in_format='i i i f f f f f f f f f f i i i ? '
-                                       'f f f f f i i i i',
-                             values=output)
-
-            elif data == ac.VEH_GET_TRACKING:
-                send_message(conn, in_format='i', values=(0,))
-                info_bitmap = None
-                while info_bitmap is None:
-                    info_bitmap = conn.recv(2048)
-                output = (4, 5, 6, 7, 8, 9, 10, 11, 12, 14, 17, 18, 19, 20, 21,
-                          22, 23, 24, 25, 26, 27)
-                send_message(conn,
-                             in_format='f f f f f f f f f f f f f i i i i i i '
-                                       'i i',
-                             values=output)
-
-            elif data == ac.TL_GET_IDS:
-                send_message(conn, in_format='i', values=(0,))
-                data = None
-                while data is None:
-                    data = conn.recv(256)
-                global tl_ids
-                if len(tl_ids) == 0:
-                    output = '-1'
-                else:
-                    output = ':'.join([str(e) for e in tl_ids])
-                send_message(conn, in_format='str', values=(output,))
-                tl_ids = []
-
-            # in case the message is unknown, return -1001
+        # receive the next command
+        data, payload = retrieve_message(conn)
+
+        if data == ac.SIMULATION_TERMINATE:
+            send_message(conn, in_format='i', values=(0,))
+            done = True
+
+        elif data == ac.VEH_GET_ENTERED_IDS:
+            if len(entered_vehicles) == 0:
+                output = '-1'
+            else:
+                output = ':'.join([str(e) for e in entered_vehicles])
+            send_message(conn, in_format='str', values=(output,))
+            entered_vehicles = []
+
+        elif data == ac.VEH_GET_EXITED_IDS:
+            if len(exited_vehicles) == 0:
+                output = '-1'
             else:
-                send_message(conn, in_format='i', values=(-1001,))
+                output = ':'.join([str(e) for e in exited_vehicles])
+            send_message(conn, in_format='str', values=(output,))
+            exited_vehicles = []
+
+        elif data == ac.VEH_GET_STATIC:
+            output = (1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15,
+                      16, False, 18, 19, 20, 21, 22, 23, 24, 25, 26)
+            send_message(conn,
+                         in_format='i i i f f f f f f f f f f i i i ? '
+                                   'f f f f f i i i i',
+                         values=output)
+
+        elif data == ac.VEH_GET_TRACKING:
+            output = (4, 5, 6, 7, 8, 9, 10, 11, 12, 14, 17, 18, 19, 20, 21,
+                      22, 23, 24, 25, 26, 27)
+            send_message(conn,
+                         in_format='f f f f f f f f f f f f f i i i i i i '
+                                   'i i',
+                         values=output)
+
+        elif data == ac.VEH_GET_TRACKING_BULK:
+            in_format, output = get_bulk_tracking_info(payload)
+            send_message(conn, in_format=in_format, values=output)
+
+        elif data == ac.VEH_SET_SPEEDS:
+            num_vehicles = len(payload) // 8
+            values = struct.unpack('<{0}i {0}f'.format(num_vehicles), payload)
+            for veh_id, speed in zip(values[:num_vehicles],
+                                     values[num_vehicles:]):
+                speeds[veh_id] = speed * 3.6
+
+        elif data == ac.VEH_SET_LANES:
+            num_vehicles = len(payload) // 8
+            values = struct.unpack('<{0}i {0}i'.format(num_vehicles), payload)
+            for veh_id, lane in zip(values[:num_vehicles],
+                                    values[num_vehicles:]):
+                lanes[veh_id] = lane
+
+        elif data == ac.TL_GET_IDS:
+            if len(tl_ids) == 0:
+                output = '-1'
+            else:
+                output = ':'.join([str(e) for e in tl_ids])
+            send_message(conn, in_format='str', values=(output,))
+            tl_ids = []
+
+        # in case the message is unknown, return -1001 and the command type
+        else:
+            send_message(conn, in_format='i', values=(data,), status=-1001)
+
+    conn.close()
 
 
 while True:
@@ -1,10 +1,15 @@
 
 import flow.config as config
 import flow.utils.aimsun.constants
+import flow.utils.aimsun.constants as ac
 from flow.utils.aimsun.api import FlowAimsunAPI
-from flow.utils.aimsun.struct import InfVeh
+from flow.utils.aimsun.struct import HEADER_FORMAT, InfVeh, make_bitmap, \
+    tracking_fields, bulk_tracking_fields
 import unittest
+from unittest import mock
 import os
+import socket
+import struct
 import subprocess
 import numpy as np
 
@@ -63,6 +68,22 @@ class TestStruct(unittest.TestCase):
         for val in expected_variables:
             self.assertIn(val, obj.__dict__.keys())
 
+    def test_tracking_fields(self):
+        """Verify the layout of the tracking information of the commands."""
+        bitmap = make_bitmap({'CurrentPos', 'stopped', 'idSection'})
+        self.assertEqual(bitmap, '1' + '0' * 11 + '11' + '0' * 7)
+        self.assertListEqual(
+            tracking_fields(bitmap),
+            [('CurrentPos', 'f'), ('stopped', 'f'), ('idSection', 'i')])
+        self.assertListEqual(
+            bulk_tracking_fields(bitmap),
+            [('CurrentPos', 'f'), ('stopped', 'f'), ('idSection', 'i'),
+             ('leader', 'i'), ('next_section', 'i'),
+             ('leader_CurrentPos', 'f'), ('leader_distance2End', 'f'),
+             ('leader_idSection', 'i'), ('leader_idJunction', 'i'),
+             ('leader_idSectionFrom', 'i'), ('leader_idSectionTo', 'i'),
+             ('leader_length', 'f')])
+
 
 class TestDummyAPI(unittest.TestCase):
     """Tests the functionality of FlowAimsunAPI.
@@ -165,6 +186,74 @@ class TestDummyAPI(unittest.TestCase):
         tl_ids = self.kernel_api.get_traffic_light_ids()
         self.assertEqual(len(tl_ids), 0)
 
+    def test_batched_methods(self):
+        # the setters are pipelined, and executed before the next getter
+        self.kernel_api.set_speeds([1, 2], [10, 20])
+        self.kernel_api.apply_lane_changes([2], [1])
+
+        records = self.kernel_api.get_bulk_tracking_info(
+            [1, 2], make_bitmap({'CurrentSpeed', 'numberLane', 'idSection'}))
+        np.testing.assert_array_almost_equal(
+            records['CurrentSpeed'], [36, 72], decimal=4)
+        np.testing.assert_array_equal(records['numberLane'], [0, 1])
+        np.testing.assert_array_equal(records['idSection'], [1, 2])
+        np.testing.assert_array_equal(records['leader'], [2, 3])
+
+        # only the leaders that are not requested are described
+        np.testing.assert_array_equal(records['leader_idSection'], [0, 3])
+        np.testing.assert_array_equal(records['leader_length'], [0, 5])
+
+
+class TestProtocol(unittest.TestCase):
+    """Tests the handling of the replies of the server by FlowAimsunAPI."""
+
+    def setUp(self):
+        self.server, client = socket.socketpair()
+        with mock.patch('flow.utils.aimsun.api.create_client',
+                        return_value=client):
+            self.kernel_api = FlowAimsunAPI(port=9999)
+
+    def tearDown(self):
+        self.server.close()
+        self.kernel_api.s.close()
+
+    def reply(self, in_format, values, status=0):
+        payload = struct.pack('<' + in_format, *values)
+        self.server.sendall(
+            struct.pack(HEADER_FORMAT, status, len(payload)) + payload)
+
+    def test_pipelined_error(self):
+        # a pipelined command that the server does not know, followed by a
+        # known one, and a getter
+        self.kernel_api._send_command(-1, None, None, None)
+        self.kernel_api._send_command(
+            ac.VEH_SET_SPEED, 'i f', (1, 10), None)
+        self.reply('i', (-1,), status=-1001)
+        self.reply('i', (3,))
+
+        # check that the error is reported, and the reply drained
+        self.assertRaises(
+            RuntimeError, self.kernel_api._send_command,
+            ac.TL_GET_STATE, 'i', (1,), 'i')
+
+        # check that the next reply is read by the next command
+        self.reply('i', (4,))
+        self.assertEqual(self.kernel_api._send_command(
+            ac.TL_GET_STATE, 'i', (1,), 'i'), (4,))
+
+    def test_unknown_getter(self):
+        # the same unknown command, pipelined and then waiting for a reply
+        self.kernel_api._send_command(-1, None, None, None)
+        self.reply('i', (-1,), status=-1001)
+        self.reply('i', (-1,), status=-1001)
+        self.assertRaises(
+            RuntimeError, self.kernel_api._send_command,
+            -1, None, None, 'i')
+
+        self.reply('i', (4,))
+        self.assertEqual(self.kernel_api._send_command(
+            ac.TL_GET_STATE, 'i', (1,), 'i'), (4,))
+
 
 if __name__ == '__main__':
     unittest.main()
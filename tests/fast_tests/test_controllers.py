@@ -1,7 +1,7 @@
 import unittest
 
 from flow.core.experiment import Experiment
-from flow.core.params import EnvParams, InitialConfig, NetParams
+from flow.core.params import EnvParams, InitialConfig, NetParams, SumoParams
 from flow.core.params import VehicleParams
 from flow.core.params import SumoCarFollowingParams
 
@@ -10,9 +10,13 @@ from flow.controllers.car_following_models import IDMController, \
     OVMController, BCMController, LinearOVM, CFMController, LACController, \
     GippsController, BandoFTLController
 from flow.controllers import FollowerStopper, PISaturation, NonLocalFollowerStopper
+from flow.controllers.base_controller import get_batch_actions
+from flow.envs import TestEnv
+from flow.networks.ring import RingNetwork, ADDITIONAL_NET_PARAMS
 from tests.setup_scripts import ring_road_exp_setup
 import os
 import numpy as np
+from traci.exceptions import TraCIException
 
 os.environ["TEST_FLAG"] = "True"
 
@@ -988,5 +992,205 @@ class TestBandoFTLController(unittest.TestCase):
         np.testing.assert_array_almost_equal(requested_accel, expected_accel)
 
 
+class TestBatchedControllers(unittest.TestCase):
+    """
+    Tests that the batched evaluation of controllers matches the evaluation of
+    every controller separately.
+    """
+
+    def setUp(self):
+        failsafes = ["instantaneous", "safe_velocity", "feasible_accel",
+                     "obey_speed_limit"]
+        controllers = [
+            (IDMController, {"noise": 0.2, "fail_safe": failsafes}),
+            (IDMController, {"v0": 10, "noise": 0.1}),
+            (OVMController, {"noise": 0.3, "fail_safe": "safe_velocity"}),
+            (LinearOVM, {"fail_safe": "feasible_accel"}),
+            (BCMController, {"fail_safe": "instantaneous"}),
+            (CFMController, {}),
+            (GippsController, {"fail_safe": "obey_speed_limit"}),
+            (BandoFTLController, {}),
+            (FollowerStopper, {"v_des": 5}),
+        ]
+
+        vehicles = VehicleParams()
+        for i, controller in enumerate(controllers):
+            vehicles.add(
+                veh_id="test_{}".format(i),
+                acceleration_controller=controller,
+                routing_controller=(ContinuousRouter, {}),
+                car_following_params=SumoCarFollowingParams(
+                    accel=20, decel=5),
+                num_vehicles=2)
+
+        # create the environment and network classes for a ring road
+        self.env, _, _ = ring_road_exp_setup(vehicles=vehicles)
+
+    def tearDown(self):
+        # terminate the traci instance
+        self.env.terminate()
+
+        # free data used by the class
+        self.env = None
+
+    def test_get_batch_actions(self):
+        self.env.reset()
+        ids = self.env.k.vehicle.get_ids()
+
+        for i, veh_id in enumerate(ids):
+            self.env.k.vehicle.set_headway(veh_id, 2 * i + 1)
+            self.env.k.vehicle.test_set_speed(veh_id, i % 5)
+
+        np.random.seed(0)
+        expected_accel = [
+            self.env.k.vehicle.get_acc_controller(veh_id).get_action(self.env)
+            for veh_id in ids
+        ]
+        expected_no_noise = [
+            self.env.k.vehicle.get_accel(veh_id, noise=False, failsafe=True)
+            for veh_id in ids
+        ]
+
+        np.random.seed(0)
+        requested_accel = get_batch_actions(self.env, ids)
+        requested_no_noise = [
+            self.env.k.vehicle.get_accel(veh_id, noise=False, failsafe=True)
+            for veh_id in ids
+        ]
+
+        np.testing.assert_array_almost_equal(requested_accel, expected_accel)
+        np.testing.assert_array_almost_equal(
+            requested_no_noise, expected_no_noise)
+
+
+class NoisyActionController(IDMController):
+    """IDM controller that samples its own noise in get_action."""
+
+    def get_action(self, env):
+        return self.get_accel(env) + np.random.normal(0, 1)
+
+
+class TestBatchedMixedControllers(unittest.TestCase):
+    """
+    Tests that the batched evaluation of controllers matches the evaluation of
+    every controller separately when some controllers override get_action.
+    """
+
+    def setUp(self):
+        vehicles = VehicleParams()
+        for i, controller in enumerate([
+                (IDMController, {"noise": 0.2}),
+                (NoisyActionController, {}),
+                (OVMController, {"noise": 0.3}),
+                (NoisyActionController, {}),
+                (IDMController, {"v0": 10, "noise": 0.1})]):
+            vehicles.add(
+                veh_id="test_{}".format(i),
+                acceleration_controller=controller,
+                routing_controller=(ContinuousRouter, {}),
+                num_vehicles=2)
+
+        # create the environment and network classes for a ring road
+        self.env, _, _ = ring_road_exp_setup(vehicles=vehicles)
+
+    def tearDown(self):
+        # terminate the traci instance
+        self.env.terminate()
+
+        # free data used by the class
+        self.env = None
+
+    def test_get_batch_actions(self):
+        self.env.reset()
+        ids = self.env.k.vehicle.get_ids()
+
+        np.random.seed(0)
+        expected_accel = [
+            self.env.k.vehicle.get_acc_controller(veh_id).get_action(self.env)
+            for veh_id in ids
+        ]
+
+        np.random.seed(0)
+        requested_accel = get_batch_actions(self.env, ids)
+
+        np.testing.assert_array_almost_equal(requested_accel, expected_accel)
+
+
+class TestContinuousRouter(unittest.TestCase):
+    """Tests that routing controllers are only called when needed."""
+
+    def setUp(self):
+        vehicles = VehicleParams()
+        vehicles.add(
+            veh_id="human",
+            acceleration_controller=(IDMController, {}),
+            routing_controller=(ContinuousRouter, {}),
+            num_vehicles=10)
+
+        network = RingNetwork(
+            name="routing",
+            vehicles=vehicles,
+            net_params=NetParams(additional_params=ADDITIONAL_NET_PARAMS))
+
+        self.env = TestEnv(
+            env_params=EnvParams(horizon=float("inf")),
+            sim_params=SumoParams(sim_step=0.1, render=False),
+            network=network)
+
+    def tearDown(self):
+        self.env.terminate()
+        self.env = None
+
+    def test_route_tables(self):
+        routes, cum_frac = self.env.route_tables["top"]
+        self.assertListEqual(routes,
+                             [self.env.available_routes["top"][0][0]])
+        np.testing.assert_array_almost_equal(cum_frac, [1])
+
+    def test_routing_ids(self):
+        self.env.reset()
+        vehicles = self.env.k.vehicle
+        num_routed = 0
+        for _ in range(200):
+            # only vehicles on the last edge of their route are routed
+            routing_ids = vehicles.get_routing_ids()
+            for veh_id in routing_ids:
+                self.assertEqual(vehicles.get_edge(veh_id),
+                                 vehicles.get_route(veh_id)[-1])
+            num_routed += len(routing_ids)
+
+            self.env.step(None)
+
+            # once routed, vehicles are no longer on the last edge of their
+            # route, and are not routed again
+            for veh_id in routing_ids:
+                self.assertNotEqual(vehicles.get_edge(veh_id),
+                                    vehicles.get_route(veh_id)[-1])
+                self.assertNotIn(veh_id, vehicles.get_routing_ids())
+
+        self.assertGreater(num_routed, 0)
+        self.assertFalse(self.env.k.simulation.check_collision())
+        self.assertEqual(len(vehicles.get_ids()), 10)
+
+    def test_failed_route(self):
+        self.env.reset()
+        vehicles = self.env.k.vehicle
+        while len(vehicles.get_routing_ids()) == 0:
+            self.env.step(None)
+        veh_id = vehicles.get_routing_ids()[0]
+
+        # vehicles whose route could not be set are routed again
+        self.assertRaises(TraCIException, vehicles.choose_routes,
+                          [veh_id], [["foo"]])
+        vehicles._update_routing_ids()
+        self.assertIn(veh_id, vehicles.get_routing_ids())
+
+        route = self.env.k.vehicle.get_routing_controller(
+            veh_id).choose_route(self.env)
+        vehicles.choose_routes([veh_id], [route])
+        vehicles._update_routing_ids()
+        self.assertNotIn(veh_id, vehicles.get_routing_ids())
+
+
 if __name__ == '__main__':
     unittest.main()
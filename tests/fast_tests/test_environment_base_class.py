@@ -10,12 +10,22 @@ from flow.controllers import RLController
 from flow.envs.ring.accel import ADDITIONAL_ENV_PARAMS
 from flow.utils.exceptions import FatalFlowError
 from flow.envs import Env, TestEnv
+from flow.networks import RingNetwork
+from flow.networks.ring import ADDITIONAL_NET_PARAMS as RING_PARAMS
 
 from tests.setup_scripts import ring_road_exp_setup, highway_exp_setup
+from flow.core.kernel.simulation.emission import EmissionWriter, \
+    EMISSION_COLUMNS
+from flow.core.profiler import StepProfiler, STEP_PHASES, get_profiler
+from flow.core.observation import ObservationBuilder
+from copy import deepcopy
 import os
+import shutil
+import tempfile
 import gymnasium.spaces as spaces
 from gymnasium.spaces.box import Box
 import numpy as np
+import pandas as pd
 
 os.environ["TEST_FLAG"] = "True"
 
@@ -339,6 +349,339 @@ class TestSimsPerStep(unittest.TestCase):
         self.assertEqual(t2 - t1, sims_per_step)
 
 
+def ring_test_env(sim_params, warmup_steps=0):
+    """Create a TestEnv on a ring road with 22 IDM vehicles (no noise)."""
+    vehicles = VehicleParams()
+    vehicles.add(
+        veh_id="idm",
+        acceleration_controller=(IDMController, {"noise": 0}),
+        routing_controller=(ContinuousRouter, {}),
+        num_vehicles=22)
+
+    network = RingNetwork(
+        name="RingRoadTest",
+        vehicles=vehicles,
+        net_params=NetParams(additional_params=RING_PARAMS.copy()),
+        initial_config=InitialConfig(spacing="uniform"))
+
+    return TestEnv(
+        env_params=EnvParams(warmup_steps=warmup_steps),
+        sim_params=sim_params,
+        network=network)
+
+
+def run_ring_test_env(env, num_steps=20):
+    """Return the speeds and positions of all vehicles at every step."""
+    states = []
+    for _ in range(num_steps):
+        env.step(rl_actions=None)
+        ids = sorted(env.k.vehicle.get_ids())
+        states.append(env.k.vehicle.get_speed(ids) +
+                      env.k.vehicle.get_position(ids))
+    return np.array(states)
+
+
+class TestSnapshotReset(unittest.TestCase):
+    """Tests the "snapshot" reset mode in SumoParams."""
+
+    def test_snapshot_reset(self):
+        for subscription_mode in ["vehicle", "context"]:
+            env = ring_test_env(SumoParams(
+                reset_mode="snapshot", subscription_mode=subscription_mode),
+                warmup_steps=5)
+
+            env.reset()
+            self.assertEqual(env.time_counter, 5)
+            expected = run_ring_test_env(env)
+
+            # every reset restores the state after the warmup steps, so the
+            # following rollouts are identical
+            for _ in range(2):
+                env.reset()
+                self.assertEqual(env.time_counter, 5)
+                self.assertEqual(len(env.k.vehicle.get_ids()), 22)
+                np.testing.assert_array_almost_equal(
+                    run_ring_test_env(env), expected)
+
+            snapshot_path = env._snapshot_path
+            env.terminate()
+            self.assertFalse(os.path.exists(snapshot_path))
+
+    def test_invalid_reset_mode(self):
+        self.assertRaises(ValueError, ring_test_env,
+                          SumoParams(reset_mode="foo"))
+
+
+class TestWarmInstances(unittest.TestCase):
+    """Tests the num_warm_instances attribute of SumoParams."""
+
+    def test_restart(self):
+        env = ring_test_env(SumoParams(
+            restart_instance=True, num_warm_instances=1))
+        self.assertEqual(env.k.simulation.num_warm_instances, 1)
+
+        env.reset()
+        expected = run_ring_test_env(env)
+
+        # the instance is replaced by the warm instance upon reset, and a new
+        # warm instance is launched
+        sumo_proc = env.k.simulation.sumo_proc
+        env.reset()
+        self.assertIsNot(env.k.simulation.sumo_proc, sumo_proc)
+        self.assertEqual(env.k.simulation.num_warm_instances, 1)
+        np.testing.assert_array_almost_equal(
+            run_ring_test_env(env), expected)
+
+        env.terminate()
+        self.assertEqual(env.k.simulation.num_warm_instances, 0)
+
+    def test_seed(self):
+        env = ring_test_env(SumoParams(
+            restart_instance=True, num_warm_instances=2))
+
+        # the instances are launched with the seeds of the next restarts
+        seeds = list(env._restart_seeds)
+        self.assertEqual(len(seeds), 2)
+        for seed in seeds:
+            sim_params = deepcopy(env.sim_params)
+            sim_params.seed = seed
+            self.assertTrue(env.k.simulation.has_warm_instance(
+                env.k.network, sim_params))
+            env.reset()
+            self.assertEqual(env.sim_params.seed, seed)
+            self.assertEqual(env.k.simulation.num_warm_instances, 2)
+
+        # changes to the parameters of the environment do not affect the
+        # instances launched in the background
+        env.sim_params.sim_step = 0.2
+        self.assertFalse(env.k.simulation.has_warm_instance(
+            env.k.network, env.sim_params))
+        env.terminate()
+
+    def test_new_network(self):
+        env = ring_test_env(SumoParams(
+            restart_instance=True, num_warm_instances=1))
+        env.reset()
+
+        # replace the network with a longer ring between resets, as done by
+        # WaveAttenuationEnv
+        net_params = NetParams(additional_params=RING_PARAMS.copy())
+        net_params.additional_params["length"] = 300
+        env.network = RingNetwork(
+            name="RingRoadTest",
+            vehicles=env.network.vehicles,
+            net_params=net_params,
+            initial_config=InitialConfig(spacing="uniform"))
+        sumo_proc = env.k.simulation.sumo_proc
+        env.reset()
+
+        # the instance of the previous ring is not used
+        self.assertIsNot(env.k.simulation.sumo_proc, sumo_proc)
+        self.assertAlmostEqual(env.k.network.length(), 300, delta=1)
+        self.assertAlmostEqual(
+            sum(env.k.kernel_api.lane.getLength(edge + "_0")
+                for edge in env.k.network.get_edge_list()),
+            300, delta=1)
+
+        # a new instance of the current ring is launched in the background
+        sim_params = deepcopy(env.sim_params)
+        sim_params.seed = env._restart_seeds[0]
+        self.assertTrue(env.k.simulation.has_warm_instance(
+            env.k.network, sim_params))
+        env.terminate()
+
+
+class TestReset(unittest.TestCase):
+    """Tests the removal and addition of the vehicles upon reset."""
+
+    def test_reset(self):
+        env = ring_test_env(SumoParams(profile=True))
+        env.reset()
+        expected = run_ring_test_env(env)
+
+        # the vehicles are removed and added back in bulk, so the following
+        # rollouts are identical
+        for _ in range(2):
+            env.reset()
+            self.assertEqual(len(env.k.vehicle.get_ids()), 22)
+            np.testing.assert_array_almost_equal(
+                run_ring_test_env(env), expected)
+        env.terminate()
+
+        summary = env.profiler.summary()
+        for phase in ["reset_vehicles", "reset"]:
+            self.assertGreaterEqual(summary[phase]["count"], 3)
+        self.assertNotIn("restart_simulation", summary)
+
+    def test_restart(self):
+        env = ring_test_env(SumoParams(
+            restart_instance=True, profile=True))
+        env.reset()
+        expected = run_ring_test_env(env)
+
+        # the vehicles kernel is restored from its template
+        kernel = env.k.vehicle
+        env.reset()
+        self.assertIsNot(env.k.vehicle, kernel)
+        self.assertIs(type(env.k.vehicle), type(kernel))
+        self.assertEqual(len(env.k.vehicle.get_ids()), 22)
+        np.testing.assert_array_almost_equal(
+            run_ring_test_env(env), expected)
+        env.terminate()
+
+        self.assertGreaterEqual(
+            env.profiler.summary()["restart_simulation"]["count"], 1)
+
+
+class TestEmissionFormat(unittest.TestCase):
+    """Tests the emission_format attribute of SumoParams."""
+
+    def setUp(self):
+        self.emission_path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.emission_path)
+
+    def test_emission_format(self):
+        for emission_format in ["csv", "csv.gz"]:
+            env = ring_test_env(SumoParams(
+                emission_path=self.emission_path,
+                emission_format=emission_format))
+            env.reset()
+            run_ring_test_env(env, num_steps=10)
+            env.k.simulation.save_emission(run_id=0)
+            env.terminate()
+
+            emission_file = os.path.join(
+                self.emission_path,
+                "{}-0_emission.{}".format(env.network.name, emission_format))
+            self.assertTrue(os.path.isfile(emission_file))
+
+            # one row per vehicle and per step (including the reset)
+            df = pd.read_csv(emission_file)
+            self.assertListEqual(
+                list(df.columns), [name for name, _ in EMISSION_COLUMNS])
+            self.assertEqual(len(df), 22 * 11)
+            self.assertEqual(df.id.nunique(), 22)
+            np.testing.assert_array_almost_equal(
+                sorted(df.time.unique()), np.arange(11) * 0.1)
+
+    def test_chunks(self):
+        path = os.path.join(self.emission_path, "emission.csv")
+        writer = EmissionWriter(path, fmt="csv", chunk_size=3)
+        for t in range(5):
+            writer.append(**{
+                name: [None if name == "realized_accel" else
+                       "veh_{}".format(i) if dtype is object else t + i
+                       for i in range(2)]
+                for name, dtype in EMISSION_COLUMNS})
+        writer.close()
+        self.assertEqual(writer.num_rows, 10)
+
+        df = pd.read_csv(path)
+        self.assertEqual(len(df), 10)
+        np.testing.assert_array_equal(df.time, [0, 1, 1, 2, 2, 3, 3, 4, 4, 5])
+        np.testing.assert_array_equal(df.id, ["veh_0", "veh_1"] * 5)
+        self.assertTrue(df.realized_accel.isnull().all())
+
+    def test_invalid_emission_format(self):
+        self.assertRaises(ValueError, ring_test_env,
+                          SumoParams(emission_format="foo"))
+
+
+class TestProfiler(unittest.TestCase):
+    """Tests the profile attribute of SumoParams."""
+
+    def test_profile(self):
+        env = ring_test_env(SumoParams(profile="infos"))
+        env.reset()
+        for _ in range(10):
+            _, _, _, _, infos = env.step(rl_actions=None)
+            self.assertTrue(set(infos["profile"]).issubset(STEP_PHASES))
+            self.assertGreater(infos["profile"]["simulation_step"], 0)
+        env.terminate()
+
+        summary = env.profiler.summary()
+        for phase in ["controllers", "routing", "simulation_step",
+                      "update_vehicle", "get_state", "compute_reward"]:
+            self.assertGreaterEqual(summary[phase]["count"], 10)
+            self.assertGreater(summary[phase]["mean"], 0)
+        counts, _ = env.profiler.histogram("simulation_step", bins=5)
+        self.assertEqual(counts.sum(), 10)
+
+    def test_disabled(self):
+        env = ring_test_env(SumoParams())
+        env.reset()
+        _, _, _, _, infos = env.step(rl_actions=None)
+        env.terminate()
+
+        self.assertFalse(env.profiler.enabled)
+        self.assertNotIn("profile", infos)
+        self.assertDictEqual(env.profiler.summary(), {})
+
+    def test_window(self):
+        profiler = StepProfiler(window=3)
+        for duration in range(5):
+            profiler.record("get_state", duration)
+        np.testing.assert_array_equal(
+            profiler.get_times("get_state"), [2, 3, 4])
+        self.assertEqual(profiler.summary()["get_state"]["count"], 5)
+        self.assertEqual(profiler.last_step()["get_state"], 10)
+
+        profiler.start_step()
+        self.assertDictEqual(profiler.last_step(), {})
+
+    def test_invalid_profile(self):
+        self.assertRaises(ValueError, ring_test_env,
+                          SumoParams(profile="foo"))
+        # integers are not accepted in place of booleans
+        for profile in [0, 1]:
+            self.assertRaises(ValueError, get_profiler,
+                              SumoParams(profile=profile))
+
+
+class TestObservationBuilder(unittest.TestCase):
+    """Tests the fixed-layout observation builder."""
+
+    def test_new(self):
+        builder = ObservationBuilder()
+        builder.add("rl", (2, 3))
+        builder.add("edges", 2, fill=-1)
+        builder.set_slots(["rl_0", "rl_1"])
+        self.assertEqual(builder.size, 8)
+        self.assertRaises(ValueError, builder.add, "rl", 1)
+
+        obs, fields = builder.new()
+        fields["rl"][builder.slots["rl_1"]] = [1, 2, 3]
+        fields["edges"][0] = 4
+        np.testing.assert_array_equal(obs, [0, 0, 0, 1, 2, 3, 4, -1])
+        np.testing.assert_array_equal(builder.view(obs, "edges"), [4, -1])
+        self.assertEqual(obs.dtype, np.float32)
+
+        # every observation is new, and filled with the default values
+        new_obs, _ = builder.new()
+        np.testing.assert_array_equal(new_obs, [0, 0, 0, 0, 0, 0, -1, -1])
+        np.testing.assert_array_equal(obs, [0, 0, 0, 1, 2, 3, 4, -1])
+        self.assertEqual(builder.space().shape, (8,))
+
+
+class TestState(unittest.TestCase):
+    """Tests that the state is not shared with the returned observation."""
+
+    def test_state_copy(self):
+        env = ring_test_env(SumoParams())
+        env.get_state = lambda: np.ones(3, dtype=np.float32)
+
+        obs, _ = env.reset()
+        obs[:] = 0
+        np.testing.assert_array_equal(env.state, [1, 1, 1])
+
+        obs, _, _, _, _ = env.step(rl_actions=None)
+        obs[:] = 0
+        np.testing.assert_array_equal(env.state, [1, 1, 1])
+        env.terminate()
+
+
 class TestAbstractMethods(unittest.TestCase):
     """
     These series of tests are meant to ensure that the environment abstractions
@@ -16,11 +16,13 @@ from flow.networks.highway_ramps import ADDITIONAL_NET_PARAMS as \
 from flow.envs import LaneChangeAccelEnv, LaneChangeAccelPOEnv, AccelEnv, \
     WaveAttenuationEnv, WaveAttenuationPOEnv, MergePOEnv, \
     TestEnv, BottleneckDesiredVelocityEnv, BottleneckEnv, BottleneckAccelEnv
-from flow.envs.ring.wave_attenuation import v_eq_max_function
+from flow.envs.ring.wave_attenuation import v_eq_max_function, get_v_eq_max
 from flow.envs.multiagent import MultiAgentHighwayPOEnv
 from flow.envs.multiagent import MultiAgentAccelPOEnv
 from flow.envs.multiagent import MultiAgentWaveAttenuationPOEnv
 from flow.envs.multiagent import MultiAgentMergePOEnv
+from flow.envs.vector import VectorFlowEnv
+from gymnasium.spaces.box import Box
 
 os.environ["TEST_FLAG"] = "True"
 
@@ -446,6 +448,18 @@ class TestWaveAttenuationEnv(unittest.TestCase):
             float(fsolve(v_eq_max_function, np.array([4]), args=(22, 270))[0]),
             5.6143732387852054)
 
+    def test_get_v_eq_max(self):
+        """
+        Tests that get_v_eq_max returns and caches the solutions of
+        v_eq_max_function.
+        """
+        self.assertAlmostEqual(get_v_eq_max(22, 230), 3.7136148111012934)
+        self.assertAlmostEqual(get_v_eq_max(22, 270), 5.6143732387852054)
+
+        hits = get_v_eq_max.cache_info().hits
+        get_v_eq_max(22, 230)
+        self.assertEqual(get_v_eq_max.cache_info().hits, hits + 1)
+
     def test_reset_no_same_length(self):
         """
         Tests that the reset method uses the original ring length when the
@@ -736,6 +750,79 @@ class TestTestEnv(unittest.TestCase):
         self.assertEqual(self.env.compute_reward([]), 1)
 
 
+class TestVectorFlowEnv(unittest.TestCase):
+
+    """Tests the VectorFlowEnv environment in flow/envs/vector.py"""
+
+    def setUp(self):
+        class SpeedEnv(TestEnv):
+            """TestEnv observing the speeds of all vehicles."""
+
+            @property
+            def observation_space(self):
+                return Box(low=0, high=30, shape=(3,), dtype=np.float32)
+
+            def get_state(self, **kwargs):
+                return np.array(self.k.vehicle.get_speed(
+                    sorted(self.k.vehicle.get_ids())))
+
+            def compute_reward(self, rl_actions, **kwargs):
+                return np.mean(self.k.vehicle.get_speed(
+                    self.k.vehicle.get_ids()))
+
+        def create_env():
+            vehicles = VehicleParams()
+            vehicles.add("test",
+                         acceleration_controller=(IDMController, {}),
+                         num_vehicles=3)
+            network = RingNetwork("test_ring",
+                                  vehicles=vehicles,
+                                  net_params=NetParams(
+                                      additional_params=RING_PARAMS))
+            return SpeedEnv(EnvParams(horizon=5), SumoParams(), network)
+
+        self.env = VectorFlowEnv([create_env] * 3)
+
+    def tearDown(self):
+        self.env.close()
+        self.env = None
+
+    def test_spaces(self):
+        self.assertEqual(self.env.num_envs, 3)
+        self.assertEqual(self.env.observation_space.shape, (3, 3))
+        self.assertEqual(self.env.action_space.shape, (3, 0))
+
+    def test_step(self):
+        obs, info = self.env.reset(seed=0)
+        self.assertEqual(obs.shape, (3, 3))
+        np.testing.assert_array_almost_equal(obs, np.zeros((3, 3)))
+
+        actions = self.env.action_space.sample()
+        for _ in range(4):
+            obs, rew, terminated, truncated, info = self.env.step(actions)
+            self.assertEqual(obs.shape, (3, 3))
+            self.assertEqual(rew.shape, (3,))
+            self.assertFalse(truncated.any())
+
+        # the vehicles accelerate in every sub-environment
+        self.assertTrue((obs > 0).all())
+        np.testing.assert_array_almost_equal(rew, obs.mean(axis=1))
+
+        # the horizon is reached, so all sub-environments are reset
+        obs, rew, terminated, truncated, info = self.env.step(actions)
+        self.assertTrue(truncated.all())
+        self.assertFalse(terminated.any())
+        np.testing.assert_array_almost_equal(obs, np.zeros((3, 3)))
+        self.assertTrue(info["_final_observation"].all())
+        self.assertTrue((np.stack(info["final_observation"]) > 0).all())
+
+    def test_attributes(self):
+        self.assertEqual(self.env.get_attr("sim_step"), (0.1, 0.1, 0.1))
+        self.env.set_attr("sim_step", 0.2)
+        self.assertEqual(self.env.get_attr("sim_step"), (0.2, 0.2, 0.2))
+        self.assertEqual(len(self.env.call("get_state")), 3)
+
+
 class TestBottleneckEnv(unittest.TestCase):
 
     """Tests the BottleneckEnv environment in flow/envs/bottleneck.py"""
@@ -2,8 +2,9 @@ import unittest
 import os
 import time
 import csv
+from copy import deepcopy
 
-from flow.core.experiment import Experiment
+from flow.core.experiment import Experiment, _worker_flow_params
 from flow.core.params import VehicleParams
 from flow.controllers import IDMController, RLController, ContinuousRouter
 from flow.core.params import SumoCarFollowingParams
@@ -12,6 +13,8 @@ from flow.core.params import EnvParams, InitialConfig, NetParams
 from flow.core.params import TrafficLightParams
 from flow.envs import AccelEnv
 from flow.networks import RingNetwork
+from flow.flow_cfg.exp_configs.non_rl.bottleneck import \
+    flow_params as bottleneck_flow_params
 
 from tests.setup_scripts import ring_road_exp_setup
 
@@ -112,6 +115,51 @@ class TestRLActions(unittest.TestCase):
                                places=1)
 
 
+class TestNumWorkers(unittest.TestCase):
+    """
+    Tests that independent runs have the same results regardless of the
+    number of worker processes they are spread over.
+    """
+
+    def test_num_workers(self):
+        flow_params = deepcopy(bottleneck_flow_params)
+        flow_params['env'].horizon = 20
+
+        exp = Experiment(flow_params)
+        self.assertRaises(ValueError, exp.run, 1, num_workers=0)
+
+        info_dicts = [exp.run(3, num_workers=1),
+                      Experiment(flow_params).run(3, num_workers=2)]
+        self.assertDictEqual(info_dicts[0], info_dicts[1])
+        self.assertEqual(len(info_dicts[0]["returns"]), 3)
+
+        # the simulation parameters of the environment are restored
+        self.assertFalse(exp.env.sim_params.restart_instance)
+
+    def test_parent_env(self):
+        flow_params = deepcopy(bottleneck_flow_params)
+        flow_params['env'].horizon = 5
+
+        # no environment is created in the parent process
+        exp = Experiment(flow_params)
+        exp.run(2, num_workers=2)
+        self.assertIsNone(exp._env)
+
+        # the workers are spawned if it was (which requires picklable
+        # rl_actions)
+        exp = Experiment(flow_params)
+        info_dicts = [exp.run(2, num_workers=1), exp.run(2, num_workers=2)]
+        self.assertDictEqual(info_dicts[0], info_dicts[1])
+
+    def test_worker_seeds(self):
+        flow_params = deepcopy(bottleneck_flow_params)
+        flow_params['sim'].seed = 10
+        seeds = [_worker_flow_params(flow_params, i)['sim'].seed
+                 for i in range(3)]
+        self.assertListEqual(seeds, [10, 11, 12])
+        self.assertEqual(flow_params['sim'].seed, 10)
+
+
 class TestConvertToCSV(unittest.TestCase):
     """
     Tests that the emission files are converted to csv's if the parameter
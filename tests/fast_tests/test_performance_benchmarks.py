@@ -0,0 +1,140 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from flow.benchmarks.performance.suite import list_configs, scale_flow_params, \
+    run_case, run_suite, compare
+from flow.flow_cfg.exp_configs.non_rl.bottleneck import flow_params
+
+
+class TestPerformanceSuite(unittest.TestCase):
+    """Tests the performance benchmark suite."""
+
+    def test_list_configs(self):
+        configs = list_configs()
+        self.assertIn("rl/singleagent_ring", configs)
+        self.assertEqual(configs["non_rl/ring"],
+                         "flow.flow_cfg.exp_configs.non_rl.ring")
+        self.assertListEqual(list(list_configs(["non_rl/high*"])),
+                             ["non_rl/highway", "non_rl/highway_ramps",
+                              "non_rl/highway_single"])
+
+    def test_scale_flow_params(self):
+        scaled = scale_flow_params(flow_params, 2)
+        self.assertEqual(scaled["veh"].num_vehicles,
+                         2 * flow_params["veh"].num_vehicles)
+        self.assertListEqual(
+            [inflow["vehsPerHour"] for inflow in scaled["net"].inflows.get()],
+            [2 * inflow["vehsPerHour"]
+             for inflow in flow_params["net"].inflows.get()])
+
+    def test_run_case(self):
+        result = run_case(
+            "non_rl/bottleneck", "flow.flow_cfg.exp_configs.non_rl.bottleneck",
+            scale=1, simulator="traci", num_steps=5, num_resets=1, seed=0)
+        self.assertEqual(result["status"], "ok")
+        self.assertGreater(result["steps_per_s"], 0)
+        self.assertGreater(result["phases_ms"]["simulation_step"], 0)
+
+        # unsupported configurations are skipped
+        result = run_case(
+            "non_rl/bottleneck", "flow.flow_cfg.exp_configs.non_rl.bottleneck",
+            scale=1, simulator="headless", num_steps=5, num_resets=1, seed=0)
+        self.assertEqual(result["status"], "skipped")
+
+    def test_run_suite_isolation(self):
+        # configurations that kill their process, or hang
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with open(os.path.join(tmp_dir, "crash_config.py"), "w") as f:
+                f.write("import os\nos._exit(3)\n")
+            with open(os.path.join(tmp_dir, "hang_config.py"), "w") as f:
+                f.write("import time\ntime.sleep(60)\n")
+            sys.path.insert(0, tmp_dir)
+            try:
+                results = run_suite(
+                    {"crash": "crash_config", "hang": "hang_config",
+                     "missing": "not_a_config"},
+                    scales=[1], simulator="headless", num_steps=5,
+                    num_resets=1, timeout=5)["results"]
+            finally:
+                sys.path.remove(tmp_dir)
+
+        # check that every configuration is reported as an error
+        self.assertListEqual(list(results), ["crash@1", "hang@1", "missing@1"])
+        for result in results.values():
+            self.assertEqual(result["status"], "error")
+        self.assertIn("code 3", results["crash@1"]["error"])
+        self.assertIn("timed out", results["hang@1"]["error"])
+        self.assertIn("ModuleNotFoundError", results["missing@1"]["error"])
+
+    def test_compare(self):
+        baseline = {"results": {
+            "a@1": {"status": "ok", "steps_per_s": 100, "reset_s": 1.0,
+                    "phases_ms": {"get_state": 1.0, "routing": 0.01}},
+            "b@1": {"status": "error"}}}
+        results = {"results": {
+            "a@1": {"status": "ok", "steps_per_s": 80, "reset_s": 0.5,
+                    "phases_ms": {"get_state": 2.0, "routing": 1.0}},
+            "b@1": {"status": "ok", "steps_per_s": 1}}}
+
+        rows = compare(baseline, results, threshold=0.1)
+        self.assertListEqual(
+            [(metric, regressed) for _, metric, _, _, _, regressed in rows],
+            [("reset_s", False), ("steps_per_s", True)])
+
+        # phases shorter than min_phase_ms are ignored
+        rows = compare(baseline, results, threshold=0.1, phases=True)
+        self.assertListEqual(
+            [(metric, regressed) for _, metric, _, _, _, regressed in rows],
+            [("reset_s", False), ("steps_per_s", True),
+             ("phases_ms.get_state", True)])
+
+
+# maximum time (in seconds) of a cold import of the base environment
+IMPORT_TIME_BUDGET = 0.75
+
+# modules that should only be imported when they are needed
+LAZY_MODULES = ["pyglet", "matplotlib", "scipy.optimize",
+                "flow.renderer.pyglet_renderer", "flow.envs.ring.accel",
+                "flow.networks.ring"]
+
+
+class TestImportTime(unittest.TestCase):
+    """Tests the cold start of the environments."""
+
+    def test_import_env_base(self):
+        # the import is timed in a new interpreter, where nothing is cached
+        code = (
+            "import json, sys, time\n"
+            "t = time.perf_counter()\n"
+            "import flow.envs.base\n"
+            "t = time.perf_counter() - t\n"
+            "print(json.dumps([t, [m for m in {} if m in sys.modules]]))"
+        ).format(LAZY_MODULES)
+        # the first import also compiles the byte code, so only the second
+        # one is timed
+        subprocess.check_output([sys.executable, "-c", code])
+        import_time, imported = json.loads(
+            subprocess.check_output([sys.executable, "-c", code]))
+
+        self.assertListEqual(imported, [])
+        self.assertLess(import_time, IMPORT_TIME_BUDGET)
+
+    def test_lazy_attributes(self):
+        import flow.envs
+        import flow.networks
+        from flow.envs.ring.accel import AccelEnv
+
+        self.assertIs(flow.envs.AccelEnv, AccelEnv)
+        self.assertIn("WaveAttenuationEnv", dir(flow.envs))
+        self.assertIn("RingNetwork", dir(flow.networks))
+        # subpackages are imported as well
+        self.assertEqual(flow.envs.multiagent.__name__, "flow.envs.multiagent")
+        self.assertRaises(AttributeError, getattr, flow.envs, "NotAnEnv")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,11 @@
 from flow.renderer.pyglet_renderer import PygletRenderer as Renderer
+from flow.renderer.recorder import VideoRecorder, SightRecorder
+import cv2
 import numpy as np
 import os
+import tempfile
 import unittest
+from unittest import mock
 import ctypes
 
 
@@ -225,5 +229,78 @@ class TestPygletRenderer(unittest.TestCase):
         )
 
 
+class TestRecorders(unittest.TestCase):
+    """Tests the video and sight recorders"""
+
+    def test_video_recorder(self):
+        frames = [np.full((51, 80, 3), 10 * i, dtype=np.uint8)
+                  for i in range(10)]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            recorder = VideoRecorder(os.path.join(tmp_dir, 'video.mp4'), 10)
+            for frame in frames[:8]:
+                recorder.append(frame)
+            # grayscale frames are also accepted
+            recorder.append(frames[8][:, :, 0])
+
+            # image files are read, and deleted if requested
+            screenshot = os.path.join(tmp_dir, 'frame.png')
+            cv2.imwrite(screenshot, frames[9])
+            recorder.append_file(screenshot, remove=True)
+            recorder.append_file(os.path.join(tmp_dir, 'missing.png'))
+            recorder.close()
+
+            self.assertFalse(os.path.exists(screenshot))
+            video = cv2.VideoCapture(recorder.path)
+            num_frames = 0
+            while video.read()[0]:
+                num_frames += 1
+            video.release()
+            self.assertEqual(num_frames, 10)
+
+    def test_video_recorder_errors(self):
+        class FailingSink(object):
+            """Sink that fails to close, and optionally to write frames."""
+
+            def __init__(self, write_error=None):
+                self.write_error = write_error
+
+            def write(self, frame):
+                if self.write_error is not None:
+                    raise self.write_error
+
+            def close(self):
+                raise RuntimeError("ffmpeg exited with code 1")
+
+        frame = np.zeros((50, 80, 3), dtype=np.uint8)
+
+        # errors raised when the video is closed are reported by close
+        with mock.patch("flow.renderer.recorder._open_sink",
+                        return_value=FailingSink()):
+            recorder = VideoRecorder("video.mp4", 10)
+            recorder.append(frame)
+            self.assertRaisesRegex(RuntimeError, "ffmpeg", recorder.close)
+
+        # earlier errors take precedence
+        with mock.patch("flow.renderer.recorder._open_sink",
+                        return_value=FailingSink(ValueError("write"))):
+            recorder = VideoRecorder("video.mp4", 10)
+            recorder.append(frame)
+            self.assertRaisesRegex(ValueError, "write", recorder.close)
+
+    def test_sight_recorder(self):
+        sights = [np.random.randint(256, size=(20, 20, 3), dtype=np.uint8)
+                  for _ in range(3)]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            recorder = SightRecorder(os.path.join(tmp_dir, 'sights.npz'))
+            for i, sight in enumerate(sights):
+                recorder.append('sight_rl_0_%06d' % i, sight)
+            recorder.close()
+
+            with np.load(recorder.path) as saved_sights:
+                self.assertEqual(len(saved_sights.files), 3)
+                np.testing.assert_array_equal(
+                    saved_sights['sight_rl_0_000002'], sights[2])
+
+
 if __name__ == '__main__':
     unittest.main()
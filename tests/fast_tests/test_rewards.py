@@ -8,6 +8,7 @@ from flow.core.rewards import average_velocity, min_delay
 from flow.core.rewards import desired_velocity, boolean_action_penalty
 from flow.core.rewards import penalize_near_standstill, penalize_standstill
 from flow.core.rewards import energy_consumption
+from flow.core.rewards import REWARD_REGISTRY
 
 os.environ["TEST_FLAG"] = "True"
 
@@ -191,6 +192,45 @@ class TestRewards(unittest.TestCase):
         self.assertEqual(boolean_action_penalty(actions, gain=1), 2)
         self.assertEqual(boolean_action_penalty(actions, gain=2), 4)
 
+    def test_reward_features(self):
+        """Test the per-step features shared by the reward registry."""
+        vehicles = VehicleParams()
+        vehicles.add("test", num_vehicles=8)
+        vehicles.add("bus", num_vehicles=2)
+
+        env, _, _ = ring_road_exp_setup(vehicles=vehicles)
+        env.reset()
+
+        # the features are computed once per step
+        features = env.reward_features
+        self.assertIs(env.reward_features, features)
+        self.assertListEqual(features.ids, env.k.vehicle.get_ids())
+        np.testing.assert_array_equal(
+            features.is_bus, [veh_id[:3] == "bus" for veh_id in features.ids])
+
+        # features used by few rewards are only collected once they are read
+        self.assertNotIn("headway", vars(features))
+        np.testing.assert_array_equal(
+            features.headway, env.k.vehicle.get_headway(features.ids))
+        self.assertIn("headway", vars(features))
+
+        # vehicles not in the network are assigned the error value
+        np.testing.assert_array_equal(
+            features.get_speed(["test_0", "foo"]), [0, -1001])
+
+        # the features are recomputed after the simulation is advanced
+        env.step(rl_actions=None)
+        self.assertIsNot(env.reward_features, features)
+
+        # check the registry against the features
+        vel = env.reward_features.speed
+        is_bus = env.reward_features.is_bus
+        self.assertAlmostEqual(REWARD_REGISTRY["vel"](env, None), np.mean(vel))
+        self.assertAlmostEqual(
+            REWARD_REGISTRY["bus"](env, None),
+            60 * np.mean(vel[is_bus]) + np.mean(vel[~is_bus]))
+        self.assertEqual(REWARD_REGISTRY["cars"](env, None), -10)
+
 
 if __name__ == '__main__':
     unittest.main()
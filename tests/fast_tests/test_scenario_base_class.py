@@ -1,8 +1,15 @@
 import unittest
+from unittest import mock
+import json
 import os
+import shutil
+import tempfile
 import numpy as np
 
+import flow.config
 from flow.config import PROJECT_PATH
+from flow.core.kernel import Kernel
+import flow.core.kernel.network.traci as traci_network
 from flow.core.params import InitialConfig
 from flow.core.params import NetParams
 from flow.core.params import VehicleParams
@@ -943,6 +950,95 @@ class TestOpenStreetMap(unittest.TestCase):
         self.assertEqual(len(env.k.network.get_edge_list()), 29)
 
 
+class TestNetCache(unittest.TestCase):
+    """Tests the cache of .net.xml files in flow/core/kernel/network/traci.py"""
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.default_cache_dir = flow.config.NET_CACHE_DIR
+        flow.config.NET_CACHE_DIR = self.cache_dir
+
+    def tearDown(self):
+        flow.config.NET_CACHE_DIR = self.default_cache_dir
+        shutil.rmtree(self.cache_dir)
+
+    @staticmethod
+    def generate_network(length):
+        k = Kernel("traci", SumoParams())
+        k.network.generate_network(RingNetwork(
+            name="RingRoadTest",
+            vehicles=VehicleParams(),
+            net_params=NetParams(
+                additional_params=dict(ADDITIONAL_NET_PARAMS, length=length))
+        ))
+        return k.network
+
+    def test_cache(self):
+        network = self.generate_network(230)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+
+        # the same network is read from the cache
+        cached_network = self.generate_network(230)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+        self.assertDictEqual(cached_network._edges, network._edges)
+        self.assertDictEqual(cached_network._connections,
+                             network._connections)
+        self.assertTrue(os.path.exists(
+            cached_network.cfg_path + cached_network.netfn))
+
+        # a different network creates a new entry
+        network = self.generate_network(260)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 4)
+        self.assertAlmostEqual(network.non_internal_length(), 260, places=1)
+
+    def test_disabled(self):
+        flow.config.NET_CACHE_DIR = None
+        self.generate_network(230)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 0)
+
+    def test_format(self):
+        network = self.generate_network(230)
+
+        # the edge and connection data is stored as json
+        files = sorted(os.listdir(self.cache_dir))
+        self.assertEqual([os.path.splitext(f)[1] for f in files],
+                         [".json", ".xml"])
+        with open(os.path.join(self.cache_dir, files[0])) as f:
+            self.assertListEqual(sorted(json.load(f)), ["connections", "edges"])
+        self.assertEqual(
+            traci_network._decode_connections(
+                traci_network._encode_connections(network._connections)),
+            network._connections)
+
+    def test_shared_dir(self):
+        # directories other users can write to are not used
+        os.chmod(self.cache_dir, 0o777)
+        self.generate_network(230)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 0)
+
+        # the default directory is created for the current user only
+        cache_dir = os.path.join(self.cache_dir, "net")
+        flow.config.NET_CACHE_DIR = cache_dir
+        os.chmod(self.cache_dir, 0o700)
+        self.generate_network(230)
+        self.assertEqual(os.stat(cache_dir).st_mode & 0o777, 0o700)
+        self.assertEqual(len(os.listdir(cache_dir)), 2)
+
+    def test_unwritable_dir(self):
+        # the network is built even if the cache cannot be written
+        flow.config.NET_CACHE_DIR = "/proc/flowcache"
+        with self.assertLogs(level="WARNING"):
+            network = self.generate_network(230)
+        self.assertAlmostEqual(network.non_internal_length(), 230, places=1)
+
+    def test_netconvert_version(self):
+        key = traci_network._net_cache_key([], [], None, None)
+        with mock.patch.object(traci_network, "_netconvert_version",
+                               return_value="netconvert Version 0.0.0"):
+            self.assertNotEqual(
+                traci_network._net_cache_key([], [], None, None), key)
+
+
 class TestNetworkTemplateGenerator(unittest.TestCase):
 
     def test_network_template(self):
@@ -84,6 +84,48 @@ class TestTrafficLightGridNetwork(unittest.TestCase):
             )
         )
 
+    def test_exit_edges(self):
+        """Validate the entrance edges of the exit edges of the network."""
+        network = TrafficLightGridNetwork(
+            name="test",
+            vehicles=VehicleParams(),
+            net_params=NetParams(additional_params={
+                "grid_array": {
+                    "row_num": 1,
+                    "col_num": 2,
+                    "inner_length": 100,
+                    "short_length": 100,
+                    "long_length": 100,
+                    "cars_top": 0,
+                    "cars_bot": 0,
+                    "cars_left": 0,
+                    "cars_right": 0,
+                },
+                "horizontal_lanes": 1,
+                "vertical_lanes": 1,
+                "speed_limit": {
+                    "vertical": 35,
+                    "horizontal": 35
+                }
+            })
+        )
+
+        self.assertDictEqual(network.exit_edges, {
+            "bot0_2": "bot0_0",
+            "top0_0": "top0_2",
+            "left0_0": "left1_0",
+            "right1_0": "right0_0",
+            "left0_1": "left1_1",
+            "right1_1": "right0_1",
+        })
+
+        # every exit edge is an outer edge, and every vehicle is placed back
+        # at the start of a route
+        outer_edges = [edge["id"] for edge in network._outer_edges]
+        for exit_edge, entrance_edge in network.exit_edges.items():
+            self.assertIn(exit_edge, outer_edges)
+            self.assertIn(entrance_edge, network.routes)
+
 
 class TestHighwayNetwork(unittest.TestCase):
 
@@ -137,6 +137,42 @@ class TestSetState(unittest.TestCase):
 
         self.assertEqual(state[1], "R")
 
+    def test_unchanged_states(self):
+        # reset the environment
+        self.env.reset()
+
+        # count the states sent to sumo
+        api = self.env.k.kernel_api.trafficlight
+        set_state = api.setRedYellowGreenState
+        sent = []
+
+        def set_state_and_count(*args, **kwargs):
+            sent.append(args)
+            return set_state(*args, **kwargs)
+
+        api.setRedYellowGreenState = set_state_and_count
+
+        # only the last state set during a step is sent
+        self.env.k.traffic_light.set_state(node_id="top", state="GG")
+        self.env.k.traffic_light.set_state(node_id="top", state="rY")
+        self.env.step([])
+        self.assertListEqual(sent, [("top", "rY")])
+
+        # states that did not change are not sent again
+        for _ in range(3):
+            self.env.k.traffic_light.set_state(node_id="top", state="rY")
+            self.env.step([])
+        self.assertEqual(len(sent), 1)
+        self.assertEqual(self.env.k.traffic_light.get_state("top"), "rY")
+
+        # states changed by other means are sent again
+        set_state("top", "GG")
+        self.env.step([])
+        self.env.k.traffic_light.set_state(node_id="top", state="rY")
+        self.env.step([])
+        self.assertEqual(len(sent), 2)
+        self.assertEqual(self.env.k.traffic_light.get_state("top"), "rY")
+
 
 class TestPOEnv(unittest.TestCase):
     """
@@ -212,6 +248,27 @@ class TestPOEnv(unittest.TestCase):
         with self.assertRaises(ValueError):
             self.env.get_closest_to_intersection(c0_edges, -1)
 
+    def test_k_closest_padding(self):
+        self.env.k.simulation.simulation_step()
+        self.env.k.update(reset=False)
+        edges = [edge for _, node_edges in self.env.network.node_mapping
+                 for edge in node_edges]
+
+        padded = self.env.get_closest_to_intersection(edges, 2, padding=True)
+        self.assertEqual(len(padded), 2 * len(edges))
+        for i, edge in enumerate(edges):
+            # vehicles on every edge, by increasing distance to the end of
+            # the edge, followed by padding
+            veh_ids = sorted(self.env.k.vehicle.get_ids_by_edge(edge),
+                             key=self.env.get_distance_to_intersection)[:2]
+            self.assertEqual(padded[2 * i:2 * i + 2],
+                             veh_ids + [""] * (2 - len(veh_ids)))
+            self.assertEqual(
+                self.env.get_closest_to_intersection(edge, 2), veh_ids)
+
+        self.assertEqual(self.env.get_closest_to_intersection(edges, 2),
+                         [veh_id for veh_id in padded if veh_id != ""])
+
 
 class TestItRuns(unittest.TestCase):
     """
@@ -9,6 +9,21 @@ from flow.controllers.car_following_models import IDMController, \
     SimCarFollowingController
 from flow.controllers.lane_change_controllers import StaticLaneChanger
 from flow.controllers.rlcontroller import RLController
+from flow.controllers.routing_controllers import ContinuousRouter
+from flow.core.kernel.vehicle.columnar import ColumnarVehicleState
+from flow.core.kernel.vehicle.counters import RollingCounter, get_rate
+from flow.core.kernel.vehicle.edge_stats import EdgeStatsIndex
+from flow.core.kernel.vehicle.multi_lane import MultiLaneHeadways
+from flow.core.kernel.vehicle.traci import TraCIVehicle
+from flow.core.kernel.simulation.ring_engine import RingEngine, \
+    RingSimulator
+from flow.core.params import EnvParams
+from flow.envs import TestEnv
+from flow.networks.ring import RingNetwork, ADDITIONAL_NET_PARAMS
+from flow.networks.figure_eight import FigureEightNetwork
+from flow.networks.figure_eight import \
+    ADDITIONAL_NET_PARAMS as FIGURE_EIGHT_PARAMS
+from flow.utils.exceptions import FatalFlowError
 
 from tests.setup_scripts import ring_road_exp_setup, highway_exp_setup
 
@@ -600,5 +615,528 @@ class TestObservedIDs(unittest.TestCase):
         self.assertCountEqual(env.k.vehicle.get_observed_ids(), ["test_1"])
 
 
+class TestSubscriptionModes(unittest.TestCase):
+    """Tests that both subscription modes collect the same vehicle states."""
+
+    def run_ring(self, subscription_mode):
+        vehicles = VehicleParams()
+        vehicles.add(
+            veh_id="idm",
+            acceleration_controller=(IDMController, {}),
+            routing_controller=(ContinuousRouter, {}),
+            num_vehicles=10)
+        sim_params = SumoParams(
+            sim_step=0.1, render=False, subscription_mode=subscription_mode)
+
+        env, _, _ = ring_road_exp_setup(
+            sim_params=sim_params, vehicles=vehicles)
+        env.reset()
+
+        states = []
+        for _ in range(20):
+            env.step(None)
+            ids = env.k.vehicle.get_ids()
+            states.append((
+                sorted(ids),
+                env.k.vehicle.get_speed(ids),
+                env.k.vehicle.get_position(ids),
+                env.k.vehicle.get_edge(ids),
+                env.k.vehicle.get_leader(ids),
+                env.k.vehicle.get_headway(ids),
+                env.k.vehicle.get_length(ids),
+            ))
+        env.terminate()
+
+        return states
+
+    def test_context_subscription(self):
+        self.assertListEqual(self.run_ring("context"),
+                             self.run_ring("vehicle"))
+
+    def test_invalid_mode(self):
+        sim_params = SumoParams(subscription_mode="foo")
+        self.assertRaises(ValueError, TraCIVehicle, None, sim_params)
+
+
+class TestAddAll(unittest.TestCase):
+    """Tests the bulk addition of vehicles by the sumo vehicle kernel."""
+
+    def test_vehicle_not_removed(self):
+        vehicles = VehicleParams()
+        vehicles.add("idm", acceleration_controller=(IDMController, {}),
+                     routing_controller=(ContinuousRouter, {}),
+                     num_vehicles=5)
+        network = RingNetwork(
+            name="RingRoadTest",
+            vehicles=vehicles,
+            net_params=NetParams(
+                additional_params=ADDITIONAL_NET_PARAMS.copy()),
+            initial_config=InitialConfig(spacing="uniform"))
+        env = TestEnv(
+            env_params=EnvParams(),
+            sim_params=SumoParams(),
+            network=network)
+        env.reset()
+
+        # add a vehicle that is still in sumo, as if its removal had failed
+        k = env.k.vehicle
+        veh_id = k.get_ids()[0]
+        state = ("idm", "top", 0, 10, 0)
+        k.add_all([veh_id], {veh_id: state})
+        env.k.simulation.simulation_step()
+        k.update(reset=False)
+
+        # check that the vehicle was removed and added again
+        self.assertIn(veh_id, k.kernel_api.vehicle.getIDList())
+        self.assertEqual(k.get_edge(veh_id), "top")
+        self.assertAlmostEqual(k.get_position(veh_id), 10)
+        env.terminate()
+
+
+class TestColumnarVehicleState(unittest.TestCase):
+    """Tests the array-backed vehicle state store."""
+
+    def test_slots(self):
+        state = ColumnarVehicleState(capacity=2)
+
+        # check that slots are assigned in order, and that adding a vehicle
+        # twice returns the same slot
+        self.assertEqual(state.add("a"), 0)
+        self.assertEqual(state.add("b"), 1)
+        self.assertEqual(state.add("a"), 0)
+        self.assertEqual(len(state), 2)
+
+        # check that the store grows when it runs out of slots
+        self.assertEqual(state.add("c"), 2)
+        self.assertEqual(state.capacity, 4)
+
+        # check that released slots are recycled
+        state.remove("b")
+        self.assertNotIn("b", state)
+        self.assertEqual(state.add("d"), 1)
+        np.testing.assert_array_equal(state.slots(["a", "b", "d"]),
+                                      [0, -1, 1])
+
+    def test_bulk_getters(self):
+        state = ColumnarVehicleState()
+        for i, veh_id in enumerate(["a", "b", "c"]):
+            state.add(veh_id)
+            state.set("speed", veh_id, i)
+            state.set("lane", veh_id, 2 * i)
+            state.set("edge", veh_id, "top" if i < 2 else "bottom")
+
+        np.testing.assert_array_equal(state.get("speed", ["c", "a"]), [2, 0])
+        np.testing.assert_array_equal(state.get("lane", ["b", "c"]), [2, 4])
+        np.testing.assert_array_equal(
+            state.get_edges(["a", "c"]), ["top", "bottom"])
+
+        # check that missing vehicles return the error term
+        np.testing.assert_array_equal(
+            state.get("speed", ["a", "x"], error=-1), [0, -1])
+        self.assertEqual(state.get_one("speed", "x", error=-5), -5)
+        np.testing.assert_array_equal(
+            state.get_edges(["x"], error="none"), ["none"])
+
+        # check that removed vehicles have their values reset
+        state.remove("c")
+        state.add("d")
+        self.assertEqual(state.get_one("speed", "d"), -1001)
+
+    def test_assign(self):
+        state = ColumnarVehicleState()
+        for veh_id in ["a", "b", "c"]:
+            state.add(veh_id)
+        state.remove("b")
+
+        # check that the columns of all vehicles are written at once
+        self.assertListEqual(state.vehicle_ids(), ["a", "c"])
+        state.assign("speed", state.occupied(), [1, 3])
+        state.assign("edge", state.occupied(), ["top", ""])
+        np.testing.assert_array_equal(state.get("speed", ["c", "a"]), [3, 1])
+        np.testing.assert_array_equal(
+            state.get_edges(["a", "c", "b"]), ["top", "", ""])
+
+    def test_kernel(self):
+        vehicles = VehicleParams()
+        vehicles.add("idm", acceleration_controller=(IDMController, {}),
+                     routing_controller=(ContinuousRouter, {}),
+                     num_vehicles=5)
+        network = RingNetwork(
+            name="RingRoadTest",
+            vehicles=vehicles,
+            net_params=NetParams(
+                additional_params=ADDITIONAL_NET_PARAMS.copy()),
+            initial_config=InitialConfig(spacing="uniform"))
+        env = TestEnv(
+            env_params=EnvParams(),
+            sim_params=SumoParams(columnar_state=True),
+            network=network)
+        env.reset()
+        for _ in range(5):
+            env.step(rl_actions=None)
+
+        # check that the list getters return arrays matching the
+        # single-vehicle getters
+        k = env.k.vehicle
+        ids = k.get_ids() + ["missing"]
+        for getter in [k.get_speed, k.get_default_speed, k.get_position,
+                       k.get_lane, k.get_edge, k.get_headway, k.get_length,
+                       k.get_previous_speed, k.get_distance,
+                       k.get_realized_accel]:
+            values = getter(ids)
+            self.assertIsInstance(values, np.ndarray)
+            self.assertListEqual(
+                values.tolist(), [getter(veh_id) for veh_id in ids])
+        env.terminate()
+
+
+class TestMultiLaneHeadways(unittest.TestCase):
+    """Tests the vectorized multi-lane leader/follower computation."""
+
+    class _Network(object):
+        """Two 2-lane edges of length 100 connected as "a" -> "b"."""
+
+        def get_edge_list(self):
+            return ["a", "b"]
+
+        def get_junction_list(self):
+            return []
+
+        def num_lanes(self, edge):
+            return 2
+
+        def edge_length(self, edge):
+            return 100
+
+        def next_edge(self, edge, lane):
+            return [("b", lane)] if edge == "a" else []
+
+        def prev_edge(self, edge, lane):
+            return [("a", lane)] if edge == "b" else []
+
+    def test_compute(self):
+        engine = MultiLaneHeadways(self._Network())
+        veh_ids = ["rl", "lead", "follow", "side", "next"]
+        edges = ["a", "a", "a", "a", "b"]
+        lanes = [0, 0, 0, 1, 1]
+        positions = [50, 70, 20, 40, 10]
+        lengths = [5, 5, 5, 5, 5]
+
+        results, ids_by_edge = engine.compute(
+            veh_ids, edges, lanes, positions, lengths, ["rl"])
+
+        headways, tailways, leaders, followers = results["rl"]
+        # lane 0: leader and follower on the same edge
+        self.assertEqual(leaders[0], "lead")
+        self.assertAlmostEqual(headways[0], 70 - 50 - 5)
+        self.assertEqual(followers[0], "follow")
+        self.assertAlmostEqual(tailways[0], 50 - 20 - 5)
+        # lane 1: the leader is on the next edge, and the follower is behind
+        # on the same edge
+        self.assertEqual(leaders[1], "next")
+        self.assertAlmostEqual(headways[1], 10 - 50 + 100 - 5)
+        self.assertEqual(followers[1], "side")
+        self.assertAlmostEqual(tailways[1], 50 - 40 - 5)
+
+        # vehicles are sorted by lane and then by position on every edge
+        self.assertListEqual(ids_by_edge["a"],
+                             ["follow", "rl", "lead", "side"])
+        self.assertListEqual(ids_by_edge["b"], ["next"])
+
+    def test_no_leader(self):
+        engine = MultiLaneHeadways(self._Network())
+        results, ids_by_edge = engine.compute(
+            ["rl"], ["b"], [0], [30], [5], ["rl"])
+
+        self.assertListEqual(results["rl"][0], [1000, 1000])
+        self.assertListEqual(results["rl"][2], ["", ""])
+        self.assertIsNone(ids_by_edge["a"])
+
+
+class TestEdgeStats(unittest.TestCase):
+    """Tests the per-step aggregate statistics of vehicles by edge."""
+
+    def test_index(self):
+        index = EdgeStatsIndex(TestMultiLaneHeadways._Network())
+        index.update(
+            edges=["a", "a", "a", "b", ":junction"],
+            lanes=[0, 1, 1, 0, 0],
+            positions=[0, 40, 90, 100, 5],
+            speeds=[1, 2, 3, 4, 5],
+            is_rl=[False, True, False, False, False])
+
+        # two segments per edge, split by lane
+        stats = index.get(["a", "b"], segments=2)
+        np.testing.assert_array_equal(stats["count"], [1, 1, 0, 1, 0, 0, 1, 0])
+        np.testing.assert_array_equal(
+            stats["speed_sum"], [1, 2, 0, 3, 0, 0, 4, 0])
+        np.testing.assert_array_equal(stats["rl_count"], [0, 1, 0, 0, 0, 0, 0, 0])
+        np.testing.assert_array_equal(
+            stats["rl_speed_sum"], [0, 2, 0, 0, 0, 0, 0, 0])
+
+        # custom boundaries, all lanes together
+        stats = index.get("a", segments=[[0, 10, 50, 100]], by_lane=False)
+        np.testing.assert_array_equal(stats["count"], [1, 1, 1])
+
+        # results are cached until the next update
+        self.assertIs(index.get(["a", "b"], segments=2),
+                      index.get(["a", "b"], segments=2))
+        index.update([], [], [], [], [])
+        stats = index.get(["a", "b"], by_lane=False)
+        np.testing.assert_array_equal(stats["count"], [0, 0])
+
+    def test_kernel(self):
+        for simulator in ["traci", "headless"]:
+            vehicles = VehicleParams()
+            vehicles.add(
+                veh_id="human",
+                acceleration_controller=(IDMController, {}),
+                routing_controller=(ContinuousRouter, {}),
+                num_vehicles=10)
+            vehicles.add(
+                veh_id="rl",
+                acceleration_controller=(RLController, {}),
+                routing_controller=(ContinuousRouter, {}),
+                num_vehicles=2)
+            network = RingNetwork(
+                name="RingRoadTest",
+                vehicles=vehicles,
+                net_params=NetParams(
+                    additional_params=ADDITIONAL_NET_PARAMS.copy()),
+                initial_config=InitialConfig(spacing="uniform"))
+            env = TestEnv(
+                env_params=EnvParams(),
+                sim_params=SumoParams(),
+                network=network,
+                simulator=simulator)
+            env.reset()
+            for _ in range(5):
+                env.k.simulation.simulation_step()
+                env.k.update(reset=False)
+
+            self.check_edge_stats(env)
+            env.terminate()
+
+    def check_edge_stats(self, env):
+        edges = env.k.network.get_edge_list()
+        stats = env.k.vehicle.get_edge_stats(edges, by_lane=False)
+        for i, edge in enumerate(edges):
+            ids = env.k.vehicle.get_ids_by_edge(edge)
+            rl_ids = [veh_id for veh_id in ids
+                      if veh_id in env.k.vehicle.get_rl_ids()]
+            self.assertEqual(stats["count"][i], len(ids))
+            self.assertAlmostEqual(stats["speed_sum"][i],
+                                   sum(env.k.vehicle.get_speed(ids)))
+            self.assertEqual(stats["rl_count"][i], len(rl_ids))
+            self.assertAlmostEqual(stats["rl_speed_sum"][i],
+                                   sum(env.k.vehicle.get_speed(rl_ids)))
+        self.assertEqual(stats["count"].sum(), 12)
+
+
+class TestHeadlessSimulator(unittest.TestCase):
+    """Tests the NumPy-based headless simulator."""
+
+    def create_env(self, network_class, net_params, num_vehicles=10):
+        vehicles = VehicleParams()
+        vehicles.add(
+            veh_id="idm",
+            acceleration_controller=(IDMController, {}),
+            routing_controller=(ContinuousRouter, {}),
+            num_vehicles=num_vehicles)
+        vehicles.add(
+            veh_id="sim",
+            acceleration_controller=(SimCarFollowingController, {}),
+            routing_controller=(ContinuousRouter, {}),
+            num_vehicles=num_vehicles)
+
+        network = network_class(
+            name="headless",
+            vehicles=vehicles,
+            net_params=NetParams(additional_params=net_params),
+            initial_config=InitialConfig(spacing="uniform"))
+
+        return TestEnv(
+            env_params=EnvParams(horizon=float("inf")),
+            sim_params=SumoParams(sim_step=0.1, render=False),
+            network=network,
+            simulator="headless")
+
+    def test_engine(self):
+        engine = RingEngine(100, sim_step=0.1, speed_limit=30, num_rings=2)
+        engine.add_vehicles([[0, 50], [60, 10]], 10)
+
+        # check the leaders and bumper-to-bumper headways in both rings
+        np.testing.assert_array_equal(engine.leader, [[1, 0], [1, 0]])
+        np.testing.assert_array_almost_equal(
+            engine.headway, [[45, 45], [45, 45]])
+
+        # check that requested speeds are applied, and that the other vehicles
+        # follow the car following model
+        target = np.array([[5, np.nan], [np.nan, np.nan]])
+        engine.step(target)
+        self.assertAlmostEqual(engine.speed[0, 0], 5)
+        self.assertAlmostEqual(engine.pos[0, 0], 0.5)
+        np.testing.assert_array_almost_equal(
+            engine.speed[1:], engine.default_speed[1:])
+        self.assertGreater(engine.speed[1, 0], 10)
+        self.assertFalse(engine.collided.any())
+
+        # check that collisions are detected for vehicles that do not obey
+        # safe speeds
+        engine = RingEngine(100, sim_step=1, num_rings=1)
+        engine.add_vehicles([0, 10], [20, 0], speed_mode=0)
+        engine.step(np.array([[20, 0]]))
+        self.assertTrue(engine.collided[0])
+
+    def test_pending_speeds(self):
+        sim = RingSimulator(100, sim_step=0.1, speed_limit=30)
+        for i, veh_id in enumerate(["a", "b", "c"]):
+            sim.add(veh_id, 30 * i, 10)
+        sim.step()
+
+        # check that the speeds requested before a removal are still applied
+        # to the right vehicles
+        sim.set_speeds(["a", "c"], [5, 8])
+        sim.remove("b")
+        sim.step()
+        np.testing.assert_array_almost_equal(
+            sim.engine.speed[0, [sim.index["a"], sim.index["c"]]], [5, 8])
+
+    def test_ring(self):
+        env = self.create_env(RingNetwork, ADDITIONAL_NET_PARAMS.copy())
+
+        for _ in range(2):
+            env.reset()
+            ids = env.k.vehicle.get_ids()
+            self.assertEqual(len(ids), 20)
+            self.assertEqual(len(env.k.vehicle.get_controlled_ids()), 10)
+
+            for _ in range(50):
+                env.step(None)
+                self.assertFalse(env.k.simulation.check_collision())
+
+            # check that the absolute positions match the edges and positions
+            # of the vehicles, and that the headways match the positions
+            x = np.array(env.k.vehicle.get_x_by_id(ids))
+            np.testing.assert_array_almost_equal(x, [
+                env.k.network.get_x(env.k.vehicle.get_edge(veh_id),
+                                    env.k.vehicle.get_position(veh_id))
+                for veh_id in ids])
+            leaders = env.k.vehicle.get_leader(ids)
+            gaps = (np.array(env.k.vehicle.get_x_by_id(leaders)) - x) \
+                % env.k.network.length() - 5
+            np.testing.assert_array_almost_equal(
+                env.k.vehicle.get_headway(ids), gaps)
+            self.assertListEqual(
+                env.k.vehicle.get_follower(leaders), list(ids))
+            self.assertTrue(all(
+                speed > 0 for speed in env.k.vehicle.get_speed(ids)))
+
+        env.terminate()
+
+    def test_bulk_getters(self):
+        env = self.create_env(RingNetwork, ADDITIONAL_NET_PARAMS.copy())
+        env.reset()
+        for _ in range(10):
+            env.step(None)
+
+        # check that the lists of values match the values of every vehicle,
+        # and that vehicles not in the network are assigned the error term
+        k = env.k.vehicle
+        ids = k.get_ids() + ["missing"]
+        for getter in [k.get_speed, k.get_position, k.get_edge, k.get_lane,
+                       k.get_headway, k.get_leader, k.get_follower,
+                       k.get_fuel_consumption, k.get_x_by_id]:
+            values = getter(ids)
+            self.assertIsInstance(values, list)
+            self.assertListEqual(values, [getter(veh_id) for veh_id in ids])
+        self.assertEqual(k.get_speed("missing", error=-5), -5)
+
+        # check that accelerations are applied to the requested vehicles only
+        speeds = k.get_speed(ids[:3])
+        k.apply_acceleration(ids[:3], [1, None, -1])
+        env.k.simulation.simulation_step()
+        env.k.update(reset=False)
+        self.assertAlmostEqual(k.get_speed(ids[0]), speeds[0] + 0.1)
+        self.assertAlmostEqual(k.get_speed(ids[2]), speeds[2] - 0.1)
+        env.terminate()
+
+    def test_figure_eight(self):
+        net_params = FIGURE_EIGHT_PARAMS.copy()
+        env = self.create_env(FigureEightNetwork, net_params, num_vehicles=7)
+        env.reset()
+
+        self.assertListEqual(
+            env.k.network.loop,
+            ["bottom", "top", "upper_ring", "right", "left", "lower_ring"])
+        for _ in range(50):
+            env.step(None)
+        self.assertFalse(env.k.simulation.check_collision())
+        self.assertEqual(len(env.k.vehicle.get_ids()), 14)
+        env.terminate()
+
+    def test_unsupported_network(self):
+        net_params = ADDITIONAL_NET_PARAMS.copy()
+        net_params["lanes"] = 2
+        self.assertRaises(
+            FatalFlowError, self.create_env, RingNetwork, net_params)
+
+    def test_edge_outflow(self):
+        env = self.create_env(RingNetwork, ADDITIONAL_NET_PARAMS.copy())
+        env.reset()
+
+        # vehicles leaving an edge are counted from the first request
+        self.assertEqual(env.k.vehicle.get_outflow_rate(10, edge="top"), 0)
+        prev_ids = set(env.k.vehicle.get_ids_by_edge("top"))
+        num_exits = 0
+        for _ in range(50):
+            env.step(None)
+            ids = set(env.k.vehicle.get_ids_by_edge("top"))
+            num_exits += len(prev_ids - ids)
+            prev_ids = ids
+
+        self.assertGreater(num_exits, 0)
+        self.assertAlmostEqual(
+            env.k.vehicle.get_outflow_rate(5, edge="top"),
+            3600 * num_exits / 5)
+        self.assertEqual(env.k.vehicle.get_outflow_rate(5), 0)
+        env.terminate()
+
+
+class TestRollingCounter(unittest.TestCase):
+    """Tests the rolling counters used to compute flow rates."""
+
+    def test_sum(self):
+        counter = RollingCounter(max_steps=5)
+        self.assertEqual(counter.sum("arrived", 3), 0)
+        self.assertEqual(get_rate(counter, "arrived", 1, 0.5), 0)
+
+        counts = np.random.RandomState(0).randint(0, 5, size=(12, 2))
+        for i, (arrived, departed) in enumerate(counts):
+            # series may be added after the first step
+            if i < 4:
+                counter.append({"arrived": arrived})
+            else:
+                counter.append({"arrived": arrived, "departed": departed})
+
+            for num_steps in range(1, 8):
+                window = min(num_steps, i + 1, 5)
+                self.assertEqual(counter.window(num_steps), window)
+                self.assertEqual(counter.sum("arrived", num_steps),
+                                 counts[i + 1 - window:i + 1, 0].sum())
+                expected = counts[max(i + 1 - window, 4):i + 1, 1].sum()
+                self.assertEqual(counter.sum("departed", num_steps),
+                                 expected)
+            self.assertEqual(counter.last("arrived"), arrived)
+
+        # the rate is computed over the available steps
+        self.assertAlmostEqual(get_rate(counter, "arrived", 100, 0.5),
+                               3600 * counts[-5:, 0].sum() / 2.5)
+
+        counter.clear()
+        self.assertEqual(counter.num_steps, 0)
+        self.assertEqual(counter.sum("arrived", 3), 0)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -3,11 +3,15 @@ from flow.visualize.visualizer_rllib import visualizer_rllib
 import flow.visualize.capacity_diagram_generator as cdg
 import flow.visualize.time_space_diagram as tsd
 import flow.visualize.plot_ray_results as prr
+from flow.core.kernel.simulation.emission import EmissionWriter, \
+    EMISSION_COLUMNS
 
 import os
+import tempfile
 import unittest
 import ray
 import numpy as np
+import pandas as pd
 import contextlib
 from io import StringIO
 
@@ -204,6 +208,57 @@ class TestPlotters(unittest.TestCase):
         for lane, expected_seg in expected_segs.items():
             np.testing.assert_array_almost_equal(segs[lane], expected_seg)
 
+    def test_import_compressed_trajectory(self):
+        columns = {
+            name: [0.1 * t for t in range(10) for _ in range(2)]
+            if name == 'time' else
+            ['veh_{}'.format(i) for _ in range(10) for i in range(2)]
+            if dtype is object else list(range(20))
+            for name, dtype in EMISSION_COLUMNS}
+
+        # compressed emission files are read the same way as csv files
+        data = {}
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for emission_format in ['csv', 'csv.gz']:
+                emission_file = os.path.join(
+                    tmp_dir, 'emission.{}'.format(emission_format))
+                writer = EmissionWriter(emission_file, fmt=emission_format)
+                writer.append(**columns)
+                writer.close()
+                data[emission_format] = tsd.import_data_from_trajectory(
+                    emission_file)
+
+        self.assertEqual(len(data['csv']), 18)
+        pd.testing.assert_frame_equal(data['csv.gz'], data['csv'])
+
+    def test_import_trajectory_chunks(self):
+        columns = {
+            name: [0.1 * t for t in range(10) for _ in range(3)]
+            if name == 'time' else
+            ['veh_{}'.format((i + t) % 4) for t in range(10) for i in range(3)]
+            if dtype is object else list(range(30))
+            for name, dtype in EMISSION_COLUMNS}
+
+        # the results do not depend on the number of rows read at a time
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            emission_file = os.path.join(tmp_dir, 'emission.csv')
+            writer = EmissionWriter(emission_file)
+            writer.append(**columns)
+            writer.close()
+            data = tsd.import_data_from_trajectory(emission_file)
+            chunked_data = tsd.import_data_from_trajectory(
+                emission_file, chunksize=4)
+
+        pd.testing.assert_frame_equal(chunked_data, data)
+
+        # segments join the successive samples of every vehicle
+        expected = pd.DataFrame(columns).groupby('id')[
+            ['distance', 'time']].shift(-1).dropna()
+        np.testing.assert_array_almost_equal(
+            data['next_pos'], expected['distance'])
+        np.testing.assert_array_almost_equal(
+            data['next_time'], expected['time'])
+
     def test_time_space_diagram_ring_road(self):
         dir_path = os.path.dirname(os.path.realpath(__file__))
         flow_params = tsd.get_flow_params(